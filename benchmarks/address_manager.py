@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import time
+import tracemalloc
+
+from benchmarks.address_manager_store import populate_address_manager
+from chia.server.address_manager import AddressManager
+
+# to run this benchmark:
+# python -m benchmarks.address_manager
+
+
+def build_address_manager(num_new: int, num_tried: int) -> AddressManager:
+    address_manager = populate_address_manager(num_new, num_tried)
+    address_manager.load_used_table_positions()
+    return address_manager
+
+
+def main() -> None:
+    tracemalloc.start()
+    address_manager = build_address_manager(num_new=500000, num_tried=200000)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    num_peers = len(address_manager.map_info)
+    print(
+        f"peers: {num_peers} memory: {current / 1024 / 1024:0.1f} MiB "
+        f"({current / num_peers:0.0f} bytes per peer, including the tables)"
+    )
+
+    for name, num_new, num_tried in [("dense", 500000, 200000), ("sparse", 2000, 500)]:
+        if name == "sparse":
+            address_manager = build_address_manager(num_new, num_tried)
+
+        iterations = 20000
+        start = time.perf_counter()
+        for i in range(iterations):
+            assert address_manager.select_peer_(new_only=i % 4 == 0) is not None
+        select_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(100):
+            address_manager.get_peers_()
+        get_peers_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        address_manager.cleanup(max_timestamp_difference=14 * 24 * 60 * 60, max_consecutive_failures=10)
+        cleanup_duration = time.perf_counter() - start
+
+        print(
+            f"{name:6s} select_peer: {select_duration * 1000000 / iterations:0.1f} us "
+            f"get_peers: {get_peers_duration * 1000 / 100:0.2f} ms "
+            f"cleanup: {cleanup_duration * 1000:0.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -17,7 +17,8 @@ from chia.server.address_manager import (
     AddressManager,
     ExtendedPeerInfo,
 )
-from chia.types.peer_info import TimestampedPeerInfo
+from chia.server.address_manager_journal import PeerJournal
+from chia.types.peer_info import PeerInfo, TimestampedPeerInfo
 from chia.util.files import write_file_async
 
 
@@ -124,8 +125,60 @@ async def benchmark_serialize_deserialize(iterations: int = 5) -> None:
         print(f"Average deserialize time: {total_deserialize_time / iterations:.6f} seconds")
 
 
+async def benchmark_journal(num_changes: int = 10000) -> None:
+    """
+    Compares the time the address manager lock is held to persist peers with
+    the journal (taking the change log) against a full serialization, and
+    measures appending to and compacting the journal.
+    """
+
+    rand = random.Random()
+    rand.seed(1338)
+    current_time = int(datetime.now().timestamp())
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        peers_file_path = Path(tmpdir) / "peers.dat"
+        await write_file_async(peers_file_path, populate_address_manager().serialize_bytes(), file_mode=0o644)
+        journal = PeerJournal(peers_file_path)
+        address_manager = await journal.load()
+
+        source = PeerInfo(generate_random_ip(rand), uint16(8444))
+        peers = [
+            TimestampedPeerInfo(generate_random_ip(rand), uint16(8444), uint64(current_time - rand.randint(0, 1000)))
+            for _ in range(num_changes)
+        ]
+        await address_manager.add_to_new_table(peers, source)
+        for peer in peers[: num_changes // 10]:
+            await address_manager.mark_good(PeerInfo(peer.host, peer.port))
+
+        start = time.perf_counter()
+        async with address_manager.lock:
+            serialised_bytes = address_manager.serialize_bytes()
+        serialize_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async with address_manager.lock:
+            changes = address_manager.take_change_log()
+        take_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await journal.append(changes)
+        append_duration = time.perf_counter() - start
+
+        start = time.perf_counter()
+        await journal.compact()
+        compact_duration = time.perf_counter() - start
+
+        print(f"\n=== Journal Benchmark ({len(changes)} changes) ===")
+        print(f"Lock held for full serialize:   {serialize_duration:.6f} seconds ({len(serialised_bytes)} bytes)")
+        print(f"Lock held to take change log:   {take_duration:.6f} seconds")
+        print(f"Journal append time:            {append_duration:.6f} seconds")
+        print(f"Journal compaction time:        {compact_duration:.6f} seconds")
+
+
 async def main() -> None:
     await benchmark_serialize_deserialize(iterations=10)
+    await benchmark_journal()
 
 
 if __name__ == "__main__":
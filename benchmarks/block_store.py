@@ -500,6 +500,49 @@ async def run_add_block_benchmark(version: int) -> None:
         print(f"database size: {db_size / 1000000:.3f} MB")
 
 
+async def run_random_not_compactified_benchmark(num_rows: int) -> None:
+    """
+    Compares sampling the uncompactified heights of a synthetic chain with
+    num_rows blocks against ORDER BY RANDOM() over the table.
+    """
+    async with setup_db("block-store-compact-benchmark.db", 2) as db_wrapper:
+        block_store = await BlockStore.create(db_wrapper)
+
+        start = monotonic()
+        async with db_wrapper.writer_maybe_transaction() as conn:
+            for batch_start in range(0, num_rows, 100000):
+                await conn.executemany(
+                    "INSERT INTO full_blocks VALUES(?, ?, ?, NULL, ?, 1, x'00', x'00')",
+                    (
+                        (random.randbytes(32), random.randbytes(32), height, int(random.random() < 0.9))
+                        for height in range(batch_start, min(batch_start + 100000, num_rows))
+                    ),
+                )
+        print(f"{monotonic() - start:0.4f}s, inserting {num_rows} blocks")
+
+        iterations = 10
+        start = monotonic()
+        for _ in range(iterations):
+            async with db_wrapper.reader_no_transaction() as conn:
+                async with conn.execute(
+                    "SELECT height FROM full_blocks WHERE in_main_chain=1 AND is_fully_compactified=0 "
+                    "ORDER BY RANDOM() LIMIT 100"
+                ) as cursor:
+                    assert len(list(await cursor.fetchall())) == 100
+        print(f"{(monotonic() - start) / iterations * 1000:0.2f} ms per call, ORDER BY RANDOM()")
+
+        start = monotonic()
+        assert len(await block_store.get_random_not_compactified(100)) == 100
+        print(f"{(monotonic() - start) * 1000:0.2f} ms, loading the uncompactified heights")
+
+        iterations = 1000
+        start = monotonic()
+        for _ in range(iterations):
+            assert len(await block_store.get_random_not_compactified(100)) == 100
+        print(f"{(monotonic() - start) / iterations * 1000:0.2f} ms per call, get_random_not_compactified")
+
+
 if __name__ == "__main__":
     print("version 2")
     asyncio.run(run_add_block_benchmark(2))
+    asyncio.run(run_random_not_compactified_benchmark(2_000_000))
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import statistics
+import subprocess
+import sys
+from time import monotonic
+
+import click
+
+# to run this benchmark:
+# python -m benchmarks.cli_startup
+
+# the chia CLI commands measured, and their start-up time budget in seconds.
+# These only run commands that don't need any services to be running
+COMMANDS: dict[str, tuple[list[str], float]] = {
+    "import": (["-c", "import chia.cmds.chia"], 1.0),
+    "version": (["-m", "chia", "version"], 1.0),
+    "show --help": (["-m", "chia", "show", "--help"], 1.5),
+    "db --help": (["-m", "chia", "db", "--help"], 1.5),
+}
+
+
+def measure(args: list[str], runs: int) -> list[float]:
+    timings: list[float] = []
+    for _ in range(runs):
+        start = monotonic()
+        subprocess.run([sys.executable, *args], check=True, stdout=subprocess.DEVNULL)
+        timings.append(monotonic() - start)
+    return timings
+
+
+@click.command()
+@click.option("-r", "--runs", default=10, help="Number of times each command is run")
+@click.option("--budget-scale", default=1.0, help="Scale the start-up time budgets, for slower machines")
+def main(runs: int, budget_scale: float) -> None:
+    over_budget: list[str] = []
+    for name, (args, budget) in COMMANDS.items():
+        timings = measure(args, runs)
+        median = statistics.median(timings)
+        scaled_budget = budget * budget_scale
+        status = "OK" if median <= scaled_budget else "OVER BUDGET"
+        print(
+            f"{name:15s} median: {median:0.3f}s min: {min(timings):0.3f}s max: {max(timings):0.3f}s "
+            f"budget: {scaled_budget:0.3f}s {status}"
+        )
+        if median > scaled_budget:
+            over_budget.append(name)
+
+    if len(over_budget) > 0:
+        print(f"start-up time budget exceeded by: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from time import monotonic
+
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint64, uint128
+
+from benchmarks.utils import setup_db
+from chia.wallet.coin_selection import select_coins
+from chia.wallet.util.tx_config import DEFAULT_COIN_SELECTION_CONFIG
+from chia.wallet.util.wallet_types import WalletType
+from chia.wallet.wallet_coin_store import WalletCoinStore
+
+# to run this benchmark:
+# python -m benchmarks.coin_selection
+
+NUM_SELECTIONS = 20
+# selecting coins for a target without an exact match runs the knapsack
+# algorithm, which takes time proportional to the number of coins
+NUM_SELECTIONS_WITHOUT_EXACT_MATCH = 3
+
+# we need seeded random, to have reproducible benchmark runs
+random.seed(123456789)
+
+log = logging.getLogger(__name__)
+
+
+def make_amount() -> int:
+    # farming rewards, and payments of a round number of mXCH
+    if random.random() < 0.3:
+        return random.choice([250_000_000_000, 1_750_000_000_000])
+    return random.randrange(1, 100_000) * 1_000_000_000
+
+
+async def run_coin_selection_benchmark(num_coins: int) -> None:
+    """
+    Measures getting the unspent coins of a wallet with num_coins coins, and
+    selecting coins from them.
+    """
+    async with setup_db(f"coin-selection-benchmark-{num_coins}.db", 2) as db_wrapper:
+        store = await WalletCoinStore.create(db_wrapper)
+
+        amounts = [make_amount() for _ in range(num_coins)]
+        async with db_wrapper.writer_maybe_transaction() as conn:
+            await conn.executemany(
+                "INSERT INTO coin_record VALUES(?, 1, 0, 0, 0, ?, ?, ?, ?, 1, 0, NULL)",
+                (
+                    (
+                        random.randbytes(32).hex(),
+                        random.randbytes(32).hex(),
+                        random.randbytes(32).hex(),
+                        uint64(amount).stream_to_bytes(),
+                        WalletType.STANDARD_WALLET,
+                    )
+                    for amount in amounts
+                ),
+            )
+
+        print(f"{num_coins} coins")
+        start = monotonic()
+        async with db_wrapper.reader_no_transaction() as conn:
+            rows = await conn.execute_fetchall(
+                "SELECT * FROM coin_record WHERE coin_type=0 AND wallet_id=1 AND spent_height=0"
+            )
+        {store.coin_record_from_row(row) for row in rows}
+        print(f"  {(monotonic() - start) * 1000:8.2f} ms, querying the unspent coins")
+        start = monotonic()
+        await store.get_unspent_coins_by_amount(1)
+        print(f"  {(monotonic() - start) * 1000:8.2f} ms, loading the unspent coin index")
+        start = monotonic()
+        for _ in range(NUM_SELECTIONS):
+            records = await store.get_unspent_coins_by_amount(1)
+        print(f"  {(monotonic() - start) / NUM_SELECTIONS * 1000:8.2f} ms, getting the unspent coins by amount")
+
+        spendable_amount = uint128(sum(amounts))
+        for name, targets in [
+            ("round targets", [random.randrange(1, 1_000_000) * 1_000_000_000 for _ in range(NUM_SELECTIONS)]),
+            (
+                "targets without an exact match",
+                [random.randrange(1, 1_000_000) * 1_000_000_000 + 1 for _ in range(NUM_SELECTIONS_WITHOUT_EXACT_MATCH)],
+            ),
+        ]:
+            exact = 0
+            start = monotonic()
+            for target in targets:
+                coins = await select_coins(
+                    spendable_amount, DEFAULT_COIN_SELECTION_CONFIG, records, {}, log, uint128(target)
+                )
+                exact += sum(coin.amount for coin in coins) == target
+            duration = (monotonic() - start) / len(targets)
+            print(f"  {duration * 1000:8.2f} ms per selection, {name} ({exact}/{len(targets)} without change)")
+
+        # the index is kept in sync as coins are spent and added
+        start = monotonic()
+        for record in records[:NUM_SELECTIONS]:
+            await store.set_spent(bytes32(record.coin.name()), record.confirmed_block_height)
+            await store.add_coin_record(record)
+        print(f"  {(monotonic() - start) / NUM_SELECTIONS * 1000:8.2f} ms per spend and add")
+
+
+async def main() -> None:
+    for num_coins in [10_000, 100_000, 1_000_000]:
+        await run_coin_selection_benchmark(num_coins)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
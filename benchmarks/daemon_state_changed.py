@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import ssl
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import aiohttp
+import click
+
+from chia.cmds.init_funcs import chia_init
+from chia.daemon.server import WebSocketServer
+from chia.server.server import ssl_context_for_client
+from chia.util.config import load_config
+from chia.util.task_referencer import create_referenced_task
+from chia.util.ws_message import create_payload
+
+# to run this benchmark:
+# python -m benchmarks.daemon_state_changed
+
+# This is a load test of the daemon forwarding state_changed notifications from
+# services to several UI clients. One client reads slowly, to check it doesn't
+# hold up the others.
+
+
+@dataclass
+class ClientStats:
+    name: str
+    read_delay: float
+    received: int = 0
+    coins_added: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+def make_event(i: int) -> str:
+    now = time.monotonic()
+    kind = i % 10
+    if kind < 5:
+        # a snapshot of the full node's state, only the latest one matters
+        return create_payload(
+            "get_blockchain_state", {"blockchain_state": {"peak": i}, "sent": now}, "chia_full_node", "wallet_ui"
+        )
+    if kind < 8:
+        state = "sync_changed" if kind < 7 else "new_block"
+        return create_payload("state_changed", {"state": state, "wallet_id": 1}, "chia_wallet", "wallet_ui")
+    # every one of these must be delivered
+    return create_payload(
+        "state_changed",
+        {"state": "coin_added", "wallet_id": 1, "additional_data": {"index": i, "sent": now}},
+        "chia_wallet",
+        "wallet_ui",
+    )
+
+
+async def run_client(
+    session: aiohttp.ClientSession, url: str, ssl_context: ssl.SSLContext, stats: ClientStats, ready: asyncio.Event
+) -> None:
+    async with session.ws_connect(url, ssl=ssl_context, max_msg_size=50 * 1000 * 1000) as ws:
+        await ws.send_str(create_payload("register_service", {"service": "wallet_ui"}, stats.name, "daemon"))
+        await ws.receive()
+        ready.set()
+        while True:
+            msg = await ws.receive()
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                return
+            message = json.loads(msg.data)
+            if message["command"] == "benchmark_done":
+                return
+            stats.received += 1
+            data = message["data"]
+            sent = data.get("sent", data.get("additional_data", {}).get("sent"))
+            if sent is not None:
+                stats.latencies.append(time.monotonic() - sent)
+            if data.get("state") == "coin_added":
+                stats.coins_added += 1
+            if stats.read_delay > 0:
+                await asyncio.sleep(stats.read_delay)
+
+
+async def run_benchmark(clients: int, events_per_second: int, duration: float, slow_read_delay: float) -> None:
+    with tempfile.TemporaryDirectory() as root_dir:
+        root_path = Path(root_dir)
+        chia_init(root_path, should_check_keys=False)
+        config = load_config(root_path, "config.yaml")
+        ca_crt_path = root_path / config["private_ssl_ca"]["crt"]
+        ca_key_path = root_path / config["private_ssl_ca"]["key"]
+        crt_path = root_path / config["daemon_ssl"]["private_crt"]
+        key_path = root_path / config["daemon_ssl"]["private_key"]
+        ssl_context = ssl_context_for_client(ca_crt_path, ca_key_path, crt_path, key_path)
+
+        ws_server = WebSocketServer(root_path, ca_crt_path, ca_key_path, crt_path, key_path)
+        ws_server.daemon_port = 0
+        async with ws_server.run():
+            assert ws_server.webserver is not None
+            url = f"wss://{ws_server.self_hostname}:{ws_server.webserver.listen_port}"
+            async with aiohttp.ClientSession() as session:
+                all_stats = [ClientStats(f"client_{i}", slow_read_delay if i == 0 else 0) for i in range(clients)]
+                ready = [asyncio.Event() for _ in all_stats]
+                tasks = [
+                    create_referenced_task(run_client(session, url, ssl_context, stats, event))
+                    for stats, event in zip(all_stats, ready)
+                ]
+                for event in ready:
+                    await event.wait()
+
+                async with session.ws_connect(url, ssl=ssl_context) as service:
+                    num_events = int(events_per_second * duration)
+                    batch_interval = 0.01
+                    batch_size = max(1, int(events_per_second * batch_interval))
+                    start = time.monotonic()
+                    sent = 0
+                    while sent < num_events:
+                        for _ in range(min(batch_size, num_events - sent)):
+                            await service.send_str(make_event(sent))
+                            sent += 1
+                        next_batch = start + sent / events_per_second
+                        await asyncio.sleep(max(0, next_batch - time.monotonic()))
+                    send_time = time.monotonic() - start
+                    await service.send_str(create_payload("benchmark_done", {}, "chia_wallet", "wallet_ui"))
+
+                    done, _ = await asyncio.wait(tasks, timeout=60)
+                    total_time = time.monotonic() - start
+
+        coins_added = sum(1 for i in range(num_events) if i % 10 >= 8)
+        print(f"{num_events} events sent to {clients} clients in {send_time:0.2f} s ({num_events / send_time:0.0f}/s)")
+        print(f"all clients done after {total_time:0.2f} s, {len(tasks) - len(done)} timed out")
+        for stats in all_stats:
+            latencies = sorted(stats.latencies)
+            median = latencies[len(latencies) // 2] * 1000 if latencies else 0
+            worst = latencies[-1] * 1000 if latencies else 0
+            print(
+                f"  {stats.name}{' (slow)' if stats.read_delay > 0 else ''}: received {stats.received}, "
+                f"coin_added {stats.coins_added}/{coins_added}, "
+                f"latency median {median:0.1f} ms, max {worst:0.1f} ms"
+            )
+
+
+@click.command()
+@click.option("-c", "--clients", default=5, help="Number of UI clients")
+@click.option("-r", "--rate", default=500, help="Events sent per second")
+@click.option("-d", "--duration", default=10.0, help="Seconds to send events for")
+@click.option("-s", "--slow-read-delay", default=0.005, help="Seconds the slow client takes to read each message")
+def main(clients: int, rate: int, duration: float, slow_read_delay: float) -> None:
+    asyncio.run(run_benchmark(clients, rate, duration, slow_read_delay))
+
+
+if __name__ == "__main__":
+    main()
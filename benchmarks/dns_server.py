@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import tempfile
+import time
+from ipaddress import IPv4Address, IPv6Address
+from pathlib import Path
+from typing import Any
+
+import click
+from dnslib import EDNS0, DNSRecord
+
+from chia.seeder.dns_server import DNSServer, UDPDNSServerProtocol
+from chia.util.config import create_default_chia_config, load_config
+
+# to run this benchmark:
+# python -m benchmarks.dns_server
+
+
+class BenchmarkTransport(asyncio.DatagramTransport):
+    """
+    Counts the replies instead of sending them.
+    """
+
+    def __init__(self, expected_replies: int) -> None:
+        super().__init__()
+        self.replies = 0
+        self.expected_replies = expected_replies
+        self.done = asyncio.Event()
+
+    def sendto(self, data: Any, addr: Any = None) -> None:
+        self.replies += 1
+        if self.replies == self.expected_replies:
+            self.done.set()
+
+    def is_closing(self) -> bool:
+        return False
+
+    def close(self) -> None:
+        pass
+
+
+def make_queries(domain: str, count: int) -> list[bytes]:
+    rng = random.Random(1337)
+    queries: list[bytes] = []
+    for _ in range(count):
+        query = DNSRecord.question(domain, rng.choice(["A", "A", "AAAA", "ANY"]))
+        query.header.id = rng.randrange(65536)
+        if rng.random() < 0.8:
+            query.add_ar(EDNS0(udp_len=1232))
+        queries.append(bytes(query.pack()))
+    return queries
+
+
+async def run_queries(protocol: UDPDNSServerProtocol, queries: list[bytes]) -> float:
+    transport = BenchmarkTransport(len(queries))
+    protocol.connection_made(transport)
+    protocol.start()
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        protocol.datagram_received(query, ("127.0.0.1", 10000 + i % 1000))
+        # let the server respond while the queries keep coming
+        if i % 100 == 99:
+            await asyncio.sleep(0)
+    await transport.done.wait()
+    duration = time.perf_counter() - start
+    await protocol.stop()
+    return duration
+
+
+async def run_benchmark(num_queries: int, num_peers: int) -> None:
+    with tempfile.TemporaryDirectory() as root:
+        root_path = Path(root)
+        create_default_chia_config(root_path)
+        dns_server = DNSServer(load_config(root_path, "config.yaml", "seeder"), root_path)
+
+        peers_v4 = [IPv4Address(0x0A000000 + i) for i in range(num_peers)]
+        peers_v6 = [IPv6Address(0x20010DB8 << 96 | i) for i in range(num_peers)]
+        start = time.perf_counter()
+        dns_server.reliable_peers_v4, dns_server.reliable_peers_v6 = peers_v4, peers_v6
+        dns_server.answer_pools = dns_server.build_answer_pools(peers_v4, peers_v6)
+        print(f"building the answer pools: {(time.perf_counter() - start) * 1000:0.1f} ms")
+
+        queries = make_queries(dns_server.domain, num_queries)
+        for name, fast_callback in [("fast path", dns_server.fast_dns_response), ("full processing", None)]:
+            protocol = UDPDNSServerProtocol(dns_server.dns_response, fast_callback)
+            duration = await run_queries(protocol, queries)
+            print(f"{name:15s} {num_queries / duration:10.0f} queries/s")
+
+
+@click.command()
+@click.option("-q", "--queries", default=20000, help="Number of queries to send")
+@click.option("-p", "--peers", default=5000, help="Number of reliable IPv4 and IPv6 peers each")
+def main(queries: int, peers: int) -> None:
+    asyncio.run(run_benchmark(queries, peers))
+
+
+if __name__ == "__main__":
+    main()
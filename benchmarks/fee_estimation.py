@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import random
+from time import monotonic
+
+import click
+from chia_rs.sized_ints import uint32
+
+from chia.full_node.fee_estimate_store import FeeStore
+from chia.full_node.fee_estimation import MempoolItemInfo
+from chia.full_node.fee_estimator_constants import SECONDS_PER_BLOCK
+from chia.full_node.fee_tracker import FeeTracker
+
+# to run this benchmark:
+# python -m benchmarks.fee_estimation
+
+START_HEIGHT = 5000000
+
+
+def make_item(rng: random.Random, height: int) -> MempoolItemInfo:
+    cost = rng.randrange(5_000_000, 50_000_000)
+    # most transactions pay little or nothing, some pay a lot
+    fee_per_cost = rng.lognormvariate(0, 3) if rng.random() < 0.8 else 0
+    return MempoolItemInfo(cost, int(cost * fee_per_cost), uint32(height))
+
+
+def run_benchmark(num_blocks: int, new_txs_per_block: int, txs_per_block: int, mempool_size: int) -> None:
+    rng = random.Random(1337)
+    tracker = FeeTracker(FeeStore())
+    mempool: list[MempoolItemInfo] = []
+
+    add_time = 0.0
+    block_time = 0.0
+    remove_time = 0.0
+    estimate_time = 0.0
+
+    for height in range(START_HEIGHT, START_HEIGHT + num_blocks):
+        new_items = [make_item(rng, height) for _ in range(new_txs_per_block)]
+        start = monotonic()
+        for item in new_items:
+            tracker.add_tx(item)
+        add_time += monotonic() - start
+        mempool.extend(new_items)
+
+        # the block includes the transactions paying the most
+        mempool.sort(key=lambda item: item.fee_per_cost, reverse=True)
+        included = mempool[:txs_per_block]
+        mempool = mempool[txs_per_block:]
+        start = monotonic()
+        tracker.process_block(uint32(height + 1), included)
+        block_time += monotonic() - start
+
+        # the full mempool evicts the transactions paying the least
+        evicted = mempool[mempool_size:]
+        mempool = mempool[:mempool_size]
+        start = monotonic()
+        for item in evicted:
+            tracker.remove_tx(item)
+        remove_time += monotonic() - start
+
+        start = monotonic()
+        tracker.estimate_fees()
+        for blocks in [1, 5, 10, 60]:
+            tracker.estimate_fee(blocks * SECONDS_PER_BLOCK)
+        estimate_time += monotonic() - start
+
+    print(
+        f"{num_blocks} blocks, {new_txs_per_block} new transactions and {txs_per_block} included per block, "
+        f"mempool size: {mempool_size}"
+    )
+    print(f"  add_tx()        {add_time:0.2f} s")
+    print(f"  process_block() {block_time:0.2f} s")
+    print(f"  remove_tx()     {remove_time:0.2f} s")
+    print(f"  estimates       {estimate_time:0.2f} s")
+    print(f"  total           {add_time + block_time + remove_time + estimate_time:0.2f} s")
+
+
+@click.command()
+@click.option("-b", "--blocks", default=86400 // SECONDS_PER_BLOCK, help="Number of blocks, a day by default")
+@click.option("-n", "--new-transactions", default=150, help="Number of transactions added to the mempool per block")
+@click.option("-t", "--transactions", default=100, help="Number of transactions included in each block")
+@click.option("-m", "--mempool-size", default=1000, help="Number of transactions the mempool holds")
+def main(blocks: int, new_transactions: int, transactions: int, mempool_size: int) -> None:
+    run_benchmark(blocks, new_transactions, transactions, mempool_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,77 @@
 from __future__ import annotations
 
 import random
+from collections.abc import Callable
 from time import perf_counter
+from typing import Any
+
+from chia_rs import CoinRecord
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint8, uint32, uint64
 
 from chia._tests.util.test_full_block_utils import get_full_blocks
+from chia.full_node.full_node_rpc_api import coin_record_dict_backwards_compat
+from chia.types.blockchain_format.coin import Coin
+from chia.util.json_util import dict_to_json_str, json_chunks
+from chia.wallet.transaction_record import TransactionRecordOld
+
+# to run this benchmark:
+# python -m benchmarks.jsonify
+
+rng = random.Random(123456789)
+
+
+def rand_hash() -> bytes32:
+    return bytes32.random(rng)
+
+
+def rand_coin() -> Coin:
+    return Coin(rand_hash(), rand_hash(), uint64(rng.randrange(2**40)))
+
 
-random.seed(123456789)
+def coin_records_response(count: int) -> dict[str, Any]:
+    # like get_coin_records_by_puzzle_hashes, the records are converted to dicts by the endpoint
+    records = [CoinRecord(rand_coin(), uint32(i), uint32(0), False, uint64(1700000000 + i)) for i in range(count)]
+    return {"coin_records": [coin_record_dict_backwards_compat(record.to_json_dict()) for record in records]}
+
+
+def transactions_response(count: int) -> dict[str, Any]:
+    # responses holding streamable objects, which are converted while writing the json
+    transactions = [
+        TransactionRecordOld(
+            confirmed_at_height=uint32(i),
+            created_at_time=uint64(1700000000 + i),
+            to_puzzle_hash=rand_hash(),
+            amount=uint64(rng.randrange(2**40)),
+            fee_amount=uint64(0),
+            confirmed=True,
+            sent=uint32(1),
+            spend_bundle=None,
+            additions=[rand_coin(), rand_coin()],
+            removals=[rand_coin()],
+            wallet_id=uint32(1),
+            sent_to=[("peer", uint8(1), None)],
+            trade_id=None,
+            type=uint32(0),
+            name=rand_hash(),
+            memos={rand_hash(): [b"memo"]},
+        )
+        for i in range(count)
+    ]
+    return {"transactions": transactions, "wallet_id": 1}
+
+
+def blocks_response() -> dict[str, Any]:
+    return {"blocks": list(get_full_blocks())}
+
+
+def measure(name: str, convert: Callable[[Any], object], payload: Any, iterations: int) -> float:
+    start = perf_counter()
+    for _ in range(iterations):
+        convert(payload)
+    elapsed = (perf_counter() - start) / iterations
+    print(f"  {name:<18} {elapsed * 1000:8.2f} ms")
+    return elapsed
 
 
 def main() -> None:
@@ -20,6 +86,20 @@ def main() -> None:
 
     print(f"total time: {total_time:0.2f}s ({counter} iterations)")
 
+    payloads = {
+        "coin records (50000)": coin_records_response(50000),
+        "transactions (5000)": transactions_response(5000),
+        f"full blocks ({counter})": blocks_response(),
+    }
+    for name, payload in payloads.items():
+        json_str = dict_to_json_str(payload)
+        chunks = list(json_chunks(payload))
+        assert "".join(chunks) == json_str
+        print(f"\n{name}: {len(json_str) / 1e6:0.1f} MB, {len(chunks)} chunks")
+        before = measure("dict_to_json_str", dict_to_json_str, payload, 5)
+        after = measure("json_chunks", lambda o: list(json_chunks(o)), payload, 5)
+        print(f"  {'speedup':<18} {before / after:8.2f}x")
+
 
 if __name__ == "__main__":
     main()
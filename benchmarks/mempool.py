@@ -237,24 +237,46 @@ async def run_mempool_benchmark() -> None:
         print(f"  time: {stop - start:0.4f}s")
         print(f"  per call: {(stop - start) / total_bundles * 1000:0.2f}ms")
 
-        print("\nProfiling create_block_generator()")
+        print("\nProfiling create_block_generator() without the block template")
         with enable_profiler(True, f"create-{suffix}"):
             start = monotonic()
             for _ in range(10):
+                # build it from scratch every time
+                mempool.mempool._block_template = None
                 mempool.create_block_generator(rec.header_hash, 2.0)
             stop = monotonic()
         print(f"  time: {stop - start:0.4f}s")
         print(f"  per call: {(stop - start) / 10 * 1000:0.2f}ms")
 
-        print("\nProfiling create_block_generator2()")
+        print("\nProfiling create_block_generator() with the block template")
+        # the template was built ahead of time, when the mempool last changed
+        start = monotonic()
+        for _ in range(10):
+            mempool.create_block_generator(rec.header_hash, 2.0)
+        stop = monotonic()
+        print(f"  time: {stop - start:0.4f}s")
+        print(f"  per call: {(stop - start) / 10 * 1000:0.2f}ms")
+
+        print("\nProfiling create_block_generator2() without the block template")
         with enable_profiler(True, f"create2-{suffix}"):
             start = monotonic()
             for _ in range(10):
+                # build it from scratch every time
+                mempool.mempool._block_template = None
                 mempool.create_block_generator2(rec.header_hash, 2.0)
             stop = monotonic()
         print(f"  time: {stop - start:0.4f}s")
         print(f"  per call: {(stop - start) / 10 * 1000:0.2f}ms")
 
+        print("\nProfiling create_block_generator2() with the block template")
+        # the template was built ahead of time, when the mempool last changed
+        start = monotonic()
+        for _ in range(10):
+            mempool.create_block_generator2(rec.header_hash, 2.0)
+        stop = monotonic()
+        print(f"  time: {stop - start:0.4f}s")
+        print(f"  per call: {(stop - start) / 10 * 1000:0.2f}ms")
+
         print("\nProfiling new_peak() (optimized)")
         blocks: list[tuple[BenchBlockRecord, list[bytes32]]] = []
         for coin_id in all_coins.keys():
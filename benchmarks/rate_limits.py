@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+from time import monotonic
+
+import click
+
+from chia.protocols.outbound_message import Message, make_msg
+from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
+from chia.server.rate_limits import RateLimiter
+
+# to run this benchmark:
+# python -m benchmarks.rate_limits
+
+capabilities = [Capability.BASE, Capability.BLOCK_HEADERS, Capability.RATE_LIMITS_V2]
+
+# a mix of the messages a full node receives from its peers
+MESSAGE_TYPES = [
+    ProtocolMessageTypes.new_transaction,
+    ProtocolMessageTypes.new_transaction,
+    ProtocolMessageTypes.new_transaction,
+    ProtocolMessageTypes.request_transaction,
+    ProtocolMessageTypes.respond_transaction,
+    ProtocolMessageTypes.new_peak,
+    ProtocolMessageTypes.new_signage_point_or_end_of_sub_slot,
+    ProtocolMessageTypes.new_unfinished_block2,
+    ProtocolMessageTypes.request_block,
+    ProtocolMessageTypes.respond_block,
+]
+
+
+@click.command()
+@click.option("-n", "--messages", default=1_000_000, help="Number of messages to check")
+@click.option("--incoming/--outgoing", default=True, help="Check incoming or outgoing messages")
+def main(messages: int, incoming: bool) -> None:
+    rng = random.Random(1337)
+    all_messages: list[Message] = [
+        make_msg(rng.choice(MESSAGE_TYPES), rng.randbytes(rng.randrange(32, 2048))) for _ in range(10000)
+    ]
+
+    # the clock advances a millisecond per message, so a thousand messages per
+    # second are checked against the limits, some of which are exceeded
+    now = 0.0
+
+    def get_time() -> float:
+        return now
+
+    limiter = RateLimiter(incoming=incoming, get_time=get_time)
+
+    rejected = 0
+    start = monotonic()
+    for i in range(messages):
+        now = i / 1000
+        if limiter.process_msg_and_check(all_messages[i % len(all_messages)], capabilities, capabilities) is not None:
+            rejected += 1
+    duration = monotonic() - start
+
+    print(f"checked {messages} messages in {duration:0.2f} s, {messages / duration:0.0f} messages/s")
+    print(f"rejected: {rejected}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,16 +13,20 @@ from typing import Any, TextIO
 import click
 from chia_rs import FullBlock
 from chia_rs.sized_bytes import bytes32
-from chia_rs.sized_ints import uint8, uint64
+from chia_rs.sized_ints import uint8, uint32, uint64
 
 from benchmarks.utils import get_commit_hash
 from chia._tests.util.benchmarks import rand_full_block, rand_hash
-from chia.util.streamable import Streamable, streamable
+from chia.util.streamable import USE_GENERATED_FUNCTIONS, Streamable, streamable
 
 # to run this benchmark:
 # python -m benchmarks.streamable
 
-_version = 1
+# to compare the generated parse and stream functions to the generic ones:
+# python -m benchmarks.streamable -o generic.json
+# CHIA_STREAMABLE_GENERATED=1 python -m benchmarks.streamable -c generic.json
+
+_version = 2
 
 
 @streamable
@@ -51,6 +55,20 @@ class BenchmarkClass(Streamable):
     e: tuple[BenchmarkMiddle, BenchmarkMiddle, BenchmarkMiddle]
 
 
+@streamable
+@dataclass(frozen=True)
+class BenchmarkFixedSize(Streamable):
+    a: uint32
+    b: uint64
+    c: bytes32
+    d: bool
+    e: uint8
+    f: bytes32
+    g: uint64
+    h: list[uint64]
+    i: list[bytes32]
+
+
 def get_random_inner() -> BenchmarkInner:
     return BenchmarkInner(random.randbytes(20).hex())
 
@@ -77,6 +95,20 @@ def get_random_benchmark_object() -> BenchmarkClass:
     return BenchmarkClass(a, b, c, d, e)
 
 
+def get_random_fixed_size_object() -> BenchmarkFixedSize:
+    return BenchmarkFixedSize(
+        uint32(random.randrange(2**32)),
+        uint64(random.randrange(2**64)),
+        rand_hash(),
+        True,
+        uint8(random.randrange(2**8)),
+        rand_hash(),
+        uint64(random.randrange(2**64)),
+        [uint64(random.randrange(2**64)) for _ in range(50)],
+        [rand_hash() for _ in range(50)],
+    )
+
+
 def print_row(
     *,
     mode: str,
@@ -123,6 +155,7 @@ def print_results(mode: str, bench_result: BenchmarkResults, final: bool) -> Non
 class Data(str, Enum):
     all = "all"
     benchmark = "benchmark"
+    fixed_size = "fixed_size"
     full_block = "full_block"
 
 
@@ -165,6 +198,17 @@ benchmark_parameter: dict[Data, BenchmarkParameter] = {
             Mode.from_json: ModeParameter(BenchmarkClass.from_json_dict, BenchmarkClass.to_json_dict),
         },
     ),
+    Data.fixed_size: BenchmarkParameter(
+        BenchmarkFixedSize,
+        get_random_fixed_size_object,
+        {
+            Mode.creation: None,
+            Mode.to_bytes: ModeParameter(to_bytes),
+            Mode.from_bytes: ModeParameter(BenchmarkFixedSize.from_bytes, to_bytes),
+            Mode.to_json: ModeParameter(BenchmarkFixedSize.to_json_dict),
+            Mode.from_json: ModeParameter(BenchmarkFixedSize.from_json_dict, BenchmarkFixedSize.to_json_dict),
+        },
+    ),
     Data.full_block: BenchmarkParameter(
         FullBlock,
         rand_full_block,
@@ -214,6 +258,8 @@ def compare_results(
     if old_version != new_version:
         sys.exit(f"version mismatch: old: {old_version} vs new: {new_version}")
     old_commit_hash, new_commit_hash = pop_data("commit_hash", old=old, new=new)
+    old_generated, new_generated = pop_data("generated_functions", old=old, new=new)
+    print(f"\ngenerated functions, old: {old_generated}, new: {new_generated}")
     for data, modes in new.items():
         if data not in old:
             continue
@@ -236,14 +282,18 @@ def compare_results(
 @click.option("-c", "--compare", type=click.File("r"), help="Compare to the results from a file")
 def run(data: Data, mode: Mode, runs: int, ms: int, live: bool, output: TextIO, compare: TextIO) -> None:
     results: dict[Data, dict[Mode, list[list[int]]]] = {}
-    bench_results: dict[str, Any] = {"version": _version, "commit_hash": get_commit_hash()}
+    bench_results: dict[str, Any] = {
+        "version": _version,
+        "commit_hash": get_commit_hash(),
+        "generated_functions": USE_GENERATED_FUNCTIONS,
+    }
     for current_data, parameter in benchmark_parameter.items():
         if data in {Data.all, current_data}:
             results[current_data] = {}
             bench_results[current_data] = {}
             print(
                 f"\nbenchmarks: {mode.name}, data: {parameter.data_class.__name__} runs: {runs}, ms/run: {ms}, "
-                f"commit_hash: {bench_results['commit_hash']}"
+                f"commit_hash: {bench_results['commit_hash']}, generated functions: {USE_GENERATED_FUNCTIONS}"
             )
             print_row(
                 mode="mode",
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from chia.cmds.chia import LAZY_SUBCOMMANDS, cli
+from chia.cmds.lazy_group import LazyGroup
+
+
+def test_cli_import_does_not_load_subcommands() -> None:
+    # this runs in a fresh interpreter, since the test process has most of
+    # chia imported already
+    script = "import sys; import chia.cmds.chia; print(*sorted(sys.modules), sep='\\n')"
+    result = subprocess.run([sys.executable, "-c", script], check=True, capture_output=True, text=True)
+    modules = set(result.stdout.splitlines())
+
+    assert "chia.cmds.chia" in modules
+    for import_path in LAZY_SUBCOMMANDS.values():
+        module_name = import_path.split(":")[0]
+        assert module_name not in modules
+    for package in ["chia.wallet", "chia.data_layer", "chia.rpc", "chia.full_node", "chia.daemon"]:
+        assert not any(module == package or module.startswith(f"{package}.") for module in modules)
+
+
+@pytest.mark.parametrize("cmd_name", sorted(LAZY_SUBCOMMANDS.keys()))
+def test_lazy_subcommands_resolve(cmd_name: str) -> None:
+    ctx = click.Context(cli)
+    assert cmd_name in cli.list_commands(ctx)
+    command = cli.get_command(ctx, cmd_name)
+    assert isinstance(command, click.Command)
+    assert command.name == cmd_name
+
+
+def test_lazy_group_loads_on_invoke() -> None:
+    @click.group(cls=LazyGroup, lazy_subcommands={"hello": f"{__name__}:_lazy_hello", "bad": f"{__name__}:_not_a_cmd"})
+    def group() -> None:
+        pass
+
+    assert isinstance(group, LazyGroup)
+    assert group.list_commands(click.Context(group)) == ["bad", "hello"]
+    assert "hello" not in group.commands
+
+    result = CliRunner().invoke(group, ["hello"])
+    assert result.exit_code == 0
+    assert result.output == "lazy hello\n"
+    # the command is only imported once
+    assert "hello" in group.commands
+    assert "hello" not in group.lazy_subcommands
+
+    result = CliRunner().invoke(group, ["bad"])
+    assert isinstance(result.exception, ValueError)
+
+
+@click.command("hello")
+def _lazy_hello() -> None:
+    print("lazy hello")
+
+
+_not_a_cmd = "not a command"
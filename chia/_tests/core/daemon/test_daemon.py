@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import importlib.metadata
 import json
 import logging
@@ -15,7 +16,7 @@ from chia_rs import G1Element
 from pytest_mock import MockerFixture
 
 from chia._tests.util.misc import Marks, datacases
-from chia._tests.util.time_out_assert import time_out_assert_not_none
+from chia._tests.util.time_out_assert import time_out_assert, time_out_assert_not_none
 from chia.daemon.client import DaemonProxy, connect_to_daemon
 from chia.daemon.keychain_server import (
     DeleteLabelRequest,
@@ -2206,3 +2207,105 @@ async def test_non_text_message_logging(
         non_text_logs = [record for record in caplog.records if "Received non-text message" in record.message]
 
         assert len(non_text_logs) == 1, "Expected one 'Received non-text message' log entry"
+
+
+@dataclass(eq=False)
+class GuiWebSocket:
+    sent: list[str] = field(default_factory=list)
+    # when set, send_str() waits for it, like a GUI that doesn't read
+    blocked: asyncio.Event | None = None
+    closed: bool = False
+
+    async def send_str(self, data: str) -> None:
+        if self.blocked is not None:
+            await self.blocked.wait()
+        self.sent.append(data)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+@pytest.mark.anyio
+async def test_slow_client_is_disconnected(
+    get_daemon: WebSocketServer, bt: BlockTools, caplog: pytest.LogCaptureFixture
+) -> None:
+    ws_server = get_daemon
+    ws_server.send_buffer_size = 10
+    slow = GuiWebSocket(blocked=asyncio.Event())
+    fast = GuiWebSocket()
+    ws_server.connections["wallet_ui"] = {cast(WebSocketResponse, slow), cast(WebSocketResponse, fast)}
+
+    def tx_update(i: int) -> str:
+        data = {"state": "tx_update", "wallet_id": 1, "additional_data": {"transaction": {"name": f"{i}"}}}
+        return create_payload("state_changed", data, "chia_wallet", "wallet_ui")
+
+    async def send_and_ping(ws: aiohttp.ClientWebSocketResponse, payloads: list[str]) -> None:
+        for payload in payloads:
+            await ws.send_str(payload)
+        # the daemon handled everything sent before once it responds to this
+        await ws.send_str(create_payload("ping", {}, "chia_wallet", "daemon"))
+        assert_response_success_only(await ws.receive())
+
+    async with aiohttp.ClientSession() as client:
+        async with client.ws_connect(
+            f"wss://127.0.0.1:{bt.config['daemon_port']}",
+            autoclose=True,
+            autoping=True,
+            ssl=bt.get_daemon_ssl_context(),
+        ) as ws:
+            with caplog.at_level(logging.WARNING, logger="chia.daemon.server"):
+                # the slow client is behind by a few notifications, and any number
+                # of signals that are coalesced
+                sync_changed = create_payload("state_changed", {"state": "sync_changed"}, "chia_wallet", "wallet_ui")
+                await send_and_ping(ws, [tx_update(i) for i in range(5)] + [sync_changed] * 20)
+                assert slow in ws_server.connections["wallet_ui"]
+                assert not slow.closed
+
+                # a burst of transaction updates that don't fit in its buffer drops it
+                await send_and_ping(ws, [tx_update(i) for i in range(5, 20)])
+                await time_out_assert(5, lambda: slow.closed)
+                assert ws_server.connections["wallet_ui"] == {fast}
+                assert slow not in ws_server.senders
+                assert any(
+                    "Client fell behind" in record.message and record.levelno == logging.WARNING
+                    for record in caplog.records
+                )
+
+                # the other clients get every notification
+                def transactions() -> list[str]:
+                    received = [json.loads(message)["data"] for message in fast.sent]
+                    return [
+                        data["additional_data"]["transaction"]["name"] for data in received if "additional_data" in data
+                    ]
+
+                await time_out_assert(5, transactions, [f"{i}" for i in range(20)])
+                assert any(json.loads(message)["data"]["state"] == "sync_changed" for message in fast.sent)
+
+                # and the sender is still connected
+                await send_and_ping(ws, [])
+
+
+@pytest.mark.anyio
+async def test_concurrent_requests_are_not_coalesced(get_daemon: WebSocketServer, bt: BlockTools) -> None:
+    ws_server = get_daemon
+    full_node = GuiWebSocket()
+    ws_server.connections["chia_full_node"] = {cast(WebSocketResponse, full_node)}
+
+    async with aiohttp.ClientSession() as client:
+        async with client.ws_connect(
+            f"wss://127.0.0.1:{bt.config['daemon_port']}",
+            autoclose=True,
+            autoping=True,
+            ssl=bt.get_daemon_ssl_context(),
+        ) as ws:
+            # the same request twice, each expecting a reply to its own request_id
+            requests = [create_payload("get_blockchain_state", {}, "wallet_ui", "chia_full_node") for _ in range(2)]
+            for request in requests:
+                await ws.send_str(request)
+            await ws.send_str(create_payload("ping", {}, "wallet_ui", "daemon"))
+            assert_response_success_only(await ws.receive())
+
+            await time_out_assert(5, lambda: len(full_node.sent), 2)
+            assert [json.loads(message)["request_id"] for message in full_node.sent] == [
+                json.loads(request)["request_id"] for request in requests
+            ]
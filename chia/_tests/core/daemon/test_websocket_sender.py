@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import cast
+
+import pytest
+from aiohttp.web_ws import WebSocketResponse
+
+from chia.daemon.websocket_sender import SendBufferFullError, WebSocketSender, coalescing_key
+
+
+@dataclass
+class FakeWebSocket:
+    sent: list[str] = field(default_factory=list)
+    # when set, send_str() waits for it, like a client that doesn't read
+    blocked: asyncio.Event | None = None
+    error: Exception | None = None
+
+    async def send_str(self, data: str) -> None:
+        if self.blocked is not None:
+            await self.blocked.wait()
+        if self.error is not None:
+            raise self.error
+        self.sent.append(data)
+
+
+@dataclass
+class Errors:
+    errors: list[Exception] = field(default_factory=list)
+
+    async def on_error(self, websocket: WebSocketResponse, e: Exception) -> None:
+        self.errors.append(e)
+
+
+def make_sender(
+    websocket: FakeWebSocket, errors: Errors, *, max_pending: int = 1000, coalesce_window: float = 0.05
+) -> WebSocketSender:
+    sender = WebSocketSender(
+        cast(WebSocketResponse, websocket),
+        errors.on_error,
+        max_pending=max_pending,
+        coalesce_window=coalesce_window,
+    )
+    sender.start()
+    return sender
+
+
+def test_coalescing_key() -> None:
+    assert coalescing_key("get_blockchain_state", "chia_full_node", "wallet_ui", {"blockchain_state": {}}) == (
+        "chia_full_node",
+        "wallet_ui",
+        "get_blockchain_state",
+    )
+    sync_changed = coalescing_key("state_changed", "chia_wallet", "wallet_ui", {"state": "sync_changed"})
+    assert sync_changed is not None
+    assert sync_changed == coalescing_key(
+        "state_changed", "chia_wallet", "wallet_ui", {"state": "sync_changed", "success": True}
+    )
+    assert sync_changed != coalescing_key("state_changed", "chia_wallet", "wallet_ui", {"state": "new_block"})
+    assert sync_changed != coalescing_key("state_changed", "chia_wallet", "metrics", {"state": "sync_changed"})
+    # notifications with more details must all be delivered
+    coin_added = {"state": "coin_added", "additional_data": {}}
+    assert coalescing_key("state_changed", "chia_wallet", "wallet_ui", coin_added) is None
+    assert coalescing_key("state_changed", "chia_plotter", "wallet_ui", {"state": "log_changed", "queue": []}) is None
+    assert coalescing_key("new_signage_point", "chia_farmer", "wallet_ui", {}) is None
+    # requests to services all get their replies
+    assert coalescing_key("get_blockchain_state", "wallet_ui", "chia_full_node", {}) is None
+    assert coalescing_key("get_connections", "wallet_ui", "chia_wallet", {}) is None
+
+
+@pytest.mark.anyio
+async def test_send_in_order() -> None:
+    websocket = FakeWebSocket()
+    errors = Errors()
+    sender = make_sender(websocket, errors)
+    for i in range(100):
+        sender.send(f"message {i}")
+    await asyncio.wait_for(sender.drain(), timeout=5)
+    assert websocket.sent == [f"message {i}" for i in range(100)]
+    assert errors.errors == []
+    sender.close()
+
+
+@pytest.mark.anyio
+async def test_coalesce() -> None:
+    websocket = FakeWebSocket()
+    errors = Errors()
+    sender = make_sender(websocket, errors, coalesce_window=0.05)
+    for i in range(10):
+        sender.send(f"state {i}", ("chia_full_node", "wallet_ui", "get_blockchain_state"))
+        sender.send(f"sync {i}", ("chia_wallet", "wallet_ui", "state_changed", "sync_changed", None))
+    # the coalesced messages are held for the window
+    await asyncio.sleep(0)
+    assert websocket.sent == []
+
+    await asyncio.wait_for(sender.drain(), timeout=5)
+    assert websocket.sent == ["state 9", "sync 9"]
+
+    # messages that aren't coalesced are sent right away, along with what's held
+    websocket.sent.clear()
+    sender.send("state 10", ("chia_full_node", "wallet_ui", "get_blockchain_state"))
+    sender.send("response")
+    await asyncio.wait_for(sender.drain(), timeout=1)
+    assert websocket.sent == ["state 10", "response"]
+    assert errors.errors == []
+    sender.close()
+
+
+@pytest.mark.anyio
+async def test_slow_client_is_dropped() -> None:
+    blocked = asyncio.Event()
+    websocket = FakeWebSocket(blocked=blocked)
+    errors = Errors()
+    sender = make_sender(websocket, errors, max_pending=10)
+    sender.send("first")
+    await asyncio.sleep(0)
+    # the first message is being sent, 10 more may wait
+    for i in range(9):
+        sender.send(f"message {i}")
+    # a notification replacing a waiting one doesn't take more space
+    for i in range(10):
+        sender.send(f"state {i}", ("chia_full_node", "wallet_ui", "get_blockchain_state"))
+    assert errors.errors == []
+    sender.send("one too many")
+    await asyncio.sleep(0)
+    assert len(errors.errors) == 1
+    assert isinstance(errors.errors[0], SendBufferFullError)
+    assert sender.failed
+
+    # nothing is sent to the dropped client anymore
+    blocked.set()
+    sender.send("ignored")
+    await asyncio.wait_for(sender.drain(), timeout=1)
+    assert websocket.sent == []
+
+
+@pytest.mark.anyio
+async def test_send_error() -> None:
+    websocket = FakeWebSocket(error=ConnectionResetError())
+    errors = Errors()
+    sender = make_sender(websocket, errors)
+    sender.send("message")
+    await asyncio.wait_for(sender.drain(), timeout=1)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert len(errors.errors) == 1
+    assert isinstance(errors.errors[0], ConnectionResetError)
+    assert sender.failed
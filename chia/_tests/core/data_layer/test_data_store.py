@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import importlib.resources as importlib_resources
 import itertools
@@ -20,6 +21,7 @@ from typing import Any, BinaryIO
 import aiohttp
 import chia_rs.datalayer
 import pytest
+from aiohttp import web
 from chia_rs.datalayer import KeyAlreadyPresentError, MerkleBlob, TreeIndex
 from chia_rs.sized_bytes import bytes32
 
@@ -43,7 +45,7 @@ from chia.data_layer.data_layer_util import (
     leaf_hash,
 )
 from chia.data_layer.data_store import DataStore
-from chia.data_layer.download_data import insert_from_delta_file, write_files_for_root
+from chia.data_layer.download_data import MirrorSessions, http_download, insert_from_delta_file, write_files_for_root
 from chia.data_layer.util.benchmark import generate_datastore
 from chia.types.blockchain_format.program import Program
 from chia.util.byte_types import hexstr_to_bytes
@@ -1227,6 +1229,7 @@ async def test_server_http_ban(
         server_info: ServerInfo,
         timeout: aiohttp.ClientTimeout,
         log: logging.Logger,
+        session: aiohttp.ClientSession | None = None,
     ) -> None:
         if error:
             raise aiohttp.ClientConnectionError
@@ -1278,6 +1281,178 @@ async def test_server_http_ban(
     assert sinfo.ignore_till == start_timestamp  # we don't increase on second failure
 
 
+@pytest.mark.parametrize("supports_range", [True, False])
+@pytest.mark.anyio
+async def test_http_download_resumes_partial_file(tmp_path: Path, supports_range: bool) -> None:
+    data = bytes(range(256)) * 1024
+    requests: list[str | None] = []
+
+    async def handle(request: web.Request) -> web.Response:
+        range_header = request.headers.get("range")
+        requests.append(range_header)
+        if supports_range and range_header is not None:
+            start = int(range_header.removeprefix("bytes=").removesuffix("-"))
+            return web.Response(status=206, body=data[start:])
+        return web.Response(body=data)
+
+    app = web.Application()
+    app.router.add_get("/{filename}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        _, port = runner.addresses[0][:2]
+        server_info = ServerInfo(f"http://127.0.0.1:{port}", 0, 0)
+        target_path = tmp_path / "delta.dat"
+        # an interrupted download left the first part of the file behind
+        partial_path = tmp_path / "delta.dat.partial"
+        partial_path.write_bytes(data[:1000])
+
+        async with aiohttp.ClientSession() as session:
+            await http_download(
+                target_path,
+                "delta.dat",
+                None,
+                server_info,
+                aiohttp.ClientTimeout(total=15),
+                log,
+                session=session,
+            )
+    finally:
+        await runner.cleanup()
+
+    assert requests == ["bytes=1000-"]
+    assert target_path.read_bytes() == data
+    assert not partial_path.exists()
+
+
+@pytest.mark.parametrize("prefetch_recovers", [True, False])
+@pytest.mark.anyio
+async def test_insert_from_delta_file_prefetch(
+    data_store: DataStore,
+    store_id: bytes32,
+    monkeypatch: Any,
+    tmp_path: Path,
+    seeded_random: random.Random,
+    prefetch_recovers: bool,
+) -> None:
+    sinfo = ServerInfo("http://127.0.0.1/8003", 0, 0)
+    await data_store.subscribe(Subscription(store_id, [sinfo]))
+    root_hashes = [bytes32.random(seeded_random) for _ in range(6)]
+    existing_generation = 3
+    paths = [
+        get_delta_filename_path(tmp_path, store_id, root_hash, existing_generation + 1 + index, False)
+        for index, root_hash in enumerate(root_hashes)
+    ]
+    # the download of the second file fails while it's prefetched, with and without grouping by store
+    failing_path = paths[1]
+    downloads: list[Path] = []
+    sessions = MirrorSessions()
+    misses: list[ServerInfo] = []
+    inserted: list[tuple[Path, int]] = []
+
+    async def mock_http_download(
+        target_filename_path: Path,
+        filename: str,
+        proxy_url: str | None,
+        server_info: ServerInfo,
+        timeout: aiohttp.ClientTimeout,
+        log: logging.Logger,
+        session: aiohttp.ClientSession | None = None,
+    ) -> None:
+        assert session is sessions.get(server_info.url)
+        downloads.append(target_filename_path)
+        if target_filename_path == failing_path and (downloads.count(failing_path) <= 2 or not prefetch_recovers):
+            raise aiohttp.ClientConnectionError
+        target_filename_path.write_bytes(b"delta")
+
+    async def mock_insert_into_data_store_from_file(
+        store_id: bytes32,
+        root_hash: bytes32 | None,
+        filename: Path,
+        delta_reader: Any = None,
+    ) -> None:
+        # let the prefetches run
+        await asyncio.sleep(0)
+        inserted.append((filename, len(set(downloads))))
+
+    async def mock_server_misses_file(store_id: bytes32, server_info: ServerInfo, timestamp: int) -> ServerInfo:
+        misses.append(server_info)
+        return server_info
+
+    with monkeypatch.context() as m:
+        m.setattr("chia.data_layer.download_data.http_download", mock_http_download)
+        m.setattr(data_store, "insert_into_data_store_from_file", mock_insert_into_data_store_from_file)
+        m.setattr(data_store, "server_misses_file", mock_server_misses_file)
+        success = await insert_from_delta_file(
+            data_store=data_store,
+            store_id=store_id,
+            existing_generation=existing_generation,
+            target_generation=existing_generation + len(root_hashes),
+            root_hashes=root_hashes,
+            server_info=sinfo,
+            client_foldername=tmp_path,
+            timeout=aiohttp.ClientTimeout(total=15, sock_connect=5),
+            log=log,
+            proxy_url="",
+            downloader=None,
+            maximum_full_file_count=0,
+            sessions=sessions,
+            prefetch_count=4,
+        )
+    await sessions.close()
+
+    if prefetch_recovers:
+        assert success
+        # the files are inserted in order, and the next 4 were prefetched while the first was inserted
+        assert [path for path, _ in inserted] == paths
+        assert inserted[0][1] == 5
+        # the failed prefetch was retried once when the file was needed, other prefetched files were reused
+        assert downloads.count(failing_path) == 3
+        assert all(downloads.count(path) == 1 for path in paths if path != failing_path)
+        assert misses == []
+    else:
+        assert not success
+        assert [path for path, _ in inserted] == paths[:1]
+        # only the downloads when the file was needed counted misses, as they would without prefetching
+        assert downloads.count(failing_path) == 4
+        assert misses == [sinfo, sinfo]
+
+
+@pytest.mark.anyio
+async def test_mirror_sessions() -> None:
+    sessions = MirrorSessions()
+    first = sessions.get("http://127.0.0.1/8000")
+    second = sessions.get("http://127.0.0.1/8001")
+    assert first is not second
+    assert sessions.get("http://127.0.0.1/8000") is first
+    assert sessions.get("http://127.0.0.1/8001") is second
+
+    # a closed session is replaced
+    await first.close()
+    replaced = sessions.get("http://127.0.0.1/8000")
+    assert replaced is not first
+    assert sessions.get("http://127.0.0.1/8000") is replaced
+
+    # only the sessions used since the last call are kept
+    await sessions.close_unused()
+    assert not replaced.closed
+    assert not second.closed
+    assert sessions.get("http://127.0.0.1/8000") is replaced
+    await sessions.close_unused()
+    assert not replaced.closed
+    assert second.closed
+    assert sessions.get("http://127.0.0.1/8001") is not second
+    second = sessions.get("http://127.0.0.1/8001")
+
+    await sessions.close()
+    assert replaced.closed
+    assert second.closed
+    assert sessions.get("http://127.0.0.1/8001") is not second
+    await sessions.close()
+
+
 async def get_first_generation(data_store: DataStore, node_hash: bytes32, store_id: bytes32) -> int | None:
     async with data_store.db_wrapper.reader() as reader:
         cursor = await reader.execute(
@@ -1764,6 +1939,7 @@ async def test_insert_from_delta_file(
         server_info: ServerInfo,
         timeout: int,
         log: logging.Logger,
+        session: aiohttp.ClientSession | None = None,
     ) -> None:
         pass
 
@@ -1774,6 +1950,7 @@ async def test_insert_from_delta_file(
         server_info: ServerInfo,
         timeout: int,
         log: logging.Logger,
+        session: aiohttp.ClientSession | None = None,
     ) -> None:
         try:
             os.rmdir(store_path)
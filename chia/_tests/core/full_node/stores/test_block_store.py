@@ -323,6 +323,84 @@ async def test_rollback(bt: BlockTools, tmp_dir: Path, use_cache: bool, default_
                     assert not rows[0][0]
 
 
+@pytest.mark.limit_consensus_modes(reason="save time")
+@pytest.mark.anyio
+async def test_get_random_not_compactified(bt: BlockTools, tmp_dir: Path, use_cache: bool) -> None:
+    blocks = bt.get_consecutive_blocks(10)
+
+    def compactify(block: FullBlock) -> FullBlock:
+        compact_proof = VDFProof(uint8(0), b"", True)
+        sub_slots = [
+            sub_slot.replace(
+                proofs=sub_slot.proofs.replace(
+                    challenge_chain_slot_proof=compact_proof,
+                    infused_challenge_chain_slot_proof=None
+                    if sub_slot.proofs.infused_challenge_chain_slot_proof is None
+                    else compact_proof,
+                )
+            )
+            for sub_slot in block.finished_sub_slots
+        ]
+        return block.replace(
+            finished_sub_slots=sub_slots,
+            challenge_chain_sp_proof=None if block.challenge_chain_sp_proof is None else compact_proof,
+            challenge_chain_ip_proof=compact_proof,
+        )
+
+    async with DBConnection(2) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        block_store = await BlockStore.create(db_wrapper, use_cache=use_cache)
+        height_map = await BlockHeightMap.create(tmp_dir, db_wrapper)
+        bc = await Blockchain.create(coin_store, block_store, height_map, bt.constants, 2)
+
+        assert await block_store.get_random_not_compactified(5) == []
+
+        for block in blocks[:5]:
+            await _validate_and_add_block(bc, block)
+        assert set(await block_store.get_random_not_compactified(100)) == set(range(5))
+
+        # the heights are sampled without repetition
+        for _ in range(10):
+            heights = await block_store.get_random_not_compactified(3)
+            assert len(heights) == 3
+            assert len(set(heights)) == 3
+
+        # the candidates are kept up to date as blocks are added to the chain
+        for block in blocks[5:]:
+            await _validate_and_add_block(bc, block)
+        assert set(await block_store.get_random_not_compactified(100)) == set(range(10))
+
+        new_block = compactify(blocks[3])
+        assert new_block.is_fully_compactified()
+        await block_store.replace_proof(new_block.header_hash, new_block)
+        assert set(await block_store.get_random_not_compactified(100)) == set(range(10)) - {3}
+
+        # heights that stopped being candidates behind the store's back are
+        # dropped when they're sampled
+        async with db_wrapper.writer_maybe_transaction() as conn:
+            await conn.execute(
+                "UPDATE full_blocks SET is_fully_compactified=1 WHERE header_hash=?", (blocks[4].header_hash,)
+            )
+        assert set(await block_store.get_random_not_compactified(100)) == set(range(10)) - {3, 4}
+
+        await block_store.rollback(6)
+        assert set(await block_store.get_random_not_compactified(100)) == {0, 1, 2, 5, 6}
+
+        # the changes of a transaction that's rolled back are undone
+        with pytest.raises(ValueError, match="rolled back"):
+            async with db_wrapper.writer():
+                await block_store.rollback(1)
+                compact_block = compactify(blocks[0])
+                await block_store.replace_proof(compact_block.header_hash, compact_block)
+                assert set(await block_store.get_random_not_compactified(100)) == {1}
+                raise ValueError("rolled back")
+        assert set(await block_store.get_random_not_compactified(100)) == {0, 1, 2, 5, 6}
+
+        # a new store loads the same candidates from the database
+        block_store = await BlockStore.create(db_wrapper, use_cache=use_cache)
+        assert set(await block_store.get_random_not_compactified(100)) == {0, 1, 2, 5, 6}
+
+
 @pytest.mark.limit_consensus_modes(reason="save time")
 @pytest.mark.anyio
 async def test_count_compactified_blocks(bt: BlockTools, tmp_dir: Path, db_version: int, use_cache: bool) -> None:
@@ -712,6 +712,42 @@ async def test_duplicate_by_hint(db_version: int) -> None:
         assert height is None
 
 
+@pytest.mark.anyio
+async def test_duplicate_by_hint_batches(db_version: int) -> None:
+    async with DBConnection(db_version) as db_wrapper:
+        coin_store = await CoinStore.create(db_wrapper)
+        hint_store = await HintStore.create(db_wrapper)
+
+        # the coins are found by both their puzzle hash and their hint, over
+        # more rows than are fetched at a time
+        ph = std_hash(b"Puzzle Hash")
+        crs = [
+            CoinRecord(
+                Coin(std_hash(b"Parent Coin Id " + i.to_bytes(4, byteorder="big")), ph, uint64(i)),
+                uint32(i // 2 + 1),
+                uint32(0),
+                False,
+                uint64(12321312),
+            )
+            for i in range(2500)
+        ]
+        await add_coin_records_to_db(coin_store, crs)
+        await hint_store.add_hints([(cr.coin.name(), ph) for cr in crs])
+
+        all_coin_states: list[CoinState] = []
+        height: uint32 | None = uint32(0)
+        while height is not None:
+            coin_states, height = await coin_store.batch_coin_states_by_puzzle_hashes(
+                [ph], min_height=height, max_items=1001
+            )
+            assert len(coin_states) <= 1001
+            all_coin_states += coin_states
+
+        heights = [coin_state.created_height or 0 for coin_state in all_coin_states]
+        assert heights == sorted(heights)
+        assert sorted(all_coin_states, key=lambda cs: cs.coin.amount) == [cr.coin_state for cr in crs]
+
+
 @pytest.mark.anyio
 async def test_unsupported_version() -> None:
     with pytest.raises(RuntimeError, match="CoinStore does not support database schema v1"):
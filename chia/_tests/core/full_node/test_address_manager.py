@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import contextlib
 import io
+import logging
 import math
+import random
 import time
 from pathlib import Path
+from typing import cast
 
 import pytest
 from chia_rs.sized_ints import uint16, uint32, uint64
@@ -12,10 +15,15 @@ from chia_rs.sized_ints import uint16, uint32, uint64
 from chia.server.address_manager import (
     BUCKET_SIZE,
     NEW_BUCKET_COUNT,
+    TRIED_BUCKET_COUNT,
     AddressManager,
     ExtendedPeerInfo,
+    TablePositions,
 )
+from chia.server.address_manager_journal import PeerJournal, decode_changes, encode_changes
 from chia.server.address_manager_store import PeerDataSerialization
+from chia.server.node_discovery import FullNodeDiscovery
+from chia.server.server import ChiaServer
 from chia.types.peer_info import PeerInfo, TimestampedPeerInfo
 from chia.util.files import write_file_async
 
@@ -759,3 +767,142 @@ class TestPeerManager:
         # Load and check the new serialization
         addrman3 = await AddressManager.create_address_manager(peers_dat_filename)
         assert await self.check_retrieved_peers(wanted_peers, addrman3)
+
+    @pytest.mark.anyio
+    async def test_journal_round_trip(self, tmp_path: Path):
+        peers_dat_filename = tmp_path / "peers.dat"
+        journal = PeerJournal(peers_dat_filename)
+        addrman = await journal.load()
+        addrman.make_private_subnets_valid()
+        now = math.floor(time.time())
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        t_peer1 = TimestampedPeerInfo("250.7.1.1", uint16(8333), uint64(now - 10000))
+        t_peer2 = TimestampedPeerInfo("1050:0000:0000:0000:0005:0600:300c:326b", uint16(9999), uint64(now - 20000))
+        t_peer3 = TimestampedPeerInfo("250.7.3.3", uint16(9999), uint64(now - 30000))
+        await addrman.add_to_new_table([t_peer1, t_peer2, t_peer3], source)
+
+        # loading writes a snapshot for the journal to start from
+        assert peers_dat_filename.exists()
+        assert not journal.journal_path.exists()
+
+        # the first batch of changes is compacted into the snapshot
+        async with addrman.lock:
+            await journal.append(addrman.take_change_log())
+        assert journal.journal_path.exists()
+        await journal.compact()
+        assert peers_dat_filename.exists()
+        assert not journal.journal_path.exists()
+
+        # the rest are only in the journal
+        await addrman.mark_good(PeerInfo("250.7.1.1", uint16(8333)))
+        t_peer4 = TimestampedPeerInfo("250.8.4.4", uint16(8444), uint64(now - 40000))
+        await addrman.add_to_new_table([t_peer4], source)
+        async with addrman.lock:
+            await journal.append(addrman.take_change_log())
+        assert journal.journal_path.exists()
+        assert not journal.should_compact()
+
+        addrman2 = await PeerJournal(peers_dat_filename).load()
+        assert addrman2.serialize_bytes() == addrman.serialize_bytes()
+        assert addrman2.tried_count == addrman.tried_count == 1
+        assert addrman2.new_count == addrman.new_count == 3
+        info, _ = addrman2.find_(PeerInfo("250.7.1.1", uint16(8333)))
+        assert info is not None and info.is_tried
+
+        # compacting doesn't change the state that's loaded
+        await journal.compact()
+        addrman3 = await PeerJournal(peers_dat_filename).load()
+        assert addrman3.serialize_bytes() == addrman.serialize_bytes()
+
+    @pytest.mark.anyio
+    async def test_journal_truncated(self, tmp_path: Path):
+        peers_dat_filename = tmp_path / "peers.dat"
+        journal = PeerJournal(peers_dat_filename)
+        addrman = await journal.load()
+        addrman.make_private_subnets_valid()
+        now = math.floor(time.time())
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.7.1.1", uint16(8333), uint64(now - 10000))], source)
+        async with addrman.lock:
+            await journal.append(addrman.take_change_log())
+        complete = journal.journal_path.read_bytes()
+
+        # an interrupted write leaves part of a change at the end of the journal
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.7.2.2", uint16(8333), uint64(now - 10000))], source)
+        async with addrman.lock:
+            changes = addrman.take_change_log()
+        journal.journal_path.write_bytes(complete + encode_changes(changes)[:5])
+
+        assert complete[:32] == addrman.key.to_bytes(32, byteorder="big")
+        assert decode_changes(journal.journal_path.read_bytes()[32:]) == decode_changes(complete[32:])
+        addrman2 = await PeerJournal(peers_dat_filename).load()
+        assert addrman2.find_(PeerInfo("250.7.1.1", uint16(8333)))[0] is not None
+        assert addrman2.find_(PeerInfo("250.7.2.2", uint16(8333)))[0] is None
+        assert addrman2.new_count == 1
+
+        # the journal can't be replayed onto a different snapshot
+        peers_dat_filename.write_bytes(AddressManager().serialize_bytes())
+        addrman3 = await PeerJournal(peers_dat_filename).load()
+        assert addrman3.find_(PeerInfo("250.7.1.1", uint16(8333)))[0] is None
+        assert not journal.journal_path.exists()
+
+    @pytest.mark.anyio
+    async def test_journal_write_failure(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+        peers_dat_filename = tmp_path / "peers.dat"
+        journal = PeerJournal(peers_dat_filename)
+        addrman = await journal.load()
+        addrman.make_private_subnets_valid()
+        discovery = FullNodeDiscovery(
+            server=cast(ChiaServer, None),
+            target_outbound_count=0,
+            peers_file_path=peers_dat_filename,
+            dns_servers=[],
+            peer_connect_interval=0,
+            selected_network="mainnet",
+            log=logging.getLogger(__name__),
+            address_manager=addrman,
+            peer_journal=journal,
+        )
+        now = math.floor(time.time())
+        source = PeerInfo("252.5.1.1", uint16(8333))
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.7.1.1", uint16(8333), uint64(now - 10000))], source)
+
+        def fail_fsync(fd: int) -> None:
+            raise OSError("disk full")
+
+        # the changes were written, but not synced
+        with monkeypatch.context() as m:
+            m.setattr("chia.server.address_manager_journal.os.fsync", fail_fsync)
+            with pytest.raises(OSError, match="disk full"):
+                await discovery._write_peer_changes()
+        assert journal.journal_path.read_bytes() == b""
+
+        # they're written along with the ones made since
+        await addrman.add_to_new_table([TimestampedPeerInfo("250.7.2.2", uint16(8333), uint64(now - 10000))], source)
+        await discovery._write_peer_changes()
+        assert addrman.change_log == []
+
+        addrman2 = await PeerJournal(peers_dat_filename).load()
+        assert addrman2.serialize_bytes() == addrman.serialize_bytes()
+        assert addrman2.find_(PeerInfo("250.7.1.1", uint16(8333)))[0] is not None
+        assert addrman2.find_(PeerInfo("250.7.2.2", uint16(8333)))[0] is not None
+
+
+def test_table_positions() -> None:
+    positions = TablePositions(TRIED_BUCKET_COUNT)
+    expected: set[tuple[int, int]] = set()
+    rand = random.Random(1337)
+    for _ in range(5000):
+        item = (rand.randrange(TRIED_BUCKET_COUNT), rand.randrange(BUCKET_SIZE))
+        if rand.randrange(3) == 0:
+            positions.discard(item)
+            expected.discard(item)
+        else:
+            positions.add(item)
+            expected.add(item)
+        assert len(positions) == len(expected)
+        assert item in positions if item in expected else item not in positions
+
+    assert set(positions) == expected
+    for _ in range(100):
+        assert positions.random_position() in expected
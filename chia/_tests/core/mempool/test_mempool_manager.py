@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import logging
 import random
@@ -36,7 +37,7 @@ from chia.full_node.eligible_coin_spends import (
     IdenticalSpendDedup,
     SkipDedup,
 )
-from chia.full_node.mempool import MAX_SKIPPED_ITEMS, PRIORITY_TX_THRESHOLD
+from chia.full_node.mempool import MAX_SKIPPED_ITEMS, PRIORITY_TX_THRESHOLD, MempoolRemoveReason
 from chia.full_node.mempool_manager import (
     MEMPOOL_MIN_FEE_INCREASE,
     QUOTE_BYTES,
@@ -70,6 +71,7 @@ from chia.types.peer_info import PeerInfo
 from chia.util.casts import int_to_bytes
 from chia.util.default_root import DEFAULT_ROOT_PATH
 from chia.util.errors import Err, ValidationError
+from chia.util.task_referencer import create_referenced_task
 from chia.wallet.conditions import AssertCoinAnnouncement
 from chia.wallet.puzzles.p2_delegated_puzzle_or_hidden_puzzle import (
     DEFAULT_HIDDEN_PUZZLE_HASH,
@@ -2908,6 +2910,121 @@ async def test_create_block_generator_real_bundles(seed: int, old: bool, test_bu
     assert additions == set(new_block_gen.additions)
 
 
+@pytest.mark.anyio
+@pytest.mark.parametrize("old", [True, False])
+async def test_block_template(old: bool, transactions_1000: list[SpendBundle]) -> None:
+    # the block generator is reused until the mempool changes in a way that
+    # affects it, it's always the same as the one built from scratch
+    all_coins = [s.coin for b in transactions_1000 for s in b.coin_spends]
+    coins = TestCoins(all_coins, {})
+    rng = random.Random(1337)
+    mempool_manager = await setup_mempool(coins)
+    block_version = 0 if old else 1
+    create_block = mempool_manager.create_block_generator if old else mempool_manager.create_block_generator2
+
+    def check_template() -> None:
+        assert mempool_manager.peak is not None
+        generator = create_block(mempool_manager.peak.header_hash, 10.0)
+        assert mempool_manager.mempool.has_block_template(
+            DEFAULT_CONSTANTS, mempool_manager.peak.height, 10.0, block_version
+        )
+        assert create_block(mempool_manager.peak.header_hash, 10.0) is generator
+        if old:
+            expected = mempool_manager.mempool._create_block_generator(
+                DEFAULT_CONSTANTS, mempool_manager.peak.height, 10.0
+            )
+        else:
+            expected = mempool_manager.mempool._create_block_generator2(
+                DEFAULT_CONSTANTS, mempool_manager.peak.height, 10.0
+            )
+        assert generator == expected
+
+    # the old way of creating blocks doesn't fit this many transactions
+    bundles = rng.sample(transactions_1000, 606)
+    for sb in bundles[:600]:
+        await mempool_manager.add_spend_bundle(
+            sb, await mempool_manager.pre_validate_spendbundle(sb), sb.name(), first_added_height=uint32(1)
+        )
+    check_template()
+
+    assert mempool_manager.peak is not None
+    if old:
+        # removing an item that didn't make it into the block doesn't affect it
+        generator = create_block(mempool_manager.peak.header_hash, 10.0)
+        assert generator is not None
+        spent = set(generator.removals)
+        excluded = [sb for sb in bundles[:600] if spent.isdisjoint(sb.removals())]
+        assert len(excluded) > 0
+        mempool_manager.mempool.remove_from_pool([excluded[0].name()], MempoolRemoveReason.CONFLICT)
+        assert create_block(mempool_manager.peak.header_hash, 10.0) is generator
+
+    for sb in bundles[600:]:
+        if rng.random() < 0.5:
+            info = await mempool_manager.add_spend_bundle(
+                sb, await mempool_manager.pre_validate_spendbundle(sb), sb.name(), first_added_height=uint32(1)
+            )
+            assert info.status == MempoolInclusionStatus.SUCCESS
+        else:
+            name = rng.choice(mempool_manager.mempool.all_item_ids())
+            mempool_manager.mempool.remove_from_pool([name], MempoolRemoveReason.CONFLICT)
+        check_template()
+
+    # a new peak always invalidates it
+    await advance_mempool(mempool_manager, [])
+    assert mempool_manager.peak is not None
+    assert not mempool_manager.mempool.has_block_template(
+        DEFAULT_CONSTANTS, mempool_manager.peak.height, 10.0, block_version
+    )
+    check_template()
+
+
+@pytest.mark.anyio
+async def test_maintain_block_template(transactions_1000: list[SpendBundle]) -> None:
+    bundles = transactions_1000[:10]
+    coins = TestCoins([s.coin for b in bundles for s in b.coin_spends], {})
+    mempool_manager = await setup_mempool(coins)
+    wanted = True
+
+    async def wait_for_template() -> bool:
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            assert mempool_manager.peak is not None
+            if mempool_manager.mempool.has_block_template(DEFAULT_CONSTANTS, mempool_manager.peak.height, 2.0, 1):
+                return True
+        return False
+
+    task = create_referenced_task(mempool_manager.maintain_block_template(1, 2.0, lambda: wanted))
+    try:
+        for sb in bundles[:5]:
+            await mempool_manager.add_spend_bundle(
+                sb, await mempool_manager.pre_validate_spendbundle(sb), sb.name(), first_added_height=uint32(1)
+            )
+        # it's only built for a signage point
+        assert not await wait_for_template()
+        mempool_manager.new_signage_point()
+        assert await wait_for_template()
+        assert mempool_manager.peak is not None
+        generator = mempool_manager.create_block_generator2(mempool_manager.peak.header_hash, 2.0)
+        assert generator is not None
+        assert len(generator.removals) == 5
+
+        # it's not built when it's not wanted
+        wanted = False
+        sb = bundles[5]
+        await mempool_manager.add_spend_bundle(
+            sb, await mempool_manager.pre_validate_spendbundle(sb), sb.name(), first_added_height=uint32(1)
+        )
+        mempool_manager.new_signage_point()
+        assert not await wait_for_template()
+
+        wanted = True
+        await advance_mempool(mempool_manager, [])
+        mempool_manager.new_signage_point()
+        assert await wait_for_template()
+    finally:
+        task.cancel()
+
+
 @pytest.mark.anyio
 async def test_spending_singleton_to_invalidate_existing_ff_spends() -> None:
     """
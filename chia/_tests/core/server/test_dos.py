@@ -15,7 +15,7 @@ from chia.protocols import full_node_protocol
 from chia.protocols.outbound_message import Message, make_msg
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.shared_protocol import Capability, Handshake
-from chia.server.rate_limits import RateLimiter
+from chia.server.rate_limits import RateLimiter, RateLimitRejection
 from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
 from chia.simulator.block_tools import BlockTools
@@ -38,6 +38,11 @@ class FakeRateLimiter:
     ) -> str | None:
         return None
 
+    def check_message(
+        self, message: Message, our_capabilities: list[Capability], peer_capabilities: list[Capability]
+    ) -> RateLimitRejection | None:
+        return None
+
 
 class TestDos:
     @pytest.mark.anyio
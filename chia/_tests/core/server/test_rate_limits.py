@@ -3,17 +3,17 @@ from __future__ import annotations
 from dataclasses import dataclass
 
 import pytest
-from chia_rs.sized_ints import uint32
+from chia_rs.sized_ints import uint8, uint32
 
 from chia._tests.conftest import node_with_params
 from chia._tests.util.misc import boolean_datacases
 from chia._tests.util.time_out_assert import time_out_assert
 from chia.protocols.full_node_protocol import RejectBlock, RejectBlocks, RespondBlock, RespondBlocks
-from chia.protocols.outbound_message import make_msg
+from chia.protocols.outbound_message import Message, make_msg
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.shared_protocol import Capability
 from chia.server.rate_limit_numbers import RLSettings, Unlimited, get_rate_limits_to_use
-from chia.server.rate_limits import RateLimiter
+from chia.server.rate_limits import RateLimitCode, RateLimiter, RateLimitRejection
 from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
 from chia.simulator.block_tools import BlockTools
@@ -242,6 +242,64 @@ async def test_periodic_reset() -> None:
     assert r.process_msg_and_check(new_tx_message, rl_v2, rl_v2) is None
 
 
+@pytest.mark.anyio
+@boolean_datacases(name="incoming", true="incoming", false="outgoing")
+async def test_no_burst_at_window_edge(incoming: bool) -> None:
+    # with counters reset every 60 seconds, a peer could send the whole limit
+    # right before a reset and again right after it
+    timer = SimClock(current_time=59.0)
+    r = RateLimiter(incoming, 60, get_time=timer.monotonic)
+    new_peak_message = make_msg(ProtocolMessageTypes.new_peak, bytes([1] * 40))
+    rate_limits, _ = get_rate_limits_to_use(rl_v2, rl_v2)
+    limit = rate_limits[ProtocolMessageTypes.new_peak]
+    assert isinstance(limit, RLSettings)
+
+    for i in range(limit.frequency):
+        assert r.process_msg_and_check(new_peak_message, rl_v2, rl_v2) is None
+    rejection = r.check_message(new_peak_message, rl_v2, rl_v2)
+    assert rejection is not None
+    assert rejection.code == RateLimitCode.MESSAGE_COUNT
+    assert rejection.message_type == ProtocolMessageTypes.new_peak.value
+
+    # across the old window boundary, only what refilled in 2 seconds is
+    # allowed
+    timer.advance(2)
+    passed = 0
+    for i in range(limit.frequency):
+        if r.process_msg_and_check(new_peak_message, rl_v2, rl_v2) is None:
+            passed += 1
+    assert passed == limit.frequency * 2 // 60
+
+    # the bucket refills over a whole period
+    timer.advance(30)
+    passed = 0
+    for i in range(limit.frequency):
+        if r.process_msg_and_check(new_peak_message, rl_v2, rl_v2) is None:
+            passed += 1
+    assert passed == limit.frequency // 2
+
+    timer.advance(120)
+    passed = 0
+    for i in range(limit.frequency * 2):
+        if r.process_msg_and_check(new_peak_message, rl_v2, rl_v2) is None:
+            passed += 1
+    assert passed == limit.frequency
+
+
+@pytest.mark.anyio
+async def test_rejection_codes() -> None:
+    r = RateLimiter(incoming=True, get_time=lambda: 0)
+    large_tx_message = make_msg(ProtocolMessageTypes.new_transaction, bytes([1] * 1024))
+    rejection = r.check_message(large_tx_message, rl_v2, rl_v2)
+    assert rejection == RateLimitRejection(
+        RateLimitCode.MESSAGE_SIZE, ProtocolMessageTypes.new_transaction.value, 1024, 100
+    )
+    assert str(rejection) == "message size: 1024 > 100"
+
+    # invalid message types are let through
+    assert r.check_message(Message(uint8(200), None, b""), rl_v2, rl_v2) is None
+
+
 @pytest.mark.anyio
 async def test_percentage_limits() -> None:
     r = RateLimiter(True, 60, 40, get_time=lambda: 0)
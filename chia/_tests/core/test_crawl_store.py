@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import ipaddress
+import random
+import time
+from collections.abc import AsyncIterator
+
+import aiosqlite
+import pytest
+from chia_rs.sized_ints import uint32, uint64
+
+from chia.seeder.crawl_store import CrawlStore
+from chia.seeder.peer_record import PeerRecord, PeerReliability
+
+
+@pytest.fixture
+async def crawl_store() -> AsyncIterator[CrawlStore]:
+    async with aiosqlite.connect(":memory:") as connection:
+        yield await CrawlStore.create(connection)
+
+
+def make_record(peer_id: str, last_try: int = 0, connected: int = 0) -> PeerRecord:
+    return PeerRecord(
+        peer_id,
+        peer_id,
+        uint32(8444),
+        connected != 0,
+        uint64(last_try),
+        uint32(0),
+        uint64(connected),
+        uint64(0),
+        uint64(0),
+        "undefined",
+        uint64(0),
+        tls_version="unknown",
+    )
+
+
+def expected_peers_to_crawl(store: CrawlStore, now: int) -> tuple[set[str], int, int]:
+    """
+    The peers get_peers_to_crawl() picks from, and the banned and ignored
+    counts, by looking at every peer.
+    """
+    eligible: set[str] = set()
+    banned = 0
+    ignored = 0
+    for peer_id, reliability in store.host_to_reliability.items():
+        add = False
+        if reliability.ignore_till < now and reliability.ban_till < now:
+            add = True
+        elif reliability.ban_till >= now:
+            banned += 1
+        elif reliability.ignore_till >= now:
+            ignored += 1
+        record = store.host_to_records[peer_id]
+        if record.last_try_timestamp == 0 and record.connected_timestamp == 0:
+            add = True
+        if now - store.host_to_selected_time.get(peer_id, 0) < 120:
+            add = False
+        delta_time = 600 if ":" in peer_id else 1000
+        if add and now - record.last_try_timestamp >= delta_time and now - record.connected_timestamp >= delta_time:
+            eligible.add(peer_id)
+    return eligible, banned, ignored
+
+
+@pytest.mark.anyio
+async def test_get_peers_to_crawl(crawl_store: CrawlStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = random.Random(1337)
+    now = 1_700_000_000
+    monkeypatch.setattr(time, "time", lambda: float(now))
+
+    peer_ids = [str(ipaddress.IPv4Address(0x0A000000 + i)) for i in range(300)]
+    peer_ids += [str(ipaddress.IPv6Address(0x20010DB8 << 96 | i)) for i in range(200)]
+    for peer_id in peer_ids:
+        never_tried = rng.random() < 0.2
+        record = make_record(
+            peer_id,
+            last_try=0 if never_tried else now - rng.randrange(2000),
+            connected=0 if never_tried else rng.choice([0, now - rng.randrange(2000)]),
+        )
+        reliability = PeerReliability(
+            peer_id,
+            ignore_till=rng.choice([0, now + rng.randrange(-500, 3000)]),
+            ban_till=rng.choice([0, 0, now + rng.randrange(-500, 3000)]),
+        )
+        if rng.random() < 0.5:
+            await crawl_store.add_peer(record, reliability)
+        else:
+            crawl_store.maybe_add_peer(record, reliability)
+
+    assert crawl_store.get_ipv6_peers() == 200
+
+    for _ in range(10):
+        eligible, banned, ignored = expected_peers_to_crawl(crawl_store, now)
+        records = await crawl_store.get_peers_to_crawl(1000, 1000)
+        assert {record.peer_id for record in records} == eligible
+        assert crawl_store.get_banned_peers() == banned
+        assert crawl_store.get_ignored_peers() == ignored
+        assert all(crawl_store.host_to_selected_time[peer_id] == now for peer_id in eligible)
+
+        # some of the peers are crawled, and the clock moves on
+        for record in records:
+            if rng.random() < 0.5:
+                await crawl_store.peer_connected_hostname(record.peer_id, rng.random() < 0.5)
+        now += rng.randrange(400)
+
+    # the peers are picked at random, up to the batch size per address family
+    now += 100_000
+    records = await crawl_store.get_peers_to_crawl(10, 10)
+    assert len(records) == 20
+    assert len({record.peer_id for record in records}) == 20
+
+    await crawl_store.prune_old_peers(older_than_days=1)
+    assert crawl_store.get_ipv6_peers() == 0
+    now += 100_000
+    assert await crawl_store.get_peers_to_crawl(10, 10) == []
+
+
+@pytest.mark.anyio
+async def test_schedule_reloaded_from_db(crawl_store: CrawlStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1_700_000_000
+    monkeypatch.setattr(time, "time", lambda: float(now))
+
+    await crawl_store.add_peer(make_record("10.0.0.1"), PeerReliability("10.0.0.1"))
+    await crawl_store.add_peer(make_record("10.0.0.2", last_try=now - 10), PeerReliability("10.0.0.2"))
+    await crawl_store.add_peer(make_record("::2", last_try=now - 10), PeerReliability("::2", ban_till=now + 10))
+    await crawl_store.load_to_db()
+    await crawl_store.unload_from_db()
+
+    assert crawl_store.get_ipv6_peers() == 1
+    records = await crawl_store.get_peers_to_crawl(10, 10)
+    assert [record.peer_id for record in records] == ["10.0.0.1"]
+    assert crawl_store.get_banned_peers() == 1
+
+    now += 1000
+    records = await crawl_store.get_peers_to_crawl(10, 10)
+    assert {record.peer_id for record in records} == {"10.0.0.1", "10.0.0.2", "::2"}
+    assert crawl_store.get_banned_peers() == 0
+
+
+@pytest.mark.anyio
+async def test_load_to_db_saves_changed_peers(crawl_store: CrawlStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    now = 1_700_000_000
+    monkeypatch.setattr(time, "time", lambda: float(now))
+
+    for i in range(10):
+        crawl_store.maybe_add_peer(make_record(f"10.0.0.{i}"), PeerReliability(f"10.0.0.{i}"))
+    await crawl_store.load_to_db()
+    assert crawl_store.dirty_peers == set()
+
+    now += 100
+    await crawl_store.peer_connected_hostname("10.0.0.3", True)
+    await crawl_store.peer_connected_hostname("10.0.0.4", False)
+    # adding a known peer again doesn't change it
+    crawl_store.maybe_add_peer(make_record("10.0.0.5", last_try=now), PeerReliability("10.0.0.5"))
+    assert crawl_store.dirty_peers == {"10.0.0.3", "10.0.0.4"}
+    await crawl_store.load_to_db()
+
+    async with crawl_store.crawl_db.execute("SELECT peer_id, added_timestamp FROM peer_records") as cursor:
+        rows = list(await cursor.fetchall())
+    assert {peer_id for peer_id, added_timestamp in rows if added_timestamp == now} == {"10.0.0.3", "10.0.0.4"}
+    assert len(rows) == 10
+
+    # what's in the DB matches what's in memory
+    host_to_records = crawl_store.host_to_records
+    host_to_reliability = crawl_store.host_to_reliability
+    await crawl_store.unload_from_db()
+    for peer_id, record in host_to_records.items():
+        assert crawl_store.host_to_records[peer_id].last_try_timestamp == record.last_try_timestamp
+        assert crawl_store.host_to_records[peer_id].connected_timestamp == record.connected_timestamp
+        assert crawl_store.host_to_reliability[peer_id].tries == host_to_reliability[peer_id].tries
+
+
+@pytest.mark.anyio
+async def test_good_peers_updated_as_diff(crawl_store: CrawlStore) -> None:
+    for i in range(10):
+        reliability = PeerReliability(f"10.0.0.{i}", tries=1, successes=1 if i < 6 else 0)
+        await crawl_store.add_peer(make_record(f"10.0.0.{i}"), reliability)
+    await crawl_store.load_reliable_peers_to_db()
+    assert set(await crawl_store.get_good_peers()) == {f"10.0.0.{i}" for i in range(6)}
+    assert crawl_store.get_reliable_peers() == 6
+
+    async with crawl_store.crawl_db.execute("SELECT rowid, ip FROM good_peers") as cursor:
+        rows_before = set(await cursor.fetchall())
+
+    crawl_store.host_to_reliability["10.0.0.0"].successes = 0
+    crawl_store.host_to_reliability["10.0.0.9"].successes = 1
+    await crawl_store.load_reliable_peers_to_db()
+    expected = {f"10.0.0.{i}" for i in [1, 2, 3, 4, 5, 9]}
+    assert set(await crawl_store.get_good_peers()) == expected
+
+    # the peers that stayed reliable weren't rewritten
+    async with crawl_store.crawl_db.execute("SELECT rowid, ip FROM good_peers") as cursor:
+        rows_after = set(await cursor.fetchall())
+    assert len(rows_after) == 6
+    assert len(rows_before & rows_after) == 5
+
+    # a new store starts from what's in the DB
+    await crawl_store.unload_from_db()
+    crawl_store.host_to_reliability = {peer_id: PeerReliability(peer_id, tries=1, successes=1) for peer_id in expected}
+    await crawl_store.load_reliable_peers_to_db()
+    async with crawl_store.crawl_db.execute("SELECT rowid, ip FROM good_peers") as cursor:
+        assert set(await cursor.fetchall()) == rows_after
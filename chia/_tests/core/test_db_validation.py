@@ -11,7 +11,8 @@ from chia_rs.sized_bytes import bytes32
 from chia_rs.sized_ints import uint32, uint64
 
 from chia._tests.util.temp_file import TempFile
-from chia.cmds.db_validate_func import validate_v2
+from chia.cmds import db_validate_func
+from chia.cmds.db_validate_func import Checkpoint, ShardResult, validate_v2
 from chia.consensus.block_body_validation import ForkInfo
 from chia.consensus.block_height_map import BlockHeightMap
 from chia.consensus.blockchain import Blockchain
@@ -105,8 +106,9 @@ def test_db_validate_missing_peak_block(default_config: dict[str, Any]) -> None:
         assert "Database is missing the peak block" in str(execinfo.value)
 
 
+@pytest.mark.parametrize("shard_size", [7, 10, 1000])
 @pytest.mark.parametrize("invalid_in_chain", [True, False])
-def test_db_validate_in_main_chain(invalid_in_chain: bool, default_config: dict[str, Any]) -> None:
+def test_db_validate_in_main_chain(invalid_in_chain: bool, shard_size: int, default_config: dict[str, Any]) -> None:
     with TempFile() as db_file:
         with closing(sqlite3.connect(db_file)) as conn:
             make_version(conn, 2)
@@ -125,10 +127,125 @@ def test_db_validate_in_main_chain(invalid_in_chain: bool, default_config: dict[
 
         if invalid_in_chain:
             with pytest.raises(RuntimeError) as execinfo:
-                validate_v2(db_file, config=default_config, validate_blocks=False)
+                validate_v2(db_file, config=default_config, validate_blocks=False, shard_size=shard_size)
             assert " (height: 96) is orphaned, but in_main_chain is set" in str(execinfo.value)
         else:
-            validate_v2(db_file, config=default_config, validate_blocks=False)
+            validate_v2(db_file, config=default_config, validate_blocks=False, shard_size=shard_size)
+
+
+@pytest.mark.parametrize("shard_size", [7, 10, 41, 1000])
+def test_db_validate_missing_block(shard_size: int, default_config: dict[str, Any]) -> None:
+    with TempFile() as db_file:
+        with closing(sqlite3.connect(db_file)) as conn:
+            make_version(conn, 2)
+            make_block_table(conn)
+
+            prev = bytes32(DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA)
+            for height in range(100):
+                header_hash = rand_hash()
+                # the main chain block at height 40 is missing, but there's an
+                # orphan in its place
+                add_block(conn, header_hash if height != 40 else rand_hash(), prev, height, height != 40)
+                if height == 40:
+                    missing_hash = header_hash
+                prev = header_hash
+
+            make_peak(conn, header_hash)
+
+        with pytest.raises(RuntimeError) as execinfo:
+            validate_v2(db_file, config=default_config, validate_blocks=False, shard_size=shard_size)
+        assert f"Database is missing the block with hash {missing_hash} at height 40" in str(execinfo.value)
+
+
+def test_db_validate_resume(default_config: dict[str, Any]) -> None:
+    with TempFile() as db_file, TempFile() as checkpoint_file:
+        with closing(sqlite3.connect(db_file)) as conn:
+            make_version(conn, 2)
+            make_block_table(conn)
+
+            prev = bytes32(DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA)
+            hashes: list[bytes32] = []
+            for height in range(100):
+                header_hash = rand_hash()
+                hashes.append(header_hash)
+                add_block(conn, header_hash, prev, height, height != 5)
+                prev = header_hash
+
+            make_peak(conn, header_hash)
+
+        # the block at height 5 doesn't have in_main_chain set. The shards
+        # above it are recorded in the checkpoint
+        with pytest.raises(RuntimeError) as execinfo:
+            validate_v2(
+                db_file, config=default_config, validate_blocks=False, shard_size=10, checkpoint_path=checkpoint_file
+            )
+        assert "(height: 5) is part of the main chain, but in_main_chain is not set" in str(execinfo.value)
+        assert checkpoint_file.exists()
+
+        with closing(sqlite3.connect(db_file)) as conn:
+            conn.execute("UPDATE full_blocks SET in_main_chain=1 WHERE height=5")
+            # this inconsistency is in a shard that was already validated, so
+            # it won't be found when resuming
+            conn.execute("UPDATE full_blocks SET in_main_chain=0 WHERE header_hash=?", (hashes[50],))
+            # blocks added since don't invalidate the checkpoint
+            for height in range(100, 105):
+                header_hash = rand_hash()
+                add_block(conn, header_hash, prev, height, True)
+                prev = header_hash
+            conn.commit()
+            make_peak(conn, header_hash)
+
+        validate_v2(
+            db_file, config=default_config, validate_blocks=False, shard_size=10, checkpoint_path=checkpoint_file
+        )
+        # the checkpoint is removed once the database has been validated
+        assert not checkpoint_file.exists()
+
+        with pytest.raises(RuntimeError) as execinfo:
+            validate_v2(
+                db_file, config=default_config, validate_blocks=False, shard_size=10, checkpoint_path=checkpoint_file
+            )
+        assert "(height: 50) is part of the main chain, but in_main_chain is not set" in str(execinfo.value)
+
+
+def test_db_validate_checkpoints_while_validating(
+    monkeypatch: pytest.MonkeyPatch, default_config: dict[str, Any]
+) -> None:
+    with TempFile() as db_file, TempFile() as checkpoint_file:
+        with closing(sqlite3.connect(db_file)) as conn:
+            make_version(conn, 2)
+            make_block_table(conn)
+
+            prev = bytes32(DEFAULT_CONSTANTS.AGG_SIG_ME_ADDITIONAL_DATA)
+            for height in range(100):
+                header_hash = rand_hash()
+                add_block(conn, header_hash, prev, height, True)
+                prev = header_hash
+
+            make_peak(conn, header_hash)
+
+        validated: list[int] = []
+        checkpoints: list[tuple[int, int]] = []
+        original_validate_shard = db_validate_func.validate_shard
+
+        def validate_shard(in_path: Path, low: int, high: int, validate_blocks: bool) -> ShardResult:
+            validated.append(low)
+            return original_validate_shard(in_path, low, high, validate_blocks)
+
+        def write_checkpoint(checkpoint_path: Path, key: dict[str, Any], checkpoint: Checkpoint) -> None:
+            checkpoints.append((len(validated), checkpoint.reduced))
+
+        monkeypatch.setattr(db_validate_func, "CHECKPOINT_INTERVAL", -1)
+        monkeypatch.setattr(db_validate_func, "validate_shard", validate_shard)
+        monkeypatch.setattr(db_validate_func, "_write_checkpoint", write_checkpoint)
+        validate_v2(
+            db_file, config=default_config, validate_blocks=False, shard_size=10, checkpoint_path=checkpoint_file
+        )
+
+        # with a single worker, the shards are validated two at a time, and
+        # reduced and checkpointed before the next ones are validated
+        assert validated == list(range(90, -1, -10))
+        assert checkpoints == [(2, 2), (4, 4), (6, 6), (8, 8), (10, 10)]
 
 
 async def make_db(db_file: Path, blocks: list[FullBlock]) -> None:
@@ -171,3 +288,4 @@ async def test_db_validate_default_1000_blocks(
             default_1000_blocks[0].foliage.prev_block_hash.hex()
         )
         validate_v2(db_file, config=default_config, validate_blocks=True)
+        validate_v2(db_file, config=default_config, validate_blocks=True, workers=2, shard_size=128)
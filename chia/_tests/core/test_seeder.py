@@ -17,8 +17,9 @@ from dns.rdatatype import A as A_TYPE
 from dns.rdtypes.IN.A import A
 from dns.rdtypes.IN.AAAA import AAAA
 from dns.rrset import RRset
+from dnslib import DNSRecord
 
-from chia.seeder.dns_server import DNSServer
+from chia.seeder.dns_server import DNSServer, parse_simple_query
 from chia.seeder.peer_record import PeerRecord, PeerReliability
 
 timeout = 0.5
@@ -418,3 +419,57 @@ async def test_static_peers_with_hostnames(
     assert len(answer) == 1
     expected = "2001:db8::5" if request_type == dns.rdatatype.AAAA else "1.2.3.4"
     assert answer[0].to_text() == expected
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("request_type", [dns.rdatatype.A, dns.rdatatype.AAAA, dns.rdatatype.ANY])
+@pytest.mark.parametrize("use_edns", [True, False])
+async def test_fast_dns_response(
+    seeder_service: DNSServer, request_type: dns.rdatatype.RdataType, use_edns: bool
+) -> None:
+    """
+    The pre-encoded replies match the ones dns_response() builds.
+    """
+    seeder_service.reliable_peers_v4, seeder_service.reliable_peers_v6 = get_addresses(1)
+    seeder_service.answer_pools = seeder_service.build_answer_pools(
+        seeder_service.reliable_peers_v4, seeder_service.reliable_peers_v6
+    )
+    # with DNS 0x20 the case of the name is random, and the reply must have the same question
+    domain = seeder_service.domain
+    mixed_case_domain = "".join(c.upper() if i % 2 == 0 else c for i, c in enumerate(domain))
+
+    # the replies rotate through the peers the same way, until the peers wrap around
+    for i in range(7):
+        name = domain if i % 2 == 0 else mixed_case_domain
+        query = dns.message.make_query(name, request_type, use_edns=use_edns, payload=1232).to_wire()
+        assert parse_simple_query(query) is not None
+        fast_reply = seeder_service.fast_dns_response(query, False)
+        assert fast_reply is not None
+        reply = await seeder_service.dns_response(DNSRecord.parse(query))
+        if name == domain:
+            assert fast_reply == reply.pack()
+        # names are compressed differently when the case differs
+        assert dns.message.from_wire(fast_reply) == dns.message.from_wire(bytes(reply.pack()))
+        assert dns.message.from_wire(fast_reply).question[0].name.to_text() == name
+
+    # UDP replies that are too large are truncated
+    fast_reply = seeder_service.fast_dns_response(query, True)
+    assert fast_reply is not None
+    if use_edns:
+        assert len(fast_reply) > 512
+    else:
+        assert fast_reply == reply.truncate().pack()
+
+    # queries that need the full processing
+    for query in [
+        dns.message.make_query(f"doesnotexist.{domain}", request_type).to_wire(),
+        dns.message.make_query("chia.net", request_type).to_wire(),
+        dns.message.make_query(domain, dns.rdatatype.NS).to_wire(),
+        dns.message.make_query(domain, request_type).to_wire() + b"\0",
+    ]:
+        assert seeder_service.fast_dns_response(query, True) is None
+
+    # the pools are only used with the peers they were built from
+    seeder_service.reliable_peers_v4, seeder_service.reliable_peers_v6 = get_addresses(2)
+    query = dns.message.make_query(domain, request_type, use_edns=use_edns).to_wire()
+    assert seeder_service.fast_dns_response(query, True) is None
@@ -15,7 +15,9 @@ from typing import Any
 import pytest
 import yaml
 
+from chia.util import config as config_module
 from chia.util.config import (
+    clear_config_cache,
     config_path_for_filename,
     create_default_chia_config,
     initial_config_file,
@@ -258,6 +260,72 @@ class TestConfig:
         loaded: dict = load_config(root_path=root_path, filename="config.yaml")
         assert loaded["harvester"]["farmer_peers"][0]["host"] == "oldmacdonald.eie.io"
 
+    def test_load_config_cache_returns_copies(self, root_path_populated_with_config: Path) -> None:
+        """
+        Configs returned from the cache can be modified without affecting later loads
+        """
+        root_path: Path = root_path_populated_with_config
+        clear_config_cache()
+        config = load_config(root_path=root_path, filename="config.yaml")
+        config["harvester"]["farmer_peers"][0]["host"] = "modified.example.com"
+        config["new_key"] = [1, 2, 3]
+
+        loaded = load_config(root_path=root_path, filename="config.yaml")
+        assert loaded["harvester"]["farmer_peers"][0]["host"] != "modified.example.com"
+        assert "new_key" not in loaded
+        assert loaded is not config
+        assert loaded["harvester"] is not config["harvester"]
+
+    def test_load_config_cache_skips_parsing(
+        self, root_path_populated_with_config: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """
+        An unchanged config file is only parsed once, and parsed again when it changes
+        """
+        root_path: Path = root_path_populated_with_config
+        clear_config_cache()
+        parse_count = 0
+        original_load = config_module._yaml_safe_load
+
+        def counting_load(contents: bytes) -> Any:
+            nonlocal parse_count
+            parse_count += 1
+            return original_load(contents)
+
+        monkeypatch.setattr(config_module, "_yaml_safe_load", counting_load)
+        # don't treat the freshly written config as possibly racy
+        monkeypatch.setattr(config_module, "_CONFIG_CACHE_RACY_SECONDS", 0.0)
+
+        first = load_config(root_path=root_path, filename="config.yaml")
+        second = load_config(root_path=root_path, filename="config.yaml", sub_config="harvester")
+        assert parse_count == 1
+        assert second == first["harvester"]
+
+        with lock_and_load_config(root_path, "config.yaml") as config:
+            assert parse_count == 1
+            config["harvester"]["farmer_peers"][0]["host"] = "oldmacdonald.eie.io"
+            save_config(root_path=root_path, filename="config.yaml", config_data=config)
+
+        loaded = load_config(root_path=root_path, filename="config.yaml")
+        assert parse_count == 2
+        assert loaded["harvester"]["farmer_peers"][0]["host"] == "oldmacdonald.eie.io"
+
+    def test_load_config_cache_detects_in_place_changes(self, root_path_populated_with_config: Path) -> None:
+        """
+        A config file rewritten in place, with the same size, right after being loaded is not
+        served from the cache
+        """
+        root_path: Path = root_path_populated_with_config
+        clear_config_cache()
+        path = config_path_for_filename(root_path, "config.yaml")
+        contents = path.read_text()
+        assert "daemon_port: 55400" in contents
+
+        assert load_config(root_path=root_path, filename="config.yaml")["daemon_port"] == 55400
+        with open(path, "w") as f:
+            f.write(contents.replace("daemon_port: 55400", "daemon_port: 55401"))
+        assert load_config(root_path=root_path, filename="config.yaml")["daemon_port"] == 55401
+
     def test_multiple_writers(self, root_path_populated_with_config, default_config_dict):
         """
         Test whether multiple readers/writers encounter data corruption. When using non-atomic operations
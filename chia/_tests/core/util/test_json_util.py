@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass, replace
+from enum import Enum, IntEnum
+from typing import Any
+
+import aiohttp
+import pytest
+from aiohttp import web
+from chia_rs import Coin, G1Element
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint8, uint32, uint64, uint128
+
+from chia.util.json_util import dict_to_json_str, encode_json, json_chunks, obj_to_streamed_response
+from chia.util.streamable import Streamable, streamable, streamable_enum
+
+
+@streamable_enum(uint8)
+class ExampleEnum(Enum):
+    A = 1
+    B = 2
+
+
+class ExampleIntEnum(IntEnum):
+    A = 3
+
+
+class ExampleStrEnum(str, Enum):
+    A = "a"
+
+
+@streamable
+@dataclass(frozen=True)
+class ExampleInner(Streamable):
+    b: bytes32
+    a: uint32
+
+
+@streamable
+@dataclass(frozen=True)
+class ExampleClass(Streamable):
+    z: uint64
+    a: bool
+    c: str
+    b: bytes
+    d: uint128 | None
+    e: list[ExampleInner]
+    f: tuple[uint8, str, ExampleInner | None]
+    g: dict[str, uint32]
+    h: ExampleEnum
+    i: Coin
+    j: G1Element
+    k: list[list[bytes32]]
+    m: list[Coin]
+
+
+@streamable
+@dataclass(frozen=True)
+class ExampleCustomJson(Streamable):
+    a: uint32
+
+    def to_json_dict(self) -> dict[str, Any]:
+        return {"custom": self.a}
+
+
+inner = ExampleInner(bytes32([1] * 32), uint32(2))
+example = ExampleClass(
+    uint64(2**64 - 1),
+    True,
+    'quotes " and ünïcödé',
+    b"\x00\xff",
+    None,
+    [inner, replace(inner, a=uint32(3))],
+    (uint8(1), "one", None),
+    {"b": uint32(1), "a": uint32(2)},
+    ExampleEnum.B,
+    Coin(bytes32([2] * 32), bytes32([3] * 32), uint64(1000)),
+    G1Element(),
+    [[], [bytes32([4] * 32)]],
+    [Coin(bytes32([6] * 32), bytes32([7] * 32), uint64(i)) for i in range(3)],
+)
+overridden = replace(example, d=uint128(5))
+object.__setattr__(overridden, "json_serialization_override", lambda o: "overridden")
+
+
+@pytest.mark.parametrize(
+    "o",
+    [
+        {},
+        [],
+        {"success": True},
+        example,
+        overridden,
+        [example, overridden, inner],
+        ExampleCustomJson(uint32(1)),
+        {"a": 1.5, "b": float("inf"), "c": None, "d": ["x", 2, False]},
+        {"int_enum": ExampleIntEnum.A, "str_enum": ExampleStrEnum.A, "bytes": b"\x01", "hash": bytes32([5] * 32)},
+        {"int_keys": {2: "b", 1: inner}, "tuple": (1, "two", (example,))},
+        {"coin_records": [{"coin": example.i, "spent": i % 2 == 0} for i in range(1000)], "success": True},
+        {"mempool_items": {f"{i:04}": example for i in range(250)}, "items": [inner] * 250},
+        [{"index": i, "inner": inner} for i in range(1000)],
+    ],
+)
+def test_json_chunks(o: object) -> None:
+    expected = dict_to_json_str(o)
+    assert encode_json(o) == expected
+    assert "".join(json_chunks(o, chunk_size=100)) == expected
+    assert "".join(json_chunks(o)) == expected
+    json.loads(expected)
+
+
+def test_json_chunks_size() -> None:
+    o = {"items": [{"index": i, "hash": bytes32([i % 256] * 32)} for i in range(10000)], "success": True}
+    chunks = list(json_chunks(o, chunk_size=1000))
+    assert len(chunks) > 10
+    assert "".join(chunks) == dict_to_json_str(o)
+
+    # a small response is a single chunk
+    assert list(json_chunks({"success": True})) == ['{"success": true}']
+
+
+@pytest.mark.parametrize("o", [{"a": object()}, [1, object()], {b"bytes key": 1}, {1: "a", "b": 2}])
+def test_json_chunks_errors(o: object) -> None:
+    with pytest.raises(TypeError):
+        dict_to_json_str(o)
+    with pytest.raises(TypeError):
+        "".join(json_chunks(o))
+
+
+class FailingJson:
+    def to_json_dict(self) -> dict[str, Any]:
+        raise ValueError("failed to convert")
+
+
+@contextlib.asynccontextmanager
+async def serve_items(handle: Callable[[web.Request], Awaitable[web.StreamResponse]]) -> AsyncIterator[str]:
+    app = web.Application()
+    app.router.add_post("/get_items", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    try:
+        _, port = runner.addresses[0][:2]
+        yield f"http://127.0.0.1:{port}/get_items"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.parametrize("fails", [False, True])
+@pytest.mark.anyio
+async def test_obj_to_streamed_response(fails: bool, caplog: pytest.LogCaptureFixture) -> None:
+    items: list[object] = [{"index": i, "hash": bytes32([i % 256] * 32)} for i in range(10000)]
+    if fails:
+        # the response was partly sent when the conversion fails
+        items.append(FailingJson())
+    o = {"items": items, "success": True}
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        return await obj_to_streamed_response(request, o)
+
+    async with serve_items(handle) as url:
+        async with aiohttp.ClientSession() as session:
+            with caplog.at_level(logging.ERROR, logger="chia.util.json_util"):
+                async with session.post(url, json={}) as response:
+                    assert response.status == 200
+                    if fails:
+                        with pytest.raises(aiohttp.ClientPayloadError):
+                            await response.read()
+                    else:
+                        assert await response.json() == json.loads(dict_to_json_str(o))
+
+    errors = [record for record in caplog.records if "Failed to convert the response to /get_items" in record.message]
+    assert len(errors) == (1 if fails else 0)
+
+
+@pytest.mark.anyio
+async def test_obj_to_streamed_response_client_disconnects(caplog: pytest.LogCaptureFixture) -> None:
+    # a response far larger than the socket buffers, so the client goes away while it's being written
+    o = {"items": [{"index": i, "hash": bytes32([i % 256] * 32)} for i in range(200000)], "success": True}
+    done = asyncio.Event()
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        try:
+            return await obj_to_streamed_response(request, o)
+        finally:
+            done.set()
+
+    async with serve_items(handle) as url:
+        with caplog.at_level(logging.DEBUG, logger="chia.util.json_util"):
+            async with aiohttp.ClientSession() as session:
+                async with session.post(url, json={}) as response:
+                    assert response.status == 200
+                    await response.content.readany()
+                    response.close()
+            await asyncio.wait_for(done.wait(), timeout=10)
+
+    assert [record for record in caplog.records if record.levelno >= logging.ERROR] == []
+    assert any(
+        "Client disconnected while streaming the response to /get_items" in record.message for record in caplog.records
+    )
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import importlib
+import io
+import random
+from dataclasses import dataclass
+from enum import Enum
+from pathlib import Path
+from typing import Any, get_args
+
+import pytest
+from chia_rs import G1Element, G2Element
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import int16, uint8, uint32, uint64, uint128
+from chia_rs.struct_stream import StructStream
+
+import chia
+from chia._tests.util import network_protocol_data
+from chia.types.blockchain_format.program import Program
+from chia.util.streamable import (
+    DefinitionError,
+    Streamable,
+    generate_streamable_functions,
+    is_type_Dict,
+    is_type_Enum,
+    is_type_List,
+    is_type_SpecificOptional,
+    is_type_Tuple,
+    streamable,
+    streamable_enum,
+    uses_generic_functions,
+)
+
+
+class MissingSample(Exception):
+    pass
+
+
+def streamable_classes() -> list[type[Streamable]]:
+    root = Path(chia.__file__).parent
+    for path in sorted(root.rglob("*.py")):
+        parts = path.relative_to(root).with_suffix("").parts
+        if "_tests" not in parts and "@streamable" in path.read_text(encoding="utf-8"):
+            importlib.import_module(".".join(("chia", *parts)).removesuffix(".__init__"))
+
+    classes = []
+    pending = [Streamable]
+    while len(pending) > 0:
+        for cls in pending.pop().__subclasses__():
+            pending.append(cls)
+            if "_streamable_fields" in cls.__dict__ and uses_generic_functions(cls):
+                classes.append(cls)
+    return sorted(set(classes), key=lambda cls: f"{cls.__module__}.{cls.__qualname__}")
+
+
+def collect_samples(value: object, samples: dict[type[Any], object]) -> None:
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            collect_samples(item, samples)
+        return
+    if not hasattr(type(value), "parse_rust") or type(value) in samples:
+        return
+    samples[type(value)] = value
+    json_dict = value.to_json_dict()  # type: ignore[attr-defined]
+    if isinstance(json_dict, dict):
+        for name in json_dict:
+            collect_samples(getattr(value, name, None), samples)
+
+
+def rust_samples() -> dict[type[Any], object]:
+    """
+    Returns a value of each type implemented in chia_rs found in the network protocol test data, there's no generic
+    way to create those
+    """
+    samples: dict[type[Any], object] = {
+        G1Element: G1Element(),
+        G2Element: G2Element(),
+        Program: Program.to([1, (2, 3)]),
+    }
+    for value in vars(network_protocol_data).values():
+        collect_samples(value, samples)
+    return samples
+
+
+def random_value(f_type: Any, rng: random.Random, samples: dict[type[Any], object]) -> Any:
+    if is_type_SpecificOptional(f_type):
+        if rng.random() < 0.25:
+            return None
+        try:
+            return random_value(get_args(f_type)[0], rng, samples)
+        except MissingSample:
+            return None
+    if is_type_List(f_type):
+        return [random_value(get_args(f_type)[0], rng, samples) for _ in range(rng.randrange(4))]
+    if is_type_Tuple(f_type):
+        return tuple(random_value(item_type, rng, samples) for item_type in get_args(f_type))
+    if is_type_Dict(f_type):
+        key_type, value_type = get_args(f_type)
+        return {
+            random_value(key_type, rng, samples): random_value(value_type, rng, samples)
+            for _ in range(rng.randrange(3))
+        }
+    if is_type_Enum(f_type):
+        return rng.choice(list(f_type))
+    if f_type is bool:
+        return rng.random() < 0.5
+    if f_type is str:
+        return rng.choice(["", "chia", "ünïcödé"])
+    if f_type is bytes:
+        return rng.randbytes(rng.randrange(40))
+    if f_type in samples:
+        return samples[f_type]
+    if isinstance(f_type, type) and issubclass(f_type, Streamable):
+        # Avoid __init__() so classes checking their values in __post_init__() can be created too
+        obj = object.__new__(f_type)
+        for field in f_type.streamable_fields():
+            object.__setattr__(obj, field.name, random_value(field.type, rng, samples))
+        return obj
+    if isinstance(f_type, type) and issubclass(f_type, bytes) and hasattr(f_type, "random"):
+        return f_type.random(rng)
+    if isinstance(f_type, type) and issubclass(f_type, StructStream):
+        return f_type(rng.randint(f_type.MINIMUM, f_type.MAXIMUM))
+    raise MissingSample(f"no value for {f_type}")
+
+
+def parse_result(parse: Any, cls: type[Streamable], blob: bytes) -> object:
+    try:
+        return parse(cls, io.BytesIO(blob))
+    except Exception as e:
+        return type(e), str(e)
+
+
+def check_generated_functions(cls: type[Streamable], obj: Streamable) -> None:
+    parse, stream = generate_streamable_functions(cls)
+    f = io.BytesIO()
+    Streamable.stream(obj, f)
+    blob = f.getvalue()
+
+    f = io.BytesIO()
+    stream(obj, f)
+    assert f.getvalue() == blob
+
+    f = io.BytesIO(blob)
+    parsed = parse(cls, f)
+    assert f.read() == b""
+    assert parsed == obj
+    assert [type(value) for value in vars(parsed).values()] == [type(value) for value in vars(obj).values()]
+
+    # the same errors are raised for truncated input
+    for size in range(0, len(blob), max(1, len(blob) // 100)):
+        assert parse_result(parse, cls, blob[:size]) == parse_result(
+            Streamable.__dict__["parse"].__func__, cls, blob[:size]
+        )
+
+
+@streamable_enum(uint8)
+class ExampleEnum(Enum):
+    A = 1
+    B = 2
+
+
+@streamable
+@dataclass(frozen=True)
+class ExampleInner(Streamable):
+    a: uint32
+    b: bytes32
+
+
+@streamable
+@dataclass(frozen=True)
+class ExampleClass(Streamable):
+    a: uint64
+    b: bool
+    c: bytes32
+    d: uint128
+    e: list[uint32]
+    f: list[bytes32]
+    g: list[uint128]
+    h: int16
+    i: ExampleInner | None
+    j: list[ExampleInner]
+    k: str
+    m: ExampleEnum
+    n: bool
+
+
+def test_generated_functions() -> None:
+    obj = ExampleClass(
+        uint64(5),
+        True,
+        bytes32([1] * 32),
+        uint128(2**100),
+        [uint32(1), uint32(7)],
+        [bytes32([2] * 32)],
+        [uint128(3), uint128.MAXIMUM],
+        int16(-3),
+        ExampleInner(uint32(3), bytes32([3] * 32)),
+        [ExampleInner(uint32(4), bytes32([4] * 32))] * 3,
+        "hello",
+        ExampleEnum.B,
+        False,
+    )
+    check_generated_functions(ExampleClass, obj)
+    check_generated_functions(ExampleClass, ExampleClass.from_bytes(bytes(obj)))
+
+
+def test_generated_functions_invalid_bool() -> None:
+    obj = ExampleClass(
+        uint64(1), True, bytes32.zeros, uint128(0), [], [], [], int16(0), None, [], "", ExampleEnum.A, True
+    )
+    blob = bytearray(bytes(obj))
+    blob[8] = 2
+    parse, _ = generate_streamable_functions(ExampleClass)
+    with pytest.raises(ValueError, match="Bool byte must be 0 or 1"):
+        parse(ExampleClass, io.BytesIO(bytes(blob)))
+
+
+def test_generated_functions_empty() -> None:
+    @streamable
+    @dataclass(frozen=True)
+    class Empty(Streamable):
+        pass
+
+    check_generated_functions(Empty, Empty())
+
+
+def test_generated_functions_slots() -> None:
+    @dataclass(frozen=True)
+    class WithSlots(Streamable):
+        __slots__ = ("a",)
+        a: uint32
+
+    with pytest.raises(DefinitionError, match="__slots__ aren't supported"):
+        generate_streamable_functions(WithSlots)
+
+
+@pytest.mark.parametrize("cls", streamable_classes(), ids=lambda cls: f"{cls.__module__}.{cls.__qualname__}")
+def test_generated_functions_all_classes(cls: type[Streamable], seeded_random: random.Random) -> None:
+    samples = rust_samples()
+    for _ in range(10):
+        try:
+            obj = random_value(cls, seeded_random, samples)
+        except MissingSample as e:
+            pytest.skip(str(e))
+        check_generated_functions(cls, obj)
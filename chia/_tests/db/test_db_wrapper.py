@@ -14,7 +14,17 @@ from _pytest.fixtures import SubRequest
 
 from chia._tests.util.db_connection import DBConnection, PathDBConnection
 from chia._tests.util.misc import Marks, boolean_datacases, datacases
-from chia.util.db_wrapper import DBWrapper2, ForeignKeyError, InternalError, NestedForeignKeyDelayedRequestError
+from chia.util.db_wrapper import (
+    DBWrapper2,
+    ForeignKeyError,
+    InternalError,
+    NestedForeignKeyDelayedRequestError,
+    ReaderPriority,
+    generate_in_memory_db_uri,
+    query_stats,
+    reader_priority,
+    statement_template,
+)
 from chia.util.task_referencer import create_referenced_task
 
 if TYPE_CHECKING:
@@ -193,6 +203,7 @@ async def test_partial_failure() -> None:
                 values.append(1)
             async with conn1.execute("SELECT value FROM counter") as cursor:
                 values.append(await get_value(cursor))
+        assert db_wrapper.rollback_count == 1
 
     # the write of 1337 failed, and was restored to 42
     assert values == [42, 1337, 1, 42]
@@ -563,3 +574,196 @@ async def test_delayed_foreign_key_request_fails_when_nested(initial: bool) -> N
             with pytest.raises(NestedForeignKeyDelayedRequestError):
                 async with db_wrapper.writer(foreign_key_enforcement_enabled=True):
                     pass  # pragma: no cover
+
+
+def test_statement_template() -> None:
+    assert statement_template("SELECT value\n    FROM counter  WHERE value = ?") == (
+        "SELECT value FROM counter WHERE value = ?"
+    )
+    assert statement_template("SELECT * FROM t WHERE a IN (?,?, ?) AND b IN (?)") == (
+        "SELECT * FROM t WHERE a IN (?, ...) AND b IN (?)"
+    )
+
+
+@pytest.mark.anyio
+async def test_query_stats() -> None:
+    query_stats.reset()
+    async with PathDBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+        async with db_wrapper.writer() as connection:
+            await connection.executemany("INSERT INTO counter(value) VALUES(?)", [(value,) for value in range(1, 10)])
+        for _ in range(3):
+            async with db_wrapper.reader() as connection:
+                async with connection.execute("SELECT value FROM counter WHERE value < ?", (5,)) as cursor:
+                    assert len(list(await cursor.fetchall())) == 5
+                rows = await connection.execute_fetchall("SELECT value FROM counter WHERE value IN (?, ?)", (1, 2))
+                assert len(list(rows)) == 2
+
+    stats = {(item["database"], item["statement"]): item for item in query_stats.to_json_dict()}
+    select = stats["db.sqlite", "SELECT value FROM counter WHERE value < ?"]
+    assert select["count"] == 3
+    assert select["rows"] == 15
+    assert select["total_time"] > 0
+    assert 0 < select["p99_time"] <= select["total_time"]
+    select_in = stats["db.sqlite", "SELECT value FROM counter WHERE value IN (?, ...)"]
+    assert select_in["count"] == 3
+    assert select_in["rows"] == 6
+    assert stats["db.sqlite", "INSERT INTO counter(value) VALUES(?)"]["count"] == 1
+
+    query_stats.reset()
+    assert query_stats.to_json_dict() == []
+
+
+@pytest.mark.anyio
+async def test_query_stats_savepoints() -> None:
+    # the savepoints of the transactions are neither recorded, nor a new
+    # statement for every transaction
+    query_stats.reset()
+    async with DBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+        for _ in range(10):
+            async with db_wrapper.writer() as connection:
+                async with db_wrapper.writer() as nested:
+                    await nested.execute("UPDATE counter SET value = value + 1")
+                await connection.execute("UPDATE counter SET value = value + 1")
+        with pytest.raises(UniqueError):
+            async with db_wrapper.writer():
+                raise UniqueError
+        assert db_wrapper._savepoint_depth == 0
+
+        async with db_wrapper.reader() as connection:
+            assert await query_value(connection) == 20
+
+    statements = [item["statement"] for item in query_stats.to_json_dict()]
+    assert "UPDATE counter SET value = value + 1" in statements
+    assert not any(statement.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")) for statement in statements)
+    query_stats.reset()
+
+
+@pytest.mark.anyio
+async def test_cached_statements_with_dropped_cursors() -> None:
+    # cursors that are never closed must not reset a cached statement while
+    # another cursor is using it
+    async with DBConnection(2) as db_wrapper:
+        await setup_table(db_wrapper)
+
+        async def increment_and_read() -> None:
+            for _ in range(50):
+                async with db_wrapper.writer_maybe_transaction() as connection:
+                    await connection.execute("UPDATE counter SET value = value + 1")
+                    cursor = await connection.execute("SELECT value FROM counter")
+                    assert await cursor.fetchone() is not None
+                    del cursor
+
+        await asyncio.gather(*(increment_and_read() for _ in range(10)))
+
+        async with db_wrapper.reader() as connection:
+            assert await query_value(connection) == 500
+
+
+@pytest.mark.anyio
+async def test_dropped_cursors() -> None:
+    async with DBConnection(1) as db_wrapper:
+        await setup_table(db_wrapper)
+        for _ in range(3):
+            async with db_wrapper.writer_maybe_transaction() as connection:
+                for _ in range(20):
+                    cursor = await connection.execute("SELECT value FROM counter")
+                    del cursor
+                await asyncio.sleep(0)
+                # the connection keeps working while the dropped cursors are closed
+                await connection.execute("UPDATE counter SET value = value + 1")
+                assert await query_value(connection) > 0
+
+        async with db_wrapper.reader() as connection:
+            cursor = await connection.execute("SELECT value FROM counter")
+
+    # a cursor dropped after its connection was closed
+    del cursor
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+
+async def hold_reader(
+    db_wrapper: DBWrapper2, priority: ReaderPriority, order: list[ReaderPriority], release: asyncio.Event
+) -> None:
+    with reader_priority(priority):
+        async with db_wrapper.reader_no_transaction():
+            order.append(priority)
+            await release.wait()
+
+
+@pytest.mark.anyio
+async def test_reader_priority() -> None:
+    async with DBWrapper2.managed(generate_in_memory_db_uri(), uri=True, reader_count=1) as db_wrapper:
+        order: list[ReaderPriority] = []
+        release = asyncio.Event()
+        async with db_wrapper.reader_no_transaction():
+            tasks = [
+                create_referenced_task(hold_reader(db_wrapper, priority, order, release))
+                for priority in [ReaderPriority.RPC, ReaderPriority.PEER, ReaderPriority.CONSENSUS, ReaderPriority.RPC]
+            ]
+            await asyncio.sleep(0.01)
+            assert order == []
+        release.set()
+        await asyncio.gather(*tasks)
+
+    assert order == [ReaderPriority.CONSENSUS, ReaderPriority.PEER, ReaderPriority.RPC, ReaderPriority.RPC]
+
+
+@pytest.mark.anyio
+async def test_reader_wait_cancelled() -> None:
+    async with DBWrapper2.managed(generate_in_memory_db_uri(), uri=True, reader_count=1) as db_wrapper:
+        order: list[ReaderPriority] = []
+        release = asyncio.Event()
+        async with db_wrapper.reader_no_transaction():
+            task = create_referenced_task(hold_reader(db_wrapper, ReaderPriority.PEER, order, release))
+            await asyncio.sleep(0.01)
+            # the reader is released before the waiting task gets to run
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert order == []
+        async with db_wrapper.reader() as connection:
+            await connection.execute_fetchall("SELECT 1")
+
+
+@pytest.mark.anyio
+async def test_reader_limits() -> None:
+    async with DBWrapper2.managed(
+        generate_in_memory_db_uri(), uri=True, reader_count=2, reader_limits={ReaderPriority.PEER: 1}
+    ) as db_wrapper:
+        order: list[ReaderPriority] = []
+        release = asyncio.Event()
+        tasks = [create_referenced_task(hold_reader(db_wrapper, ReaderPriority.PEER, order, release)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        # only one reader is used for peers, leaving the other one free
+        assert order == [ReaderPriority.PEER]
+        with reader_priority(ReaderPriority.CONSENSUS):
+            async with db_wrapper.reader() as connection:
+                await connection.execute_fetchall("SELECT 1")
+        release.set()
+        await asyncio.gather(*tasks)
+
+    assert order == [ReaderPriority.PEER] * 3
+
+
+@pytest.mark.anyio
+async def test_readers_opened_on_demand() -> None:
+    async with DBWrapper2.managed(
+        generate_in_memory_db_uri(), uri=True, reader_count=1, max_reader_count=3
+    ) as db_wrapper:
+        order: list[ReaderPriority] = []
+        release = asyncio.Event()
+        tasks = [
+            create_referenced_task(hold_reader(db_wrapper, ReaderPriority.CONSENSUS, order, release)) for _ in range(4)
+        ]
+        await asyncio.sleep(0.1)
+        # all the connections are in use, the last reader waits for one
+        assert len(order) == 3
+        assert db_wrapper._num_read_connections == 3
+        release.set()
+        await asyncio.gather(*tasks)
+        # the extra connections are closed once nobody is waiting for them
+        assert len(order) == 4
+        assert db_wrapper._num_read_connections == 1
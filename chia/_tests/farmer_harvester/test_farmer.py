@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from dataclasses import dataclass
@@ -767,6 +768,7 @@ def create_valid_pos(farmer: Farmer) -> tuple[farmer_protocol.NewSignagePoint, P
         "stale_partials_24h": [],
         "missing_partials_since_start": 0,
         "missing_partials_24h": [],
+        "partial_latency_24h": [],
         "authentication_token_timeout": case.authentication_token_timeout,
         "plot_count": 0,
         "pool_config": case.pool_config,
@@ -1223,6 +1225,109 @@ async def test_farmer_pool_info_config_update(
     assert config["pool"]["pool_list"][0]["pool_url"] == case.expected_pool_url_in_config
 
 
+def setup_pool_list(farmer_service: FarmerService, pool_urls: list[str]) -> list[bytes32]:
+    p2_singleton_puzzle_hashes = [bytes32([i] * 32) for i in range(len(pool_urls))]
+    authentication_sk = PrivateKey.from_bytes(
+        bytes.fromhex("11ed596eb95b31364a9185e948f6b66be30415f816819449d5d40751dc70e786")
+    )
+    config = load_config(farmer_service.root_path, "config.yaml")
+    config["pool"]["pool_list"] = []
+    for p2_singleton_puzzle_hash, pool_url in zip(p2_singleton_puzzle_hashes, pool_urls):
+        farmer_service._node.authentication_keys[p2_singleton_puzzle_hash] = authentication_sk
+        farmer_service._node.pool_state[p2_singleton_puzzle_hash] = make_pool_state(
+            p2_singleton_puzzle_hash,
+            overrides={
+                "next_farmer_update": time() + UPDATE_POOL_FARMER_INFO_INTERVAL,
+            },
+        )
+        config["pool"]["pool_list"].append(
+            make_pool_list_entry(
+                overrides={
+                    "p2_singleton_puzzle_hash": p2_singleton_puzzle_hash.hex(),
+                    "pool_url": pool_url,
+                }
+            )
+        )
+    save_config(farmer_service.root_path, "config.yaml", config)
+    return p2_singleton_puzzle_hashes
+
+
+@pytest.mark.anyio
+async def test_farmer_pool_info_shared_by_pool_url(
+    mocker: MockerFixture,
+    farmer_one_harvester: tuple[list[HarvesterService], FarmerService, BlockTools],
+) -> None:
+    _, farmer_service, _ = farmer_one_harvester
+    pool_url = "https://pool-domain.tld"
+    p2_singleton_puzzle_hashes = setup_pool_list(farmer_service, [pool_url] * 3)
+    pool_response = DummyPoolInfoResponse(
+        ok=True, status=200, url=URL(f"{pool_url}/pool_info"), pool_info=make_pool_info()
+    )
+    mock_http_get = mocker.patch("aiohttp.ClientSession.get", return_value=pool_response)
+
+    await farmer_service._node.update_pool_state()
+
+    mock_http_get.assert_called_once()
+    for p2_singleton_puzzle_hash in p2_singleton_puzzle_hashes:
+        pool_state = farmer_service._node.pool_state[p2_singleton_puzzle_hash]
+        assert pool_state["authentication_token_timeout"] == 5
+        assert pool_state["current_difficulty"] == 1
+        assert pool_state["pool_errors_24h"] == []
+
+    # a failed request is an error for all of the pools using it
+    for p2_singleton_puzzle_hash in p2_singleton_puzzle_hashes:
+        farmer_service._node.pool_state[p2_singleton_puzzle_hash]["next_pool_info_update"] = 0
+    mock_http_get = mocker.patch(
+        "aiohttp.ClientSession.get",
+        return_value=DummyPoolInfoResponse(ok=False, status=500, url=URL(f"{pool_url}/pool_info")),
+    )
+
+    await farmer_service._node.update_pool_state()
+
+    mock_http_get.assert_called_once()
+    for p2_singleton_puzzle_hash in p2_singleton_puzzle_hashes:
+        assert len(farmer_service._node.pool_state[p2_singleton_puzzle_hash]["pool_errors_24h"]) == 1
+
+
+@dataclass
+class HangingPoolInfoResponse(DummyPoolInfoResponse):
+    async def __aenter__(self) -> Self:
+        await asyncio.sleep(3600)
+        return self
+
+
+@pytest.mark.anyio
+async def test_farmer_pool_state_update_timeout(
+    mocker: MockerFixture,
+    farmer_one_harvester: tuple[list[HarvesterService], FarmerService, BlockTools],
+) -> None:
+    _, farmer_service, _ = farmer_one_harvester
+    hanging_pool_url = "https://hanging-pool.tld"
+    pool_url = "https://pool-domain.tld"
+    hanging_p2_singleton_puzzle_hash, p2_singleton_puzzle_hash = setup_pool_list(
+        farmer_service, [hanging_pool_url, pool_url]
+    )
+
+    def get(url: str, **kwargs: Any) -> DummyPoolInfoResponse:
+        if url.startswith(hanging_pool_url):
+            return HangingPoolInfoResponse(ok=True, status=200, url=URL(url), pool_info=make_pool_info())
+        return DummyPoolInfoResponse(ok=True, status=200, url=URL(url), pool_info=make_pool_info())
+
+    mocker.patch("aiohttp.ClientSession.get", side_effect=get)
+    mocker.patch("chia.farmer.farmer.POOL_STATE_UPDATE_TIMEOUT", 1)
+
+    start = time()
+    await farmer_service._node.update_pool_state()
+    assert time() - start < 30
+
+    pool_state = farmer_service._node.pool_state[p2_singleton_puzzle_hash]
+    assert pool_state["current_difficulty"] == 1
+    assert pool_state["pool_errors_24h"] == []
+    hanging_pool_state = farmer_service._node.pool_state[hanging_p2_singleton_puzzle_hash]
+    assert hanging_pool_state["current_difficulty"] is None
+    assert len(hanging_pool_state["pool_errors_24h"]) == 1
+
+
 @dataclass
 class PartialSubmitHeaderCase(DataCase):
     _id: str
@@ -1282,3 +1387,39 @@ async def test_farmer_additional_headers_on_partial_submit(
     await farmer_api.new_proof_of_space(new_pos, peer)
 
     mock_http_post.assert_called_once_with(ANY, json=ANY, ssl=ANY, headers=case.expected_headers)
+
+
+@pytest.mark.anyio
+async def test_farmer_reuses_pool_session(
+    mocker: MockerFixture,
+    farmer_one_harvester: tuple[list[HarvesterService], FarmerService, BlockTools],
+) -> None:
+    _, farmer_service, _ = farmer_one_harvester
+    farmer_api = farmer_service._api
+
+    _, pos, new_pos = create_valid_pos(farmer_api.farmer)
+    assert pos.pool_contract_puzzle_hash is not None
+    pool_state = farmer_api.farmer.pool_state[pos.pool_contract_puzzle_hash]
+
+    mock_http_post = mocker.patch(
+        "aiohttp.ClientSession.post",
+        autospec=True,
+        return_value=DummyPoolResponse(True, 200, new_difficulty=1),
+    )
+
+    peer = cast(WSChiaConnection, DummyHarvesterPeer(False))
+    await farmer_api.new_proof_of_space(new_pos, peer)
+    await farmer_api.new_proof_of_space(new_pos, peer)
+
+    assert mock_http_post.call_count == 2
+    first_session = mock_http_post.call_args_list[0].args[0]
+    assert mock_http_post.call_args_list[1].args[0] is first_session
+    assert first_session is farmer_api.farmer.pool_sessions.get(pool_state["pool_config"].pool_url)
+    ssl_contexts = {call.kwargs["ssl"] for call in mock_http_post.call_args_list}
+    assert len(ssl_contexts) == 1
+    assert len(pool_state["partial_latency_24h"]) == 2
+    assert all(latency >= 0 for _, latency in pool_state["partial_latency_24h"])
+
+    # sessions of pools that are no longer configured are closed
+    await farmer_api.farmer.pool_sessions.close_unused(set())
+    assert first_session.closed
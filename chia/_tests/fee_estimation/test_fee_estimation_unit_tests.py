@@ -1,15 +1,17 @@
 from __future__ import annotations
 
 import logging
+import random
 
 import pytest
 from chia_rs.sized_ints import uint32, uint64
 
 from chia.full_node.bitcoin_fee_estimator import create_bitcoin_fee_estimator
+from chia.full_node.fee_estimate_store import FeeStore
 from chia.full_node.fee_estimation import FeeBlockInfo, MempoolItemInfo
-from chia.full_node.fee_estimator_constants import INFINITE_FEE_RATE, INITIAL_STEP
+from chia.full_node.fee_estimator_constants import INFINITE_FEE_RATE, INITIAL_STEP, SUCCESS_PCT, SUFFICIENT_FEE_TXS
 from chia.full_node.fee_estimator_interface import FeeEstimatorInterface
-from chia.full_node.fee_tracker import get_bucket_index, init_buckets
+from chia.full_node.fee_tracker import FeeStat, FeeTracker, get_bucket_index, init_buckets
 from chia.types.fee_rate import FeeRateV2
 from chia.util.math import make_monotonically_decreasing
 
@@ -141,3 +143,93 @@ def test_monotonically_decrease() -> None:
     for i, o in zip(inputs, output):
         print(o, i)
         assert o == make_monotonically_decreasing(i)
+
+
+class ReferenceFeeStat(FeeStat):
+    """
+    Updates and sums the statistics one value at a time, like FeeStat used to
+    """
+
+    def update_moving_averages(self) -> None:
+        for j in range(len(self.buckets)):
+            for i in range(len(self.confirmed_average)):
+                self.confirmed_average[i][j] *= self.decay
+                self.failed_average[i][j] *= self.decay
+
+            self.tx_ct_avg[j] *= self.decay
+            self.m_fee_rate_avg[j] *= self.decay
+
+    def clear_current(self, block_height: uint32) -> None:
+        for i in range(len(self.buckets)):
+            self.old_unconfirmed_txs[i] += self.unconfirmed_txs[block_height % len(self.unconfirmed_txs)][i]
+            self.unconfirmed_txs[block_height % len(self.unconfirmed_txs)][i] = 0
+
+    def unconfirmed_by_bucket(self, conf_target: int, block_height: uint32) -> list[int]:
+        bins = len(self.unconfirmed_txs)
+        result = []
+        for bucket in range(len(self.buckets)):
+            extra_num = 0
+            for conf_ct in range(conf_target, self.max_confirms):
+                extra_num += self.unconfirmed_txs[(block_height - conf_ct) % bins][bucket]
+            extra_num += self.old_unconfirmed_txs[bucket]
+            result.append(extra_num)
+        return result
+
+
+def make_reference_tracker() -> FeeTracker:
+    tracker = FeeTracker(FeeStore())
+    for name in ["short_horizon", "med_horizon", "long_horizon"]:
+        stat: FeeStat = getattr(tracker, name)
+        setattr(
+            tracker,
+            name,
+            ReferenceFeeStat(stat.buckets, stat.max_periods, stat.decay, stat.scale, stat.fee_store, stat.type),
+        )
+    return tracker
+
+
+def test_fee_stat_equivalence(seeded_random: random.Random) -> None:
+    tracker = FeeTracker(FeeStore())
+    reference = make_reference_tracker()
+    mempool: list[MempoolItemInfo] = []
+    for height in range(1000, 1300):
+        for _ in range(seeded_random.randrange(30)):
+            cost = seeded_random.randrange(1_000_000, 50_000_000)
+            item = MempoolItemInfo(cost, int(cost * seeded_random.lognormvariate(0, 3)), uint32(height))
+            tracker.add_tx(item)
+            reference.add_tx(item)
+            mempool.append(item)
+        seeded_random.shuffle(mempool)
+        included = mempool[:20]
+        evicted = mempool[20:25]
+        mempool = mempool[25:]
+        tracker.process_block(uint32(height + 1), included)
+        reference.process_block(uint32(height + 1), included)
+        for item in evicted:
+            tracker.remove_tx(item)
+            reference.remove_tx(item)
+
+        if height % 10 == 0:
+            assert tracker.estimate_fees() == reference.estimate_fees()
+            for seconds in [0, 40, 120, 300, 600, 1200, 3600]:
+                assert tracker.estimate_fee(seconds) == reference.estimate_fee(seconds)
+
+    for name in ["short_horizon", "med_horizon", "long_horizon"]:
+        stat = getattr(tracker, name)
+        reference_stat = getattr(reference, name)
+        assert stat.create_backup() == reference_stat.create_backup()
+        assert stat.unconfirmed_txs == reference_stat.unconfirmed_txs
+        assert stat.old_unconfirmed_txs == reference_stat.old_unconfirmed_txs
+        for conf_target in range(stat.max_confirms + 2):
+            assert stat.estimate_median_val(
+                conf_target, SUFFICIENT_FEE_TXS, SUCCESS_PCT, tracker.latest_seen_height
+            ) == reference_stat.estimate_median_val(
+                conf_target, SUFFICIENT_FEE_TXS, SUCCESS_PCT, reference.latest_seen_height
+            )
+
+    # the statistics are restored from a backup
+    tracker.shutdown()
+    restored = FeeTracker(tracker.fee_store)
+    for name in ["short_horizon", "med_horizon", "long_horizon"]:
+        assert getattr(restored, name).create_backup() == getattr(tracker, name).create_backup()
+    assert restored.estimate_fees()[2].median == tracker.estimate_fees()[2].median
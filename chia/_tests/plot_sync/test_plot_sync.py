@@ -13,6 +13,7 @@ import pytest
 from chia_rs import G1Element, PlotParam
 from chia_rs.sized_bytes import bytes32
 from chia_rs.sized_ints import uint8, uint32, uint64
+from pytest_mock import MockerFixture
 
 from chia._tests.plot_sync.util import start_harvester_service
 from chia._tests.plotting.test_plot_manager import Directory, MockPlotInfo
@@ -621,3 +622,36 @@ async def test_sync_start_and_disconnect_while_sync_is_active(
     # Now start another sync and wait for it to be done to make sure everything still works fine
     harvester.plot_manager.trigger_refresh()
     await time_out_assert(20, synced, True, harvester.plot_sync_sender, receiver, current_last_sync_id)
+
+
+@pytest.mark.anyio
+async def test_sync_resumed_after_reconnect(
+    mocker: MockerFixture,
+    farmer_one_harvester: tuple[list[HarvesterService], FarmerService, BlockTools],
+) -> None:
+    harvesters, farmer_service, _ = farmer_one_harvester
+    harvester = harvesters[0]._node
+    farmer: Farmer = farmer_service._node
+
+    async def receiver_available() -> bool:
+        return harvester.server.node_id in farmer.plot_sync_receivers
+
+    await time_out_assert(20, receiver_available)
+    receiver = farmer.plot_sync_receivers[harvester.server.node_id]
+    await time_out_assert(20, receiver.initial_sync, False)
+    await time_out_assert(20, harvester.plot_sync_sender.sync_active, False)
+    plots = receiver.plots().copy()
+    assert len(plots) > 0
+    last_sync_id = receiver.last_sync().sync_id
+    process_digest = mocker.spy(Receiver, "process_digest")
+    process_loaded = mocker.spy(Receiver, "process_loaded")
+    # Disconnect and wait for the harvester to reconnect
+    await receiver.connection().close()
+    await time_out_assert(20, receiver_available, False)
+    await time_out_assert(20, receiver_available, True)
+    receiver = farmer.plot_sync_receivers[harvester.server.node_id]
+    await time_out_assert(20, synced, True, harvester.plot_sync_sender, receiver, last_sync_id)
+    # The sync was resumed from the digest of the plots, without sending them again
+    process_digest.assert_called_once()
+    assert sum(len(call.args[1].data) for call in process_loaded.call_args_list) == 0
+    assert receiver.plots() == plots
@@ -16,11 +16,13 @@ from chia._tests.plot_sync.util import get_dummy_connection
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
 from chia.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR, _expected_plot_size
 from chia.plot_sync.delta import Delta
+from chia.plot_sync.digest import PlotSetDigest
 from chia.plot_sync.receiver import Receiver, Sync, get_list_or_len
 from chia.plot_sync.util import ErrorCodes, State
 from chia.plotting.util import HarvestingMode
 from chia.protocols.harvester_protocol import (
     Plot,
+    PlotSyncDigest,
     PlotSyncDone,
     PlotSyncIdentifier,
     PlotSyncPathList,
@@ -186,6 +188,8 @@ def plot_sync_setup(seeded_random: random.Random) -> tuple[Receiver, list[SyncSt
 
     # Manually add the plots we want to remove in tests
     receiver._plots = {plot_info.filename: plot_info for plot_info in plot_info_list[0:10]}
+    for plot_info in plot_info_list[0:10]:
+        receiver._plots_digest.add(plot_info)
     receiver._total_plot_size = sum(plot.file_size for plot in receiver.plots().values())
     # TODO: todo_v2_plots support v2 plots
     receiver._total_effective_plot_size = int(
@@ -391,6 +395,60 @@ async def test_sync_flow(seeded_random: random.Random) -> None:
     assert receiver.current_sync().state == State.idle
 
 
+@pytest.mark.anyio
+async def test_resume_from_digest(seeded_random: random.Random) -> None:
+    receiver, sync_steps = plot_sync_setup(seeded_random=seeded_random)
+    for state in State:
+        await run_sync_step(receiver, sync_steps[state])
+    expected_digest = PlotSetDigest()
+    for plot in receiver.plots().values():
+        expected_digest.add(plot)
+    assert receiver._plots_digest == expected_digest
+
+    def new_receiver() -> Receiver:
+        connection = get_dummy_connection(NodeType.HARVESTER, receiver.connection().peer_node_id)
+        resumed = Receiver(connection, dummy_callback, DEFAULT_CONSTANTS)  # type:ignore[arg-type]
+        resumed.allow_resume_from(receiver)
+        return resumed
+
+    def start_payload(initial: bool, last_sync_id: uint64) -> PlotSyncStart:
+        identifier = plot_sync_identifier(uint64(last_sync_id + 1), uint64(0))
+        return PlotSyncStart(identifier, initial, last_sync_id, uint32(0), uint8(HarvestingMode.CPU))
+
+    # The harvester can't resume with an initial sync or from another sync
+    for initial, last_sync_id in [(True, uint64(0)), (False, uint64(receiver.last_sync().sync_id + 1))]:
+        resumed = new_receiver()
+        await resumed.sync_started(start_payload(initial, last_sync_id))
+        assert resumed.plots() == {}
+        assert resumed._previous is None
+
+    # A receiver for a new connection of the harvester takes over the state of the last sync
+    resumed = new_receiver()
+    assert resumed.initial_sync()
+    await resumed.sync_started(start_payload(False, receiver.last_sync().sync_id))
+    assert resumed.last_sync() == receiver.last_sync()
+    assert resumed.plots() == receiver.plots()
+    assert resumed.invalid() == receiver.invalid()
+    assert resumed.to_dict(True)["plots"] == 10
+    assert resumed.current_sync().resumed
+    assert resumed.current_sync().next_message_id == 1
+
+    def digest_payload(digest: bytes32, plot_count: int) -> PlotSyncDigest:
+        identifier = plot_sync_identifier(resumed.current_sync().sync_id, resumed.current_sync().next_message_id)
+        return PlotSyncDigest(identifier, digest, uint32(plot_count))
+
+    # The harvester needs to have the same plots
+    await resumed.process_digest(digest_payload(bytes32.zeros, 10))
+    assert_error_response(resumed, ErrorCodes.digest_mismatch)
+    await resumed.process_digest(digest_payload(expected_digest.digest(), 9))
+    assert_error_response(resumed, ErrorCodes.digest_mismatch)
+    assert resumed.current_sync().next_message_id == 1
+    await resumed.process_digest(digest_payload(expected_digest.digest(), 10))
+    assert resumed.current_sync().next_message_id == 2
+    message = resumed.connection().last_sent_message  # type: ignore[attr-defined]
+    assert PlotSyncResponse.from_bytes(message.data).error is None
+
+
 @pytest.mark.anyio
 async def test_invalid_ids(seeded_random: random.Random) -> None:
     receiver, sync_steps = plot_sync_setup(seeded_random=seeded_random)
@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+import dataclasses
 import random
 
 import pytest
 from chia_rs.sized_bytes import bytes32
-from chia_rs.sized_ints import int16, uint64
+from chia_rs.sized_ints import int16, uint32, uint64
 
 from chia._tests.plot_sync.util import get_dummy_connection, plot_sync_identifier
+from chia.plot_sync.digest import PlotSetDigest
 from chia.plot_sync.exceptions import AlreadyStartedError, InvalidConnectionTypeError
-from chia.plot_sync.sender import ExpectedResponse, Sender
+from chia.plot_sync.sender import ExpectedResponse, Sender, _convert_plot_info_list
 from chia.plot_sync.util import Constants
 from chia.plotting.util import HarvestingMode
-from chia.protocols.harvester_protocol import PlotSyncIdentifier, PlotSyncResponse
+from chia.protocols.harvester_protocol import (
+    PlotSyncDigest,
+    PlotSyncIdentifier,
+    PlotSyncPathList,
+    PlotSyncPlotList,
+    PlotSyncResponse,
+    PlotSyncStart,
+)
 from chia.protocols.outbound_message import NodeType
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
 from chia.server.ws_connection import WSChiaConnection
 from chia.simulator.block_tools import BlockTools
 
@@ -115,3 +125,68 @@ def test_sync_done_with_negative_duration_does_not_crash(bt: BlockTools) -> None
     sender.sync_start(0, True)
 
     sender.sync_done([], -1)
+
+
+def test_resume(bt: BlockTools, seeded_random: random.Random) -> None:
+    farmer_connection = get_dummy_connection(NodeType.FARMER, bytes32.random(seeded_random))
+    sender = Sender(bt.plot_manager, HarvestingMode.CPU)
+    sender.set_connection(farmer_connection)  # type:ignore[arg-type]
+    plot_infos = list(bt.plot_manager.plots.values())
+    plots = _convert_plot_info_list(plot_infos)
+    assert len(plots) > 2
+    # Nothing to resume from before the first sync
+    assert not sender._resume()
+    # Sync all plots but the first one, plus one which is gone now
+    gone_plot = dataclasses.replace(plots[0], filename="gone.plot")
+    sender.sync_start(len(plot_infos), True)
+    sender.process_batch(plot_infos[1:], 0)
+    sender._sync_loaded.append(gone_plot)
+    sender.sync_done([], 0)
+    sender._finalize_sync()
+    synced_sync_id = sender._last_sync_id
+    assert set(sender._synced.plots) == {plot.filename for plot in plots[1:]} | {"gone.plot"}
+    # The farmer needs to support resuming
+    sender._reset()
+    assert not sender._resume()
+    farmer_connection.peer_capabilities.append(Capability.PLOT_SYNC_RESUME)
+    assert sender._resume()
+    # Only the changes get synced, after the digest of the plots the farmer has
+    message_types = [message.message_type for message in sender._messages]
+    assert message_types == [
+        ProtocolMessageTypes.plot_sync_start,
+        ProtocolMessageTypes.plot_sync_digest,
+        ProtocolMessageTypes.plot_sync_loaded,
+        ProtocolMessageTypes.plot_sync_removed,
+        ProtocolMessageTypes.plot_sync_invalid,
+        ProtocolMessageTypes.plot_sync_keys_missing,
+        ProtocolMessageTypes.plot_sync_duplicates,
+        ProtocolMessageTypes.plot_sync_done,
+    ]
+    _, start = sender._messages[0].generate()
+    assert isinstance(start, PlotSyncStart)
+    assert not start.initial and start.last_sync_id == synced_sync_id
+    expected_digest = PlotSetDigest()
+    for plot in [*plots[1:], gone_plot]:
+        expected_digest.add(plot)
+    _, digest = sender._messages[1].generate()
+    assert isinstance(digest, PlotSyncDigest)
+    assert digest.digest == expected_digest.digest()
+    assert digest.plot_count == uint32(len(plots))
+    _, loaded = sender._messages[2].generate()
+    assert isinstance(loaded, PlotSyncPlotList)
+    assert loaded.data == [plots[0]]
+    _, removed = sender._messages[3].generate()
+    assert isinstance(removed, PlotSyncPathList)
+    assert removed.data == ["gone.plot"]
+    # After the sync the farmer has the same plots as the plot manager
+    sender._finalize_sync()
+    assert sender._synced.plots == {plot.filename: plot for plot in plots}
+    expected_digest = PlotSetDigest()
+    for plot in plots:
+        expected_digest.add(plot)
+    assert sender._synced.digest == expected_digest
+    # A replaced plot can't be synced by resuming
+    sender._synced.remove(plots[1].filename)
+    sender._synced.add(dataclasses.replace(plots[1], file_size=uint64(plots[1].file_size + 1)))
+    sender._reset()
+    assert not sender._resume()
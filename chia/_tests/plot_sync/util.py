@@ -3,7 +3,7 @@ from __future__ import annotations
 import contextlib
 import time
 from collections.abc import AsyncIterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from chia_rs.sized_bytes import bytes32
 from chia_rs.sized_ints import uint16, uint64
@@ -16,6 +16,7 @@ from chia.harvester.harvester_service import HarvesterService
 from chia.plot_sync.sender import Sender
 from chia.protocols.harvester_protocol import PlotSyncIdentifier
 from chia.protocols.outbound_message import Message, NodeType
+from chia.protocols.shared_protocol import Capability
 from chia.types.peer_info import PeerInfo, UnresolvedPeerInfo
 
 
@@ -25,10 +26,14 @@ class WSChiaConnectionDummy:
     peer_node_id: bytes32
     peer_info: PeerInfo = PeerInfo("127.0.0.1", uint16(0))
     last_sent_message: Message | None = None
+    peer_capabilities: list[Capability] = field(default_factory=list)
 
     async def send_message(self, message: Message) -> None:
         self.last_sent_message = message
 
+    def has_capability(self, capability: Capability) -> bool:
+        return capability in self.peer_capabilities
+
     def get_peer_logging(self) -> PeerInfo:
         return self.peer_info
 
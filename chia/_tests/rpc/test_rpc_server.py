@@ -11,11 +11,15 @@ from typing import TYPE_CHECKING, Any, ClassVar, cast
 
 import aiohttp
 import pytest
-from chia_rs.sized_ints import uint16
+from chia_rs import Coin
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint16, uint64
 
+from chia._tests.util.db_connection import DBConnection
 from chia.rpc.rpc_server import Endpoint, EndpointResult, RpcServer, RpcServiceProtocol
 from chia.ssl.create_ssl import create_all_ssl
 from chia.util.config import load_config
+from chia.util.db_wrapper import query_stats
 from chia.util.ws_message import WsRpcMessage
 
 root_logger = logging.getLogger()
@@ -49,6 +53,7 @@ class TestRpcApi:
     def get_routes(self) -> dict[str, Endpoint]:
         return {
             "/log": self.log,
+            "/get_coins": self.get_coins,
         }
 
     async def log(self, request: dict[str, Any]) -> EndpointResult:
@@ -60,6 +65,9 @@ class TestRpcApi:
 
         return {}
 
+    async def get_coins(self, request: dict[str, Any]) -> EndpointResult:
+        return {"coins": [Coin(bytes32.zeros, bytes32.zeros, uint64(i)) for i in range(request["count"])]}
+
 
 @dataclasses.dataclass
 class Client:
@@ -181,3 +189,29 @@ async def test_reset_log_level(
 
     await client.request("reset_log_level")
     assert number_to_name_level_map[root_logger.level] == configured_level
+
+
+@pytest.mark.anyio
+async def test_get_db_query_stats(client: Client) -> None:
+    query_stats.reset()
+    async with DBConnection(2) as db_wrapper:
+        async with db_wrapper.reader() as connection:
+            await connection.execute_fetchall("SELECT 1")
+
+    result = await client.request("get_db_query_stats")
+    assert result["enabled"]
+    [statement] = [item for item in result["statements"] if item["statement"] == "SELECT 1"]
+    assert statement["count"] == 1
+    assert statement["rows"] == 1
+
+    await client.request("reset_db_query_stats")
+    result = await client.request("get_db_query_stats")
+    assert result["statements"] == []
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("count", [1, 10000])
+async def test_large_response(client: Client, count: int) -> None:
+    # the large response is streamed in chunks
+    result = await client.request("get_coins", json={"count": count})
+    assert result["coins"] == [Coin(bytes32.zeros, bytes32.zeros, uint64(i)).to_json_dict() for i in range(count)]
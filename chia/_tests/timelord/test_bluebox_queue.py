@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import cast
+
+import pytest
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint8, uint32, uint64
+
+from chia.consensus.default_constants import DEFAULT_CONSTANTS
+from chia.protocols.timelord_protocol import RequestCompactProofOfTime
+from chia.timelord.bluebox_queue import BlueboxQueue
+from chia.timelord.timelord import Timelord
+from chia.types.blockchain_format.classgroup import ClassgroupElement
+from chia.types.blockchain_format.vdf import VDFInfo
+from chia.util.task_referencer import create_referenced_task
+
+
+def make_request(rng: random.Random, height: int, field_vdf: int) -> RequestCompactProofOfTime:
+    return RequestCompactProofOfTime(
+        VDFInfo(bytes32.random(rng), uint64(rng.randrange(1, 10**6)), ClassgroupElement.get_default_element()),
+        bytes32.random(rng),
+        uint32(height),
+        uint8(field_vdf),
+    )
+
+
+@pytest.mark.anyio
+async def test_flood_assigns_every_proof_once() -> None:
+    rng = random.Random(1337)
+    requests = [make_request(rng, height, field_vdf) for height in range(200) for field_vdf in range(1, 5)]
+    flood = requests * 5
+    rng.shuffle(flood)
+
+    queue = BlueboxQueue()
+    assigned: list[RequestCompactProofOfTime] = []
+
+    async def worker() -> None:
+        while True:
+            assigned.append(await queue.get())
+            await asyncio.sleep(0)
+
+    workers = [create_referenced_task(worker()) for _ in range(4)]
+    try:
+        for i, request in enumerate(flood):
+            await queue.put(request)
+            if i % 50 == 0:
+                await asyncio.sleep(0)
+        for _ in range(10000):
+            if len(queue) == 0:
+                break
+            await asyncio.sleep(0)
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    assert len(assigned) == len(requests)
+    assert set(assigned) == set(requests)
+    stats = queue.get_stats()
+    assert stats["pending"] == 0
+    assert stats["received"] == len(flood)
+    assert stats["duplicates"] == len(flood) - len(requests)
+    assert stats["assigned"] == len(requests)
+
+
+@pytest.mark.anyio
+async def test_lowest_height_first() -> None:
+    rng = random.Random(1337)
+    heights = list(range(100))
+    rng.shuffle(heights)
+    queue = BlueboxQueue()
+    for height in heights:
+        await queue.put(make_request(rng, height, 1 + height % 2))
+
+    assigned = [await queue.get() for _ in range(100)]
+    for field_vdf in [1, 2]:
+        field_heights = [request.height for request in assigned if request.field_vdf == field_vdf]
+        assert field_heights == sorted(field_heights)
+        assert len(field_heights) == 50
+
+
+@pytest.mark.anyio
+async def test_worker_waits_until_ready(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = random.Random(1337)
+    now = 1000.0
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    queue = BlueboxQueue()
+    free_clients: list[int] = []
+
+    task = create_referenced_task(queue.get(ready=lambda: len(free_clients) > 0))
+    request = make_request(rng, 10, 1)
+    assert await queue.put(request)
+    for _ in range(10):
+        await asyncio.sleep(0)
+    assert not task.done()
+
+    free_clients.append(1)
+    await queue.notify()
+    assert await task == request
+
+    # the work that's been assigned isn't queued again
+    assert not await queue.put(request)
+    assert len(queue) == 0
+
+    # pending work from a previous batch is dropped
+    other = make_request(rng, 11, 2)
+    assert await queue.put(other)
+    now += 10
+    assert queue.get_stats()["expired"] == 1
+    assert len(queue) == 0
+
+    # eventually the assigned work can be requested again
+    now += 1000
+    assert await queue.put(request)
+    assert len(queue) == 1
+
+    queue.record_finished()
+    assert queue.get_stats()["finished"] == 1
+    assert queue.get_stats()["proofs_per_minute"] > 0
+
+
+@pytest.mark.anyio
+async def test_failed_work_is_queued_again() -> None:
+    rng = random.Random(1337)
+    queue = BlueboxQueue()
+    request = make_request(rng, 10, 1)
+    assert await queue.put(request)
+    assert await queue.get() == request
+    assert not await queue.put(request)
+
+    # the worker failed, so the next request for the proof is queued
+    queue.release(request)
+    assert await queue.put(request)
+    assert await queue.get() == request
+
+    # work no worker could take is put back
+    await queue.put_back(request)
+    assert len(queue) == 1
+    assert await queue.get() == request
+    assert queue.get_stats()["assigned"] == 2
+
+
+@pytest.mark.anyio
+async def test_timelord_puts_back_work_without_a_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    rng = random.Random(1337)
+    timelord = Timelord(Path("."), {"vdf_clients": {"ip": []}, "bluebox_mode": True}, DEFAULT_CONSTANTS)
+    timelord.lock = asyncio.Lock()
+    processed: list[RequestCompactProofOfTime] = []
+
+    async def do_process_communication(*args: object) -> bool:
+        processed.append(request)
+        # the vdf_client disconnected
+        return False
+
+    monkeypatch.setattr(timelord, "_do_process_communication", do_process_communication)
+    client = ("127.0.0.1", cast(asyncio.StreamReader, None), cast(asyncio.StreamWriter, None))
+    request = make_request(rng, 10, 1)
+
+    await timelord.lock.acquire()
+    task = create_referenced_task(timelord._manage_discriminant_queue_sanitizer())
+    try:
+        timelord.free_clients.append(client)
+        assert await timelord.bluebox_queue.put(request)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert len(timelord.bluebox_queue) == 0
+
+        # the client is taken before the work is handed to it
+        timelord.free_clients.clear()
+        timelord.lock.release()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert len(timelord.bluebox_queue) == 1
+        assert processed == []
+
+        timelord.free_clients.append(client)
+        await timelord.bluebox_queue.notify()
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert processed == [request]
+        assert len(timelord.bluebox_queue) == 0
+        # the vdf_client failed, so the next request for the proof is queued
+        assert await timelord.bluebox_queue.put(request)
+    finally:
+        timelord._shut_down = True
+        task.cancel()
+        await asyncio.gather(task, *timelord.process_communication_tasks, return_exceptions=True)
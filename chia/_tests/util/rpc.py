@@ -21,6 +21,8 @@ async def validate_get_routes(client: RpcClient, api: RpcApiProtocol) -> None:
         "/get_log_level",
         "/set_log_level",
         "/reset_log_level",
+        "/get_db_query_stats",
+        "/reset_db_query_stats",
     ]
     assert len(routes_api) > 0
     assert sorted(routes_client) == sorted(routes_api + routes_server)
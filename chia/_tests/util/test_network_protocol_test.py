@@ -178,6 +178,7 @@ def test_missing_messages() -> None:
         "NewSignagePointHarvester",
         "NewSignagePointHarvester2",
         "Plot",
+        "PlotSyncDigest",
         "PlotSyncDone",
         "PlotSyncError",
         "PlotSyncIdentifier",
@@ -250,6 +250,9 @@ async def test_complex_offer(cost_logger: CostLogger) -> None:
             str_to_tail_hash("blue").hex(): 3000,
         }
         assert new_offer.is_valid()
+        assert new_offer.get_root_removals() == {
+            coin: new_offer.get_root_removal(coin) for coin in new_offer.additions()
+        }
 
         # Test preventing TAIL from running during exchange
         blue_cat_puz = construct_cat_puzzle(CAT_MOD, str_to_tail_hash("blue"), OFFER_MOD)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import itertools
 import logging
+import random
 import time
 from random import randrange
 
@@ -12,6 +14,7 @@ from chia.consensus.default_constants import DEFAULT_CONSTANTS
 from chia.types.blockchain_format.coin import Coin
 from chia.util.hash import std_hash
 from chia.wallet.coin_selection import (
+    branch_and_bound_exact_match,
     check_for_exact_match,
     knapsack_coin_algorithm,
     select_coins,
@@ -67,6 +70,55 @@ class TestCoinSelection:
             selected_sum = sum(coin.amount for coin in list(knapsack))
             assert 265 <= selected_sum <= 281  # Selects a set of coins which does exceed by too much
 
+    def test_branch_and_bound_exact_match(self, a_hash: bytes32) -> None:
+        rng = random.Random(1337)
+        for _ in range(100):
+            amounts = sorted((rng.randrange(1, 100) for _ in range(8)), reverse=True)
+            coin_list = [Coin(a_hash, std_hash(i.to_bytes(4, "big")), uint64(a)) for i, a in enumerate(amounts)]
+            for target in range(1, 200):
+                exact = branch_and_bound_exact_match(coin_list, uint128(target), 500)
+                # compare with all the subsets of coins
+                has_exact_match = any(
+                    sum(subset) == target for n in range(1, 9) for subset in itertools.combinations(amounts, n)
+                )
+                if exact is None:
+                    assert not has_exact_match
+                else:
+                    assert sum(coin.amount for coin in exact) == target
+
+        coin_list = [Coin(a_hash, std_hash(i.to_bytes(4, "big")), uint64(10)) for i in range(10)]
+        assert branch_and_bound_exact_match(coin_list, uint128(50), 5) is not None
+        assert branch_and_bound_exact_match(coin_list, uint128(60), 5) is None
+        # the search gives up after max_tries
+        assert branch_and_bound_exact_match(coin_list, uint128(50), 5, max_tries=3) is None
+
+    @pytest.mark.anyio
+    async def test_coin_selection_exact_match_without_change(self, a_hash: bytes32) -> None:
+        coin_amounts = [320, 203, 202, 201, 160, 150, 80, 40, 20, 6, 3]
+        coin_list: list[WalletCoinRecord] = [
+            WalletCoinRecord(
+                Coin(a_hash, std_hash(i.to_bytes(4, "big")), uint64(a)),
+                uint32(1),
+                uint32(1),
+                False,
+                True,
+                WalletType(0),
+                1,
+            )
+            for i, a in enumerate(coin_amounts)
+        ]
+        spendable_amount = uint128(sum(coin_amounts))
+        for target_amount in [9, 46, 209, 363, 1000, 1379]:
+            result: set[Coin] = await select_coins(
+                spendable_amount,
+                DEFAULT_COIN_SELECTION_CONFIG,
+                coin_list,
+                {},
+                logging.getLogger("test"),
+                uint128(target_amount),
+            )
+            assert sum(coin.amount for coin in result) == target_amount
+
     @pytest.mark.anyio
     async def test_coin_selection_randomly(self, a_hash: bytes32) -> None:
         coin_base_amounts = [3, 6, 20, 40, 80, 150, 160, 203, 202, 201, 320]
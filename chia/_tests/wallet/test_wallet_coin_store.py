@@ -999,3 +999,63 @@ async def test_delete_wallet(seeded_random: random.Random) -> None:
             # Remove the wallet_id and make sure its removed fully
             await store.delete_wallet(wallet_id)
             assert (await store.get_coin_records(wallet_id=wallet_id)).records == []
+
+
+@pytest.mark.anyio
+async def test_unspent_coin_index(seeded_random: random.Random) -> None:
+    async with DBConnection(1) as db_wrapper:
+        store = await WalletCoinStore.create(db_wrapper)
+        assert await store.get_unspent_coins_by_amount(1) == []
+
+        async def check() -> None:
+            for wallet_id in [1, 2]:
+                expected = (
+                    await store.get_coin_records(
+                        wallet_id=uint32(wallet_id), coin_type=CoinType.NORMAL, spent_range=UInt32Range(stop=uint32(0))
+                    )
+                ).records
+                by_amount = await store.get_unspent_coins_by_amount(wallet_id)
+                assert set(by_amount) == set(expected)
+                assert [r.coin.amount for r in by_amount] == sorted((r.coin.amount for r in expected), reverse=True)
+                assert await store.get_unspent_coins_for_wallet(wallet_id) == set(expected)
+
+        records: list[WalletCoinRecord] = []
+        for i in range(300):
+            operation = seeded_random.randrange(6) if len(records) > 0 else 0
+            if operation in {0, 1}:
+                coin = Coin(
+                    bytes32.random(seeded_random), bytes32.random(seeded_random), uint64(seeded_random.randrange(20))
+                )
+                spent = seeded_random.randrange(8) if operation == 1 else 0
+                new_record = record(coin, confirmed=i // 10, spent=spent)
+                new_record = replace(new_record, wallet_id=seeded_random.randrange(1, 3))
+                records.append(new_record)
+                await store.add_coin_record(new_record)
+            elif operation == 2:
+                await store.set_spent(seeded_random.choice(records).name(), uint32(i // 10 + 1))
+            elif operation == 3:
+                await store.delete_coin_record(seeded_random.choice(records).name())
+            elif operation == 4:
+                # move a coin to the other wallet
+                old_record = seeded_random.choice(records)
+                await store.add_coin_record(replace(old_record, wallet_id=3 - old_record.wallet_id))
+            elif i % 3 == 0:
+                await store.rollback_to_block(i // 10 - 2)
+            else:
+                # the index follows writes that are rolled back
+                with pytest.raises(RuntimeError):
+                    async with db_wrapper.writer():
+                        await store.set_spent(seeded_random.choice(records).name(), uint32(i // 10 + 1))
+                        await store.add_coin_record(
+                            record(
+                                Coin(bytes32.random(seeded_random), bytes32.random(seeded_random), uint64(7)),
+                                confirmed=1,
+                                spent=0,
+                            )
+                        )
+                        raise RuntimeError("rollback")
+            await check()
+
+        await store.delete_wallet(uint32(1))
+        assert await store.get_unspent_coins_by_amount(1) == []
+        await check()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import random
+import time
+from dataclasses import dataclass, field
+from typing import cast
+
+import pytest
+from chia_rs import CoinState, G2Element
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint32, uint64
+
+from chia._tests.util.db_connection import DBConnection
+from chia.server.ws_connection import WSChiaConnection
+from chia.types.blockchain_format.coin import Coin
+from chia.types.blockchain_format.program import Program
+from chia.types.coin_spend import make_spend
+from chia.util.lru_cache import LRUCache
+from chia.wallet.conditions import ConditionValidTimes
+from chia.wallet.trade_manager import TradeManager
+from chia.wallet.trade_record import TradeRecord
+from chia.wallet.trading.offer import Offer
+from chia.wallet.trading.trade_status import TradeStatus
+from chia.wallet.transaction_record import TransactionRecord
+from chia.wallet.util.wallet_types import WalletType
+from chia.wallet.wallet_coin_record import WalletCoinRecord
+from chia.wallet.wallet_coin_store import WalletCoinStore
+from chia.wallet.wallet_spend_bundle import WalletSpendBundle
+
+peer = cast(WSChiaConnection, None)
+
+
+@dataclass
+class FakeWalletNode:
+    # the coin states the peer knows about
+    coin_states: dict[bytes32, CoinState] = field(default_factory=dict)
+    queries: list[list[bytes32]] = field(default_factory=list)
+
+    async def get_coin_state(
+        self, coin_names: list[bytes32], peer: WSChiaConnection, fork_height: uint32 | None = None
+    ) -> list[CoinState]:
+        self.queries.append(coin_names)
+        return [self.coin_states[name] for name in coin_names if name in self.coin_states]
+
+
+@dataclass
+class FakeWalletStateManager:
+    coin_store: WalletCoinStore
+    wallet_node: FakeWalletNode = field(default_factory=FakeWalletNode)
+    deleted_trade_transactions: list[bytes32] = field(default_factory=list)
+
+    async def delete_trade_transactions(self, trade_id: bytes32) -> None:
+        self.deleted_trade_transactions.append(trade_id)
+
+    async def add_transaction(self, tx: TransactionRecord) -> None:
+        pass
+
+
+def make_offer(coin: Coin) -> Offer:
+    # spends one of our coins into a settlement payment
+    spend = make_spend(coin, Program.to(1), Program.to([[51, Offer.ph(), coin.amount]]))
+    return Offer({}, WalletSpendBundle([spend], G2Element()), {})
+
+
+def make_trade(offer: Offer, status: TradeStatus, rng: random.Random) -> TradeRecord:
+    return TradeRecord(
+        confirmed_at_index=uint32(0),
+        accepted_at_time=None,
+        created_at_time=uint64(time.time()),
+        is_my_offer=True,
+        sent=uint32(0),
+        offer=bytes(offer),
+        taken_offer=None,
+        coins_of_interest=offer.removals(),
+        trade_id=bytes32.random(rng),
+        status=uint32(status.value),
+        sent_to=[],
+        valid_times=ConditionValidTimes(),
+    )
+
+
+# the status of each trade, whether its settlement payment was created, and the status it ends up with
+trade_cases = [
+    (TradeStatus.PENDING_CONFIRM, True, TradeStatus.CONFIRMED),
+    (TradeStatus.PENDING_CONFIRM, False, TradeStatus.FAILED),
+    (TradeStatus.PENDING_CANCEL, False, TradeStatus.CANCELLED),
+    (TradeStatus.PENDING_ACCEPT, True, TradeStatus.CONFIRMED),
+]
+
+
+@pytest.mark.parametrize("lookup", ["batched", "unbatched", "fallback"])
+@pytest.mark.anyio
+async def test_coins_of_interest_farmed(lookup: str, seeded_random: random.Random) -> None:
+    async with DBConnection(2) as db_wrapper:
+        coin_store = await WalletCoinStore.create(db_wrapper)
+        wallet_state_manager = FakeWalletStateManager(coin_store)
+        trade_manager = await TradeManager.create(wallet_state_manager, db_wrapper)
+
+        async def calculate_tx_records_for_offer(offer: Offer, validate: bool) -> list[TransactionRecord]:
+            return []
+
+        trade_manager.calculate_tx_records_for_offer = calculate_tx_records_for_offer  # type: ignore[method-assign]
+
+        trades: list[TradeRecord] = []
+        coin_states: list[CoinState] = []
+        for status, settled, _ in trade_cases:
+            coin = Coin(bytes32.random(seeded_random), bytes32.random(seeded_random), uint64(1000))
+            await coin_store.add_coin_record(
+                WalletCoinRecord(coin, uint32(1), uint32(0), False, False, WalletType.STANDARD_WALLET, 1)
+            )
+            offer = make_offer(coin)
+            [settlement_payment] = offer.additions()
+            assert offer.get_root_removals() == {settlement_payment: coin}
+            if settled:
+                wallet_state_manager.wallet_node.coin_states[settlement_payment.name()] = CoinState(
+                    settlement_payment, None, uint32(10)
+                )
+            trade = make_trade(offer, status, seeded_random)
+            await trade_manager.trade_store.add_trade_record(trade, offer_name=bytes32.random(seeded_random))
+            trades.append(trade)
+            coin_states.append(CoinState(coin, uint32(10), uint32(1)))
+
+        if lookup == "batched":
+            settlement_states = await trade_manager.get_settlement_coin_states(coin_states, None, peer)
+            assert len(settlement_states) == len(trades)
+        elif lookup == "fallback":
+            # only the first trades were looked up, the others are looked up one at a time
+            settlement_states = await trade_manager.get_settlement_coin_states(coin_states[:2], None, peer)
+            assert len(settlement_states) == 2
+        else:
+            settlement_states = None
+
+        for coin_state in coin_states:
+            await trade_manager.coins_of_interest_farmed(coin_state, None, peer, settlement_states)
+
+        for trade, (_, _, expected_status) in zip(trades, trade_cases):
+            record = await trade_manager.get_trade_by_id(trade.trade_id)
+            assert record is not None
+            assert TradeStatus(record.status) == expected_status
+            if expected_status == TradeStatus.CONFIRMED:
+                assert record.confirmed_at_index == 10
+        assert wallet_state_manager.deleted_trade_transactions == [trade.trade_id for trade in trades[1:3]]
+
+        queries = wallet_state_manager.wallet_node.queries
+        if lookup == "batched":
+            assert len(queries) == 1
+            assert len(queries[0]) == len(trades)
+        elif lookup == "fallback":
+            assert [len(query) for query in queries] == [2, 1, 1]
+        else:
+            assert [len(query) for query in queries] == [1] * len(trades)
+
+        # nothing is looked up for coins that aren't spent, or don't settle any trade
+        unspent = [CoinState(coin_state.coin, None, uint32(1)) for coin_state in coin_states]
+        assert await trade_manager.get_settlement_coin_states(unspent, None, peer) == {}
+        other = Coin(bytes32.random(seeded_random), bytes32.random(seeded_random), uint64(1))
+        assert (
+            await trade_manager.get_settlement_coin_states([CoinState(other, uint32(10), uint32(1))], None, peer) == {}
+        )
+
+
+@pytest.mark.anyio
+async def test_parsed_offers(seeded_random: random.Random) -> None:
+    async with DBConnection(2) as db_wrapper:
+        coin_store = await WalletCoinStore.create(db_wrapper)
+        trade_manager = await TradeManager.create(FakeWalletStateManager(coin_store), db_wrapper)
+        trade_manager.parsed_offers = LRUCache(2)
+        offers = [
+            make_offer(Coin(bytes32.random(seeded_random), bytes32.random(seeded_random), uint64(1))) for _ in range(3)
+        ]
+        trades = [make_trade(offer, TradeStatus.PENDING_CONFIRM, seeded_random) for offer in offers]
+
+        parsed = [trade_manager.get_parsed_offer(trade) for trade in trades]
+        assert parsed == offers
+        # the most recently used offers are kept
+        assert trade_manager.get_parsed_offer(trades[2]) is parsed[2]
+        assert trade_manager.get_parsed_offer(trades[1]) is parsed[1]
+        reparsed = trade_manager.get_parsed_offer(trades[0])
+        assert reparsed is not parsed[0]
+        assert reparsed == offers[0]
+        assert trade_manager.get_parsed_offer(trades[1]) is parsed[1]
@@ -7,6 +7,7 @@ from typing_extensions import Protocol
 
 from chia.protocols import farmer_protocol, harvester_protocol
 from chia.protocols.harvester_protocol import (
+    PlotSyncDigest,
     PlotSyncDone,
     PlotSyncPathList,
     PlotSyncPlotList,
@@ -96,6 +97,11 @@ class FarmerApiStub(ApiProtocol, Protocol):
         """Handle plot sync duplicates."""
         ...
 
+    @metadata.request(peer_required=True)
+    async def plot_sync_digest(self, message: PlotSyncDigest, peer: WSChiaConnection) -> None:
+        """Handle plot sync digest."""
+        ...
+
     @metadata.request(peer_required=True)
     async def plot_sync_done(self, message: PlotSyncDone, peer: WSChiaConnection) -> None:
         """Handle plot sync done."""
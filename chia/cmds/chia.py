@@ -5,28 +5,8 @@ from io import TextIOWrapper
 import click
 
 from chia import __version__
-from chia.cmds.beta import beta_cmd
 from chia.cmds.cmd_classes import ChiaCliContext
-from chia.cmds.completion import completion
-from chia.cmds.configure import configure_cmd
-from chia.cmds.data import data_cmd
-from chia.cmds.db import db_cmd
-from chia.cmds.dev.main import dev_cmd
-from chia.cmds.farm import farm_cmd
-from chia.cmds.init import init_cmd
-from chia.cmds.keys import keys_cmd
-from chia.cmds.netspace import netspace_cmd
-from chia.cmds.passphrase import passphrase_cmd
-from chia.cmds.peer import peer_cmd
-from chia.cmds.plotnft import plotnft_cmd
-from chia.cmds.plots import plots_cmd
-from chia.cmds.plotters import plotters_cmd
-from chia.cmds.rpc import rpc_cmd
-from chia.cmds.show import show_cmd
-from chia.cmds.solver import solver_cmd
-from chia.cmds.start import start_cmd
-from chia.cmds.stop import stop_cmd
-from chia.cmds.wallet import wallet_cmd
+from chia.cmds.lazy_group import LazyGroup
 from chia.ssl.ssl_check import check_ssl
 from chia.util.default_root import DEFAULT_KEYS_ROOT_PATH, resolve_root_path
 from chia.util.errors import KeychainCurrentPassphraseIsInvalid
@@ -37,8 +17,37 @@ CONTEXT_SETTINGS = {
     "show_default": True,
 }
 
+# subcommands are only imported once they are invoked, to keep the start-up
+# time of the CLI down. Many of them pull in large parts of the wallet, data
+# layer or RPC client code
+LAZY_SUBCOMMANDS = {
+    "beta": "chia.cmds.beta:beta_cmd",
+    "completion": "chia.cmds.completion:completion",
+    "configure": "chia.cmds.configure:configure_cmd",
+    "data": "chia.cmds.data:data_cmd",
+    "db": "chia.cmds.db:db_cmd",
+    "dev": "chia.cmds.dev.main:dev_cmd",
+    "farm": "chia.cmds.farm:farm_cmd",
+    "init": "chia.cmds.init:init_cmd",
+    "keys": "chia.cmds.keys:keys_cmd",
+    "netspace": "chia.cmds.netspace:netspace_cmd",
+    "passphrase": "chia.cmds.passphrase:passphrase_cmd",
+    "peer": "chia.cmds.peer:peer_cmd",
+    "plotnft": "chia.cmds.plotnft:plotnft_cmd",
+    "plots": "chia.cmds.plots:plots_cmd",
+    "plotters": "chia.cmds.plotters:plotters_cmd",
+    "rpc": "chia.cmds.rpc:rpc_cmd",
+    "show": "chia.cmds.show:show_cmd",
+    "solver": "chia.cmds.solver:solver_cmd",
+    "start": "chia.cmds.start:start_cmd",
+    "stop": "chia.cmds.stop:stop_cmd",
+    "wallet": "chia.cmds.wallet:wallet_cmd",
+}
+
 
 @click.group(
+    cls=LazyGroup,
+    lazy_subcommands=LAZY_SUBCOMMANDS,
     help=f"\n  Manage chia blockchain infrastructure ({__version__})\n",
     epilog="Try 'chia start node', 'chia netspace -d 192', or 'chia show -s'",
     context_settings=CONTEXT_SETTINGS,
@@ -119,29 +128,6 @@ def run_daemon_cmd(ctx: click.Context, wait_for_unlock: bool) -> None:
     asyncio.run(async_run_daemon(ChiaCliContext.set_default(ctx).root_path, wait_for_unlock=wait_for_unlock))
 
 
-cli.add_command(keys_cmd)
-cli.add_command(plots_cmd)
-cli.add_command(wallet_cmd)
-cli.add_command(plotnft_cmd)
-cli.add_command(configure_cmd)
-cli.add_command(init_cmd)
-cli.add_command(rpc_cmd)
-cli.add_command(show_cmd)
-cli.add_command(solver_cmd)
-cli.add_command(start_cmd)
-cli.add_command(stop_cmd)
-cli.add_command(netspace_cmd)
-cli.add_command(farm_cmd)
-cli.add_command(plotters_cmd)
-cli.add_command(db_cmd)
-cli.add_command(peer_cmd)
-cli.add_command(data_cmd)
-cli.add_command(passphrase_cmd)
-cli.add_command(beta_cmd)
-cli.add_command(completion)
-cli.add_command(dev_cmd)
-
-
 def main() -> None:
     cli()
 
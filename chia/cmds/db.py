@@ -8,6 +8,7 @@ from chia.cmds.cmd_classes import ChiaCliContext
 from chia.cmds.db_backup_func import db_backup_func
 from chia.cmds.db_upgrade_func import db_upgrade_func
 from chia.cmds.db_validate_func import db_validate_func
+from chia.util.cpu import available_logical_cores
 
 
 @click.group("db", help="Manage the blockchain database")
@@ -59,13 +60,35 @@ def db_upgrade_cmd(
     is_flag=True,
     help="validate consistency of properties of the encoded blocks and block records",
 )
+@click.option(
+    "--workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="number of worker processes used to validate the database. Defaults to the number of available cores",
+)
+@click.option(
+    "--checkpoint",
+    "checkpoint_path",
+    default=None,
+    type=click.Path(),
+    help="file to record validation progress in, to allow resuming an interrupted run. "
+    "Defaults to a file next to the database",
+)
 @click.pass_context
-def db_validate_cmd(ctx: click.Context, in_db_path: str | None, validate_blocks: bool) -> None:
+def db_validate_cmd(
+    ctx: click.Context,
+    in_db_path: str | None,
+    validate_blocks: bool,
+    workers: int | None,
+    checkpoint_path: str | None,
+) -> None:
     try:
         db_validate_func(
             ChiaCliContext.set_default(ctx).root_path,
             None if in_db_path is None else Path(in_db_path),
             validate_blocks=validate_blocks,
+            workers=available_logical_cores() if workers is None else workers,
+            checkpoint_path=None if checkpoint_path is None else Path(checkpoint_path),
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
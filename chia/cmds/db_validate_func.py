@@ -1,6 +1,12 @@
 from __future__ import annotations
 
+import dataclasses
+import json
+import logging
+import sys
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
 from pathlib import Path
+from time import monotonic
 from typing import Any
 
 from chia_rs import BlockRecord, FullBlock
@@ -8,15 +14,29 @@ from chia_rs.sized_bytes import bytes32
 
 from chia.consensus.constants import replace_str_to_bytes
 from chia.consensus.default_constants import DEFAULT_CONSTANTS
-from chia.util.config import load_config
+from chia.util.config import load_config, process_config_start_method
+from chia.util.inline_executor import InlineExecutor
 from chia.util.path import path_from_root
 
+log = logging.getLogger(__name__)
+
+# the number of heights validated by a single worker task
+SHARD_SIZE = 10_000
+# minimum number of seconds between writing checkpoint files
+CHECKPOINT_INTERVAL = 30.0
+# the number of shards per worker that may be validated ahead of the last one
+# reduced
+SHARDS_AHEAD_PER_WORKER = 2
+
 
 def db_validate_func(
     root_path: Path,
     in_db_path: Path | None = None,
     *,
     validate_blocks: bool,
+    workers: int = 1,
+    shard_size: int = SHARD_SIZE,
+    checkpoint_path: Path | None = None,
 ) -> None:
     config: dict[str, Any] = load_config(root_path, "config.yaml")
     if in_db_path is None:
@@ -26,16 +46,308 @@ def db_validate_func(
         db_path_replaced: str = db_pattern.replace("CHALLENGE", selected_network)
         in_db_path = path_from_root(root_path, db_path_replaced)
 
-    validate_v2(in_db_path, config=config, validate_blocks=validate_blocks)
+    if checkpoint_path is None:
+        checkpoint_path = default_checkpoint_path(in_db_path)
+
+    validate_v2(
+        in_db_path,
+        config=config,
+        validate_blocks=validate_blocks,
+        workers=workers,
+        shard_size=shard_size,
+        checkpoint_path=checkpoint_path,
+    )
 
     print(f"\n\nDATABASE IS VALID: {in_db_path}\n")
 
 
-def validate_v2(in_path: Path, *, config: dict[str, Any], validate_blocks: bool) -> None:
+def default_checkpoint_path(db_path: Path) -> Path:
+    return db_path.with_name(db_path.name + ".validate-checkpoint.json")
+
+
+@dataclasses.dataclass(frozen=True)
+class ChainState:
+    """
+    The state of the top-down traversal of the chain, as it's handed from one
+    shard to the one below it.
+    """
+
+    # the lowest height traversed so far
+    current_height: int
+    # the hash of the main chain block we're looking for at current_height
+    expect_hash: bytes32 | None
+    # the prev-hash of the main chain block found at current_height, if any
+    next_hash: bytes32 | None
+    num_orphans: int
+
+    def to_json_dict(self) -> dict[str, Any]:
+        return {
+            "current_height": self.current_height,
+            "expect_hash": None if self.expect_hash is None else self.expect_hash.hex(),
+            "next_hash": None if self.next_hash is None else self.next_hash.hex(),
+            "num_orphans": self.num_orphans,
+        }
+
+    @classmethod
+    def from_json_dict(cls, json_dict: dict[str, Any]) -> ChainState:
+        return cls(
+            current_height=json_dict["current_height"],
+            expect_hash=None if json_dict["expect_hash"] is None else bytes32.fromhex(json_dict["expect_hash"]),
+            next_hash=None if json_dict["next_hash"] is None else bytes32.fromhex(json_dict["next_hash"]),
+            num_orphans=json_dict["num_orphans"],
+        )
+
+
+# the outcome of traversing a shard, either the resulting state or an error message
+WalkResult = ChainState | str
+
+
+@dataclasses.dataclass(frozen=True)
+class ShardResult:
+    """
+    The result of validating the heights [low, high]. Since shards are
+    validated independently, we don't know which block at the top of the shard
+    is the main chain block until the shard above has been reduced. So the
+    traversal is computed for every candidate block at the top height, and the
+    reduction step picks the one that links up with the shard above.
+    """
+
+    low: int
+    high: int
+    num_blocks: int
+    # the highest height with any blocks in this shard. None if the shard is empty
+    top_height: int | None
+    # maps the header hash of every block at top_height to the result of
+    # traversing the shard starting from that block
+    walks: dict[bytes32, WalkResult]
+    # the result of traversing top_height when no block there is the one we
+    # expect
+    unmatched: WalkResult
+    # whether there are blocks below top_height in this shard
+    has_rows_below_top: bool
+
+
+@dataclasses.dataclass(frozen=True)
+class _BlockRow:
+    header_hash: bytes32
+    prev_hash: bytes32
+    height: int
+    in_main_chain: bool
+    # the prev-hash stored in the block blob, if blocks are validated
+    blob_prev_hash: bytes32 | None
+    # the first inconsistency found in the block blob or block record, if any
+    error: str | None
+
+
+def _check_block(hh: bytes32, height: int, block_blob: bytes, block_record_blob: bytes) -> tuple[bytes32, str | None]:
+    import zstd
+
+    block = FullBlock.from_bytes(zstd.decompress(block_blob))
+    block_record = BlockRecord.from_bytes(block_record_blob)
+    actual_header_hash = block.header_hash
+    actual_prev_hash = block.prev_header_hash
+    error: str | None = None
+    if actual_header_hash != hh:
+        error = f"Block {hh.hex()} has a blob with mismatching hash: {actual_header_hash.hex()}"
+    elif block_record.header_hash != hh:
+        error = f"Block {hh.hex()} has a block record with mismatching hash: {block_record.header_hash.hex()}"
+    elif block_record.total_iters != block.total_iters:
+        error = (
+            f"Block {hh.hex()} has a block record with mismatching total "
+            f"iters: {block_record.total_iters} expected {block.total_iters}"
+        )
+    elif block_record.prev_hash != actual_prev_hash:
+        error = (
+            f"Block {hh.hex()} has a block record with mismatching "
+            f"prev_hash: {block_record.prev_hash} expected {actual_prev_hash.hex()}"
+        )
+    elif block.height != height:
+        error = f"Block {hh.hex()} has a mismatching height: {block.height} expected {height}"
+    return actual_prev_hash, error
+
+
+def _walk(rows: list[_BlockRow], state: ChainState) -> ChainState:
+    """
+    Traverses the rows (ordered by height, descending) starting from the
+    specified state. Raises RuntimeError on the first inconsistency.
+    """
+    current_height = state.current_height
+    expect_hash = state.expect_hash
+    next_hash = state.next_hash
+    num_orphans = state.num_orphans
+
+    for row in rows:
+        if row.error is not None:
+            raise RuntimeError(row.error)
+
+        if row.height != current_height:
+            # we're moving to the next level. Make sure we found the block
+            # we were looking for at the previous level
+            if next_hash is None:
+                raise RuntimeError(f"Database is missing the block with hash {expect_hash} at height {current_height}")
+            expect_hash = next_hash
+            next_hash = None
+            current_height = row.height
+
+        if row.header_hash == expect_hash:
+            if next_hash is not None:
+                raise RuntimeError(
+                    f"Database has multiple blocks with hash {row.header_hash.hex()}, at height {row.height}"
+                )
+            if not row.in_main_chain:
+                raise RuntimeError(
+                    f"block {row.header_hash.hex()} (height: {row.height}) is part of the main chain, "
+                    f"but in_main_chain is not set"
+                )
+            if row.blob_prev_hash is not None and row.blob_prev_hash != row.prev_hash:
+                raise RuntimeError(
+                    f"Block {row.header_hash.hex()} has a blob with mismatching "
+                    f"prev-hash: {row.blob_prev_hash}, expected {row.prev_hash}"
+                )
+            next_hash = row.prev_hash
+        else:
+            if row.in_main_chain:
+                raise RuntimeError(
+                    f"block {row.header_hash.hex()} (height: {row.height}) is orphaned, but in_main_chain is set"
+                )
+            num_orphans += 1
+
+    return ChainState(current_height, expect_hash, next_hash, num_orphans)
+
+
+def _try_walk(rows: list[_BlockRow], state: ChainState) -> WalkResult:
+    try:
+        return _walk(rows, state)
+    except RuntimeError as e:
+        return str(e)
+
+
+def validate_shard(in_path: Path, low: int, high: int, validate_blocks: bool) -> ShardResult:
+    """
+    Validates the blocks with heights in [low, high]. This is run in worker
+    processes, so it opens its own connection to the database.
+    """
     import sqlite3
     from contextlib import closing
 
-    import zstd
+    rows: list[_BlockRow] = []
+    with closing(sqlite3.connect(in_path)) as in_db:
+        with closing(
+            in_db.execute(
+                f"SELECT header_hash, prev_hash, height, in_main_chain"
+                f"{', block, block_record' if validate_blocks else ''} "
+                "FROM full_blocks WHERE height BETWEEN ? AND ? ORDER BY height DESC",
+                (low, high),
+            )
+        ) as cursor:
+            for row in cursor:
+                hh = bytes32(row[0])
+                height = row[2]
+                blob_prev_hash: bytes32 | None = None
+                error: str | None = None
+                if validate_blocks:
+                    blob_prev_hash, error = _check_block(hh, height, row[4], row[5])
+                rows.append(_BlockRow(hh, bytes32(row[1]), height, bool(row[3]), blob_prev_hash, error))
+
+    if len(rows) == 0:
+        return ShardResult(low, high, 0, None, {}, ChainState(high, None, None, 0), False)
+
+    top_height = rows[0].height
+    top_rows = [row for row in rows if row.height == top_height]
+    walks = {row.header_hash: _try_walk(rows, ChainState(top_height, row.header_hash, None, 0)) for row in top_rows}
+    unmatched = _try_walk(top_rows, ChainState(top_height, None, None, 0))
+    return ShardResult(low, high, len(rows), top_height, walks, unmatched, len(top_rows) < len(rows))
+
+
+def reduce_shard(state: ChainState, shard: ShardResult) -> ChainState:
+    """
+    Links the traversal of the chain so far (covering the heights above this
+    shard) with the traversal of this shard. Raises RuntimeError if the chain is
+    broken.
+    """
+    if shard.top_height is None:
+        return state
+
+    if shard.top_height != state.current_height:
+        if state.next_hash is None:
+            raise RuntimeError(
+                f"Database is missing the block with hash {state.expect_hash} at height {state.current_height}"
+            )
+        expect_hash = state.next_hash
+    else:
+        assert state.expect_hash is not None
+        expect_hash = state.expect_hash
+
+    result = shard.walks.get(expect_hash)
+    if result is None:
+        if isinstance(shard.unmatched, str):
+            raise RuntimeError(shard.unmatched)
+        if shard.has_rows_below_top:
+            raise RuntimeError(f"Database is missing the block with hash {expect_hash} at height {shard.top_height}")
+        return ChainState(shard.top_height, expect_hash, None, state.num_orphans + shard.unmatched.num_orphans)
+
+    if isinstance(result, str):
+        raise RuntimeError(result)
+    return dataclasses.replace(result, num_orphans=state.num_orphans + result.num_orphans)
+
+
+@dataclasses.dataclass(frozen=True)
+class Checkpoint:
+    # the peak the validation started from. Blocks added since are ignored
+    peak_hash: bytes32
+    peak_height: int
+    # the number of shards that have been linked to the peak
+    reduced: int
+    state: ChainState
+
+
+def _load_checkpoint(checkpoint_path: Path, key: dict[str, Any]) -> Checkpoint | None:
+    if not checkpoint_path.exists():
+        return None
+    try:
+        checkpoint = json.loads(checkpoint_path.read_text())
+        if checkpoint["key"] != key:
+            print(f"ignoring checkpoint with different settings: {checkpoint_path}")
+            return None
+        result = Checkpoint(
+            bytes32.fromhex(checkpoint["peak_hash"]),
+            int(checkpoint["peak_height"]),
+            int(checkpoint["reduced"]),
+            ChainState.from_json_dict(checkpoint["state"]),
+        )
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"ignoring invalid checkpoint file {checkpoint_path}: {e}")
+        return None
+    return result
+
+
+def _write_checkpoint(checkpoint_path: Path, key: dict[str, Any], checkpoint: Checkpoint) -> None:
+    # only the shards that have been linked to the peak are recorded. Any
+    # shard that was validated but not yet reduced is validated again when
+    # resuming
+    checkpoint_dict = {
+        "key": key,
+        "peak_hash": checkpoint.peak_hash.hex(),
+        "peak_height": checkpoint.peak_height,
+        "reduced": checkpoint.reduced,
+        "state": checkpoint.state.to_json_dict(),
+    }
+    temp_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+    temp_path.write_text(json.dumps(checkpoint_dict))
+    temp_path.replace(checkpoint_path)
+
+
+def validate_v2(
+    in_path: Path,
+    *,
+    config: dict[str, Any],
+    validate_blocks: bool,
+    workers: int = 1,
+    shard_size: int = SHARD_SIZE,
+    checkpoint_path: Path | None = None,
+) -> None:
+    import sqlite3
+    from contextlib import closing
 
     if not in_path.exists():
         print(f"input file doesn't exist. {in_path}")
@@ -73,118 +385,120 @@ def validate_v2(in_path: Path, *, config: dict[str, Any], validate_blocks: bool)
 
         print(f"peak height: {peak_height}")
 
-        print("traversing the full chain")
-
-        current_height = peak_height
-        # we're looking for a block with this hash
-        expect_hash = peak
-        # once we find it, we know what the next block to look for is, which
-        # this is set to
-        next_hash = None
-
-        num_orphans = 0
-        height_to_hash = bytearray(peak_height * 32)
-
-        with closing(
-            in_db.execute(
-                f"SELECT header_hash, prev_hash, height, in_main_chain"
-                f"{', block, block_record' if validate_blocks else ''} "
-                "FROM full_blocks ORDER BY height DESC"
-            )
-        ) as cursor:
-            for row in cursor:
-                hh = row[0]
-                prev = row[1]
-                height = row[2]
-                in_main_chain = row[3]
-
-                # if there are blocks being added to the database, just ignore
-                # the ones added since we picked the peak
-                if height > peak_height:
-                    continue
-
-                if validate_blocks:
-                    block = FullBlock.from_bytes(zstd.decompress(row[4]))
-                    block_record = BlockRecord.from_bytes(row[5])
-                    actual_header_hash = block.header_hash
-                    actual_prev_hash = block.prev_header_hash
-                    if actual_header_hash != hh:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a blob with mismatching hash: {actual_header_hash.hex()}"
-                        )
-                    if block_record.header_hash != hh:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching "
-                            f"hash: {block_record.header_hash.hex()}"
-                        )
-                    if block_record.total_iters != block.total_iters:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching total "
-                            f"iters: {block_record.total_iters} expected {block.total_iters}"
-                        )
-                    if block_record.prev_hash != actual_prev_hash:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a block record with mismatching "
-                            f"prev_hash: {block_record.prev_hash} expected {actual_prev_hash.hex()}"
-                        )
-                    if block.height != height:
-                        raise RuntimeError(
-                            f"Block {hh.hex()} has a mismatching height: {block.height} expected {height}"
-                        )
-
-                if height != current_height:
-                    # we're moving to the next level. Make sure we found the block
-                    # we were looking for at the previous level
-                    if next_hash is None:
-                        raise RuntimeError(
-                            f"Database is missing the block with hash {expect_hash} at height {current_height}"
-                        )
-                    expect_hash = next_hash
-                    next_hash = None
-                    current_height = height
-
-                if hh == expect_hash:
-                    if next_hash is not None:
-                        raise RuntimeError(f"Database has multiple blocks with hash {hh.hex()}, at height {height}")
-                    if not in_main_chain:
-                        raise RuntimeError(
-                            f"block {hh.hex()} (height: {height}) is part of the main chain, "
-                            f"but in_main_chain is not set"
-                        )
-
-                    if validate_blocks:
-                        if actual_prev_hash != prev:
-                            raise RuntimeError(
-                                f"Block {hh.hex()} has a blob with mismatching "
-                                f"prev-hash: {actual_prev_hash}, expected {prev}"
-                            )
-
-                    next_hash = prev
-
-                    height_to_hash[height * 32 : height * 32 + 32] = hh
-
-                    print(f"\r{height} orphaned blocks: {num_orphans} ", end="")
-
-                else:
-                    if in_main_chain:
-                        raise RuntimeError(f"block {hh.hex()} (height: {height}) is orphaned, but in_main_chain is set")
-                    num_orphans += 1
-        print("")
-
-        if current_height != 0:
-            raise RuntimeError(f"Database is missing blocks below height {current_height}")
-
-        # make sure the prev_hash pointer of block height 0 is the genesis
-        # challenge
-        service_config = config["full_node"]
-        network_id = service_config["selected_network"]
-        overrides = service_config["network_overrides"]["constants"][network_id]
-        updated_constants = replace_str_to_bytes(DEFAULT_CONSTANTS, **overrides)
-        if next_hash != updated_constants.AGG_SIG_ME_ADDITIONAL_DATA:
-            raise RuntimeError(
-                f"Blockchain has invalid genesis challenge {next_hash}, expected "
-                f"{updated_constants.AGG_SIG_ME_ADDITIONAL_DATA.hex()}"
+        # blocks added since the checkpoint was written don't invalidate it, the
+        # validation resumes below the peak it started from. A reorg past that
+        # peak does, since it changes the main chain below it
+        checkpoint_key = {"validate_blocks": validate_blocks, "shard_size": shard_size}
+        checkpoint: Checkpoint | None = None
+        if checkpoint_path is not None:
+            checkpoint = _load_checkpoint(checkpoint_path, checkpoint_key)
+        if checkpoint is not None:
+            with closing(
+                in_db.execute("SELECT in_main_chain FROM full_blocks WHERE header_hash = ?", (checkpoint.peak_hash,))
+            ) as cursor:
+                row = cursor.fetchone()
+            if row is None or not row[0]:
+                print(f"ignoring checkpoint for a peak that's no longer in the main chain: {checkpoint_path}")
+                checkpoint = None
+
+    if checkpoint is None:
+        checkpoint = Checkpoint(peak, peak_height, 0, ChainState(peak_height, peak, None, 0))
+    else:
+        print(
+            f"resuming from checkpoint: {checkpoint_path} ({checkpoint.reduced} shards below "
+            f"height {checkpoint.peak_height} already validated)"
+        )
+    peak = checkpoint.peak_hash
+    peak_height = checkpoint.peak_height
+    reduced = checkpoint.reduced
+    state = checkpoint.state
+
+    # if there are blocks being added to the database, the ones added since we
+    # picked the peak are ignored, by only validating up to the peak height.
+    # Shards are ordered top-down, since that's the order they're reduced in
+    shard_lows = list(range(peak_height - peak_height % shard_size, -1, -shard_size))
+
+    print(f"traversing the full chain in {len(shard_lows)} shards using {workers} workers")
+
+    executor: Executor
+    if workers > 1:
+        import multiprocessing
+
+        start_method = process_config_start_method(config=config, log=log)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+    else:
+        executor = InlineExecutor()
+
+    results: dict[int, ShardResult] = {}
+    num_blocks = 0
+    start_time = monotonic()
+    last_checkpoint = start_time
+    try:
+        # shards are submitted as the ones above them are reduced, so results
+        # are reduced and checkpointed as they come in, rather than once every
+        # shard was validated
+        next_shard = reduced
+        futures: set[Future[ShardResult]] = set()
+        while reduced < len(shard_lows):
+            while next_shard < len(shard_lows) and next_shard - reduced < workers * SHARDS_AHEAD_PER_WORKER:
+                low = shard_lows[next_shard]
+                high = min(low + shard_size - 1, peak_height)
+                futures.add(executor.submit(validate_shard, in_path, low, high, validate_blocks))
+                next_shard += 1
+
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                shard = future.result()
+                results[shard.low] = shard
+                num_blocks += shard.num_blocks
+
+            while reduced < len(shard_lows) and shard_lows[reduced] in results:
+                state = reduce_shard(state, results.pop(shard_lows[reduced]))
+                reduced += 1
+
+            now = monotonic()
+            rate = num_blocks / max(now - start_time, 0.001)
+            print(
+                f"\r{reduced}/{len(shard_lows)} shards reduced, height: {state.current_height} "
+                f"orphaned blocks: {state.num_orphans} {rate:0.1f} blocks/s    ",
+                end="",
             )
-
-        if num_orphans > 0:
-            print(f"{num_orphans} orphaned blocks")
+            sys.stdout.flush()
+
+            if checkpoint_path is not None and now - last_checkpoint > CHECKPOINT_INTERVAL:
+                _write_checkpoint(checkpoint_path, checkpoint_key, Checkpoint(peak, peak_height, reduced, state))
+                last_checkpoint = now
+    except BaseException:
+        if checkpoint_path is not None and reduced > 0:
+            _write_checkpoint(checkpoint_path, checkpoint_key, Checkpoint(peak, peak_height, reduced, state))
+        raise
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    print("")
+
+    end_time = monotonic()
+    print(
+        f"validated {num_blocks} blocks in {end_time - start_time:.2f} seconds "
+        f"({num_blocks / max(end_time - start_time, 0.001):0.1f} blocks/s)"
+    )
+
+    if state.current_height != 0:
+        raise RuntimeError(f"Database is missing blocks below height {state.current_height}")
+
+    # make sure the prev_hash pointer of block height 0 is the genesis
+    # challenge
+    service_config = config["full_node"]
+    network_id = service_config["selected_network"]
+    overrides = service_config["network_overrides"]["constants"][network_id]
+    updated_constants = replace_str_to_bytes(DEFAULT_CONSTANTS, **overrides)
+    if state.next_hash != updated_constants.AGG_SIG_ME_ADDITIONAL_DATA:
+        raise RuntimeError(
+            f"Blockchain has invalid genesis challenge {state.next_hash}, expected "
+            f"{updated_constants.AGG_SIG_ME_ADDITIONAL_DATA.hex()}"
+        )
+
+    if checkpoint_path is not None and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    if state.num_orphans > 0:
+        print(f"{state.num_orphans} orphaned blocks")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+import click
+
+
+class LazyGroup(click.Group):
+    """
+    A click group whose subcommands are only imported when they are invoked
+    (or when the help text needs them). This keeps the start-up cost of the
+    CLI proportional to the command being run, rather than to every command
+    that exists.
+
+    lazy_subcommands maps command names to "module.path:attribute" strings.
+    """
+
+    def __init__(self, *args: Any, lazy_subcommands: dict[str, str] | None = None, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.lazy_subcommands: dict[str, str] = {} if lazy_subcommands is None else dict(lazy_subcommands)
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted([*super().list_commands(ctx), *self.lazy_subcommands.keys()])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands:
+            return self._load_lazy_command(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def _load_lazy_command(self, cmd_name: str) -> click.Command:
+        import_path = self.lazy_subcommands[cmd_name]
+        module_name, attribute_name = import_path.split(":", maxsplit=1)
+        command = getattr(importlib.import_module(module_name), attribute_name)
+        if not isinstance(command, click.Command):
+            raise ValueError(f"lazy loading of {import_path} for command {cmd_name!r} did not return a click command")
+        # once loaded, the command is registered like any other so it is only
+        # imported once
+        del self.lazy_subcommands[cmd_name]
+        self.add_command(command, cmd_name)
+        return command
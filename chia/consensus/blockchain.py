@@ -5,6 +5,7 @@ import dataclasses
 import enum
 import logging
 import traceback
+from collections.abc import Iterable
 from concurrent.futures import Executor, ThreadPoolExecutor
 from enum import Enum
 from typing import TYPE_CHECKING, ClassVar, cast
@@ -892,8 +893,15 @@ class Blockchain:
     async def get_header_blocks_in_range(
         self, start: int, stop: int, tx_filter: bool = True
     ) -> dict[bytes32, HeaderBlock]:
+        return await self.get_header_blocks_at(range(start, stop + 1), tx_filter)
+
+    async def get_header_blocks_at(self, heights: Iterable[int], tx_filter: bool = True) -> dict[bytes32, HeaderBlock]:
+        """
+        gets the header blocks at the heights (only blocks that are part of the
+        chain), with the blocks that aren't cached read from the DB in one go
+        """
         hashes = []
-        for height in range(start, stop + 1):
+        for height in heights:
             header_hash: bytes32 | None = self.height_to_hash(uint32(height))
             if header_hash is not None:
                 hashes.append(header_hash)
@@ -12,7 +12,7 @@ import subprocess
 import sys
 import traceback
 import uuid
-from collections.abc import AsyncIterator, Collection
+from collections.abc import AsyncIterator, Collection, Hashable
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from enum import Enum
@@ -28,6 +28,7 @@ from chia import __version__
 from chia.cmds.init_funcs import check_keys, chia_init
 from chia.cmds.passphrase_funcs import default_passphrase, using_default_passphrase
 from chia.daemon.keychain_server import KeychainServer, keychain_commands
+from chia.daemon.websocket_sender import SendBufferFullError, WebSocketSender, coalescing_key
 from chia.daemon.windows_signal import kill
 from chia.plotters.plotters import get_available_plotters
 from chia.plotting.util import add_plot_directory
@@ -173,6 +174,9 @@ class StatusMessage:
     def create_payload(self) -> str:
         return create_payload(command=self.command, data=self.data, origin=self.origin, destination=self.destination)
 
+    def coalescing_key(self) -> Hashable | None:
+        return coalescing_key(self.command, self.origin, self.destination, self.data)
+
 
 class WebSocketServer:
     def __init__(
@@ -195,6 +199,9 @@ class WebSocketServer:
         self.daemon_port = self.net_config["daemon_port"]
         self.daemon_max_message_size = self.net_config.get("daemon_max_message_size", 50 * 1000 * 1000)
         self.heartbeat = self.net_config.get("daemon_heartbeat", 300)
+        self.send_buffer_size = self.net_config.get("daemon_send_buffer_size", 1000)
+        self.coalesce_window = self.net_config.get("daemon_coalesce_window", 0.1)
+        self.senders: dict[WebSocketResponse, WebSocketSender] = {}
         self.webserver: WebServer | None = None
         self.ssl_context = ssl_context_for_server(ca_crt_path, ca_key_path, crt_path, key_path, log=self.log)
         self.keychain_server = KeychainServer()
@@ -277,6 +284,16 @@ class WebSocketServer:
         )
         await ws.prepare(request)
 
+        try:
+            await self._handle_incoming_messages(ws)
+        finally:
+            sender = self.senders.pop(ws, None)
+            if sender is not None:
+                sender.close()
+
+        return ws
+
+    async def _handle_incoming_messages(self, ws: WebSocketResponse) -> None:
         while True:
             msg = await ws.receive()
             decoded: WsRpcMessage = {
@@ -302,6 +319,12 @@ class WebSocketServer:
                         continue
 
                     response, connections = maybe_response
+                    key = None
+                    if decoded["destination"] != "daemon" and not decoded.get("ack", False):
+                        # a notification a service sends to its clients
+                        key = coalescing_key(
+                            decoded["command"], decoded["origin"], decoded["destination"], decoded["data"]
+                        )
 
                 except Exception as e:
                     tb = traceback.format_exc()
@@ -309,8 +332,9 @@ class WebSocketServer:
                     error = {"success": False, "error": f"{e}"}
                     response = format_response(decoded, error)
                     connections = {ws}  # send error back to the sender
+                    key = None
 
-                await self.send_all_responses(connections, response)
+                await self.send_all_responses(connections, response, key)
             else:
                 self.log.debug("Received non-text message")
                 service_names = self.remove_connection(ws)
@@ -339,25 +363,52 @@ class WebSocketServer:
                 await ws.close()
                 break
 
-        return ws
+    def sender_for(self, connection: WebSocketResponse) -> WebSocketSender:
+        sender = self.senders.get(connection)
+        if sender is None:
+            sender = WebSocketSender(
+                connection,
+                self._send_failed,
+                max_pending=self.send_buffer_size,
+                coalesce_window=self.coalesce_window,
+            )
+            sender.start()
+            self.senders[connection] = sender
+        return sender
 
-    async def send_all_responses(self, connections: set[WebSocketResponse], response: str) -> None:
+    async def send_all_responses(
+        self, connections: set[WebSocketResponse], response: str, key: Hashable | None = None
+    ) -> None:
+        """
+        Queues the encoded response for each of the connections. Each one is
+        sent by its own task, so a slow connection doesn't hold up the others.
+        If key isn't None, a later message with the same key may replace this
+        one before it's sent.
+        """
         for connection in connections.copy():
-            try:
-                await connection.send_str(response)
-            except Exception as e:
-                service_names = self.remove_connection(connection)
-                if len(service_names) == 0:
-                    service_names = ["Unknown"]
-
-                if isinstance(e, ConnectionResetError):
-                    self.log.info(f"Peer disconnected. Closing websocket with {service_names}")
-                else:
-                    tb = traceback.format_exc()
-                    self.log.error(f"Unexpected exception trying to send to {service_names} (websocket: {e} {tb})")
-                    self.log.info(f"Closing websocket with {service_names}")
+            sender = self.sender_for(connection)
+            if sender.full:
+                # a burst of messages may have been queued without the sender
+                # getting to run, only a client that's still behind is dropped
+                await asyncio.sleep(0)
+            sender.send(response, key)
+
+    async def _send_failed(self, connection: WebSocketResponse, e: Exception) -> None:
+        self.senders.pop(connection, None)
+        service_names = self.remove_connection(connection)
+        if len(service_names) == 0:
+            service_names = ["Unknown"]
+
+        if isinstance(e, ConnectionResetError):
+            self.log.info(f"Peer disconnected. Closing websocket with {service_names}")
+        elif isinstance(e, SendBufferFullError):
+            self.log.warning(f"{e}. Closing websocket with {service_names}")
+        else:
+            tb = "".join(traceback.format_exception(e))
+            self.log.error(f"Unexpected exception trying to send to {service_names} (websocket: {e} {tb})")
+            self.log.info(f"Closing websocket with {service_names}")
 
-                await connection.close()
+        await connection.close()
 
     def remove_connection(self, websocket: WebSocketResponse) -> list[str]:
         """Returns a list of service names from which the connection was removed"""
@@ -779,15 +830,9 @@ class WebSocketServer:
         if message.service not in self.connections:
             return None
 
-        websockets = self.connections[message.service]
-        for websocket in websockets.copy():
-            try:
-                await websocket.send_str(message.create_payload())
-            except Exception as e:
-                tb = traceback.format_exc()
-                self.log.error(f"Unexpected exception trying to send to websocket: {e} {tb}")
-                websockets.remove(websocket)
-                await websocket.close()
+        await self.send_all_responses(
+            self.connections[message.service], message.create_payload(), message.coalescing_key()
+        )
 
     def state_changed(self, service: str, message: dict[str, Any]) -> None:
         self.state_changed_msg_queue.put_nowait(
@@ -1350,6 +1395,13 @@ class WebSocketServer:
         return {"success": True, "service_name": service_name, "is_running": is_running}
 
     async def exit(self) -> None:
+        # deliver what's already queued, like the response to the exit command
+        senders = list(self.senders.values())
+        if len(senders) > 0:
+            await asyncio.wait([create_referenced_task(sender.drain()) for sender in senders], timeout=3)
+        for sender in senders:
+            sender.close()
+        self.senders.clear()
         if self.webserver is not None:
             self.webserver.close()
             await self.webserver.await_closed()
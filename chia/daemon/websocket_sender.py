@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Hashable
+from typing import Any
+
+from aiohttp.web_ws import WebSocketResponse
+
+from chia.util.task_referencer import create_referenced_task
+
+# the clients that services send their notifications to. Anything else is a
+# request to a service, which expects a reply to its request_id
+NOTIFICATION_DESTINATIONS = frozenset({"wallet_ui", "metrics"})
+
+# notifications carrying a complete snapshot of some state, so a newer one
+# makes an older one that's still waiting to be sent redundant
+SNAPSHOT_COMMANDS = frozenset({"get_blockchain_state", "get_connections", "keyring_status_changed"})
+
+# the data of a state_changed notification that only says what kind of change
+# happened, like the wallet's "sync_changed" and "new_block"
+SIGNAL_DATA_KEYS = frozenset({"state", "wallet_id", "success"})
+
+
+def coalescing_key(command: str, origin: str, destination: str, data: Any) -> Hashable | None:
+    """
+    Returns a key for the kind of a notification, such that a notification
+    makes any earlier one with the same key redundant. Returns None if the
+    notification must be delivered regardless of what follows it.
+    """
+    if destination not in NOTIFICATION_DESTINATIONS:
+        return None
+    if command in SNAPSHOT_COMMANDS:
+        return origin, destination, command
+    if command == "state_changed" and isinstance(data, dict) and data.keys() <= SIGNAL_DATA_KEYS:
+        return origin, destination, command, data.get("state"), data.get("wallet_id")
+    return None
+
+
+class SendBufferFullError(Exception):
+    pass
+
+
+class WebSocketSender:
+    """
+    Sends messages to one websocket from a task of its own, in the order they
+    were queued, so a slow client doesn't hold up the daemon or its other
+    clients.
+
+    At most max_pending messages wait to be sent, a client that falls further
+    behind is dropped rather than waited for, since waiting would hold up the
+    daemon's handling of every other connection. This applies to services as
+    well as the GUI, notifications that are coalesced don't count towards the
+    limit. Messages queued with a coalescing key are held for up to
+    coalesce_window seconds, and replaced by a message with the same key
+    queued in the meantime.
+    """
+
+    websocket: WebSocketResponse
+    on_error: Callable[[WebSocketResponse, Exception], Coroutine[Any, Any, None]]
+    max_pending: int
+    coalesce_window: float
+
+    def __init__(
+        self,
+        websocket: WebSocketResponse,
+        on_error: Callable[[WebSocketResponse, Exception], Coroutine[Any, Any, None]],
+        *,
+        max_pending: int = 1000,
+        coalesce_window: float = 0.1,
+    ) -> None:
+        self.websocket = websocket
+        self.on_error = on_error
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+        # messages waiting to be sent, in order. Messages that aren't coalesced
+        # are keyed by a sequence number, which never equals a coalescing key
+        self._pending: dict[Hashable, str] = {}
+        self._sequence = 0
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._flush_timer: asyncio.TimerHandle | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.failed = False
+
+    def start(self) -> None:
+        self._task = create_referenced_task(self._send_pending())
+
+    def close(self) -> None:
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pending.clear()
+        self._idle.set()
+
+    @property
+    def full(self) -> bool:
+        return len(self._pending) >= self.max_pending
+
+    def send(self, payload: str, key: Hashable | None = None) -> None:
+        if self.failed:
+            return
+        if key is not None and key in self._pending:
+            del self._pending[key]
+        elif self.full:
+            self._fail(SendBufferFullError(f"Client fell behind by {len(self._pending)} messages"))
+            return
+
+        if key is None:
+            key = self._sequence
+            self._sequence += 1
+            self._wakeup.set()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.coalesce_window, self._wakeup.set)
+        self._pending[key] = payload
+        self._idle.clear()
+
+    async def drain(self) -> None:
+        """
+        Waits until all the queued messages were sent, or the client was dropped
+        """
+        await self._idle.wait()
+
+    def _fail(self, e: Exception) -> None:
+        self.failed = True
+        self.close()
+        create_referenced_task(self.on_error(self.websocket, e), known_unreferenced=True)
+
+    async def _send_pending(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            # messages queued while this batch is sent go in the next one
+            batch = self._pending
+            self._pending = {}
+            for payload in batch.values():
+                try:
+                    await self.websocket.send_str(payload)
+                except Exception as e:
+                    self._task = None
+                    self._fail(e)
+                    return
+
+            if len(self._pending) == 0:
+                self._idle.set()
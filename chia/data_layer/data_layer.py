@@ -52,7 +52,13 @@ from chia.data_layer.data_layer_util import (
 )
 from chia.data_layer.data_layer_wallet import DataLayerWallet, Mirror, verify_offer
 from chia.data_layer.data_store import DataStore
-from chia.data_layer.download_data import delete_full_file_if_exists, insert_from_delta_file, write_files_for_root
+from chia.data_layer.download_data import (
+    DEFAULT_PREFETCH_COUNT,
+    MirrorSessions,
+    delete_full_file_if_exists,
+    insert_from_delta_file,
+    write_files_for_root,
+)
 from chia.data_layer.singleton_record import SingletonRecord
 from chia.protocols.outbound_message import NodeType
 from chia.rpc.rpc_server import StateChangedProtocol, default_get_connections
@@ -148,6 +154,8 @@ class DataLayer:
         default_factory=functools.partial(aiohttp.ClientTimeout, total=45, sock_connect=5)
     )
     group_files_by_store: bool = False
+    download_prefetch_count: int = DEFAULT_PREFETCH_COUNT
+    mirror_sessions: MirrorSessions = dataclasses.field(default_factory=MirrorSessions)
 
     @property
     def server(self) -> ChiaServer:
@@ -219,6 +227,7 @@ class DataLayer:
                 total=config.get("client_timeout", 45), sock_connect=config.get("connect_timeout", 5)
             ),
             group_files_by_store=config.get("group_files_by_store", False),
+            download_prefetch_count=config.get("download_prefetch_count", DEFAULT_PREFETCH_COUNT),
         )
 
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -262,6 +271,7 @@ class DataLayer:
                         pass
                 if self._wallet_rpc is not None:
                     await self.wallet_rpc.await_closed()
+                await self.mirror_sessions.close()
 
     def _set_state_changed_callback(self, callback: StateChangedProtocol) -> None:
         self.state_changed_callback = callback
@@ -654,6 +664,8 @@ class DataLayer:
                     downloader=await self.get_downloader(store_id, url),
                     group_files_by_store=self.group_files_by_store,
                     maximum_full_file_count=self.maximum_full_file_count,
+                    sessions=self.mirror_sessions,
+                    prefetch_count=self.download_prefetch_count,
                 )
                 if success:
                     self.log.info(
@@ -1027,6 +1039,10 @@ class DataLayer:
 
                 await asyncio.gather(*(job.done.wait() for job in jobs), return_exceptions=True)
 
+            # the mirrors that weren't downloaded from in this round may have
+            # been removed, their sessions are created again when needed
+            await self.mirror_sessions.close_unused()
+
             # Do unsubscribes after the fetching of data is complete, to avoid races.
             async with self.subscription_lock:
                 for unsubscribe_data in self.unsubscribe_data_queue:
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Literal
 
@@ -22,6 +23,12 @@ from chia.data_layer.data_layer_util import (
 )
 from chia.data_layer.data_store import DataStore
 from chia.util.log_exceptions import log_exceptions
+from chia.util.task_referencer import create_referenced_task
+
+# the number of delta files downloaded ahead of the one being inserted
+DEFAULT_PREFETCH_COUNT = 4
+# downloaded data is buffered up to this size before it's written to disk
+DOWNLOAD_WRITE_BUFFER_SIZE = 1024 * 1024
 
 
 def is_filename_valid(filename: str, group_by_store: bool = False) -> bool:
@@ -58,6 +65,42 @@ def is_filename_valid(filename: str, group_by_store: bool = False) -> bool:
     return reformatted == filename
 
 
+@dataclass
+class MirrorSessions:
+    """
+    HTTP client sessions for downloading files, one per mirror (or download
+    plugin) URL, so connections are kept alive and reused across files.
+    """
+
+    _sessions: dict[str, aiohttp.ClientSession] = field(default_factory=dict)
+    # the URLs a session was requested for since close_unused() was last called
+    _used: set[str] = field(default_factory=set)
+
+    def get(self, url: str) -> aiohttp.ClientSession:
+        self._used.add(url)
+        session = self._sessions.get(url)
+        if session is None or session.closed:
+            session = aiohttp.ClientSession()
+            self._sessions[url] = session
+        return session
+
+    async def close_unused(self) -> None:
+        """
+        Closes the sessions that weren't requested since the last call, like the
+        ones for mirrors that were removed. No download may be in progress.
+        """
+        unused = [url for url in self._sessions if url not in self._used]
+        self._used.clear()
+        for url in unused:
+            await self._sessions.pop(url).close()
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+
 @dataclass
 class WriteFilesResult:
     result: bool
@@ -121,6 +164,8 @@ async def download_file(
     log: logging.Logger,
     grouped_by_store: bool,
     group_downloaded_files_by_store: bool,
+    sessions: MirrorSessions | None = None,
+    record_miss: bool = True,
 ) -> bool:
     if target_filename_path.exists():
         return True
@@ -129,8 +174,11 @@ async def download_file(
     if downloader is None:
         # use http downloader - this raises on any error
         try:
-            await http_download(target_filename_path, filename, proxy_url, server_info, timeout, log)
+            session = None if sessions is None else sessions.get(server_info.url)
+            await http_download(target_filename_path, filename, proxy_url, server_info, timeout, log, session=session)
         except (asyncio.TimeoutError, aiohttp.ClientError):
+            if not record_miss:
+                return False
             new_server_info = await data_store.server_misses_file(store_id, server_info, timestamp)
             log.info(
                 f"Failed to download {filename} from {new_server_info.url}."
@@ -147,7 +195,11 @@ async def download_file(
         "filename": filename,
         "group_files_by_store": group_downloaded_files_by_store,
     }
-    async with aiohttp.ClientSession() as session:
+    async with contextlib.AsyncExitStack() as exit_stack:
+        if sessions is None:
+            session = await exit_stack.enter_async_context(aiohttp.ClientSession())
+        else:
+            session = sessions.get(downloader.url)
         async with session.post(
             downloader.url + "/download",
             json=request_json,
@@ -172,90 +224,169 @@ async def insert_from_delta_file(
     downloader: PluginRemote | None,
     group_files_by_store: bool = False,
     maximum_full_file_count: int = 1,
+    sessions: MirrorSessions | None = None,
+    prefetch_count: int = DEFAULT_PREFETCH_COUNT,
+) -> bool:
+    """
+    Downloads and inserts the delta files for root_hashes, which are the
+    generations following existing_generation. While a file is inserted, the
+    files of the next prefetch_count generations are downloaded.
+    """
+    async with contextlib.AsyncExitStack() as exit_stack:
+        if sessions is None:
+            sessions = MirrorSessions()
+            exit_stack.push_async_callback(sessions.close)
+        return await _insert_from_delta_file(
+            data_store=data_store,
+            store_id=store_id,
+            existing_generation=existing_generation,
+            target_generation=target_generation,
+            root_hashes=root_hashes,
+            server_info=server_info,
+            client_foldername=client_foldername,
+            timeout=timeout,
+            log=log,
+            proxy_url=proxy_url,
+            downloader=downloader,
+            group_files_by_store=group_files_by_store,
+            maximum_full_file_count=maximum_full_file_count,
+            sessions=sessions,
+            prefetch_count=prefetch_count,
+        )
+
+
+async def _insert_from_delta_file(
+    data_store: DataStore,
+    store_id: bytes32,
+    existing_generation: int,
+    target_generation: int,
+    root_hashes: list[bytes32],
+    server_info: ServerInfo,
+    client_foldername: Path,
+    timeout: aiohttp.ClientTimeout,
+    log: logging.Logger,
+    proxy_url: str | None,
+    downloader: PluginRemote | None,
+    group_files_by_store: bool,
+    maximum_full_file_count: int,
+    sessions: MirrorSessions,
+    prefetch_count: int,
 ) -> bool:
     if group_files_by_store:
         client_foldername.joinpath(f"{store_id}").mkdir(parents=True, exist_ok=True)
 
     delta_reader: DeltaReader | None = None
+    first_generation = existing_generation + 1
+    # the indexes of the files downloaded here, rather than found on disk
+    downloaded: set[int] = set()
 
-    for root_hash in root_hashes:
-        timestamp = int(time.time())
-        existing_generation += 1
+    async def download(index: int, record_miss: bool) -> bool:
+        root_hash = root_hashes[index]
+        generation = first_generation + index
         target_filename_path = get_delta_filename_path(
-            client_foldername, store_id, root_hash, existing_generation, group_files_by_store
+            client_foldername, store_id, root_hash, generation, group_files_by_store
         )
-        filename_exists = target_filename_path.exists()
+        if target_filename_path.exists():
+            return True
         for grouped_by_store in (False, True):
             success = await download_file(
                 data_store=data_store,
                 target_filename_path=target_filename_path,
                 store_id=store_id,
                 root_hash=root_hash,
-                generation=existing_generation,
+                generation=generation,
                 server_info=server_info,
                 proxy_url=proxy_url,
                 downloader=downloader,
                 timeout=timeout,
                 client_foldername=client_foldername,
-                timestamp=timestamp,
+                timestamp=int(time.time()),
                 log=log,
                 grouped_by_store=grouped_by_store,
                 group_downloaded_files_by_store=group_files_by_store,
+                sessions=sessions,
+                record_miss=record_miss,
             )
             if success:
-                break
-        else:
-            return False
+                downloaded.add(index)
+                return True
+        return False
 
-        log.info(f"Successfully downloaded delta file {target_filename_path.name}.")
-        try:
-            with log_exceptions(log=log, message="exception while inserting from delta file"):
-                filename_full_tree = get_full_tree_filename_path(
-                    client_foldername,
-                    store_id,
-                    root_hash,
-                    existing_generation,
-                    group_files_by_store,
-                )
-                delta_reader = await data_store.insert_into_data_store_from_file(
-                    store_id,
-                    None if root_hash == bytes32.zeros else root_hash,
-                    target_filename_path,
-                    delta_reader=delta_reader,
-                )
-                log.info(
-                    f"Successfully inserted hash {root_hash} from delta file. "
-                    f"Generation: {existing_generation}. Store id: {store_id}."
-                )
-
-                if target_generation - existing_generation <= maximum_full_file_count - 1:
-                    root = await data_store.get_tree_root(store_id=store_id)
-                    with open(filename_full_tree, "wb") as writer:
-                        await data_store.write_tree_to_file(root, root_hash, store_id, False, writer)
-                    log.info(f"Successfully written full tree filename {filename_full_tree}.")
-                else:
-                    log.info(f"Skipping full file generation for {existing_generation}")
-
-                await data_store.received_correct_file(store_id, server_info)
-        except Exception:
-            try:
-                target_filename_path.unlink()
-            except FileNotFoundError:
-                pass
+    # prefetched downloads don't count misses against the server. If one
+    # fails, the file is downloaded again when it's needed, which counts
+    # them as before
+    prefetches: dict[int, asyncio.Task[bool]] = {}
+    try:
+        for index, root_hash in enumerate(root_hashes):
+            for prefetch_index in range(index + 1, min(index + 1 + prefetch_count, len(root_hashes))):
+                if prefetch_index not in prefetches:
+                    prefetches[prefetch_index] = create_referenced_task(download(prefetch_index, record_miss=False))
+            prefetch = prefetches.pop(index, None)
+            if prefetch is not None:
+                with contextlib.suppress(Exception):
+                    await prefetch
+
+            existing_generation += 1
+            timestamp = int(time.time())
+            target_filename_path = get_delta_filename_path(
+                client_foldername, store_id, root_hash, existing_generation, group_files_by_store
+            )
+            if not await download(index, record_miss=True):
+                return False
+            filename_exists = index not in downloaded
 
+            log.info(f"Successfully downloaded delta file {target_filename_path.name}.")
             try:
-                filename_full_tree.unlink()
-            except FileNotFoundError:
-                pass
-
-            # await data_store.received_incorrect_file(store_id, server_info, timestamp)
-            # incorrect file bans for 7 days which in practical usage
-            # is too long given this file might be incorrect for various reasons
-            # therefore, use the misses file logic instead
-            if not filename_exists:
-                # Don't penalize this server if we didn't download the file from it.
-                await data_store.server_misses_file(store_id, server_info, timestamp)
-            return False
+                with log_exceptions(log=log, message="exception while inserting from delta file"):
+                    filename_full_tree = get_full_tree_filename_path(
+                        client_foldername,
+                        store_id,
+                        root_hash,
+                        existing_generation,
+                        group_files_by_store,
+                    )
+                    delta_reader = await data_store.insert_into_data_store_from_file(
+                        store_id,
+                        None if root_hash == bytes32.zeros else root_hash,
+                        target_filename_path,
+                        delta_reader=delta_reader,
+                    )
+                    log.info(
+                        f"Successfully inserted hash {root_hash} from delta file. "
+                        f"Generation: {existing_generation}. Store id: {store_id}."
+                    )
+
+                    if target_generation - existing_generation <= maximum_full_file_count - 1:
+                        root = await data_store.get_tree_root(store_id=store_id)
+                        with open(filename_full_tree, "wb") as writer:
+                            await data_store.write_tree_to_file(root, root_hash, store_id, False, writer)
+                        log.info(f"Successfully written full tree filename {filename_full_tree}.")
+                    else:
+                        log.info(f"Skipping full file generation for {existing_generation}")
+
+                    await data_store.received_correct_file(store_id, server_info)
+            except Exception:
+                try:
+                    target_filename_path.unlink()
+                except FileNotFoundError:
+                    pass
+
+                try:
+                    filename_full_tree.unlink()
+                except FileNotFoundError:
+                    pass
+
+                # await data_store.received_incorrect_file(store_id, server_info, timestamp)
+                # incorrect file bans for 7 days which in practical usage
+                # is too long given this file might be incorrect for various reasons
+                # therefore, use the misses file logic instead
+                if not filename_exists:
+                    # Don't penalize this server if we didn't download the file from it.
+                    await data_store.server_misses_file(store_id, server_info, timestamp)
+                return False
+    finally:
+        for prefetch in prefetches.values():
+            prefetch.cancel()
 
     return True
 
@@ -289,29 +420,65 @@ async def http_download(
     server_info: ServerInfo,
     timeout: aiohttp.ClientTimeout,
     log: logging.Logger,
+    session: aiohttp.ClientSession | None = None,
 ) -> None:
     """
     Download a file from a server using aiohttp.
     Raises exceptions on errors
+
+    The file is downloaded to a .partial file next to target_filename_path,
+    which is renamed once it's complete. If an earlier download was
+    interrupted, it's resumed from the end of the .partial file (if the server
+    supports range requests).
     """
-    async with aiohttp.ClientSession() as session:
-        headers = {"accept-encoding": "gzip"}
+    async with contextlib.AsyncExitStack() as exit_stack:
+        if session is None:
+            session = await exit_stack.enter_async_context(aiohttp.ClientSession())
+        partial_path = target_filename_path.with_name(target_filename_path.name + ".partial")
+        try:
+            resume_from = partial_path.stat().st_size
+        except FileNotFoundError:
+            resume_from = 0
+        if resume_from > 0:
+            # byte ranges refer to the encoded content, so don't let the
+            # server compress it
+            headers = {"accept-encoding": "identity", "range": f"bytes={resume_from}-"}
+        else:
+            headers = {"accept-encoding": "gzip"}
         async with session.get(
             server_info.url + "/" + filename,
             headers=headers,
             timeout=timeout,
             proxy=proxy_url,
         ) as resp:
+            if resp.status == 416:
+                # the partial file doesn't match the file on the server
+                partial_path.unlink(missing_ok=True)
             resp.raise_for_status()
-            size = int(resp.headers.get("content-length", 0))
-            log.debug(f"Downloading delta file {filename}. Size {size} bytes.")
-            progress_byte = 0
+            if resp.status != 206:
+                # the server sent the whole file
+                resume_from = 0
+            size = resume_from + int(resp.headers.get("content-length", 0))
+            if resume_from > 0:
+                log.debug(f"Resuming download of delta file {filename} at {resume_from} of {size} bytes.")
+            else:
+                log.debug(f"Downloading delta file {filename}. Size {size} bytes.")
+            progress_byte = resume_from
             progress_percentage = f"{0:.0%}"
-            with target_filename_path.open(mode="wb") as f:
+            buffer = bytearray()
+            with partial_path.open(mode="ab" if resume_from > 0 else "wb") as f:
                 async for chunk, _ in resp.content.iter_chunks():
-                    f.write(chunk)
+                    buffer += chunk
+                    if len(buffer) >= DOWNLOAD_WRITE_BUFFER_SIZE:
+                        # write in a thread, so a slow disk doesn't block the event loop
+                        await asyncio.to_thread(f.write, bytes(buffer))
+                        buffer.clear()
                     progress_byte += len(chunk)
-                    new_percentage = f"{progress_byte / size:.0%}"
-                    if new_percentage != progress_percentage:
-                        progress_percentage = new_percentage
-                        log.info(f"Downloading delta file {filename}. {progress_percentage} of {size} bytes.")
+                    if size > 0:
+                        new_percentage = f"{progress_byte / size:.0%}"
+                        if new_percentage != progress_percentage:
+                            progress_percentage = new_percentage
+                            log.info(f"Downloading delta file {filename}. {progress_percentage} of {size} bytes.")
+                if len(buffer) > 0:
+                    await asyncio.to_thread(f.write, bytes(buffer))
+        partial_path.replace(target_filename_path)
@@ -4,6 +4,7 @@ import asyncio
 import contextlib
 import json
 import logging
+import random
 import sys
 import time
 import traceback
@@ -13,12 +14,12 @@ from math import floor
 from pathlib import Path
 from typing import TYPE_CHECKING, Any, ClassVar, cast
 
-import aiohttp
 from chia_rs import AugSchemeMPL, ConsensusConstants, G1Element, G2Element, PrivateKey, ProofOfSpace
 from chia_rs.sized_bytes import bytes32
 from chia_rs.sized_ints import uint8, uint16, uint32, uint64
 
 from chia.daemon.keychain_proxy import KeychainProxy, connect_to_keychain_and_validate, wrap_local_keychain
+from chia.farmer.pool_sessions import PoolSessions
 from chia.plot_sync.delta import Delta
 from chia.plot_sync.receiver import Receiver
 from chia.pools.pool_config import PoolWalletConfig, load_pool_config, update_pool_url
@@ -37,9 +38,8 @@ from chia.protocols.pool_protocol import (
 )
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.rpc.rpc_server import StateChangedProtocol, default_get_connections
-from chia.server.server import ChiaServer, ssl_context_for_root
+from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
-from chia.ssl.create_ssl import get_mozilla_ca_crt
 from chia.util.bech32m import decode_puzzle_hash, encode_puzzle_hash
 from chia.util.byte_types import hexstr_to_bytes
 from chia.util.config import config_path_for_filename, load_config, lock_and_load_config, save_config
@@ -65,6 +65,14 @@ log = logging.getLogger(__name__)
 UPDATE_POOL_INFO_INTERVAL: int = 3600
 UPDATE_POOL_INFO_FAILURE_RETRY_INTERVAL: int = 120
 UPDATE_POOL_FARMER_INFO_INTERVAL: int = 300
+# the pool state update intervals are randomized by this fraction, so the pools
+# drift apart instead of all being refreshed at once
+UPDATE_POOL_INTERVAL_JITTER: float = 0.1
+# the longest an update of a single pool's state may take
+POOL_STATE_UPDATE_TIMEOUT: int = 60
+# the plot sync state of a disconnected harvester is kept this long (in seconds),
+# so it can resume syncing from there if it reconnects
+DISCONNECTED_HARVESTER_RETAIN_TIME: int = 3600
 
 
 @dataclass(frozen=True)
@@ -73,6 +81,10 @@ class GetPoolInfoResult:
     new_pool_url: str | None
 
 
+def jittered_interval(interval: float) -> float:
+    return interval * random.uniform(1 - UPDATE_POOL_INTERVAL_JITTER, 1 + UPDATE_POOL_INTERVAL_JITTER)
+
+
 def strip_old_entries(pairs: list[tuple[float, Any]], before: float) -> list[tuple[float, Any]]:
     for index, [timestamp, points] in enumerate(pairs):
         if timestamp >= before:
@@ -89,7 +101,7 @@ def increment_pool_stats(
     name: str,
     current_time: float,
     count: int = 1,
-    value: int | dict[str, Any] | None = None,
+    value: float | dict[str, Any] | None = None,
 ) -> None:
     if p2_singleton_puzzlehash not in pool_states:
         return
@@ -154,6 +166,8 @@ class Farmer:
         self.cache_add_time: dict[bytes32, uint64] = {}
 
         self.plot_sync_receivers: dict[bytes32, Receiver] = {}
+        # the receivers of disconnected harvesters, with the time they disconnected
+        self.disconnected_plot_sync_receivers: dict[bytes32, tuple[float, Receiver]] = {}
 
         self.cache_clear_task: asyncio.Task[None] | None = None
         self.update_pool_state_task: asyncio.Task[None] | None = None
@@ -171,6 +185,9 @@ class Farmer:
         # From p2_singleton_puzzle_hash to pool state dict
         self.pool_state: dict[bytes32, dict[str, Any]] = {}
 
+        # Persistent HTTP sessions, by pool URL
+        self.pool_sessions = PoolSessions(self.log)
+
         # From p2_singleton to auth PrivateKey
         self.authentication_keys: dict[bytes32, PrivateKey] = {}
 
@@ -212,6 +229,7 @@ class Farmer:
                 await self.cache_clear_task
             if self.update_pool_state_task is not None:
                 await self.update_pool_state_task
+            await self.pool_sessions.close()
             if self.keychain_proxy is not None:
                 proxy = self.keychain_proxy
                 self.keychain_proxy = None
@@ -312,7 +330,13 @@ class Farmer:
             self.harvester_handshake_task = None
 
         if peer.connection_type is NodeType.HARVESTER:
-            self.plot_sync_receivers[peer.peer_node_id] = Receiver(peer, self.plot_sync_callback, self.constants)
+            receiver = Receiver(peer, self.plot_sync_callback, self.constants)
+            self.plot_sync_receivers[peer.peer_node_id] = receiver
+            disconnected_time, previous_receiver = self.disconnected_plot_sync_receivers.pop(
+                peer.peer_node_id, (0.0, None)
+            )
+            if previous_receiver is not None and time.time() - disconnected_time < DISCONNECTED_HARVESTER_RETAIN_TIME:
+                receiver.allow_resume_from(previous_receiver)
             self.harvester_handshake_task = create_referenced_task(handshake_task())
 
     def set_server(self, server: ChiaServer) -> None:
@@ -336,7 +360,15 @@ class Farmer:
         self.log.info(f"peer disconnected {connection.get_peer_logging()}")
         self.state_changed("close_connection", {})
         if connection.connection_type is NodeType.HARVESTER:
-            del self.plot_sync_receivers[connection.peer_node_id]
+            receiver = self.plot_sync_receivers.pop(connection.peer_node_id)
+            now = time.time()
+            self.disconnected_plot_sync_receivers = {
+                node_id: (disconnected_time, disconnected_receiver)
+                for node_id, (disconnected_time, disconnected_receiver) in self.disconnected_plot_sync_receivers.items()
+                if now - disconnected_time < DISCONNECTED_HARVESTER_RETAIN_TIME
+            }
+            if not receiver.initial_sync():
+                self.disconnected_plot_sync_receivers[connection.peer_node_id] = (now, receiver)
             self.state_changed("harvester_removed", {"node_id": connection.peer_node_id})
 
     async def plot_sync_callback(self, peer_id: bytes32, delta: Delta | None) -> None:
@@ -348,27 +380,27 @@ class Farmer:
 
     async def _pool_get_pool_info(self, pool_config: PoolWalletConfig) -> GetPoolInfoResult | None:
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                url = f"{pool_config.pool_url}/pool_info"
-                async with session.get(url, ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log)) as resp:
-                    if resp.ok:
-                        response: dict[str, Any] = json.loads(await resp.text())
-                        self.log.info(f"GET /pool_info response: {response}")
-                        new_pool_url: str | None = None
-                        response_url_str = f"{resp.url}"
-                        if (
-                            response_url_str != url
-                            and len(resp.history) > 0
-                            and all(r.status in {301, 308} for r in resp.history)
-                        ):
-                            new_pool_url = response_url_str.replace("/pool_info", "")
-
-                        return GetPoolInfoResult(pool_info=response, new_pool_url=new_pool_url)
-                    else:
-                        self.handle_failed_pool_response(
-                            pool_config.p2_singleton_puzzle_hash,
-                            f"Error in GET /pool_info {pool_config.pool_url}, {resp.status}",
-                        )
+            session = self.pool_sessions.get(pool_config.pool_url)
+            url = f"{pool_config.pool_url}/pool_info"
+            async with session.get(url, ssl=self.pool_sessions.ssl_context) as resp:
+                if resp.ok:
+                    response: dict[str, Any] = json.loads(await resp.text())
+                    self.log.info(f"GET /pool_info response: {response}")
+                    new_pool_url: str | None = None
+                    response_url_str = f"{resp.url}"
+                    if (
+                        response_url_str != url
+                        and len(resp.history) > 0
+                        and all(r.status in {301, 308} for r in resp.history)
+                    ):
+                        new_pool_url = response_url_str.replace("/pool_info", "")
+
+                    return GetPoolInfoResult(pool_info=response, new_pool_url=new_pool_url)
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in GET /pool_info {pool_config.pool_url}, {resp.status}",
+                    )
 
         except Exception as e:
             self.handle_failed_pool_response(
@@ -393,31 +425,31 @@ class Farmer:
             "signature": bytes(signature).hex(),
         }
         try:
-            async with aiohttp.ClientSession(trust_env=True) as session:
-                async with session.get(
-                    f"{pool_config.pool_url}/farmer",
-                    params=get_farmer_params,
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: dict[str, Any] = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            increment_pool_stats(
-                                self.pool_state,
-                                pool_config.p2_singleton_puzzle_hash,
-                                "pool_errors",
-                                time.time(),
-                                value=response,
-                            )
-                        self.log.log(log_level, f"GET /farmer response: {response}")
-                        return response
-                    else:
-                        self.handle_failed_pool_response(
+            session = self.pool_sessions.get(pool_config.pool_url)
+            async with session.get(
+                f"{pool_config.pool_url}/farmer",
+                params=get_farmer_params,
+                ssl=self.pool_sessions.ssl_context,
+            ) as resp:
+                if resp.ok:
+                    response: dict[str, Any] = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        increment_pool_stats(
+                            self.pool_state,
                             pool_config.p2_singleton_puzzle_hash,
-                            f"Error in GET /farmer {pool_config.pool_url}, {resp.status}",
+                            "pool_errors",
+                            time.time(),
+                            value=response,
                         )
+                    self.log.log(log_level, f"GET /farmer response: {response}")
+                    return response
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in GET /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in GET /farmer {pool_config.pool_url}, {e}"
@@ -441,31 +473,31 @@ class Farmer:
         post_farmer_request = PostFarmerRequest(post_farmer_payload, signature)
         self.log.debug(f"POST /farmer request {post_farmer_request}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{pool_config.pool_url}/farmer",
-                    json=post_farmer_request.to_json_dict(),
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: dict[str, Any] = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            increment_pool_stats(
-                                self.pool_state,
-                                pool_config.p2_singleton_puzzle_hash,
-                                "pool_errors",
-                                time.time(),
-                                value=response,
-                            )
-                        self.log.log(log_level, f"POST /farmer response: {response}")
-                        return response
-                    else:
-                        self.handle_failed_pool_response(
+            session = self.pool_sessions.get(pool_config.pool_url)
+            async with session.post(
+                f"{pool_config.pool_url}/farmer",
+                json=post_farmer_request.to_json_dict(),
+                ssl=self.pool_sessions.ssl_context,
+            ) as resp:
+                if resp.ok:
+                    response: dict[str, Any] = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        increment_pool_stats(
+                            self.pool_state,
                             pool_config.p2_singleton_puzzle_hash,
-                            f"Error in POST /farmer {pool_config.pool_url}, {resp.status}",
+                            "pool_errors",
+                            time.time(),
+                            value=response,
                         )
+                    self.log.log(log_level, f"POST /farmer response: {response}")
+                    return response
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in POST /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in POST /farmer {pool_config.pool_url}, {e}"
@@ -489,30 +521,30 @@ class Farmer:
         put_farmer_request = PutFarmerRequest(put_farmer_payload, signature)
         self.log.debug(f"PUT /farmer request {put_farmer_request}")
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    f"{pool_config.pool_url}/farmer",
-                    json=put_farmer_request.to_json_dict(),
-                    ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.log),
-                ) as resp:
-                    if resp.ok:
-                        response: dict[str, Any] = json.loads(await resp.text())
-                        log_level = logging.INFO
-                        if "error_code" in response:
-                            log_level = logging.WARNING
-                            increment_pool_stats(
-                                self.pool_state,
-                                pool_config.p2_singleton_puzzle_hash,
-                                "pool_errors",
-                                time.time(),
-                                value=response,
-                            )
-                        self.log.log(log_level, f"PUT /farmer response: {response}")
-                    else:
-                        self.handle_failed_pool_response(
+            session = self.pool_sessions.get(pool_config.pool_url)
+            async with session.put(
+                f"{pool_config.pool_url}/farmer",
+                json=put_farmer_request.to_json_dict(),
+                ssl=self.pool_sessions.ssl_context,
+            ) as resp:
+                if resp.ok:
+                    response: dict[str, Any] = json.loads(await resp.text())
+                    log_level = logging.INFO
+                    if "error_code" in response:
+                        log_level = logging.WARNING
+                        increment_pool_stats(
+                            self.pool_state,
                             pool_config.p2_singleton_puzzle_hash,
-                            f"Error in PUT /farmer {pool_config.pool_url}, {resp.status}",
+                            "pool_errors",
+                            time.time(),
+                            value=response,
                         )
+                    self.log.log(log_level, f"PUT /farmer response: {response}")
+                else:
+                    self.handle_failed_pool_response(
+                        pool_config.p2_singleton_puzzle_hash,
+                        f"Error in PUT /farmer {pool_config.pool_url}, {resp.status}",
+                    )
         except Exception as e:
             self.handle_failed_pool_response(
                 pool_config.p2_singleton_puzzle_hash, f"Exception in PUT /farmer {pool_config.pool_url}, {e}"
@@ -527,143 +559,183 @@ class Farmer:
         return auth_sk
 
     async def update_pool_state(self) -> None:
+        """
+        Refreshes the state of all the configured pools concurrently, each with a timeout, so an unresponsive pool
+        doesn't hold up the others.
+        """
         config = load_config(self._root_path, "config.yaml")
 
         pool_config_list: list[PoolWalletConfig] = load_pool_config(self._root_path)
-        for pool_config in pool_config_list:
-            p2_singleton_puzzle_hash = pool_config.p2_singleton_puzzle_hash
+        # GET /pool_info is only requested once per pool URL in a refresh
+        pool_info_requests: dict[str, asyncio.Task[GetPoolInfoResult | None]] = {}
 
+        async def update_with_timeout(pool_config: PoolWalletConfig) -> None:
             try:
-                authentication_sk: PrivateKey | None = self.get_authentication_sk(pool_config)
-
-                if authentication_sk is None:
-                    self.log.error(f"Could not find authentication sk for {p2_singleton_puzzle_hash}")
-                    continue
-
-                if p2_singleton_puzzle_hash not in self.pool_state:
-                    self.pool_state[p2_singleton_puzzle_hash] = {
-                        "p2_singleton_puzzle_hash": p2_singleton_puzzle_hash.hex(),
-                        "points_found_since_start": 0,
-                        "points_found_24h": [],
-                        "points_acknowledged_since_start": 0,
-                        "points_acknowledged_24h": [],
-                        "next_farmer_update": 0,
-                        "next_pool_info_update": 0,
-                        "current_points": 0,
-                        "current_difficulty": None,
-                        "pool_errors_24h": [],
-                        "valid_partials_since_start": 0,
-                        "valid_partials_24h": [],
-                        "invalid_partials_since_start": 0,
-                        "invalid_partials_24h": [],
-                        "insufficient_partials_since_start": 0,
-                        "insufficient_partials_24h": [],
-                        "stale_partials_since_start": 0,
-                        "stale_partials_24h": [],
-                        "missing_partials_since_start": 0,
-                        "missing_partials_24h": [],
-                        "authentication_token_timeout": None,
-                        "plot_count": 0,
-                        "pool_config": pool_config,
-                    }
-                    self.log.info(f"Added pool: {pool_config}")
+                await asyncio.wait_for(
+                    self._update_single_pool_state(config, pool_config, pool_info_requests),
+                    timeout=POOL_STATE_UPDATE_TIMEOUT,
+                )
+            except asyncio.TimeoutError:
+                self.handle_failed_pool_response(
+                    pool_config.p2_singleton_puzzle_hash,
+                    f"Timed out updating the pool state from {pool_config.pool_url}",
+                )
+
+        try:
+            await asyncio.gather(*(update_with_timeout(pool_config) for pool_config in pool_config_list))
+        finally:
+            for request in pool_info_requests.values():
+                request.cancel()
+
+        await self.pool_sessions.close_unused({pool_config.pool_url for pool_config in pool_config_list})
+
+    async def _update_single_pool_state(
+        self,
+        config: dict[str, Any],
+        pool_config: PoolWalletConfig,
+        pool_info_requests: dict[str, asyncio.Task[GetPoolInfoResult | None]],
+    ) -> None:
+        p2_singleton_puzzle_hash = pool_config.p2_singleton_puzzle_hash
+
+        try:
+            authentication_sk: PrivateKey | None = self.get_authentication_sk(pool_config)
+
+            if authentication_sk is None:
+                self.log.error(f"Could not find authentication sk for {p2_singleton_puzzle_hash}")
+                return
+
+            if p2_singleton_puzzle_hash not in self.pool_state:
+                self.pool_state[p2_singleton_puzzle_hash] = {
+                    "p2_singleton_puzzle_hash": p2_singleton_puzzle_hash.hex(),
+                    "points_found_since_start": 0,
+                    "points_found_24h": [],
+                    "points_acknowledged_since_start": 0,
+                    "points_acknowledged_24h": [],
+                    "next_farmer_update": 0,
+                    "next_pool_info_update": 0,
+                    "current_points": 0,
+                    "current_difficulty": None,
+                    "pool_errors_24h": [],
+                    "valid_partials_since_start": 0,
+                    "valid_partials_24h": [],
+                    "invalid_partials_since_start": 0,
+                    "invalid_partials_24h": [],
+                    "insufficient_partials_since_start": 0,
+                    "insufficient_partials_24h": [],
+                    "stale_partials_since_start": 0,
+                    "stale_partials_24h": [],
+                    "missing_partials_since_start": 0,
+                    "missing_partials_24h": [],
+                    "partial_latency_24h": [],
+                    "authentication_token_timeout": None,
+                    "plot_count": 0,
+                    "pool_config": pool_config,
+                }
+                self.log.info(f"Added pool: {pool_config}")
+            else:
+                self.pool_state[p2_singleton_puzzle_hash]["pool_config"] = pool_config
+
+            pool_state = self.pool_state[p2_singleton_puzzle_hash]
+
+            # Skip state update when self pooling
+            if pool_config.pool_url == "":
+                return
+
+            enforce_https = config["full_node"]["selected_network"] == "mainnet"
+            if enforce_https and not pool_config.pool_url.startswith("https://"):
+                self.log.error(f"Pool URLs must be HTTPS on mainnet {pool_config.pool_url}")
+                return
+
+            # TODO: Improve error handling below, inform about unexpected failures
+            if time.time() >= pool_state["next_pool_info_update"]:
+                pool_state["next_pool_info_update"] = time.time() + jittered_interval(UPDATE_POOL_INFO_INTERVAL)
+                # Makes a GET request to the pool to get the updated information, unless another pool with the
+                # same URL already did in this refresh
+                pool_info_request = pool_info_requests.get(pool_config.pool_url)
+                shared_request = pool_info_request is not None
+                if pool_info_request is None:
+                    pool_info_request = create_referenced_task(self._pool_get_pool_info(pool_config))
+                    pool_info_requests[pool_config.pool_url] = pool_info_request
+                # a timeout of this pool's update mustn't cancel the request for the others
+                pool_info_result = await asyncio.shield(pool_info_request)
+                if pool_info_result is None and shared_request:
+                    self.handle_failed_pool_response(
+                        p2_singleton_puzzle_hash, f"Error in GET /pool_info {pool_config.pool_url}"
+                    )
+                if pool_info_result is not None and "error_code" not in pool_info_result.pool_info:
+                    pool_info = pool_info_result.pool_info
+                    pool_state["authentication_token_timeout"] = pool_info["authentication_token_timeout"]
+                    # Only update the first time from GET /pool_info, gets updated from GET /farmer later
+                    if pool_state["current_difficulty"] is None:
+                        pool_state["current_difficulty"] = pool_info["minimum_difficulty"]
                 else:
-                    self.pool_state[p2_singleton_puzzle_hash]["pool_config"] = pool_config
-
-                pool_state = self.pool_state[p2_singleton_puzzle_hash]
-
-                # Skip state update when self pooling
-                if pool_config.pool_url == "":
-                    continue
-
-                enforce_https = config["full_node"]["selected_network"] == "mainnet"
-                if enforce_https and not pool_config.pool_url.startswith("https://"):
-                    self.log.error(f"Pool URLs must be HTTPS on mainnet {pool_config.pool_url}")
-                    continue
-
-                # TODO: Improve error handling below, inform about unexpected failures
-                if time.time() >= pool_state["next_pool_info_update"]:
-                    pool_state["next_pool_info_update"] = time.time() + UPDATE_POOL_INFO_INTERVAL
-                    # Makes a GET request to the pool to get the updated information
-                    pool_info_result = await self._pool_get_pool_info(pool_config)
-                    if pool_info_result is not None and "error_code" not in pool_info_result.pool_info:
-                        pool_info = pool_info_result.pool_info
-                        pool_state["authentication_token_timeout"] = pool_info["authentication_token_timeout"]
-                        # Only update the first time from GET /pool_info, gets updated from GET /farmer later
-                        if pool_state["current_difficulty"] is None:
-                            pool_state["current_difficulty"] = pool_info["minimum_difficulty"]
-                    else:
-                        pool_state["next_pool_info_update"] = time.time() + UPDATE_POOL_INFO_FAILURE_RETRY_INTERVAL
-
-                    if pool_info_result is not None and pool_info_result.new_pool_url is not None:
-                        update_pool_url(self._root_path, pool_config, pool_info_result.new_pool_url)
-
-                if time.time() >= pool_state["next_farmer_update"]:
-                    pool_state["next_farmer_update"] = time.time() + UPDATE_POOL_FARMER_INFO_INTERVAL
-                    authentication_token_timeout = pool_state["authentication_token_timeout"]
-
-                    async def update_pool_farmer_info() -> tuple[GetFarmerResponse | None, PoolErrorCode | None]:
-                        # Run a GET /farmer to see if the farmer is already known by the pool
-                        response = await self._pool_get_farmer(
-                            pool_config, authentication_token_timeout, authentication_sk
-                        )
-                        farmer_response: GetFarmerResponse | None = None
-                        error_code_response: PoolErrorCode | None = None
-                        if response is not None:
-                            if "error_code" not in response:
-                                farmer_response = GetFarmerResponse.from_json_dict(response)
-                                if farmer_response is not None:
-                                    pool_state["current_difficulty"] = farmer_response.current_difficulty
-                                    pool_state["current_points"] = farmer_response.current_points
-                            else:
-                                try:
-                                    error_code_response = PoolErrorCode(response["error_code"])
-                                except ValueError:
-                                    self.log.error(
-                                        f"Invalid error code received from the pool: {response['error_code']}"
-                                    )
-
-                        return farmer_response, error_code_response
-
-                    if authentication_token_timeout is not None:
-                        farmer_info, error_code = await update_pool_farmer_info()
-                        if error_code == PoolErrorCode.FARMER_NOT_KNOWN:
-                            # Make the farmer known on the pool with a POST /farmer
-                            owner_sk_and_index = find_owner_sk(self.all_root_sks, pool_config.owner_public_key)
-                            assert owner_sk_and_index is not None
-                            post_response = await self._pool_post_farmer(
-                                pool_config, authentication_token_timeout, owner_sk_and_index[0]
-                            )
-                            if post_response is not None and "error_code" not in post_response:
-                                self.log.info(
-                                    f"Welcome message from {pool_config.pool_url}: {post_response['welcome_message']}"
-                                )
-                                # Now we should be able to update the local farmer info
-                                farmer_info, farmer_is_known = await update_pool_farmer_info()
-                                if farmer_info is None and not farmer_is_known:
-                                    self.log.error("Failed to update farmer info after POST /farmer.")
-
-                        # Update the farmer information on the pool if the payout instructions changed or if the
-                        # signature is invalid (latter to make sure the pool has the correct authentication public key).
-                        payout_instructions_update_required: bool = (
-                            farmer_info is not None
-                            and pool_config.payout_instructions.lower() != farmer_info.payout_instructions.lower()
+                    pool_state["next_pool_info_update"] = time.time() + jittered_interval(
+                        UPDATE_POOL_INFO_FAILURE_RETRY_INTERVAL
+                    )
+
+                if pool_info_result is not None and pool_info_result.new_pool_url is not None:
+                    update_pool_url(self._root_path, pool_config, pool_info_result.new_pool_url)
+
+            if time.time() >= pool_state["next_farmer_update"]:
+                pool_state["next_farmer_update"] = time.time() + jittered_interval(UPDATE_POOL_FARMER_INFO_INTERVAL)
+                authentication_token_timeout = pool_state["authentication_token_timeout"]
+
+                async def update_pool_farmer_info() -> tuple[GetFarmerResponse | None, PoolErrorCode | None]:
+                    # Run a GET /farmer to see if the farmer is already known by the pool
+                    response = await self._pool_get_farmer(pool_config, authentication_token_timeout, authentication_sk)
+                    farmer_response: GetFarmerResponse | None = None
+                    error_code_response: PoolErrorCode | None = None
+                    if response is not None:
+                        if "error_code" not in response:
+                            farmer_response = GetFarmerResponse.from_json_dict(response)
+                            if farmer_response is not None:
+                                pool_state["current_difficulty"] = farmer_response.current_difficulty
+                                pool_state["current_points"] = farmer_response.current_points
+                        else:
+                            try:
+                                error_code_response = PoolErrorCode(response["error_code"])
+                            except ValueError:
+                                self.log.error(f"Invalid error code received from the pool: {response['error_code']}")
+
+                    return farmer_response, error_code_response
+
+                if authentication_token_timeout is not None:
+                    farmer_info, error_code = await update_pool_farmer_info()
+                    if error_code == PoolErrorCode.FARMER_NOT_KNOWN:
+                        # Make the farmer known on the pool with a POST /farmer
+                        owner_sk_and_index = find_owner_sk(self.all_root_sks, pool_config.owner_public_key)
+                        assert owner_sk_and_index is not None
+                        post_response = await self._pool_post_farmer(
+                            pool_config, authentication_token_timeout, owner_sk_and_index[0]
                         )
-                        if payout_instructions_update_required or error_code == PoolErrorCode.INVALID_SIGNATURE:
-                            owner_sk_and_index = find_owner_sk(self.all_root_sks, pool_config.owner_public_key)
-                            assert owner_sk_and_index is not None
-                            await self._pool_put_farmer(
-                                pool_config, authentication_token_timeout, owner_sk_and_index[0]
+                        if post_response is not None and "error_code" not in post_response:
+                            self.log.info(
+                                f"Welcome message from {pool_config.pool_url}: {post_response['welcome_message']}"
                             )
-                    else:
-                        self.log.warning(
-                            f"No pool specific authentication_token_timeout has been set for {p2_singleton_puzzle_hash}"
-                            f", check communication with the pool."
-                        )
+                            # Now we should be able to update the local farmer info
+                            farmer_info, farmer_is_known = await update_pool_farmer_info()
+                            if farmer_info is None and not farmer_is_known:
+                                self.log.error("Failed to update farmer info after POST /farmer.")
+
+                    # Update the farmer information on the pool if the payout instructions changed or if the
+                    # signature is invalid (latter to make sure the pool has the correct authentication public key).
+                    payout_instructions_update_required: bool = (
+                        farmer_info is not None
+                        and pool_config.payout_instructions.lower() != farmer_info.payout_instructions.lower()
+                    )
+                    if payout_instructions_update_required or error_code == PoolErrorCode.INVALID_SIGNATURE:
+                        owner_sk_and_index = find_owner_sk(self.all_root_sks, pool_config.owner_public_key)
+                        assert owner_sk_and_index is not None
+                        await self._pool_put_farmer(pool_config, authentication_token_timeout, owner_sk_and_index[0])
+                else:
+                    self.log.warning(
+                        f"No pool specific authentication_token_timeout has been set for {p2_singleton_puzzle_hash}"
+                        f", check communication with the pool."
+                    )
 
-            except Exception as e:
-                tb = traceback.format_exc()
-                self.log.error(f"Exception in update_pool_state for {pool_config.pool_url}, {e} {tb}")
+        except Exception as e:
+            tb = traceback.format_exc()
+            self.log.error(f"Exception in update_pool_state for {pool_config.pool_url}, {e} {tb}")
 
     def get_public_keys(self) -> list[G1Element]:
         return [child_sk.get_g1() for child_sk in self._private_keys]
@@ -5,7 +5,6 @@ import logging
 import time
 from typing import TYPE_CHECKING, Any, ClassVar
 
-import aiohttp
 from chia_rs import AugSchemeMPL, G2Element, PlotParam, PoolTarget, PrivateKey, ProofOfSpace
 from chia_rs.sized_bytes import bytes32
 from chia_rs.sized_ints import uint8, uint16, uint32, uint64
@@ -19,6 +18,7 @@ from chia.protocols import farmer_protocol, harvester_protocol
 from chia.protocols.farmer_protocol import DeclareProofOfSpace, SignedValues
 from chia.protocols.harvester_protocol import (
     PartialProofsData,
+    PlotSyncDigest,
     PlotSyncDone,
     PlotSyncPathList,
     PlotSyncPlotList,
@@ -37,9 +37,7 @@ from chia.protocols.pool_protocol import (
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.solver_protocol import SolverInfo, SolverResponse
 from chia.server.api_protocol import ApiMetadata
-from chia.server.server import ssl_context_for_root
 from chia.server.ws_connection import WSChiaConnection
-from chia.ssl.create_ssl import get_mozilla_ca_crt
 from chia.types.blockchain_format.proof_of_space import (
     calculate_prefix_bits,
     generate_plot_public_key,
@@ -362,87 +360,94 @@ class FarmerAPI:
                 )
                 self.farmer.log.debug(f"POST /partial request {post_partial_request}")
                 try:
-                    async with aiohttp.ClientSession() as session:
-                        async with session.post(
-                            f"{pool_url}/partial",
-                            json=post_partial_request.to_json_dict(),
-                            ssl=ssl_context_for_root(get_mozilla_ca_crt(), log=self.farmer.log),
-                            headers={
-                                "User-Agent": f"Chia Blockchain v.{__version__}",
-                                "chia-farmer-version": __version__,
-                                "chia-harvester-version": peer.version,
-                            },
-                        ) as resp:
-                            if not resp.ok:
-                                self.farmer.log.error(f"Error sending partial to {pool_url}, {resp.status}")
+                    session = self.farmer.pool_sessions.get(pool_url)
+                    submit_start = time.monotonic()
+                    async with session.post(
+                        f"{pool_url}/partial",
+                        json=post_partial_request.to_json_dict(),
+                        ssl=self.farmer.pool_sessions.ssl_context,
+                        headers={
+                            "User-Agent": f"Chia Blockchain v.{__version__}",
+                            "chia-farmer-version": __version__,
+                            "chia-harvester-version": peer.version,
+                        },
+                    ) as resp:
+                        increment_pool_stats(
+                            self.farmer.pool_state,
+                            p2_singleton_puzzle_hash,
+                            "partial_latency",
+                            time.time(),
+                            value=time.monotonic() - submit_start,
+                        )
+                        if not resp.ok:
+                            self.farmer.log.error(f"Error sending partial to {pool_url}, {resp.status}")
+                            increment_pool_stats(
+                                self.farmer.pool_state,
+                                p2_singleton_puzzle_hash,
+                                "invalid_partials",
+                                time.time(),
+                            )
+                            return
+
+                        pool_response: dict[str, Any] = json.loads(await resp.text())
+                        self.farmer.log.info(f"Pool response: {pool_response}")
+                        if "error_code" in pool_response:
+                            self.farmer.log.error(
+                                f"Error in pooling: {pool_response['error_code'], pool_response['error_message']}"
+                            )
+
+                            increment_pool_stats(
+                                self.farmer.pool_state,
+                                p2_singleton_puzzle_hash,
+                                "pool_errors",
+                                time.time(),
+                                value=pool_response,
+                            )
+
+                            if pool_response["error_code"] == PoolErrorCode.TOO_LATE.value:
                                 increment_pool_stats(
                                     self.farmer.pool_state,
                                     p2_singleton_puzzle_hash,
-                                    "invalid_partials",
+                                    "stale_partials",
                                     time.time(),
                                 )
-                                return
-
-                            pool_response: dict[str, Any] = json.loads(await resp.text())
-                            self.farmer.log.info(f"Pool response: {pool_response}")
-                            if "error_code" in pool_response:
+                            elif pool_response["error_code"] == PoolErrorCode.PROOF_NOT_GOOD_ENOUGH.value:
                                 self.farmer.log.error(
-                                    f"Error in pooling: {pool_response['error_code'], pool_response['error_message']}"
+                                    "Partial not good enough, forcing pool farmer update to get our current difficulty."
                                 )
-
                                 increment_pool_stats(
                                     self.farmer.pool_state,
                                     p2_singleton_puzzle_hash,
-                                    "pool_errors",
+                                    "insufficient_partials",
                                     time.time(),
-                                    value=pool_response,
                                 )
+                                pool_state_dict["next_farmer_update"] = 0
+                                await self.farmer.update_pool_state()
+                            else:
+                                increment_pool_stats(
+                                    self.farmer.pool_state,
+                                    p2_singleton_puzzle_hash,
+                                    "invalid_partials",
+                                    time.time(),
+                                )
+                            return
 
-                                if pool_response["error_code"] == PoolErrorCode.TOO_LATE.value:
-                                    increment_pool_stats(
-                                        self.farmer.pool_state,
-                                        p2_singleton_puzzle_hash,
-                                        "stale_partials",
-                                        time.time(),
-                                    )
-                                elif pool_response["error_code"] == PoolErrorCode.PROOF_NOT_GOOD_ENOUGH.value:
-                                    self.farmer.log.error(
-                                        "Partial not good enough, forcing pool farmer update to "
-                                        "get our current difficulty."
-                                    )
-                                    increment_pool_stats(
-                                        self.farmer.pool_state,
-                                        p2_singleton_puzzle_hash,
-                                        "insufficient_partials",
-                                        time.time(),
-                                    )
-                                    pool_state_dict["next_farmer_update"] = 0
-                                    await self.farmer.update_pool_state()
-                                else:
-                                    increment_pool_stats(
-                                        self.farmer.pool_state,
-                                        p2_singleton_puzzle_hash,
-                                        "invalid_partials",
-                                        time.time(),
-                                    )
-                                return
-
-                            increment_pool_stats(
-                                self.farmer.pool_state,
-                                p2_singleton_puzzle_hash,
-                                "valid_partials",
-                                time.time(),
-                            )
-                            new_difficulty = pool_response["new_difficulty"]
-                            increment_pool_stats(
-                                self.farmer.pool_state,
-                                p2_singleton_puzzle_hash,
-                                "points_acknowledged",
-                                time.time(),
-                                new_difficulty,
-                                new_difficulty,
-                            )
-                            pool_state_dict["current_difficulty"] = new_difficulty
+                        increment_pool_stats(
+                            self.farmer.pool_state,
+                            p2_singleton_puzzle_hash,
+                            "valid_partials",
+                            time.time(),
+                        )
+                        new_difficulty = pool_response["new_difficulty"]
+                        increment_pool_stats(
+                            self.farmer.pool_state,
+                            p2_singleton_puzzle_hash,
+                            "points_acknowledged",
+                            time.time(),
+                            new_difficulty,
+                            new_difficulty,
+                        )
+                        pool_state_dict["current_difficulty"] = new_difficulty
                 except Exception as e:
                     self.farmer.log.error(f"Error connecting to pool: {e}")
 
@@ -792,6 +797,10 @@ class FarmerAPI:
     async def plot_sync_duplicates(self, message: PlotSyncPathList, peer: WSChiaConnection) -> None:
         await self.farmer.plot_sync_receivers[peer.peer_node_id].process_duplicates(message)
 
+    @metadata.request(peer_required=True)
+    async def plot_sync_digest(self, message: PlotSyncDigest, peer: WSChiaConnection) -> None:
+        await self.farmer.plot_sync_receivers[peer.peer_node_id].process_digest(message)
+
     @metadata.request(peer_required=True)
     async def plot_sync_done(self, message: PlotSyncDone, peer: WSChiaConnection) -> None:
         await self.farmer.plot_sync_receivers[peer.peer_node_id].sync_done(message)
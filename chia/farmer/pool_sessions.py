@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import logging
+import ssl
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from chia.server.server import ssl_context_for_root
+from chia.ssl.create_ssl import get_mozilla_ca_crt
+
+# the number of concurrent connections to each pool, further requests wait for
+# a connection to be released
+POOL_CONNECTION_LIMIT = 8
+# idle connections are kept open this long (in seconds) to be reused
+POOL_KEEPALIVE_TIMEOUT = 60.0
+
+
+@dataclass
+class PoolSessions:
+    """
+    HTTP client sessions for talking to pools, one per pool URL. Each session
+    keeps its connections alive between requests, so partials and farmer
+    updates don't pay for a new TCP connection and TLS handshake every time,
+    and the CA bundle is only loaded once.
+    """
+
+    log: logging.Logger
+    _sessions: dict[str, aiohttp.ClientSession] = field(default_factory=dict)
+    _ssl_context: ssl.SSLContext | None = None
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = ssl_context_for_root(get_mozilla_ca_crt(), log=self.log)
+        return self._ssl_context
+
+    def get(self, pool_url: str) -> aiohttp.ClientSession:
+        session = self._sessions.get(pool_url)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=POOL_CONNECTION_LIMIT, keepalive_timeout=POOL_KEEPALIVE_TIMEOUT, ssl=self.ssl_context
+            )
+            session = aiohttp.ClientSession(connector=connector, trust_env=True)
+            self._sessions[pool_url] = session
+        return session
+
+    async def close_unused(self, pool_urls: set[str]) -> None:
+        """
+        Closes the sessions of pools that aren't in pool_urls anymore.
+        """
+        for pool_url in list(self._sessions.keys()):
+            if pool_url not in pool_urls:
+                await self._sessions.pop(pool_url).close()
+
+    async def close(self) -> None:
+        await self.close_unused(set())
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import dataclasses
 import logging
+import random
 import sqlite3
 from contextlib import AbstractAsyncContextManager
 
@@ -35,12 +36,70 @@ def decompress_blob(block_bytes: bytes) -> bytes:
     return ret
 
 
+@dataclasses.dataclass
+class HeightSet:
+    """
+    A set of block heights that supports adding, removing and sampling k
+    random heights in O(1) and O(k) time. The heights are kept in a list, and
+    a removed height is swapped with the last one.
+    """
+
+    _heights: list[int] = dataclasses.field(default_factory=list)
+    _positions: dict[int, int] = dataclasses.field(default_factory=dict)
+    # no height in the set is above this
+    _max_height: int = -1
+
+    def __len__(self) -> int:
+        return len(self._heights)
+
+    def __contains__(self, height: int) -> bool:
+        return height in self._positions
+
+    def add(self, height: int) -> None:
+        if height in self._positions:
+            return
+        self._positions[height] = len(self._heights)
+        self._heights.append(height)
+        self._max_height = max(self._max_height, height)
+
+    def discard(self, height: int) -> None:
+        pos = self._positions.pop(height, None)
+        if pos is None:
+            return
+        last = self._heights.pop()
+        if last != height:
+            self._heights[pos] = last
+            self._positions[last] = pos
+
+    def discard_above(self, height: int) -> None:
+        if self._max_height - height < len(self._heights):
+            for h in range(height + 1, self._max_height + 1):
+                self.discard(h)
+        else:
+            for h in [h for h in self._heights if h > height]:
+                self.discard(h)
+        self._max_height = min(self._max_height, height)
+
+    def sample(self, number: int) -> list[int]:
+        return random.sample(self._heights, min(number, len(self._heights)))
+
+
 @typing_extensions.final
 @dataclasses.dataclass
 class BlockStore:
     block_cache: LRUCache[bytes32, FullBlock]
     db_wrapper: DBWrapper2
     ses_challenge_cache: LRUCache[bytes32, list[SubEpochChallengeSegment]]
+    # the heights of the main chain blocks that aren't fully compactified.
+    # This is only loaded (and then kept up to date) once it's first sampled
+    # from, since most nodes never do. Changes are applied as they're written,
+    # so the set is dropped (and loaded again) once a transaction is rolled
+    # back. Heights that stopped being candidates behind the store's back are
+    # removed when they're sampled
+    _uncompactified: HeightSet | None = dataclasses.field(default=None, repr=False)
+    # the rollback count of the DB wrapper when _uncompactified was last known
+    # to be in sync with the DB
+    _uncompactified_rollback_count: int = dataclasses.field(default=0, repr=False)
 
     @classmethod
     async def create(cls, db_wrapper: DBWrapper2, *, use_cache: bool = True) -> BlockStore:
@@ -101,9 +160,18 @@ class BlockStore:
 
         return self
 
+    def _get_uncompactified(self) -> HeightSet | None:
+        if self._uncompactified is not None and self.db_wrapper.rollback_count != self._uncompactified_rollback_count:
+            # the set may have been updated by writes that were rolled back
+            self._uncompactified = None
+        return self._uncompactified
+
     async def rollback(self, height: int) -> None:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
             await conn.execute("UPDATE full_blocks SET in_main_chain=0 WHERE height>? AND in_main_chain=1", (height,))
+            uncompactified = self._get_uncompactified()
+            if uncompactified is not None:
+                uncompactified.discard_above(height)
 
     async def set_in_chain(self, header_hashes: list[tuple[bytes32]]) -> None:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
@@ -113,6 +181,20 @@ class BlockStore:
                 if cursor.rowcount != len(header_hashes):
                     raise RuntimeError(f"The blockchain database is corrupt. All of {header_hashes} should exist")
 
+            uncompactified = self._get_uncompactified()
+            if uncompactified is not None:
+                for batch in to_batches(header_hashes, self.db_wrapper.host_parameter_limit):
+                    async with conn.execute(
+                        "SELECT height, is_fully_compactified FROM full_blocks "
+                        f"WHERE header_hash in ({'?,' * (len(batch.entries) - 1)}?)",
+                        [header_hash for (header_hash,) in batch.entries],
+                    ) as cursor:
+                        for height, compactified in await cursor.fetchall():
+                            if compactified:
+                                uncompactified.discard(height)
+                            else:
+                                uncompactified.add(height)
+
     async def replace_proof(self, header_hash: bytes32, block: FullBlock) -> None:
         assert header_hash == block.header_hash
 
@@ -129,6 +211,13 @@ class BlockStore:
                     header_hash,
                 ),
             )
+            uncompactified = self._get_uncompactified()
+            if uncompactified is not None and block.is_fully_compactified():
+                row = await execute_fetchone(
+                    conn, "SELECT in_main_chain FROM full_blocks WHERE header_hash=?", (header_hash,)
+                )
+                if row is not None and row[0]:
+                    uncompactified.discard(block.height)
 
     async def add_full_block(self, header_hash: bytes32, block: FullBlock, block_record: BlockRecord) -> None:
         self.block_cache.put(header_hash, block)
@@ -542,16 +631,42 @@ class BlockStore:
         return bool(row[0])
 
     async def get_random_not_compactified(self, number: int) -> list[int]:
-        async with self.db_wrapper.reader_no_transaction() as conn:
-            async with conn.execute(
-                f"SELECT height FROM full_blocks WHERE in_main_chain=1 AND is_fully_compactified=0 "
-                f"ORDER BY RANDOM() LIMIT {number}"
-            ) as cursor:
-                rows = await cursor.fetchall()
+        uncompactified = self._get_uncompactified()
+        if uncompactified is None:
+            # hold the writer, so no changes are missed while loading
+            async with self.db_wrapper.writer_maybe_transaction() as conn:
+                async with conn.execute(
+                    "SELECT height FROM full_blocks WHERE in_main_chain=1 AND is_fully_compactified=0"
+                ) as cursor:
+                    uncompactified = HeightSet()
+                    for row in await cursor.fetchall():
+                        uncompactified.add(int(row[0]))
+                self._uncompactified = uncompactified
+                self._uncompactified_rollback_count = self.db_wrapper.rollback_count
+            log.info(f"Loaded {len(uncompactified)} uncompactified block heights")
 
-        heights = [int(row[0]) for row in rows]
+        heights = uncompactified.sample(number)
+        if len(heights) == 0:
+            return []
 
-        return heights
+        # make sure the sampled heights are still candidates
+        candidates: set[int] = set()
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            for batch in to_batches(heights, self.db_wrapper.host_parameter_limit):
+                # only filtering on the height, to look the rows up by it
+                async with conn.execute(
+                    "SELECT height, in_main_chain, is_fully_compactified FROM full_blocks "
+                    f"WHERE height in ({'?,' * (len(batch.entries) - 1)}?)",
+                    batch.entries,
+                ) as cursor:
+                    for height, in_main_chain, compactified in await cursor.fetchall():
+                        if in_main_chain and not compactified:
+                            candidates.add(int(height))
+
+        for height in heights:
+            if height not in candidates:
+                uncompactified.discard(height)
+        return [height for height in heights if height in candidates]
 
     async def count_compactified_blocks(self) -> int:
         # DB V2 has an index on is_fully_compactified only for blocks in the main chain
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import contextlib
 import dataclasses
+import heapq
 import logging
 import sqlite3
 import time
-from collections.abc import Collection
+from collections.abc import AsyncIterator, Collection
 from typing import Any, ClassVar
 
 import typing_extensions
@@ -20,6 +22,30 @@ from chia.util.db_wrapper import SQLITE_MAX_VARIABLE_NUMBER, DBWrapper2
 
 log = logging.getLogger(__name__)
 
+# when streaming the results of a query, rows are fetched this many at a time
+FETCH_CHUNK_SIZE = 1000
+
+
+async def fetch_rows(cursor: Cursor, chunk_size: int = FETCH_CHUNK_SIZE) -> AsyncIterator[sqlite3.Row]:
+    """
+    Yields the rows of a query, fetching them a chunk at a time rather than
+    all at once.
+    """
+    while True:
+        rows = list(await cursor.fetchmany(chunk_size))
+        if len(rows) == 0:
+            return
+        for row in rows:
+            yield row
+
+
+def coin_state_height(coin_state: CoinState) -> int:
+    """
+    The height the coin was last changed at, i.e. when it was spent (or created,
+    if it's unspent).
+    """
+    return max(coin_state.created_height or 0, coin_state.spent_height or 0)
+
 
 @typing_extensions.final
 @dataclasses.dataclass
@@ -300,7 +326,7 @@ class CoinStore:
                 f"{'' if include_spent_coins else 'AND spent_index <= 0'}",
                 (*puzzle_hashes_db, start_height, end_height),
             ) as cursor:
-                for row in await cursor.fetchall():
+                async for row in fetch_rows(cursor):
                     coin = self.row_to_coin(row)
                     spent_index = uint32(0) if row[1] <= 0 else uint32(row[1])
                     coins.add(CoinRecord(coin, row[0], spent_index, row[2] != 0, row[6]))
@@ -369,7 +395,7 @@ class CoinStore:
                     (*puzzle_hashes_db, min_height, min_height, max_items - len(coins)),
                 ) as cursor:
                     row: sqlite3.Row
-                    for row in await cursor.fetchall():
+                    async for row in fetch_rows(cursor):
                         coins.add(self.row_to_coin_state(row))
 
                 if len(coins) >= max_items:
@@ -434,7 +460,7 @@ class CoinStore:
                     " LIMIT ?",
                     (*coin_ids_db, min_height, min_height, max_items - len(coins)),
                 ) as cursor:
-                    for row in await cursor.fetchall():
+                    async for row in fetch_rows(cursor):
                         coins.append(self.row_to_coin_state(row))
                 if len(coins) >= max_items:
                     break
@@ -466,76 +492,32 @@ class CoinStore:
         if len(puzzle_hashes) == 0:
             return [], None
 
-        # Coin states are keyed by coin id to filter out and prevent duplicates.
-        coin_states_dict: dict[bytes32, CoinState] = dict()
-        coin_states: list[CoinState]
+        if not include_spent and not include_unspent:
+            # There are no coins which are both spent and unspent, so we're finished.
+            return [], None
 
+        # Only the first max_items + 1 coin states are needed, the last one is
+        # the start of the next batch.
+        coin_states: list[CoinState] = []
+        queries, parameters = self._coin_states_by_puzzle_hashes_queries(
+            puzzle_hashes,
+            min_height=min_height,
+            include_spent=include_spent,
+            include_unspent=include_unspent,
+            include_hinted=include_hinted,
+            min_amount=min_amount,
+            limit=max_items + 1,
+        )
         async with self.db_wrapper.reader() as conn:
-            puzzle_hashes_db = tuple(puzzle_hashes)
-            puzzle_hash_count = len(puzzle_hashes_db)
-
-            require_spent = "spent_index>0"
-            require_unspent = "spent_index <= 0"
-            amount_filter = "AND amount>=? " if min_amount > 0 else ""
-
-            if include_spent and include_unspent:
-                height_filter = ""
-            elif include_spent:
-                height_filter = f"AND {require_spent}"
-            elif include_unspent:
-                height_filter = f"AND {require_unspent}"
-            else:
-                # There are no coins which are both spent and unspent, so we're finished.
-                return [], None
-
-            cursor = await conn.execute(
-                f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
-                f"coin_parent, amount, timestamp FROM coin_record INDEXED BY coin_puzzle_hash "
-                f"WHERE puzzle_hash in ({'?,' * (puzzle_hash_count - 1)}?) "
-                f"AND (confirmed_index>=? OR spent_index>=?) "
-                f"{height_filter} {amount_filter}"
-                f"ORDER BY MAX(confirmed_index, spent_index) ASC "
-                f"LIMIT ?",
-                (
-                    puzzle_hashes_db
-                    + (min_height, min_height)
-                    + ((min_amount.to_bytes(8, "big"),) if min_amount > 0 else ())
-                    + (max_items + 1,)
-                ),
-            )
-
-            for row in await cursor.fetchall():
-                coin_state = self.row_to_coin_state(row)
-                coin_states_dict[coin_state.coin.name()] = coin_state
-
-            if include_hinted:
-                cursor = await conn.execute(
-                    f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
-                    f"coin_parent, amount, timestamp FROM coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
-                    f"WHERE coin_name IN (SELECT coin_id FROM hints "
-                    f"WHERE hint IN ({'?,' * (puzzle_hash_count - 1)}?)) "
-                    f"AND (confirmed_index>=? OR spent_index>=?) "
-                    f"{height_filter} {amount_filter}"
-                    f"ORDER BY MAX(confirmed_index, spent_index) ASC "
-                    f"LIMIT ?",
-                    (
-                        puzzle_hashes_db
-                        + (min_height, min_height)
-                        + ((min_amount.to_bytes(8, "big"),) if min_amount > 0 else ())
-                        + (max_items + 1,)
-                    ),
-                )
-
-                for row in await cursor.fetchall():
-                    coin_state = self.row_to_coin_state(row)
-                    coin_states_dict[coin_state.coin.name()] = coin_state
-
-            coin_states = list(coin_states_dict.values())
-
-            if include_hinted:
-                coin_states.sort(key=lambda cr: max(cr.created_height or uint32(0), cr.spent_height or uint32(0)))
-                while len(coin_states) > max_items + 1:
-                    coin_states.pop()
+            async with contextlib.AsyncExitStack() as exit_stack:
+                streams: list[AsyncIterator[sqlite3.Row]] = []
+                for query in queries:
+                    cursor = await exit_stack.enter_async_context(conn.execute(query, parameters))
+                    streams.append(fetch_rows(cursor))
+                async for coin_state in self._merge_coin_states(streams):
+                    coin_states.append(coin_state)
+                    if len(coin_states) > max_items:
+                        break
 
         # If there aren't too many coin states, we've finished syncing these hashes.
         # There is no next height to start from, so return `None`.
@@ -543,21 +525,108 @@ class CoinStore:
             return coin_states, None
 
         # The last item is the start of the next batch of coin states.
-        next_coin_state = coin_states.pop()
-        next_height = uint32(max(next_coin_state.created_height or 0, next_coin_state.spent_height or 0))
+        next_height = uint32(coin_state_height(coin_states.pop()))
 
         # In order to prevent blocks from being split up between batches, remove
         # all coin states whose max height is the same as the last coin state's height.
-        while len(coin_states) > 0:
-            last_coin_state = coin_states[-1]
-            height = uint32(max(last_coin_state.created_height or 0, last_coin_state.spent_height or 0))
-            if height != next_height:
-                break
-
+        while len(coin_states) > 0 and coin_state_height(coin_states[-1]) == next_height:
             coin_states.pop()
 
         return coin_states, next_height
 
+    def _coin_states_by_puzzle_hashes_queries(
+        self,
+        puzzle_hashes: list[bytes32],
+        *,
+        min_height: uint32,
+        include_spent: bool,
+        include_unspent: bool,
+        include_hinted: bool,
+        min_amount: uint64,
+        limit: int,
+    ) -> tuple[list[str], tuple[Any, ...]]:
+        """
+        Returns the queries for the coin states of the coins with the puzzle
+        hashes (and the coins hinted with them), in order of
+        coin_state_height(), along with their parameters.
+        """
+        puzzle_hashes_db = tuple(puzzle_hashes)
+        puzzle_hash_count = len(puzzle_hashes_db)
+
+        require_spent = "spent_index>0"
+        require_unspent = "spent_index <= 0"
+        amount_filter = "AND amount>=? " if min_amount > 0 else ""
+
+        if include_spent and include_unspent:
+            height_filter = ""
+        elif include_spent:
+            height_filter = f"AND {require_spent}"
+        else:
+            height_filter = f"AND {require_unspent}"
+
+        parameters = (
+            puzzle_hashes_db
+            + (min_height, min_height)
+            + ((min_amount.to_bytes(8, "big"),) if min_amount > 0 else ())
+            + (limit,)
+        )
+        queries = [
+            (
+                f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
+                f"coin_parent, amount, timestamp FROM coin_record INDEXED BY coin_puzzle_hash "
+                f"WHERE puzzle_hash in ({'?,' * (puzzle_hash_count - 1)}?) "
+                f"AND (confirmed_index>=? OR spent_index>=?) "
+                f"{height_filter} {amount_filter}"
+                f"ORDER BY MAX(confirmed_index, spent_index) ASC "
+                f"LIMIT ?"
+            )
+        ]
+        if include_hinted:
+            queries.append(
+                f"SELECT confirmed_index, spent_index, coinbase, puzzle_hash, "
+                f"coin_parent, amount, timestamp FROM coin_record INDEXED BY sqlite_autoindex_coin_record_1 "
+                f"WHERE coin_name IN (SELECT coin_id FROM hints "
+                f"WHERE hint IN ({'?,' * (puzzle_hash_count - 1)}?)) "
+                f"AND (confirmed_index>=? OR spent_index>=?) "
+                f"{height_filter} {amount_filter}"
+                f"ORDER BY MAX(confirmed_index, spent_index) ASC "
+                f"LIMIT ?"
+            )
+        return queries, parameters
+
+    async def _merge_coin_states(self, streams: list[AsyncIterator[sqlite3.Row]]) -> AsyncIterator[CoinState]:
+        """
+        Merges the rows of queries ordered by coin_state_height() into coin
+        states in that order, without duplicates. Only the next row of each
+        query is held at a time.
+        """
+        # the next coin state of each stream, by height
+        heads: list[tuple[int, int, CoinState]] = []
+        for index, stream in enumerate(streams):
+            row = await anext(stream, None)
+            if row is not None:
+                coin_state = self.row_to_coin_state(row)
+                heapq.heappush(heads, (coin_state_height(coin_state), index, coin_state))
+
+        # a coin matching both its puzzle hash and a hint is in two streams, at
+        # the same height
+        current_height = -1
+        names_at_height: set[bytes32] = set()
+        while len(heads) > 0:
+            height, index, coin_state = heapq.heappop(heads)
+            if height != current_height:
+                current_height = height
+                names_at_height.clear()
+            name = coin_state.coin.name()
+            if name not in names_at_height:
+                names_at_height.add(name)
+                yield coin_state
+
+            row = await anext(streams[index], None)
+            if row is not None:
+                next_coin_state = self.row_to_coin_state(row)
+                heapq.heappush(heads, (coin_state_height(next_coin_state), index, next_coin_state))
+
     async def rollback_to_block(self, block_index: int) -> dict[bytes32, CoinRecord]:
         """
         Note that block_index can be negative, in which case everything is rolled back
@@ -146,18 +146,21 @@ class FeeStat:  # TxConfirmStats
         self.m_fee_rate_avg[bucket_index] += fee_rate
 
     def update_moving_averages(self) -> None:
-        for j in range(len(self.buckets)):
-            for i in range(len(self.confirmed_average)):
-                self.confirmed_average[i][j] *= self.decay
-                self.failed_average[i][j] *= self.decay
+        # this runs for every block, so each list is decayed in one go rather
+        # than one value at a time
+        decay = self.decay
+        for averages in (self.confirmed_average, self.failed_average):
+            for i, row in enumerate(averages):
+                averages[i] = [value * decay for value in row]
 
-            self.tx_ct_avg[j] *= self.decay
-            self.m_fee_rate_avg[j] *= self.decay
+        self.tx_ct_avg = [value * decay for value in self.tx_ct_avg]
+        self.m_fee_rate_avg = [value * decay for value in self.m_fee_rate_avg]
 
     def clear_current(self, block_height: uint32) -> None:
-        for i in range(len(self.buckets)):
-            self.old_unconfirmed_txs[i] += self.unconfirmed_txs[block_height % len(self.unconfirmed_txs)][i]
-            self.unconfirmed_txs[block_height % len(self.unconfirmed_txs)][i] = 0
+        block_index = block_height % len(self.unconfirmed_txs)
+        current = self.unconfirmed_txs[block_index]
+        self.old_unconfirmed_txs = [old + count for old, count in zip(self.old_unconfirmed_txs, current)]
+        self.unconfirmed_txs[block_index] = [0] * len(self.buckets)
 
     def new_mempool_tx(self, block_height: uint32, fee_rate: float) -> int:
         bucket_index: int = get_bucket_index(self.buckets, fee_rate)
@@ -229,6 +232,17 @@ class FeeStat:  # TxConfirmStats
         for i in range(len(self.m_fee_rate_avg)):
             self.m_fee_rate_avg[i] = float.fromhex(backup.m_fee_rate_avg[i])
 
+    def unconfirmed_by_bucket(self, conf_target: int, block_height: uint32) -> list[int]:
+        """
+        Returns the number of txs in each bucket that are still in the mempool
+        after conf_target blocks
+        """
+        bins = len(self.unconfirmed_txs)
+        still_unconfirmed = [
+            self.unconfirmed_txs[(block_height - conf_ct) % bins] for conf_ct in range(conf_target, self.max_confirms)
+        ]
+        return [sum(counts) for counts in zip(*still_unconfirmed, self.old_unconfirmed_txs)]
+
     # See TxConfirmStats::EstimateMedianVal in https://github.com/bitcoin/bitcoin/blob/master/src/policy/fees.cpp
     def estimate_median_val(
         self, conf_target: int, sufficient_tx_val: float, success_break_point: float, block_height: uint32
@@ -252,7 +266,6 @@ class FeeStat:  # TxConfirmStats
         best_far_bucket = max_bucket_index
 
         found_answer = False
-        bins = len(self.unconfirmed_txs)
         new_bucket_range = True
         passing = True
         pass_bucket: BucketResult = BucketResult(
@@ -271,30 +284,31 @@ class FeeStat:  # TxConfirmStats
             in_mempool=0.0,
             left_mempool=0.0,
         )
+        if period_target - 1 < 0 or period_target - 1 >= len(self.confirmed_average):
+            return EstimateResult(
+                requested_time=uint64(conf_target * SECONDS_PER_BLOCK),
+                pass_bucket=pass_bucket,
+                fail_bucket=fail_bucket,
+                median=-1.0,
+            )
+
+        confirmed_average = self.confirmed_average[period_target - 1]
+        failed_average = self.failed_average[period_target - 1]
+        ca_len = len(confirmed_average)
+        if ca_len < len(self.buckets):
+            raise RuntimeError(f"bucket index ({max_bucket_index}) out of range (0, {ca_len})")
+        extra_by_bucket = self.unconfirmed_by_bucket(conf_target, block_height)
+
         for bucket in range(max_bucket_index, -1, -1):
             if new_bucket_range:
                 cur_near_bucket = bucket
                 new_bucket_range = False
 
             cur_far_bucket = bucket
-            if period_target - 1 < 0 or period_target - 1 >= len(self.confirmed_average):
-                return EstimateResult(
-                    requested_time=uint64(conf_target * SECONDS_PER_BLOCK),
-                    pass_bucket=pass_bucket,
-                    fail_bucket=fail_bucket,
-                    median=-1.0,
-                )
-
-            ca_len = len(self.confirmed_average[period_target - 1])
-            if bucket < 0 or bucket >= ca_len:
-                raise RuntimeError(f"bucket index ({bucket}) out of range (0, {ca_len})")
-
-            n_conf += self.confirmed_average[period_target - 1][bucket]
+            n_conf += confirmed_average[bucket]
             total_num += self.tx_ct_avg[bucket]
-            fail_num += self.failed_average[period_target - 1][bucket]
-            for conf_ct in range(conf_target, self.max_confirms):
-                extra_num += self.unconfirmed_txs[(block_height - conf_ct) % bins][bucket]
-            extra_num += self.old_unconfirmed_txs[bucket]
+            fail_num += failed_average[bucket]
+            extra_num += extra_by_bucket[bucket]
 
             # If we have enough transaction data points in this range of buckets,
             # we can test for success
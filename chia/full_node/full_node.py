@@ -87,7 +87,7 @@ from chia.util.bech32m import encode_puzzle_hash
 from chia.util.config import process_config_start_method
 from chia.util.db_synchronous import db_synchronous_on
 from chia.util.db_version import lookup_db_version, set_db_version_async
-from chia.util.db_wrapper import DBWrapper2, manage_connection
+from chia.util.db_wrapper import DBWrapper2, ReaderPriority, manage_connection, reader_priority
 from chia.util.errors import ConsensusError, Err, TimestampError, ValidationError
 from chia.util.limited_semaphore import LimitedSemaphore
 from chia.util.network import is_localhost
@@ -149,6 +149,7 @@ class FullNode:
     _ui_tasks: set[asyncio.Task[None]] = dataclasses.field(default_factory=set)
     subscriptions: PeerSubscriptions = dataclasses.field(default_factory=PeerSubscriptions)
     _transaction_queue_task: asyncio.Task[None] | None = None
+    _block_template_task: asyncio.Task[None] | None = None
     simulator_transaction_callback: Callable[[bytes32], Awaitable[None]] | None = None
     _sync_task_list: list[asyncio.Task[None]] = dataclasses.field(default_factory=list)
     _transaction_queue: TransactionQueue | None = None
@@ -233,12 +234,18 @@ class FullNode:
         db_sync = db_synchronous_on(self.config.get("db_sync", "auto"))
         self.log.info(f"opening blockchain DB: synchronous={db_sync}")
 
+        db_readers = self.config.get("db_readers", 4)
+        # serving wallets and RPC requests can use no more than half of the
+        # readers each, the rest are opened when blocks or transactions need them
+        peer_readers = max(1, db_readers // 2)
         async with DBWrapper2.managed(
             self.db_path,
             db_version=db_version,
-            reader_count=self.config.get("db_readers", 4),
+            reader_count=db_readers,
             log_path=sql_log_path,
             synchronous=db_sync,
+            max_reader_count=self.config.get("db_max_readers", 2 * db_readers),
+            reader_limits={ReaderPriority.PEER: peer_readers, ReaderPriority.RPC: peer_readers},
         ) as self._db_wrapper:
             if self.db_wrapper.db_version != 2:
                 async with self.db_wrapper.reader_no_transaction() as conn:
@@ -290,6 +297,16 @@ class FullNode:
             self._transaction_queue = TransactionQueue(1000, self.log)
             self._transaction_queue_task: asyncio.Task[None] = create_referenced_task(self._handle_transactions())
 
+            # build the block generator ahead of time, when there's a new
+            # signage point, for the farmers to create blocks without waiting
+            # for it
+            block_version = 1 if self.config.get("block_creation", 0) == 1 else 0
+            self._block_template_task = create_referenced_task(
+                self.mempool_manager.maintain_block_template(
+                    block_version, self.config.get("block_creation_timeout", 2.0), self._farmer_connected
+                )
+            )
+
             self._init_weight_proof = create_referenced_task(self.initialize_weight_proof())
 
             if self.config.get("enable_profiler", False):
@@ -372,6 +389,8 @@ class FullNode:
                     self.uncompact_task.cancel()
                 if self._transaction_queue_task is not None:
                     self._transaction_queue_task.cancel()
+                if self._block_template_task is not None:
+                    self._block_template_task.cancel()
                 cancel_task_safe(task=self.wallet_sync_task, log=self.log)
                 for one_tx_task in self._tx_task_list:
                     if not one_tx_task.done():
@@ -456,6 +475,9 @@ class FullNode:
         assert self._compact_vdf_sem is not None
         return self._compact_vdf_sem
 
+    def _farmer_connected(self) -> bool:
+        return self._server is not None and len(self._server.get_connections(NodeType.FARMER)) > 0
+
     def get_connections(self, request_node_type: NodeType | None) -> list[dict[str, Any]]:
         connections = self.server.get_connections(request_node_type)
         con_info: list[dict[str, Any]] = []
@@ -498,9 +520,10 @@ class FullNode:
     async def _handle_one_transaction(self, entry: TransactionQueueEntry) -> None:
         peer = entry.peer
         try:
-            inc_status, err = await self.add_transaction(
-                entry.transaction, entry.spend_name, peer, entry.test, entry.peers_with_tx
-            )
+            with reader_priority(ReaderPriority.MEMPOOL):
+                inc_status, err = await self.add_transaction(
+                    entry.transaction, entry.spend_name, peer, entry.test, entry.peers_with_tx
+                )
             entry.done.set((inc_status, err))
         except asyncio.CancelledError:
             error_stack = traceback.format_exc()
@@ -1841,6 +1864,8 @@ class FullNode:
         )
         msg = make_msg(ProtocolMessageTypes.new_signage_point, broadcast_farmer)
         await self.server.send_to_all([msg], NodeType.FARMER)
+        # the farmers may create a block for this signage point
+        self.mempool_manager.new_signage_point()
 
         self._state_changed("signage_point", {"broadcast_farmer": broadcast_farmer})
 
@@ -3271,75 +3296,75 @@ class FullNode:
                 heights = await self.block_store.get_random_not_compactified(total_target_uncompact_proofs)
                 self.log.info("Heights found for bluebox to compact: [%s]", ", ".join(map(str, heights)))
 
-                for h in heights:
-                    headers = await self.blockchain.get_header_blocks_in_range(h, h, tx_filter=False)
-                    records: dict[bytes32, BlockRecord] = {}
+                headers = await self.blockchain.get_header_blocks_at(heights, tx_filter=False)
+                records: dict[bytes32, BlockRecord] = {}
+                if sanitize_weight_proof_only:
+                    block_records = await self.block_store.get_block_records_by_hash(list(headers.keys()))
+                    records = {record.header_hash: record for record in block_records}
+                for header in headers.values():
+                    expected_header_hash = self.blockchain.height_to_hash(header.height)
+                    if header.header_hash != expected_header_hash:
+                        continue
                     if sanitize_weight_proof_only:
-                        records = await self.blockchain.get_block_records_in_range(h, h)
-                    for header in headers.values():
-                        expected_header_hash = self.blockchain.height_to_hash(header.height)
-                        if header.header_hash != expected_header_hash:
-                            continue
-                        if sanitize_weight_proof_only:
-                            assert header.header_hash in records
-                            record = records[header.header_hash]
-                        for sub_slot in header.finished_sub_slots:
-                            if (
-                                sub_slot.proofs.challenge_chain_slot_proof.witness_type > 0
-                                or not sub_slot.proofs.challenge_chain_slot_proof.normalized_to_identity
-                            ):
-                                broadcast_list.append(
-                                    timelord_protocol.RequestCompactProofOfTime(
-                                        sub_slot.challenge_chain.challenge_chain_end_of_slot_vdf,
-                                        header.header_hash,
-                                        header.height,
-                                        uint8(CompressibleVDFField.CC_EOS_VDF),
-                                    )
-                                )
-                            if sub_slot.proofs.infused_challenge_chain_slot_proof is not None and (
-                                sub_slot.proofs.infused_challenge_chain_slot_proof.witness_type > 0
-                                or not sub_slot.proofs.infused_challenge_chain_slot_proof.normalized_to_identity
-                            ):
-                                assert sub_slot.infused_challenge_chain is not None
-                                broadcast_list.append(
-                                    timelord_protocol.RequestCompactProofOfTime(
-                                        sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf,
-                                        header.header_hash,
-                                        header.height,
-                                        uint8(CompressibleVDFField.ICC_EOS_VDF),
-                                    )
-                                )
-                        # Running in 'sanitize_weight_proof_only' ignores CC_SP_VDF and CC_IP_VDF
-                        # unless this is a challenge block.
-                        if sanitize_weight_proof_only:
-                            if not record.is_challenge_block(self.constants):
-                                continue
-                        if header.challenge_chain_sp_proof is not None and (
-                            header.challenge_chain_sp_proof.witness_type > 0
-                            or not header.challenge_chain_sp_proof.normalized_to_identity
+                        assert header.header_hash in records
+                        record = records[header.header_hash]
+                    for sub_slot in header.finished_sub_slots:
+                        if (
+                            sub_slot.proofs.challenge_chain_slot_proof.witness_type > 0
+                            or not sub_slot.proofs.challenge_chain_slot_proof.normalized_to_identity
                         ):
-                            assert header.reward_chain_block.challenge_chain_sp_vdf is not None
                             broadcast_list.append(
                                 timelord_protocol.RequestCompactProofOfTime(
-                                    header.reward_chain_block.challenge_chain_sp_vdf,
+                                    sub_slot.challenge_chain.challenge_chain_end_of_slot_vdf,
                                     header.header_hash,
                                     header.height,
-                                    uint8(CompressibleVDFField.CC_SP_VDF),
+                                    uint8(CompressibleVDFField.CC_EOS_VDF),
                                 )
                             )
-
-                        if (
-                            header.challenge_chain_ip_proof.witness_type > 0
-                            or not header.challenge_chain_ip_proof.normalized_to_identity
+                        if sub_slot.proofs.infused_challenge_chain_slot_proof is not None and (
+                            sub_slot.proofs.infused_challenge_chain_slot_proof.witness_type > 0
+                            or not sub_slot.proofs.infused_challenge_chain_slot_proof.normalized_to_identity
                         ):
+                            assert sub_slot.infused_challenge_chain is not None
                             broadcast_list.append(
                                 timelord_protocol.RequestCompactProofOfTime(
-                                    header.reward_chain_block.challenge_chain_ip_vdf,
+                                    sub_slot.infused_challenge_chain.infused_challenge_chain_end_of_slot_vdf,
                                     header.header_hash,
                                     header.height,
-                                    uint8(CompressibleVDFField.CC_IP_VDF),
+                                    uint8(CompressibleVDFField.ICC_EOS_VDF),
                                 )
                             )
+                    # Running in 'sanitize_weight_proof_only' ignores CC_SP_VDF and CC_IP_VDF
+                    # unless this is a challenge block.
+                    if sanitize_weight_proof_only:
+                        if not record.is_challenge_block(self.constants):
+                            continue
+                    if header.challenge_chain_sp_proof is not None and (
+                        header.challenge_chain_sp_proof.witness_type > 0
+                        or not header.challenge_chain_sp_proof.normalized_to_identity
+                    ):
+                        assert header.reward_chain_block.challenge_chain_sp_vdf is not None
+                        broadcast_list.append(
+                            timelord_protocol.RequestCompactProofOfTime(
+                                header.reward_chain_block.challenge_chain_sp_vdf,
+                                header.header_hash,
+                                header.height,
+                                uint8(CompressibleVDFField.CC_SP_VDF),
+                            )
+                        )
+
+                    if (
+                        header.challenge_chain_ip_proof.witness_type > 0
+                        or not header.challenge_chain_ip_proof.normalized_to_identity
+                    ):
+                        broadcast_list.append(
+                            timelord_protocol.RequestCompactProofOfTime(
+                                header.reward_chain_block.challenge_chain_ip_vdf,
+                                header.header_hash,
+                                header.height,
+                                uint8(CompressibleVDFField.CC_IP_VDF),
+                            )
+                        )
 
                 broadcast_list_chunks: list[list[timelord_protocol.RequestCompactProofOfTime]] = []
                 for index in range(0, len(broadcast_list), target_uncompact_proofs):
@@ -75,6 +75,28 @@ class MempoolAddInfo:
     error: Err | None
 
 
+@dataclass
+class BlockTemplate:
+    """
+    A block generator built from the mempool. It's reused for blocks on the
+    same transaction block until the mempool items it may include change.
+    """
+
+    constants: ConsensusConstants
+    prev_tx_height: uint32
+    # 0 for create_block_generator(), 1 for create_block_generator2()
+    block_version: int
+    timeout: float
+    generator: NewBlockGenerator | None
+    # the coins spent by the generator
+    coin_ids: set[bytes32]
+    # the mempool items spending those coins. This may include items that
+    # didn't make it into the generator, if they spend the same coins
+    item_names: set[bytes32]
+    # the lowest fee per cost of those items
+    min_fee_per_cost: float
+
+
 class MempoolRemoveReason(Enum):
     CONFLICT = 1
     BLOCK_INCLUSION = 2
@@ -95,6 +117,9 @@ class Mempool:
     _total_fee: int
     _total_cost: int
 
+    # the most recently built block generator, if it's still valid
+    _block_template: BlockTemplate | None
+
     def __init__(self, mempool_info: MempoolInfo, fee_estimator: FeeEstimatorInterface):
         self._db_conn = sqlite3.connect(":memory:")
         self._items = {}
@@ -102,6 +127,7 @@ class Mempool:
         self._timestamp = uint64(0)
         self._total_fee = 0
         self._total_cost = 0
+        self._block_template = None
 
         with self._db_conn:
             # name means SpendBundle hash
@@ -330,6 +356,7 @@ class Mempool:
 
         self._block_height = block_height
         self._timestamp = timestamp
+        self._block_template = None
 
         return self.remove_from_pool(to_remove, MempoolRemoveReason.EXPIRED)
 
@@ -355,6 +382,8 @@ class Mempool:
                         removed_items.append(item)
 
         removed_internal_items = {name: self._items.pop(name) for name in items}
+        if self._block_template is not None and not self._block_template.item_names.isdisjoint(items):
+            self._block_template = None
 
         for batch in to_batches(items, SQLITE_MAX_VARIABLE_NUMBER):
             args = ",".join(["?"] * len(batch.entries))
@@ -483,6 +512,8 @@ class Mempool:
         )
         self._total_cost += item.cost
         self._total_fee += item.fee
+        if self._block_template is not None and self._may_change_block_template(item, self._block_template):
+            self._block_template = None
 
         info = FeeMempoolInfo(self.mempool_info, self.total_mempool_cost(), self.total_mempool_fees(), datetime.now())
         self.fee_estimator.add_mempool_item(info, MempoolItemInfo(item.cost, item.fee, item.height_added_to_mempool))
@@ -492,6 +523,80 @@ class Mempool:
     def update_spend_index(self, spends_to_update: list[tuple[bytes32, bytes32, bytes32]]) -> None:
         with self._db_conn as conn:
             conn.executemany("UPDATE OR REPLACE spends SET coin_id=? WHERE coin_id=? AND tx=?", spends_to_update)
+        self._block_template = None
+
+    def _may_change_block_template(self, item: MempoolItem, template: BlockTemplate) -> bool:
+        """
+        Whether building the block generator again could include the newly
+        added item. An item with a lower fee rate than everything in the
+        template is considered after all of it, so it's left out if it can't
+        fit in the space left, and it doesn't spend any of the same coins.
+        """
+        if template.generator is None or item.fee_per_cost >= template.min_fee_per_cost:
+            return True
+        assert item.conds is not None
+        # the byte cost may shrink with compression, the rest of the cost won't
+        min_cost = item.conds.condition_cost + item.conds.execution_cost
+        max_block_cost = max(self.mempool_info.max_block_clvm_cost, template.constants.MAX_BLOCK_COST_CLVM)
+        if min_cost <= max_block_cost - template.generator.cost:
+            return True
+        for coin_id, bcs in item.bundle_coin_spends.items():
+            if coin_id in template.coin_ids:
+                return True
+            if bcs.latest_singleton_lineage is not None and bcs.latest_singleton_lineage.coin_id in template.coin_ids:
+                return True
+        return False
+
+    def has_block_template(
+        self, constants: ConsensusConstants, prev_tx_height: uint32, timeout: float, block_version: int
+    ) -> bool:
+        """
+        Whether create_block_generator() (block_version 0) or
+        create_block_generator2() (block_version 1) would return a generator
+        that's already built.
+        """
+        template = self._block_template
+        return (
+            template is not None
+            and template.constants is constants
+            and template.prev_tx_height == prev_tx_height
+            and template.block_version == block_version
+            and template.timeout == timeout
+        )
+
+    def _get_block_template(
+        self, constants: ConsensusConstants, prev_tx_height: uint32, timeout: float, block_version: int
+    ) -> NewBlockGenerator | None:
+        if self._block_template is not None and self.has_block_template(
+            constants, prev_tx_height, timeout, block_version
+        ):
+            return self._block_template.generator
+
+        if block_version == 0:
+            generator = self._create_block_generator(constants, prev_tx_height, timeout)
+        else:
+            generator = self._create_block_generator2(constants, prev_tx_height, timeout)
+
+        coin_ids: set[bytes32] = set()
+        item_names: set[bytes32] = set()
+        min_fee_per_cost = float("inf")
+        if generator is not None:
+            coin_ids = {coin.name() for coin in generator.removals}
+            for batch in to_batches(list(coin_ids), SQLITE_MAX_VARIABLE_NUMBER):
+                args = ",".join(["?"] * len(batch.entries))
+                cursor = self._db_conn.execute(
+                    "SELECT name, fee_per_cost FROM tx "
+                    f"WHERE name IN (SELECT tx FROM spends WHERE coin_id IN ({args}))",
+                    tuple(batch.entries),
+                )
+                for name, fee_per_cost in cursor:
+                    item_names.add(bytes32(name))
+                    min_fee_per_cost = min(min_fee_per_cost, fee_per_cost)
+
+        self._block_template = BlockTemplate(
+            constants, prev_tx_height, block_version, timeout, generator, coin_ids, item_names, min_fee_per_cost
+        )
+        return generator
 
     def at_full_capacity(self, cost: int) -> bool:
         """
@@ -509,8 +614,16 @@ class Mempool:
         """
         prev_tx_height is needed in case we fast-forward a transaction and we
         need to re-run its puzzle.
+        The generator is reused until the mempool items it may include change.
         """
+        return self._get_block_template(constants, prev_tx_height, timeout, 0)
 
+    def _create_block_generator(
+        self,
+        constants: ConsensusConstants,
+        prev_tx_height: uint32,
+        timeout: float,
+    ) -> NewBlockGenerator | None:
         mempool_bundle = self.create_bundle_from_mempool_items(constants, prev_tx_height, timeout)
         if mempool_bundle is None:
             return None
@@ -686,6 +799,14 @@ class Mempool:
 
     def create_block_generator2(
         self, constants: ConsensusConstants, prev_tx_height: uint32, timeout: float
+    ) -> NewBlockGenerator | None:
+        """
+        The generator is reused until the mempool items it may include change.
+        """
+        return self._get_block_template(constants, prev_tx_height, timeout, 1)
+
+    def _create_block_generator2(
+        self, constants: ConsensusConstants, prev_tx_height: uint32, timeout: float
     ) -> NewBlockGenerator | None:
         fee_sum = 0  # Checks that total fees don't exceed 64 bits
         additions: list[Coin] = []
@@ -314,6 +314,8 @@ class MempoolManager:
     _worker_queue_size: int
     max_block_clvm_cost: uint64
     max_tx_clvm_cost: uint64
+    # set on a new signage point, when the block template may be needed soon
+    _block_template_wanted: asyncio.Event
 
     def __init__(
         self,
@@ -366,6 +368,7 @@ class MempoolManager:
             CLVMCost(uint64(self.max_block_clvm_cost)),
         )
         self.mempool: Mempool = Mempool(mempool_info, self.fee_estimator)
+        self._block_template_wanted = asyncio.Event()
 
     def shut_down(self) -> None:
         self.pool.shutdown(wait=True)
@@ -396,6 +399,43 @@ class MempoolManager:
             return None
         return self.mempool.create_block_generator2(self.constants, self.peak.height, timeout)
 
+    async def maintain_block_template(
+        self, block_version: int, timeout: float, wanted: Callable[[], bool] = lambda: True
+    ) -> None:
+        """
+        Builds the block generator in the background after a new signage
+        point, if a new peak or mempool changes have made the previous one
+        stale, so that it's ready when a farmer creates a block for the
+        signage point. Building it holds up the event loop, like building it
+        when the block is created does, so it's built at most once per
+        signage point rather than on every change. block_version 0 builds the
+        generator of create_block_generator() and 1 the one of
+        create_block_generator2(). The template is only built while wanted()
+        returns True. Runs until it's cancelled.
+        """
+        while True:
+            await self._block_template_wanted.wait()
+            self._block_template_wanted.clear()
+            if self.peak is None or not wanted():
+                continue
+            if self.mempool.has_block_template(self.constants, self.peak.height, timeout, block_version):
+                continue
+            try:
+                if block_version == 0:
+                    self.mempool.create_block_generator(self.constants, self.peak.height, timeout)
+                else:
+                    self.mempool.create_block_generator2(self.constants, self.peak.height, timeout)
+            except Exception:
+                log.exception("failed to build the block template")
+
+    def new_signage_point(self) -> None:
+        """
+        Called when the full node has a new signage point, which farmers may
+        create a block for. Lets maintain_block_template() build the block
+        template, if it's stale.
+        """
+        self._block_template_wanted.set()
+
     def get_filter(self) -> bytes:
         all_transactions: set[bytes32] = set()
         byte_array_list = []
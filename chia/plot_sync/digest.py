@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from chia_rs.sized_bytes import bytes32
+
+from chia.protocols.harvester_protocol import Plot
+from chia.util.hash import std_hash
+
+_MODULUS = 1 << 256
+
+
+@dataclass
+class PlotSetDigest:
+    """
+    A digest of a set of plots which doesn't depend on their order and is updated with every plot added or removed,
+    the sum of the hashes of the serialized plots.
+    """
+
+    _sum: int = 0
+
+    def add(self, plot: Plot) -> None:
+        self._sum = (self._sum + int.from_bytes(std_hash(plot), "big")) % _MODULUS
+
+    def remove(self, plot: Plot) -> None:
+        self._sum = (self._sum - int.from_bytes(std_hash(plot), "big")) % _MODULUS
+
+    def digest(self) -> bytes32:
+        return bytes32(self._sum.to_bytes(32, "big"))
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
-from chia_rs.sized_ints import uint64
+from chia_rs.sized_bytes import bytes32
+from chia_rs.sized_ints import uint32, uint64
 
 from chia.plot_sync.util import ErrorCodes, State
 from chia.protocols.harvester_protocol import PlotSyncIdentifier
@@ -37,6 +38,11 @@ class InvalidLastSyncIdError(InvalidValueError):
         super().__init__("Invalid last-sync-id", actual, expected, ErrorCodes.invalid_last_sync_id)
 
 
+class PlotSetDigestMismatchError(InvalidValueError):
+    def __init__(self, actual: tuple[bytes32, uint32], expected: tuple[bytes32, uint32]) -> None:
+        super().__init__("Plot set digest mismatch", actual, expected, ErrorCodes.digest_mismatch)
+
+
 class InvalidConnectionTypeError(InvalidValueError):
     def __init__(self, actual: NodeType, expected: NodeType) -> None:
         super().__init__("Unexpected connection type", actual, expected, ErrorCodes.invalid_connection_type)
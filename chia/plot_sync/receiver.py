@@ -13,11 +13,13 @@ from typing_extensions import Protocol
 
 from chia.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR, _expected_plot_size
 from chia.plot_sync.delta import Delta, PathListDelta, PlotListDelta
+from chia.plot_sync.digest import PlotSetDigest
 from chia.plot_sync.exceptions import (
     InvalidIdentifierError,
     InvalidLastSyncIdError,
     PlotAlreadyAvailableError,
     PlotNotAvailableError,
+    PlotSetDigestMismatchError,
     PlotSyncException,
     SyncIdsMatchError,
 )
@@ -25,6 +27,7 @@ from chia.plot_sync.util import ErrorCodes, State, T_PlotSyncMessage
 from chia.plotting.util import HarvestingMode
 from chia.protocols.harvester_protocol import (
     Plot,
+    PlotSyncDigest,
     PlotSyncDone,
     PlotSyncError,
     PlotSyncIdentifier,
@@ -53,6 +56,7 @@ class Sync:
     plots_total: uint32 = uint32(0)
     delta: Delta = field(default_factory=Delta)
     time_done: float | None = None
+    resumed: bool = False
 
     def in_progress(self) -> bool:
         return self.sync_id != 0
@@ -85,6 +89,7 @@ class Receiver:
     _current_sync: Sync
     _last_sync: Sync
     _plots: dict[str, Plot]
+    _plots_digest: PlotSetDigest
     _invalid: list[str]
     _keys_missing: list[str]
     _duplicates: list[str]
@@ -93,6 +98,7 @@ class Receiver:
     _update_callback: ReceiverUpdateCallback
     _harvesting_mode: HarvestingMode | None
     _constants: ConsensusConstants
+    _previous: Receiver | None
 
     def __init__(
         self,
@@ -104,6 +110,7 @@ class Receiver:
         self._current_sync = Sync()
         self._last_sync = Sync()
         self._plots = {}
+        self._plots_digest = PlotSetDigest()
         self._invalid = []
         self._keys_missing = []
         self._duplicates = []
@@ -112,6 +119,7 @@ class Receiver:
         self._update_callback = update_callback
         self._harvesting_mode = None
         self._constants = constants
+        self._previous = None
 
     async def trigger_callback(self, update: Delta | None = None) -> None:
         try:
@@ -124,6 +132,7 @@ class Receiver:
         self._current_sync = Sync()
         self._last_sync = Sync()
         self._plots.clear()
+        self._plots_digest = PlotSetDigest()
         self._invalid.clear()
         self._keys_missing.clear()
         self._duplicates.clear()
@@ -131,6 +140,25 @@ class Receiver:
         self._total_effective_plot_size = 0
         self._harvesting_mode = None
 
+    def allow_resume_from(self, previous: Receiver) -> None:
+        """
+        Lets the harvester resume syncing from the last completed sync of the receiver of its previous connection,
+        instead of starting over.
+        """
+        self._previous = previous
+
+    def _resume_from(self, previous: Receiver) -> None:
+        log.info(f"_resume_from: node_id {self.connection().peer_node_id}, last_sync: {previous.last_sync()}")
+        self._last_sync = previous._last_sync
+        self._plots = previous._plots
+        self._plots_digest = previous._plots_digest
+        self._invalid = previous._invalid
+        self._keys_missing = previous._keys_missing
+        self._duplicates = previous._duplicates
+        self._total_plot_size = previous._total_plot_size
+        self._total_effective_plot_size = previous._total_effective_plot_size
+        self._harvesting_mode = previous._harvesting_mode
+
     def connection(self) -> WSChiaConnection:
         return self._connection
 
@@ -207,8 +235,13 @@ class Receiver:
             )
 
     async def _sync_started(self, data: PlotSyncStart) -> None:
+        resumed = False
         if data.initial:
             self.reset()
+        elif self._previous is not None and data.last_sync_id == self._previous.last_sync().sync_id:
+            self._resume_from(self._previous)
+            resumed = True
+        self._previous = None
         self._validate_identifier(data.identifier, True)
         if data.last_sync_id != self._last_sync.sync_id:
             raise InvalidLastSyncIdError(data.last_sync_id, self._last_sync.sync_id)
@@ -218,6 +251,7 @@ class Receiver:
         self._current_sync.delta.clear()
         self._current_sync.state = State.loaded
         self._current_sync.plots_total = data.plot_file_count
+        self._current_sync.resumed = resumed
         self._harvesting_mode = HarvestingMode(data.harvesting_mode)
         self._current_sync.bump_next_message_id()
 
@@ -244,6 +278,17 @@ class Receiver:
     async def process_loaded(self, plot_infos: PlotSyncPlotList) -> None:
         await self._process(self._process_loaded, ProtocolMessageTypes.plot_sync_loaded, plot_infos)
 
+    async def _process_digest(self, data: PlotSyncDigest) -> None:
+        self._validate_identifier(data.identifier)
+        # The harvester only sends the changes since the last sync, which requires us to have the same plots
+        expected = (self._plots_digest.digest(), uint32(len(self._plots)))
+        if (data.digest, data.plot_count) != expected:
+            raise PlotSetDigestMismatchError((data.digest, data.plot_count), expected)
+        self._current_sync.bump_next_message_id()
+
+    async def process_digest(self, data: PlotSyncDigest) -> None:
+        await self._process(self._process_digest, ProtocolMessageTypes.plot_sync_digest, data)
+
     async def process_path_list(
         self,
         *,
@@ -346,11 +391,21 @@ class Receiver:
         )
         # Apply delta
         self._plots.update(self._current_sync.delta.valid.additions)
+        for plot in self._current_sync.delta.valid.additions.values():
+            self._plots_digest.add(plot)
         for removal in self._current_sync.delta.valid.removals:
-            del self._plots[removal]
+            self._plots_digest.remove(self._plots.pop(removal))
         self._invalid = self._current_sync.delta.invalid.additions.copy()
         self._keys_missing = self._current_sync.delta.keys_missing.additions.copy()
         self._duplicates = self._current_sync.delta.duplicates.additions.copy()
+        if self._current_sync.resumed:
+            # The harvester was removed when it disconnected, report everything it has again
+            update = Delta(
+                PlotListDelta(self._plots.copy()),
+                PathListDelta(self._invalid.copy()),
+                PathListDelta(self._keys_missing.copy()),
+                PathListDelta(self._duplicates.copy()),
+            )
         self._total_plot_size = sum(plot.file_size for plot in self._plots.values())
 
         self._total_effective_plot_size = int(
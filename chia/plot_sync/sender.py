@@ -5,19 +5,21 @@ import logging
 import time
 import traceback
 from collections.abc import Iterable
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Generic, TypeVar
 
 from chia_rs.sized_ints import int16, uint8, uint32, uint64
 from typing_extensions import Protocol
 
+from chia.plot_sync.digest import PlotSetDigest
 from chia.plot_sync.exceptions import AlreadyStartedError, InvalidConnectionTypeError
 from chia.plot_sync.util import Constants
 from chia.plotting.manager import PlotManager
 from chia.plotting.util import HarvestingMode, PlotInfo
 from chia.protocols.harvester_protocol import (
     Plot,
+    PlotSyncDigest,
     PlotSyncDone,
     PlotSyncIdentifier,
     PlotSyncPathList,
@@ -27,6 +29,7 @@ from chia.protocols.harvester_protocol import (
 )
 from chia.protocols.outbound_message import NodeType, make_msg
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
+from chia.protocols.shared_protocol import Capability
 from chia.server.ws_connection import WSChiaConnection
 from chia.util.batches import to_batches
 from chia.util.task_referencer import create_referenced_task
@@ -98,6 +101,24 @@ class ExpectedResponse:
         )
 
 
+@dataclass
+class SyncedPlots:
+    """
+    The plots the farmer has after the last completed sync.
+    """
+
+    sync_id: uint64 = uint64(0)
+    plots: dict[str, Plot] = field(default_factory=dict)
+    digest: PlotSetDigest = field(default_factory=PlotSetDigest)
+
+    def add(self, plot: Plot) -> None:
+        self.plots[plot.filename] = plot
+        self.digest.add(plot)
+
+    def remove(self, filename: str) -> None:
+        self.digest.remove(self.plots.pop(filename))
+
+
 class Sender:
     _plot_manager: PlotManager
     _connection: WSChiaConnection | None
@@ -109,6 +130,11 @@ class Sender:
     _task: asyncio.Task[None] | None
     _response: ExpectedResponse | None
     _harvesting_mode: HarvestingMode
+    _synced: SyncedPlots
+    _sync_initial: bool
+    _sync_loaded: list[Plot]
+    _sync_removed: list[str]
+    _resuming: bool
 
     def __init__(self, plot_manager: PlotManager, harvesting_mode: HarvestingMode) -> None:
         self._plot_manager = plot_manager
@@ -121,6 +147,11 @@ class Sender:
         self._task = None
         self._response = None
         self._harvesting_mode = harvesting_mode
+        self._synced = SyncedPlots()
+        self._sync_initial = False
+        self._sync_loaded = []
+        self._sync_removed = []
+        self._resuming = False
 
     def __str__(self) -> str:
         return f"sync_id {self._sync_id}, next_message_id {self._next_message_id}, messages {len(self._messages)}"
@@ -131,7 +162,7 @@ class Sender:
         if self._task is None:
             self._task = create_referenced_task(self._run())
             if not self._plot_manager.initial_refresh() or self._sync_id != 0:
-                self._reset()
+                self._reset(resume=True)
         else:
             raise AlreadyStartedError
 
@@ -154,13 +185,16 @@ class Sender:
     def bump_next_message_id(self) -> None:
         self._next_message_id = uint64(self._next_message_id + 1)
 
-    def _reset(self) -> None:
-        log.debug(f"_reset {self}")
+    def _reset(self, resume: bool = False) -> None:
+        log.debug(f"_reset {self}, resume {resume}")
         self._last_sync_id = uint64(0)
         self._sync_id = uint64(0)
         self._next_message_id = uint64(0)
         self._messages.clear()
+        self._resuming = False
         if self._task is not None:
+            if resume and self._resume():
+                return
             self.sync_start(self._plot_manager.plot_count(), True)
             for batch in to_batches(
                 list(self._plot_manager.plots.values()), self._plot_manager.refresh_parameter.batch_size
@@ -168,6 +202,43 @@ class Sender:
                 self.process_batch(batch.entries, batch.remaining)
             self.sync_done([], 0)
 
+    def _resume(self) -> bool:
+        """
+        Adds a sync of only the changes since the last completed sync if the farmer can resume from it, which it
+        validates by the digest of the plots it has.
+        """
+        if self._synced.sync_id == 0 or self._connection is None:
+            return False
+        if not self._connection.has_capability(Capability.PLOT_SYNC_RESUME):
+            return False
+        loaded: list[Plot] = []
+        filenames: set[str] = set()
+        for plot in _convert_plot_info_list(list(self._plot_manager.plots.values())):
+            synced_plot = self._synced.plots.get(plot.filename)
+            if synced_plot is None:
+                loaded.append(plot)
+            elif synced_plot != plot:
+                # A replaced plot needs to be removed and added again, which takes more than one sync
+                return False
+            filenames.add(plot.filename)
+        removed = [filename for filename in self._synced.plots if filename not in filenames]
+        log.info(
+            f"Resuming the plot sync from sync_id {self._synced.sync_id}: loaded {len(loaded)}, removed {len(removed)}"
+        )
+        self._last_sync_id = self._synced.sync_id
+        self.sync_start(len(loaded), False)
+        self._resuming = True
+        self._add_message(
+            ProtocolMessageTypes.plot_sync_digest,
+            PlotSyncDigest,
+            self._synced.digest.digest(),
+            uint32(len(self._synced.plots)),
+        )
+        self._sync_loaded = loaded
+        self._add_list_batched(ProtocolMessageTypes.plot_sync_loaded, PlotSyncPlotList, loaded)
+        self._add_sync_done(removed, 0)
+        return True
+
     async def _wait_for_response(self) -> bool:
         start = time.time()
         assert self._response is not None
@@ -250,6 +321,11 @@ class Sender:
                     self._next_message_id = expected.message_id
                     recovered = True
             if not recovered:
+                if self._resuming:
+                    # The farmer doesn't have the plots of our last sync anymore, start over with a full sync
+                    log.info(f"Unable to resume the plot sync: {self._response.message}")
+                    self._reset()
+                    return True
                 return failed(f"Not recoverable error {self._response.message}")
             return True
 
@@ -280,6 +356,11 @@ class Sender:
             sync_id += 1
         log.debug(f"sync_start {sync_id}")
         self._sync_id = uint64(sync_id)
+        self._sync_initial = initial
+        self._sync_loaded = []
+        self._sync_removed = []
+        if initial:
+            self._synced = SyncedPlots()
         self._add_message(
             ProtocolMessageTypes.plot_sync_start,
             PlotSyncStart,
@@ -293,11 +374,15 @@ class Sender:
         log.debug(f"process_batch {self}: loaded {len(loaded)}, remaining {remaining}")
         if len(loaded) > 0 or remaining == 0:
             converted = _convert_plot_info_list(loaded)
+            self._sync_loaded.extend(converted)
             self._add_message(ProtocolMessageTypes.plot_sync_loaded, PlotSyncPlotList, converted, remaining == 0)
 
     def sync_done(self, removed: list[Path], duration: float) -> None:
         log.debug(f"sync_done {self}: removed {len(removed)}, duration {duration}")
-        removed_list = [str(x) for x in removed]
+        self._add_sync_done([str(x) for x in removed], duration)
+
+    def _add_sync_done(self, removed_list: list[str], duration: float) -> None:
+        self._sync_removed = removed_list
         self._add_list_batched(
             ProtocolMessageTypes.plot_sync_removed,
             PlotSyncPathList,
@@ -314,6 +399,15 @@ class Sender:
     def _finalize_sync(self) -> None:
         log.debug(f"_finalize_sync {self}")
         assert self._sync_id != 0
+        # Keep track of the plots the farmer has now, to be able to resume from here after a reconnect
+        if self._sync_initial:
+            self._synced = SyncedPlots()
+        for plot in self._sync_loaded:
+            self._synced.add(plot)
+        for filename in self._sync_removed:
+            self._synced.remove(filename)
+        self._synced.sync_id = self._sync_id
+        self._resuming = False
         self._last_sync_id = self._sync_id
         self._next_message_id = uint64(0)
         self._messages.clear()
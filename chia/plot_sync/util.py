@@ -32,6 +32,7 @@ class ErrorCodes(IntEnum):
     plot_already_available = 5
     plot_not_available = 6
     sync_ids_match = 7
+    digest_mismatch = 8
 
 
 class PlotSyncMessage(Protocol):
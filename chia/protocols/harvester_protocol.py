@@ -223,6 +223,17 @@ class PlotSyncPlotList(Streamable):
         return f"PlotSyncPlotList: identifier {self.identifier}, count {len(self.data)}, final {self.final}"
 
 
+@streamable
+@dataclass(frozen=True)
+class PlotSyncDigest(Streamable):
+    identifier: PlotSyncIdentifier
+    digest: bytes32
+    plot_count: uint32
+
+    def __str__(self) -> str:
+        return f"PlotSyncDigest: identifier {self.identifier}, digest {self.digest}, plot_count {self.plot_count}"
+
+
 @streamable
 @dataclass(frozen=True)
 class PlotSyncDone(Streamable):
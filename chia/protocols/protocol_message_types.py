@@ -143,4 +143,7 @@ class ProtocolMessageTypes(Enum):
     # solver protocol
     solve = 109
 
+    # plot sync resumption
+    plot_sync_digest = 111
+
     error = 255
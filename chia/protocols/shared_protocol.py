@@ -45,6 +45,9 @@ class Capability(IntEnum):
     # This is between a full node and receiving wallet
     MEMPOOL_UPDATES = 5
 
+    # a farmer can resume a plot sync from the last sync completed before the harvester reconnected
+    PLOT_SYNC_RESUME = 6
+
 
 # These are the default capabilities used in all outgoing handshakes.
 # "1" means the capability is supported and enabled.
@@ -56,11 +59,14 @@ _capabilities: list[tuple[uint16, str]] = [
 _mempool_updates = [
     (uint16(Capability.MEMPOOL_UPDATES.value), "1"),
 ]
+_plot_sync_resume = [
+    (uint16(Capability.PLOT_SYNC_RESUME.value), "1"),
+]
 
 default_capabilities = {
     NodeType.FULL_NODE: _capabilities + _mempool_updates,
-    NodeType.HARVESTER: _capabilities,
-    NodeType.FARMER: _capabilities,
+    NodeType.HARVESTER: _capabilities + _plot_sync_resume,
+    NodeType.FARMER: _capabilities + _plot_sync_resume,
     NodeType.TIMELORD: _capabilities,
     NodeType.INTRODUCER: _capabilities,
     NodeType.WALLET: _capabilities,
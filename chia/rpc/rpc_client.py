@@ -155,6 +155,13 @@ class RpcClient:
     async def reset_log_level(self) -> dict:
         return await self.fetch("reset_log_level", {})
 
+    async def get_db_query_stats(self, limit: int | None = None) -> dict:
+        request = {} if limit is None else {"limit": limit}
+        return await self.fetch("get_db_query_stats", request)
+
+    async def reset_db_query_stats(self) -> dict:
+        return await self.fetch("reset_db_query_stats", {})
+
     def close(self) -> None:
         self.closing_task = create_referenced_task(self.session.close())
 
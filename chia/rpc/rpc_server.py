@@ -36,6 +36,7 @@ from chia.types.peer_info import PeerInfo
 from chia.util.byte_types import hexstr_to_bytes
 from chia.util.chia_logging import default_log_level, set_log_level
 from chia.util.config import str2bool
+from chia.util.db_wrapper import ReaderPriority, query_stats, reader_priority
 from chia.util.json_util import dict_to_json_str
 from chia.util.network import WebServer, resolve
 from chia.util.task_referencer import create_referenced_task
@@ -361,6 +362,20 @@ class RpcServer(Generic[_T_RpcApiProtocol]):
             "errors": error_strings,
         }
 
+    async def get_db_query_stats(self, request: dict[str, Any]) -> EndpointResult:
+        """
+        Returns the stats of the database statements run by this service, the
+        ones that took the most total time first.
+        """
+        return {
+            "enabled": query_stats.enabled,
+            "statements": query_stats.to_json_dict(limit=request.get("limit")),
+        }
+
+    async def reset_db_query_stats(self, request: dict[str, Any]) -> EndpointResult:
+        query_stats.reset()
+        return {}
+
     async def ws_api(self, message: WsRpcMessage) -> dict[str, object] | None:
         """
         This function gets called when new message is received via websocket.
@@ -377,11 +392,12 @@ class RpcServer(Generic[_T_RpcApiProtocol]):
             return pong()
 
         f_internal: Endpoint | None = getattr(self, command, None)
-        if f_internal is not None:
-            return await f_internal(data)
-        f_rpc_api: Endpoint | None = getattr(self.rpc_api, command, None)
-        if f_rpc_api is not None:
-            return await f_rpc_api(data)
+        with reader_priority(ReaderPriority.RPC):
+            if f_internal is not None:
+                return await f_internal(data)
+            f_rpc_api: Endpoint | None = getattr(self.rpc_api, command, None)
+            if f_rpc_api is not None:
+                return await f_rpc_api(data)
 
         raise ValueError(f"unknown_command {command}")
 
@@ -474,6 +490,8 @@ class RpcServer(Generic[_T_RpcApiProtocol]):
         "/get_log_level": get_log_level,
         "/set_log_level": set_log_level,
         "/reset_log_level": reset_log_level,
+        "/get_db_query_stats": get_db_query_stats,
+        "/reset_db_query_stats": reset_db_query_stats,
     }
 
 
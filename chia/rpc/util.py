@@ -7,7 +7,8 @@ from typing import TYPE_CHECKING, Any, get_type_hints
 
 import aiohttp
 
-from chia.util.json_util import obj_to_response
+from chia.util.db_wrapper import ReaderPriority, reader_priority
+from chia.util.json_util import obj_to_streamed_response
 from chia.util.streamable import Streamable
 from chia.wallet.util.blind_signer_tl import BLIND_SIGNER_TRANSLATION
 from chia.wallet.util.clvm_streamable import (
@@ -77,7 +78,8 @@ def wrap_http_handler(
     async def inner(request: aiohttp.web.Request) -> aiohttp.web.StreamResponse:
         request_data = await request.json()
         try:
-            res_object = await f(request_data)
+            with reader_priority(ReaderPriority.RPC):
+                res_object = await f(request_data)
             if res_object is None:
                 res_object = {}
             if "success" not in res_object:
@@ -90,6 +92,6 @@ def wrap_http_handler(
             else:
                 res_object = {"success": False, "error": f"{e}"}
 
-        return obj_to_response(res_object)
+        return await obj_to_streamed_response(request, res_object)
 
     return inner
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import heapq
 import ipaddress
 import logging
 import random
 import time
 from dataclasses import dataclass, field, replace
 from datetime import datetime, timedelta
+from enum import IntEnum
 
 import aiosqlite
 from chia_rs.sized_ints import uint32, uint64
@@ -14,6 +16,243 @@ from chia.seeder.peer_record import PeerRecord, PeerReliability
 
 log = logging.getLogger(__name__)
 
+# peers are crawled again once this many seconds have passed since they were
+# last tried or connected to
+IPV4_RECRAWL_INTERVAL = 1000
+IPV6_RECRAWL_INTERVAL = 600
+# a peer isn't selected again for this many seconds after being selected
+RESELECT_INTERVAL = 120
+
+
+def is_ipv6(peer_id: str) -> bool:
+    try:
+        ipaddress.IPv6Address(peer_id)
+    except ValueError:
+        return False
+    return True
+
+
+@dataclass
+class PeerPool:
+    """
+    A set of peer IDs that supports adding, removing and taking out a random
+    peer in constant time.
+    """
+
+    _peers: list[str] = field(default_factory=list)
+    _positions: dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self._peers)
+
+    def __contains__(self, peer_id: str) -> bool:
+        return peer_id in self._positions
+
+    def add(self, peer_id: str) -> None:
+        if peer_id in self._positions:
+            return
+        self._positions[peer_id] = len(self._peers)
+        self._peers.append(peer_id)
+
+    def remove(self, peer_id: str) -> None:
+        pos = self._positions.pop(peer_id, None)
+        if pos is None:
+            return
+        last = self._peers.pop()
+        if pos < len(self._peers):
+            self._peers[pos] = last
+            self._positions[last] = pos
+
+    def pop_random(self) -> str:
+        peer_id = self._peers[random.randrange(len(self._peers))]
+        self.remove(peer_id)
+        return peer_id
+
+
+class PeerStatus(IntEnum):
+    NONE = 0
+    BANNED = 1
+    IGNORED = 2
+
+
+@dataclass
+class CrawlSchedule:
+    """
+    Keeps track of when each known peer can be crawled next, so a crawl round
+    doesn't have to look at every peer. Peers wait in a heap (one per address
+    family) ordered by the time they become eligible, and are moved into a
+    pool of eligible peers once that time has passed. A batch is then picked
+    at random from the pools.
+
+    Heap entries are invalidated lazily: updating a peer pushes a new entry,
+    and an entry only counts if its time is still the peer's scheduled time.
+    The banned and ignored peers are counted the same way, with a heap of the
+    times their status expires.
+    """
+
+    # peer_id: whether it's an IPv6 address, for every peer in the schedule
+    _ipv6: dict[str, bool] = field(default_factory=dict)
+    # peer_id: the time it becomes eligible, for the peers that are waiting
+    _scheduled: dict[str, float] = field(default_factory=dict)
+    _waiting: dict[bool, list[tuple[float, str]]] = field(default_factory=lambda: {False: [], True: []})
+    _eligible: dict[bool, PeerPool] = field(default_factory=lambda: {False: PeerPool(), True: PeerPool()})
+    # peer_id: (status, expiry, banned until, ignored until), for the peers
+    # that are counted as banned or ignored
+    _status: dict[str, tuple[PeerStatus, int, int, int]] = field(default_factory=dict)
+    _status_expiry: list[tuple[int, str]] = field(default_factory=list)
+    ipv6_peers: int = 0
+    banned_peers: int = 0
+    ignored_peers: int = 0
+
+    def update(
+        self, peer_id: str, record: PeerRecord | None, reliability: PeerReliability, selected_time: float | None
+    ) -> None:
+        """
+        Adds a peer, or reschedules it after its record, reliability or
+        selection time changed.
+        """
+        v6 = self._ipv6.get(peer_id)
+        if v6 is None:
+            v6 = is_ipv6(peer_id)
+            self._ipv6[peer_id] = v6
+            self.ipv6_peers += v6
+        self._eligible[v6].remove(peer_id)
+        # the ban and ignore times are inclusive
+        self._set_status(peer_id, reliability.ban_till + 1, reliability.ignore_till + 1, time.time())
+        if record is None:
+            self._scheduled.pop(peer_id, None)
+            return
+
+        interval = IPV6_RECRAWL_INTERVAL if v6 else IPV4_RECRAWL_INTERVAL
+        last_seen = max(record.last_try_timestamp, record.connected_timestamp)
+        eligible_time = float(last_seen + interval)
+        # peers we've never tried are crawled even if they're banned or ignored
+        if last_seen != 0:
+            eligible_time = max(eligible_time, reliability.ban_till + 1, reliability.ignore_till + 1)
+        if selected_time is not None:
+            eligible_time = max(eligible_time, selected_time + RESELECT_INTERVAL)
+        self._scheduled[peer_id] = eligible_time
+        heapq.heappush(self._waiting[v6], (eligible_time, peer_id))
+
+    def remove(self, peer_id: str) -> None:
+        v6 = self._ipv6.pop(peer_id, None)
+        if v6 is None:
+            return
+        self.ipv6_peers -= v6
+        self._eligible[v6].remove(peer_id)
+        self._scheduled.pop(peer_id, None)
+        self._set_status(peer_id, 0, 0, 0)
+
+    def _set_status(self, peer_id: str, banned_until: int, ignored_until: int, now: float) -> None:
+        old = self._status.pop(peer_id, None)
+        if old is not None:
+            self.banned_peers -= old[0] == PeerStatus.BANNED
+            self.ignored_peers -= old[0] == PeerStatus.IGNORED
+        if now < banned_until:
+            status = PeerStatus.BANNED
+            expiry = banned_until
+            self.banned_peers += 1
+        elif now < ignored_until:
+            status = PeerStatus.IGNORED
+            expiry = ignored_until
+            self.ignored_peers += 1
+        else:
+            return
+        self._status[peer_id] = (status, expiry, banned_until, ignored_until)
+        heapq.heappush(self._status_expiry, (expiry, peer_id))
+
+    def _advance(self, now: float) -> None:
+        for v6, waiting in self._waiting.items():
+            eligible = self._eligible[v6]
+            while len(waiting) > 0 and waiting[0][0] <= now:
+                eligible_time, peer_id = heapq.heappop(waiting)
+                if self._scheduled.get(peer_id) == eligible_time:
+                    del self._scheduled[peer_id]
+                    eligible.add(peer_id)
+
+        while len(self._status_expiry) > 0 and self._status_expiry[0][0] <= now:
+            expiry, peer_id = heapq.heappop(self._status_expiry)
+            status = self._status.get(peer_id)
+            if status is not None and status[1] == expiry:
+                # a ban can expire into an ignore
+                self._set_status(peer_id, status[2], status[3], now)
+
+        # stale entries pile up in the heaps as peers are updated, rebuild
+        # them once they're mostly stale
+        if sum(len(waiting) for waiting in self._waiting.values()) > 2 * len(self._scheduled) + 1000:
+            self._waiting = {False: [], True: []}
+            for peer_id, eligible_time in self._scheduled.items():
+                self._waiting[self._ipv6[peer_id]].append((eligible_time, peer_id))
+            for waiting in self._waiting.values():
+                heapq.heapify(waiting)
+        if len(self._status_expiry) > 2 * len(self._status) + 1000:
+            self._status_expiry = [(status[1], peer_id) for peer_id, status in self._status.items()]
+            heapq.heapify(self._status_expiry)
+
+    def select(self, min_batch_size: int, max_batch_size: int, now: float) -> list[str]:
+        """
+        Takes a random batch of the eligible peers of each address family out
+        of the schedule, and updates the banned and ignored counts. The batch
+        size scales with the number of eligible IPv4 peers. The selected peers
+        must be updated (with their selection time) to be scheduled again.
+        """
+        self._advance(now)
+        batch_size = max(min_batch_size, len(self._eligible[False]) // 10)
+        batch_size = min(batch_size, max_batch_size)
+        selected: list[str] = []
+        for eligible in self._eligible.values():
+            for _ in range(min(batch_size, len(eligible))):
+                selected.append(eligible.pop_random())
+        return selected
+
+
+PEER_RECORD_INSERT = "INSERT OR REPLACE INTO peer_records VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+PEER_RELIABILITY_INSERT = (
+    "INSERT OR REPLACE INTO peer_reliability VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+def peer_record_row(peer_record: PeerRecord, added_timestamp: int) -> tuple[object, ...]:
+    return (
+        peer_record.peer_id,
+        peer_record.ip_address,
+        peer_record.port,
+        int(peer_record.connected),
+        peer_record.last_try_timestamp,
+        peer_record.try_count,
+        peer_record.connected_timestamp,
+        added_timestamp,
+        peer_record.best_timestamp,
+        peer_record.version,
+        peer_record.handshake_time,
+        peer_record.tls_version,
+    )
+
+
+def peer_reliability_row(peer_reliability: PeerReliability) -> tuple[object, ...]:
+    return (
+        peer_reliability.peer_id,
+        peer_reliability.ignore_till,
+        peer_reliability.ban_till,
+        peer_reliability.stat_2h.weight,
+        peer_reliability.stat_2h.count,
+        peer_reliability.stat_2h.reliability,
+        peer_reliability.stat_8h.weight,
+        peer_reliability.stat_8h.count,
+        peer_reliability.stat_8h.reliability,
+        peer_reliability.stat_1d.weight,
+        peer_reliability.stat_1d.count,
+        peer_reliability.stat_1d.reliability,
+        peer_reliability.stat_1w.weight,
+        peer_reliability.stat_1w.count,
+        peer_reliability.stat_1w.reliability,
+        peer_reliability.stat_1m.weight,
+        peer_reliability.stat_1m.count,
+        peer_reliability.stat_1m.reliability,
+        peer_reliability.tries,
+        peer_reliability.successes,
+    )
+
 
 @dataclass
 class CrawlStore:
@@ -21,6 +260,11 @@ class CrawlStore:
     host_to_records: dict[str, PeerRecord] = field(default_factory=dict)  # peer_id: PeerRecord
     host_to_selected_time: dict[str, float] = field(default_factory=dict)  # peer_id: timestamp (as a float)
     host_to_reliability: dict[str, PeerReliability] = field(default_factory=dict)  # peer_id: PeerReliability
+    schedule: CrawlSchedule = field(default_factory=CrawlSchedule)
+    # the peers that changed since they were last saved to the DB
+    dirty_peers: set[str] = field(default_factory=set)
+    # the contents of the good_peers table, if we know them
+    good_peers_in_db: set[str] | None = None
     banned_peers: int = 0
     ignored_peers: int = 0
     reliable_peers: int = 0
@@ -62,6 +306,7 @@ class CrawlStore:
             pass  # ignore what is likely Duplicate column error
 
         await self.crawl_db.execute("CREATE TABLE IF NOT EXISTS good_peers(ip text)")
+        await self.crawl_db.execute("CREATE INDEX IF NOT EXISTS good_peers_ip on good_peers(ip)")
 
         await self.crawl_db.execute("CREATE INDEX IF NOT EXISTS ip_address on peer_records(ip_address)")
 
@@ -78,63 +323,41 @@ class CrawlStore:
         await self.unload_from_db()
         return self
 
+    def _schedule_peer(self, peer_id: str) -> None:
+        reliability = self.host_to_reliability.get(peer_id)
+        if reliability is not None:
+            record = self.host_to_records.get(peer_id)
+            self.schedule.update(peer_id, record, reliability, self.host_to_selected_time.get(peer_id))
+
+    def _peer_changed(self, peer_id: str) -> None:
+        self.dirty_peers.add(peer_id)
+        self._schedule_peer(peer_id)
+
     def maybe_add_peer(self, peer_record: PeerRecord, peer_reliability: PeerReliability) -> None:
+        added = False
         if peer_record.peer_id not in self.host_to_records:
             self.host_to_records[peer_record.peer_id] = peer_record
+            added = True
         if peer_reliability.peer_id not in self.host_to_reliability:
             self.host_to_reliability[peer_reliability.peer_id] = peer_reliability
+            added = True
+        if added:
+            self._peer_changed(peer_record.peer_id)
+            if peer_reliability.peer_id != peer_record.peer_id:
+                self._peer_changed(peer_reliability.peer_id)
 
     async def add_peer(self, peer_record: PeerRecord, peer_reliability: PeerReliability, save_db: bool = False) -> None:
         if not save_db:
             self.host_to_records[peer_record.peer_id] = peer_record
             self.host_to_reliability[peer_reliability.peer_id] = peer_reliability
+            self._peer_changed(peer_record.peer_id)
+            if peer_reliability.peer_id != peer_record.peer_id:
+                self._peer_changed(peer_reliability.peer_id)
             return
 
-        added_timestamp = int(time.time())
-        cursor = await self.crawl_db.execute(
-            "INSERT OR REPLACE INTO peer_records VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                peer_record.peer_id,
-                peer_record.ip_address,
-                peer_record.port,
-                int(peer_record.connected),
-                peer_record.last_try_timestamp,
-                peer_record.try_count,
-                peer_record.connected_timestamp,
-                added_timestamp,
-                peer_record.best_timestamp,
-                peer_record.version,
-                peer_record.handshake_time,
-                peer_record.tls_version,
-            ),
-        )
+        cursor = await self.crawl_db.execute(PEER_RECORD_INSERT, peer_record_row(peer_record, int(time.time())))
         await cursor.close()
-        cursor = await self.crawl_db.execute(
-            "INSERT OR REPLACE INTO peer_reliability"
-            " VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (
-                peer_reliability.peer_id,
-                peer_reliability.ignore_till,
-                peer_reliability.ban_till,
-                peer_reliability.stat_2h.weight,
-                peer_reliability.stat_2h.count,
-                peer_reliability.stat_2h.reliability,
-                peer_reliability.stat_8h.weight,
-                peer_reliability.stat_8h.count,
-                peer_reliability.stat_8h.reliability,
-                peer_reliability.stat_1d.weight,
-                peer_reliability.stat_1d.count,
-                peer_reliability.stat_1d.reliability,
-                peer_reliability.stat_1w.weight,
-                peer_reliability.stat_1w.count,
-                peer_reliability.stat_1w.reliability,
-                peer_reliability.stat_1m.weight,
-                peer_reliability.stat_1m.count,
-                peer_reliability.stat_1m.reliability,
-                peer_reliability.tries,
-                peer_reliability.successes,
-            ),
-        )
+        cursor = await self.crawl_db.execute(PEER_RELIABILITY_INSERT, peer_reliability_row(peer_reliability))
         await cursor.close()
 
     async def get_peer_reliability(self, peer_id: str) -> PeerReliability:
@@ -184,65 +407,19 @@ class CrawlStore:
             await self.peer_failed_to_connect(record)
 
     async def get_peers_to_crawl(self, min_batch_size: int, max_batch_size: int) -> list[PeerRecord]:
-        now = int(time.time())
+        now = time.time()
+        peer_ids = self.schedule.select(min_batch_size, max_batch_size, now)
+        self.banned_peers = self.schedule.banned_peers
+        self.ignored_peers = self.schedule.ignored_peers
         records = []
-        records_v6 = []
-        counter = 0
-        self.ignored_peers = 0
-        self.banned_peers = 0
-        for peer_id, reliability in self.host_to_reliability.items():
-            add = False
-            counter += 1
-            if reliability.ignore_till < now and reliability.ban_till < now:
-                add = True
-            elif reliability.ban_till >= now:
-                self.banned_peers += 1
-            elif reliability.ignore_till >= now:
-                self.ignored_peers += 1
-            record = self.host_to_records[peer_id]
-            if record.last_try_timestamp == 0 and record.connected_timestamp == 0:
-                add = True
-            if peer_id in self.host_to_selected_time:
-                last_selected = self.host_to_selected_time[peer_id]
-                if time.time() - last_selected < 120:
-                    add = False
-            if add:
-                v6 = True
-                try:
-                    _ = ipaddress.IPv6Address(peer_id)
-                except ValueError:
-                    v6 = False
-                delta_time = 600 if v6 else 1000
-                if now - record.last_try_timestamp >= delta_time and now - record.connected_timestamp >= delta_time:
-                    if not v6:
-                        records.append(record)
-                    else:
-                        records_v6.append(record)
-
-        batch_size = max(min_batch_size, len(records) // 10)
-        batch_size = min(batch_size, max_batch_size)
-        if len(records) > batch_size:
-            random.shuffle(records)
-            records = records[:batch_size]
-        if len(records_v6) > batch_size:
-            random.shuffle(records_v6)
-            records_v6 = records_v6[:batch_size]
-        records += records_v6
-        for record in records:
-            self.host_to_selected_time[record.peer_id] = time.time()
+        for peer_id in peer_ids:
+            self.host_to_selected_time[peer_id] = now
+            self._schedule_peer(peer_id)
+            records.append(self.host_to_records[peer_id])
         return records
 
     def get_ipv6_peers(self) -> int:
-        counter = 0
-        for peer_id in self.host_to_reliability:
-            v6 = True
-            try:
-                _ = ipaddress.IPv6Address(peer_id)
-            except ValueError:
-                v6 = False
-            if v6:
-                counter += 1
-        return counter
+        return self.schedule.ipv6_peers
 
     def get_total_records(self) -> int:
         return len(self.host_to_records)
@@ -257,18 +434,40 @@ class CrawlStore:
         return self.reliable_peers
 
     async def load_to_db(self) -> None:
-        log.warning("Saving peers to DB...")
-        for peer_id in list(self.host_to_reliability.keys()):
-            if peer_id in self.host_to_reliability and peer_id in self.host_to_records:
-                reliability = self.host_to_reliability[peer_id]
-                record = self.host_to_records[peer_id]
-                await self.add_peer(record, reliability, True)
-        await self.crawl_db.commit()
+        """
+        Saves the peers that changed since they were last saved, in a single
+        transaction.
+        """
+        dirty_peers = self.dirty_peers
+        self.dirty_peers = set()
+        log.warning(f"Saving {len(dirty_peers)} changed peers to DB...")
+        added_timestamp = int(time.time())
+        record_rows = []
+        reliability_rows = []
+        for peer_id in dirty_peers:
+            record = self.host_to_records.get(peer_id)
+            reliability = self.host_to_reliability.get(peer_id)
+            if record is not None and reliability is not None:
+                record_rows.append(peer_record_row(record, added_timestamp))
+                reliability_rows.append(peer_reliability_row(reliability))
+        try:
+            cursor = await self.crawl_db.executemany(PEER_RECORD_INSERT, record_rows)
+            await cursor.close()
+            cursor = await self.crawl_db.executemany(PEER_RELIABILITY_INSERT, reliability_rows)
+            await cursor.close()
+            await self.crawl_db.commit()
+        except BaseException:
+            # the peers are saved again next time
+            self.dirty_peers |= dirty_peers
+            await self.crawl_db.rollback()
+            raise
         log.warning(" - Done saving peers to DB")
 
     async def unload_from_db(self) -> None:
         self.host_to_records = {}
         self.host_to_reliability = {}
+        self.dirty_peers = set()
+        self.good_peers_in_db = None
         log.warning("Loading peer reliability records...")
         cursor = await self.crawl_db.execute(
             "SELECT * from peer_reliability",
@@ -312,29 +511,39 @@ class CrawlStore:
             )
             self.host_to_records[peer.peer_id] = peer
         log.warning("  - Done loading peer records...")
+        self.schedule = CrawlSchedule()
+        for peer_id in self.host_to_reliability:
+            self._schedule_peer(peer_id)
 
     # Crawler -> DNS.
     async def load_reliable_peers_to_db(self) -> None:
-        peers = []
-        for peer_id, reliability in self.host_to_reliability.items():
-            if reliability.is_reliable():
-                peers.append(peer_id)
+        """
+        Updates good_peers to the current reliable peers. Only the peers that
+        were added or removed since the last update are written, in a single
+        transaction, so the DNS server never reads a partially updated table.
+        """
+        peers = {peer_id for peer_id, reliability in self.host_to_reliability.items() if reliability.is_reliable()}
         self.reliable_peers = len(peers)
-        log.warning("Deleting old good_peers from DB...")
-        cursor = await self.crawl_db.execute(
-            "DELETE from good_peers",
-        )
-        await cursor.close()
-        log.warning(" - Done deleting old good_peers...")
-        log.warning("Saving new good_peers to DB...")
-        for peer_id in peers:
-            cursor = await self.crawl_db.execute(
-                "INSERT OR REPLACE INTO good_peers VALUES(?)",
-                (peer_id,),
-            )
+        if self.good_peers_in_db is None:
+            cursor = await self.crawl_db.execute("SELECT ip from good_peers")
+            rows = await cursor.fetchall()
             await cursor.close()
-        await self.crawl_db.commit()
-        log.warning(" - Done saving new good_peers to DB...")
+            self.good_peers_in_db = {row[0] for row in rows}
+        removed = [(peer_id,) for peer_id in self.good_peers_in_db - peers]
+        added = [(peer_id,) for peer_id in peers - self.good_peers_in_db]
+        log.warning(f"Updating good_peers in DB, {len(added)} added and {len(removed)} removed...")
+        try:
+            cursor = await self.crawl_db.executemany("DELETE from good_peers WHERE ip=?", removed)
+            await cursor.close()
+            cursor = await self.crawl_db.executemany("INSERT INTO good_peers VALUES(?)", added)
+            await cursor.close()
+            await self.crawl_db.commit()
+        except BaseException:
+            self.good_peers_in_db = None
+            await self.crawl_db.rollback()
+            raise
+        self.good_peers_in_db = peers
+        log.warning(" - Done updating good_peers...")
 
     def load_host_to_version(self) -> tuple[dict[str, str], dict[str, uint64]]:
         versions = {}
@@ -403,6 +612,8 @@ class CrawlStore:
         )
         await self.crawl_db.commit()
         await self.crawl_db.execute("VACUUM")
+        # good_peers may have lost peers we didn't prune from memory
+        self.good_peers_in_db = None
 
         to_delete: list[str] = []
 
@@ -419,3 +630,6 @@ class CrawlStore:
 
             if peer_id in self.host_to_reliability:
                 del self.host_to_reliability[peer_id]
+
+            self.schedule.remove(peer_id)
+            self.dirty_peers.discard(peer_id)
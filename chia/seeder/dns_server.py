@@ -2,7 +2,9 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import math
 import signal
+import struct
 import sys
 import traceback
 from collections.abc import AsyncIterator, Awaitable, Callable
@@ -12,11 +14,27 @@ from ipaddress import IPv4Address, IPv6Address, ip_address
 from multiprocessing import freeze_support
 from pathlib import Path
 from types import FrameType
-from typing import Any
+from typing import Any, TypeVar
 
 import aiosqlite
 import dns.asyncresolver
-from dnslib import AAAA, EDNS0, NS, QTYPE, RCODE, RD, RR, SOA, A, DNSError, DNSHeader, DNSQuestion, DNSRecord
+from dnslib import (
+    AAAA,
+    CLASS,
+    EDNS0,
+    NS,
+    QTYPE,
+    RCODE,
+    RD,
+    RR,
+    SOA,
+    A,
+    DNSError,
+    DNSHeader,
+    DNSLabel,
+    DNSQuestion,
+    DNSRecord,
+)
 
 from chia.seeder.crawl_store import CrawlStore
 from chia.server.signal_handlers import SignalHandlers
@@ -27,8 +45,18 @@ from chia.util.path import path_from_root
 from chia.util.task_referencer import create_referenced_task
 
 SERVICE_NAME = "seeder"
+_T = TypeVar("_T")
 log = logging.getLogger(__name__)
 DnsCallback = Callable[[DNSRecord], Awaitable[DNSRecord]]
+# takes a raw query, and whether it came over UDP, and returns the raw reply, or
+# None if the query needs the DnsCallback
+FastDnsCallback = Callable[[bytes, bool], bytes | None]
+
+# the number of pre-encoded replies kept for each query type, each answering
+# with a different set of peers
+MAX_ANSWER_SETS = 128
+# an OPT record (with the root name) for a 4096 byte UDP payload, without options
+EDNS_OPT_RECORD = b"\0" + struct.pack("!2HIH", QTYPE.OPT, 4096, 0, 0)
 
 
 # DNS snippet taken from: https://gist.github.com/pklaus/b5a7876d4d2cf7271873
@@ -51,6 +79,118 @@ class PeerList:
         return not self.ipv4 and not self.ipv6
 
 
+def peer_counts(question_type: int) -> tuple[int, int]:
+    """
+    The number of IPv4 and IPv6 peers to answer a query with.
+    """
+    if question_type == QTYPE.AAAA:
+        return 0, 32
+    if question_type == QTYPE.ANY:
+        return 16, 16
+    return 32, 0
+
+
+@dataclass(frozen=True)
+class SimpleQuery:
+    question_end: int
+    qtype: int
+    edns_len: int | None
+
+
+def parse_simple_query(data: bytes) -> SimpleQuery | None:
+    """
+    Parses a standard query with a single question, and optionally an EDNS OPT record, without building a
+    DNSRecord. Returns None for anything else, which is left to the full parser.
+    """
+    if len(data) < 17:
+        return None
+    # QR and the opcode must be 0
+    if data[2] & 0xF8 != 0:
+        return None
+    qdcount, ancount, nscount, arcount = struct.unpack_from("!4H", data, 4)
+    if qdcount != 1 or ancount != 0 or nscount != 0 or arcount > 1:
+        return None
+    pos = 12
+    while pos < len(data) and data[pos] != 0:
+        # the question name isn't compressed, so all we expect are labels
+        if data[pos] > 63:
+            return None
+        pos += data[pos] + 1
+    question_end = pos + 5
+    if question_end > len(data):
+        return None
+    qtype, qclass = struct.unpack_from("!2H", data, pos + 1)
+    if qclass != CLASS.IN:
+        return None
+    if arcount == 0:
+        return SimpleQuery(question_end, qtype, None) if len(data) == question_end else None
+    # an OPT record has the root name, and its class is the UDP payload size
+    if len(data) < question_end + 11 or data[question_end] != 0:
+        return None
+    rtype, edns_len, _, rdlength = struct.unpack_from("!2HIH", data, question_end + 1)
+    if rtype != QTYPE.OPT or len(data) != question_end + 11 + rdlength:
+        return None
+    return SimpleQuery(question_end, qtype, edns_len)
+
+
+@dataclass
+class AnswerPool:
+    """
+    Pre-encoded replies to a query type for our domain, each answering with a different set of peers. Queries are
+    answered from the replies in turn, after patching in the query's ID and question (and the EDNS payload size),
+    so answering a query doesn't build or pack a DNSRecord.
+    """
+
+    replies: list[bytes]
+    next_reply: int = 0
+
+    def reply(self, data: bytes, query: SimpleQuery, udp: bool) -> bytes:
+        template = self.replies[self.next_reply]
+        self.next_reply = (self.next_reply + 1) % len(self.replies)
+        # the question has the same length as the one in the template, since only the case of the name can differ
+        # (see DNS 0x20), so the compressed names pointing into it stay valid
+        end = query.question_end
+        if query.edns_len is None:
+            reply = b"".join((data[:2], template[2:12], data[12:end], template[end:]))
+            max_size = 512
+        else:
+            # the template ends with an OPT record without options, the payload size is its class
+            udp_len = min(4096, query.edns_len)
+            reply = b"".join(
+                (data[:2], template[2:12], data[12:end], template[end:-8], udp_len.to_bytes(2, "big"), template[-6:])
+            )
+            max_size = max(512, udp_len)
+        if udp and len(reply) > max_size:
+            # like DNSRecord.truncate(), just the header with the TC flag set
+            return b"".join((data[:2], bytes([template[2] | 0x02, template[3]]), bytes(8)))
+        return reply
+
+
+@dataclass(frozen=True)
+class AnswerPools:
+    # the peer lists the replies were built from
+    peers_v4: list[IPv4Address]
+    peers_v6: list[IPv6Address]
+    # the domain name, as it's encoded in a query
+    domain_wire: bytes
+    # (question type, EDNS): replies
+    pools: dict[tuple[int, bool], AnswerPool]
+
+
+def add_edns(reply: bytes) -> bytes:
+    """
+    Adds an OPT record to a packed reply without one, like create_reply() does.
+    """
+    arcount = int.from_bytes(reply[10:12], byteorder="big") + 1
+    return b"".join((reply[:10], arcount.to_bytes(2, byteorder="big"), reply[12:], EDNS_OPT_RECORD))
+
+
+def rotated_peers(peers: list[_T], start: int, count: int) -> list[_T]:
+    if len(peers) <= count:
+        return peers
+    return [peers[(start + i) % len(peers)] for i in range(count)]
+
+
 @dataclass
 class UDPDNSServerProtocol(asyncio.DatagramProtocol):
     """
@@ -58,6 +198,7 @@ class UDPDNSServerProtocol(asyncio.DatagramProtocol):
     """
 
     callback: DnsCallback
+    fast_callback: FastDnsCallback | None = None
     transport: asyncio.DatagramTransport | None = field(init=False, default=None)
     data_queue: asyncio.Queue[tuple[DNSRecord, tuple[str, int]]] = field(default_factory=asyncio.Queue)
     queue_task: asyncio.Task[None] | None = field(init=False, default=None)
@@ -81,6 +222,10 @@ class UDPDNSServerProtocol(asyncio.DatagramProtocol):
 
     def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
         log.debug(f"Received UDP DNS request from {addr}.")
+        reply = get_fast_dns_reply(self.fast_callback, data, True)
+        if reply is not None and self.transport is not None:
+            self.transport.sendto(reply, addr)
+            return
         dns_request: DNSRecord | None = parse_dns_request(data)
         if dns_request is None:  # Invalid Request, we can just drop it and move on.
             return
@@ -123,6 +268,7 @@ class TCPDNSServerProtocol(asyncio.BufferedProtocol):
     """
 
     callback: DnsCallback
+    fast_callback: FastDnsCallback | None = None
     transport: asyncio.Transport | None = field(init=False, default=None)
     peer_info: str = field(init=False, default="")
     expected_length: int = 0
@@ -178,6 +324,10 @@ class TCPDNSServerProtocol(asyncio.BufferedProtocol):
                 self.buffer = self.buffer[self.expected_length :]  # Remove the message from the buffer
                 self.expected_length = 0  # Reset the expected length
 
+                reply = get_fast_dns_reply(self.fast_callback, bytes(message), False)
+                if reply is not None:
+                    self.transport.write(len(reply).to_bytes(2, byteorder="big") + reply)
+                    continue
                 dns_request: DNSRecord | None = parse_dns_request(message)
                 if dns_request is None:  # Invalid Request, so we disconnect and don't send anything back.
                     self.transport.close()
@@ -267,6 +417,20 @@ async def get_dns_reply(callback: DnsCallback, dns_request: DNSRecord) -> DNSRec
     return dns_reply
 
 
+def get_fast_dns_reply(callback: FastDnsCallback | None, data: bytes, udp: bool) -> bytes | None:
+    """
+    This function calls the fast path callback, if there is one. If it raises an exception, the request is left to
+    the regular callback.
+    """
+    if callback is None:
+        return None
+    try:
+        return callback(data, udp)
+    except Exception as e:
+        log.error(f"Exception during fast DNS record processing: {e}. Traceback: {traceback.format_exc()}.")
+        return None
+
+
 @dataclass
 class DNSServer:
     config: dict[str, Any]
@@ -298,6 +462,7 @@ class DNSServer:
     resolver: dns.asyncresolver.Resolver | None = field(init=False)
     pointer_v4: int = 0
     pointer_v6: int = 0
+    answer_pools: AnswerPools | None = None
 
     def __post_init__(self) -> None:
         """
@@ -347,7 +512,8 @@ class DNSServer:
 
         # One protocol instance will be created for each udp transport, so that we can accept ipv4 and ipv6
         self.udp_transport_ipv6, self.udp_protocol_ipv6 = await loop.create_datagram_endpoint(
-            lambda: UDPDNSServerProtocol(self.dns_response), local_addr=("::0", self.udp_dns_port)
+            lambda: UDPDNSServerProtocol(self.dns_response, self.fast_dns_response),
+            local_addr=("::0", self.udp_dns_port),
         )
         self.udp_protocol_ipv6.start()  # start ipv6 udp transmit task
 
@@ -357,13 +523,16 @@ class DNSServer:
         if sys.platform.startswith("win32") or sys.platform.startswith("cygwin"):
             # Windows does not support dual stack sockets, so we need to create a new socket for ipv4.
             self.udp_transport_ipv4, self.udp_protocol_ipv4 = await loop.create_datagram_endpoint(
-                lambda: UDPDNSServerProtocol(self.dns_response), local_addr=("0.0.0.0", self.udp_dns_port)
+                lambda: UDPDNSServerProtocol(self.dns_response, self.fast_dns_response),
+                local_addr=("0.0.0.0", self.udp_dns_port),
             )
             self.udp_protocol_ipv4.start()  # start ipv4 udp transmit task
 
         # One tcp server will handle both ipv4 and ipv6 on both linux and windows.
         self.tcp_server = await loop.create_server(
-            lambda: TCPDNSServerProtocol(self.dns_response), ["::0", "0.0.0.0"], self.tcp_dns_port
+            lambda: TCPDNSServerProtocol(self.dns_response, self.fast_dns_response),
+            ["::0", "0.0.0.0"],
+            self.tcp_dns_port,
         )
 
         log.warning("DNS server started.")
@@ -453,26 +622,31 @@ class DNSServer:
             log.warning("No reliable peers found in database, waiting for db to be populated.")
             await asyncio.sleep(2)  # sleep for 2 seconds, because the db has not been populated yet.
 
+        # the new peer lists are built before taking the lock, and replace the
+        # old ones in one go, so queries are never answered from partial lists
+        reliable_peers_v4: list[IPv4Address] = []
+        reliable_peers_v6: list[IPv6Address] = []
+        for peer in new_reliable_peers:
+            try:
+                validated_peer = ip_address(peer)
+                if validated_peer.version == 4:
+                    reliable_peers_v4.append(validated_peer)
+                elif validated_peer.version == 6:
+                    reliable_peers_v6.append(validated_peer)
+            except ValueError:
+                log.error(f"Invalid peer: {peer}")
+                continue
         async with self.lock:
-            self.reliable_peers_v4 = []
-            self.reliable_peers_v6 = []
+            self.reliable_peers_v4 = reliable_peers_v4
+            self.reliable_peers_v6 = reliable_peers_v6
             self.pointer_v4 = 0
             self.pointer_v6 = 0
-            for peer in new_reliable_peers:
-                try:
-                    validated_peer = ip_address(peer)
-                    if validated_peer.version == 4:
-                        self.reliable_peers_v4.append(validated_peer)
-                    elif validated_peer.version == 6:
-                        self.reliable_peers_v6.append(validated_peer)
-                except ValueError:
-                    log.error(f"Invalid peer: {peer}")
-                    continue
-            log.warning(
-                f"Number of reliable peers discovered in dns server:"
-                f" IPv4 count - {len(self.reliable_peers_v4)}"
-                f" IPv6 count - {len(self.reliable_peers_v6)}"
-            )
+        self.answer_pools = await asyncio.to_thread(self.build_answer_pools, reliable_peers_v4, reliable_peers_v6)
+        log.warning(
+            f"Number of reliable peers discovered in dns server:"
+            f" IPv4 count - {len(reliable_peers_v4)}"
+            f" IPv6 count - {len(reliable_peers_v6)}"
+        )
 
     async def get_peers_to_respond(self, ipv4_count: int, ipv6_count: int) -> PeerList:
         async with self.lock:
@@ -498,20 +672,78 @@ class DNSServer:
                 self.pointer_v6 = (self.pointer_v6 + ipv6_count) % size  # mark where we left off
             return PeerList(ipv4_peers, ipv6_peers)
 
-    async def dns_response(self, request: DNSRecord) -> DNSRecord:
+    def build_answer_pools(self, peers_v4: list[IPv4Address], peers_v6: list[IPv6Address]) -> AnswerPools:
         """
-        This function is called when a DNS request is received, and it returns a DNS response.
-        It does not catch any errors as it is called from within a try-except block.
+        Builds the pre-encoded replies to A, AAAA and ANY queries for our domain, with and without EDNS. The replies
+        rotate through the peers like get_peers_to_respond(), up to MAX_ANSWER_SETS replies per query type.
+        """
+        domain_wire = b"".join(bytes([len(label)]) + label for label in DNSLabel(self.domain).label) + b"\0"
+        pools: dict[tuple[int, bool], AnswerPool] = {}
+        if len(peers_v4) == 0 and len(peers_v6) == 0:
+            # the replies without peers are left to dns_response(), which logs them
+            return AnswerPools(peers_v4, peers_v6, domain_wire, pools)
+        for question_type in [QTYPE.A, QTYPE.AAAA, QTYPE.ANY]:
+            ipv4_count, ipv6_count = peer_counts(question_type)
+            answer_sets = max(
+                math.ceil(len(peers_v4) / ipv4_count) if ipv4_count > 0 else 1,
+                math.ceil(len(peers_v6) / ipv6_count) if ipv6_count > 0 else 1,
+            )
+            answer_sets = min(max(answer_sets, 1), MAX_ANSWER_SETS)
+            query = DNSRecord(q=DNSQuestion(self.domain, question_type))
+            replies: list[bytes] = []
+            for i in range(answer_sets):
+                peers_to_respond = PeerList(
+                    rotated_peers(peers_v4, i * ipv4_count, ipv4_count),
+                    rotated_peers(peers_v6, i * ipv6_count, ipv6_count),
+                )
+                reply = self.create_reply(query)
+                self.add_records(reply, peers_to_respond)
+                replies.append(bytes(reply.pack()))
+            pools[question_type, False] = AnswerPool(replies)
+            pools[question_type, True] = AnswerPool([add_edns(reply) for reply in replies])
+        return AnswerPools(peers_v4, peers_v6, domain_wire, pools)
+
+    def fast_dns_response(self, data: bytes, udp: bool) -> bytes | None:
         """
+        This function answers the A, AAAA and ANY queries for our domain from the answer pools, and returns None for
+        the queries that need dns_response().
+        """
+        answer_pools = self.answer_pools
+        # the pools are only used with the peers they were built from
+        if (
+            answer_pools is None
+            or answer_pools.peers_v4 is not self.reliable_peers_v4
+            or answer_pools.peers_v6 is not self.reliable_peers_v6
+        ):
+            return None
+        query = parse_simple_query(data)
+        if query is None:
+            return None
+        if data[12 : query.question_end - 4].lower() != answer_pools.domain_wire:
+            return None
+        pool = answer_pools.pools.get((query.qtype, query.edns_len is not None))
+        if pool is None:
+            return None
+        return pool.reply(data, query, udp)
+
+    def create_reply(self, request: DNSRecord) -> DNSRecord:
         reply = create_dns_reply(request)
-        dns_question: DNSQuestion = request.q  # this is the question / request
-        question_type: int = dns_question.qtype  # the type of the record being requested
-        qname = dns_question.qname  # the name being queried / requested
         # ADD EDNS0 to response if supported
         if len(request.ar) > 0 and request.ar[0].rtype == QTYPE.OPT:  # OPT Means EDNS
             udp_len = min(4096, request.ar[0].edns_len)
             edns_reply = EDNS0(udp_len=udp_len)
             reply.add_ar(edns_reply)
+        return reply
+
+    async def dns_response(self, request: DNSRecord) -> DNSRecord:
+        """
+        This function is called when a DNS request is received, and it returns a DNS response.
+        It does not catch any errors as it is called from within a try-except block.
+        """
+        reply = self.create_reply(request)
+        dns_question: DNSQuestion = request.q  # this is the question / request
+        question_type: int = dns_question.qtype  # the type of the record being requested
+        qname = dns_question.qname  # the name being queried / requested
         # DNS labels are mixed case with DNS resolvers that implement the use of bit 0x20 to improve
         # transaction identity. See https://datatracker.ietf.org/doc/html/draft-vixie-dnsext-dns0x20-00
         qname_str = str(qname).lower()
@@ -521,24 +753,25 @@ class DNSServer:
             reply.header.rcode = RCODE.REFUSED
             return reply
 
-        ttl: int = self.ttl
-        # we add these to the list as it will allow us to respond to ns and soa requests
-        ips: list[RD] = [self.soa_record, *self.ns_records]
-        ipv4_count = 0
-        ipv6_count = 0
-        if question_type is QTYPE.A:
-            ipv4_count = 32
-        elif question_type is QTYPE.AAAA:
-            ipv6_count = 32
-        elif question_type is QTYPE.ANY:
-            ipv4_count = 16
-            ipv6_count = 16
-        else:
-            ipv4_count = 32
+        ipv4_count, ipv6_count = peer_counts(question_type)
         peers: PeerList = await self.get_peers_to_respond(ipv4_count, ipv6_count)
         if peers.no_peers:
             log.error("No peers found, returning SOA and NS records only.")
+        self.add_records(reply, peers)
+        return reply
+
+    def add_records(self, reply: DNSRecord, peers: PeerList) -> None:
+        """
+        This function adds the answer and authority records to a reply for our domain (or a name in it).
+        """
+        question_type: int = reply.q.qtype
+        qname = reply.q.qname
+        qname_str = str(qname).lower()
+        ttl: int = self.ttl
+        if peers.no_peers:
             ttl = 60  # 1 minute as we should have some peers very soon
+        # we add these to the list as it will allow us to respond to ns and soa requests
+        ips: list[RD] = [self.soa_record, *self.ns_records]
         # we always return the SOA and NS records, so we continue even if there are no peers
         ips.extend([A(str(peer)) for peer in peers.ipv4])
         ips.extend([AAAA(str(peer)) for peer in peers.ipv6])
@@ -561,7 +794,6 @@ class DNSServer:
         for nameserver in self.ns_records:
             reply.add_auth(RR(rname=self.domain, rtype=QTYPE.NS, rclass=1, ttl=ttl, rdata=nameserver))
         reply.add_auth(RR(rname=self.domain, rtype=QTYPE.SOA, rclass=1, ttl=ttl, rdata=self.soa_record))
-        return reply
 
 
 async def run_dns_server(dns_server: DNSServer) -> None:  # pragma: no cover
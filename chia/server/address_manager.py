@@ -5,8 +5,11 @@ import io
 import logging
 import math
 import time
+from array import array
 from asyncio import Lock
+from collections.abc import Iterator
 from dataclasses import dataclass, field
+from enum import IntEnum
 from ipaddress import IPv4Address, IPv6Address, ip_address
 from pathlib import Path
 from random import choice, randrange
@@ -41,6 +44,20 @@ log = logging.getLogger(__name__)
 
 # This is a Python port from 'CAddrInfo' class from Bitcoin core code.
 class ExtendedPeerInfo:
+    # address managers on busy nodes hold hundreds of thousands of these
+    __slots__ = (
+        "is_tried",
+        "last_count_attempt",
+        "last_success",
+        "last_try",
+        "num_attempts",
+        "peer_info",
+        "random_pos",
+        "ref_count",
+        "src",
+        "timestamp",
+    )
+
     def __init__(
         self,
         addr: TimestampedPeerInfo,
@@ -214,12 +231,96 @@ class ExtendedPeerInfo:
         return chance
 
 
-def create_tried_matrix() -> list[list[int]]:
-    return [[-1 for x in range(BUCKET_SIZE)] for y in range(TRIED_BUCKET_COUNT)]
+def create_tried_matrix() -> list[array[int]]:
+    return [array("i", [-1]) * BUCKET_SIZE for y in range(TRIED_BUCKET_COUNT)]
+
+
+def create_new_matrix() -> list[array[int]]:
+    return [array("i", [-1]) * BUCKET_SIZE for y in range(NEW_BUCKET_COUNT)]
+
+
+class TablePositions:
+    """
+    The used (bucket, position) pairs of the new or tried table. The pairs are
+    packed into a dense array, and a second array maps each table position to
+    its index in the first, so adding, removing and picking a random used
+    position are all O(1).
+    """
+
+    def __init__(self, bucket_count: int) -> None:
+        self._positions: array[int] = array("i")
+        self._index: array[int] = array("i", [-1]) * (bucket_count * BUCKET_SIZE)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, item: tuple[int, int]) -> bool:
+        bucket, pos = item
+        return self._index[bucket * BUCKET_SIZE + pos] != -1
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        for position in self._positions:
+            yield divmod(position, BUCKET_SIZE)
+
+    def add(self, item: tuple[int, int]) -> None:
+        bucket, pos = item
+        position = bucket * BUCKET_SIZE + pos
+        if self._index[position] == -1:
+            self._index[position] = len(self._positions)
+            self._positions.append(position)
+
+    def discard(self, item: tuple[int, int]) -> None:
+        bucket, pos = item
+        position = bucket * BUCKET_SIZE + pos
+        index = self._index[position]
+        if index == -1:
+            return
+        # move the last position into the hole
+        last = self._positions.pop()
+        if last != position:
+            self._positions[index] = last
+            self._index[last] = index
+        self._index[position] = -1
+
+    def random_position(self) -> tuple[int, int]:
+        return divmod(self._positions[randrange(len(self._positions))], BUCKET_SIZE)
+
 
+def create_new_table_positions() -> TablePositions:
+    return TablePositions(NEW_BUCKET_COUNT)
 
-def create_new_matrix() -> list[list[int]]:
-    return [[-1 for x in range(BUCKET_SIZE)] for y in range(NEW_BUCKET_COUNT)]
+
+def create_tried_table_positions() -> TablePositions:
+    return TablePositions(TRIED_BUCKET_COUNT)
+
+
+class PeerChangeKind(IntEnum):
+    # a peer was added, or its timestamp changed
+    NODE = 0
+    # a peer was removed
+    REMOVE = 1
+    # a position in the new table was set (or cleared if host is None)
+    NEW_CELL = 2
+    # a position in the tried table was set (or cleared if host is None)
+    TRIED_CELL = 3
+
+
+@dataclass(frozen=True)
+class PeerChange:
+    """
+    A change to the address manager's persisted state, as recorded in its change
+    log. Changes only refer to peers by host, so they can be replayed onto any
+    address manager with the same key.
+    """
+
+    kind: PeerChangeKind
+    host: str | None
+    port: int = 0
+    timestamp: int = 0
+    src_host: str = ""
+    src_port: int = 0
+    bucket: int = 0
+    pos: int = 0
 
 
 # This is a Python port from 'CAddrMan' class from Bitcoin core code.
@@ -228,18 +329,21 @@ class AddressManager:
     id_count: int = 0
     key: int = field(default_factory=functools.partial(randbits, 256))
     random_pos: list[int] = field(default_factory=list)
-    tried_matrix: list[list[int]] = field(default_factory=create_tried_matrix)
-    new_matrix: list[list[int]] = field(default_factory=create_new_matrix)
+    tried_matrix: list[array[int]] = field(default_factory=create_tried_matrix)
+    new_matrix: list[array[int]] = field(default_factory=create_new_matrix)
     tried_count: int = 0
     new_count: int = 0
     map_addr: dict[str, int] = field(default_factory=dict)
     map_info: dict[int, ExtendedPeerInfo] = field(default_factory=dict)
     last_good: int = 1
     tried_collisions: list[int] = field(default_factory=list)
-    used_new_matrix_positions: set[tuple[int, int]] = field(default_factory=set)
-    used_tried_matrix_positions: set[tuple[int, int]] = field(default_factory=set)
+    used_new_matrix_positions: TablePositions = field(default_factory=create_new_table_positions)
+    used_tried_matrix_positions: TablePositions = field(default_factory=create_tried_table_positions)
     allow_private_subnets: bool = False
     lock: Lock = field(default_factory=Lock)
+    # the changes made since the log was last taken, None if changes aren't
+    # being recorded
+    change_log: list[PeerChange] | None = None
 
     @classmethod
     async def create_address_manager(cls, peers_file_path: Path) -> AddressManager:
@@ -274,14 +378,16 @@ class AddressManager:
         unique_ids: dict[int, int] = {}
         count_ids: int = 0
 
+        # the nodes in the new table must come before the tried ones, since
+        # that's how they are told apart when deserializing
         for node_id, info in self.map_info.items():
-            unique_ids[node_id] = count_ids
             if info.ref_count > 0:
                 assert count_ids != self.new_count
+                unique_ids[node_id] = count_ids
                 info.stream(nodes)
                 count_ids += 1
             if info.is_tried:
-                info.stream(nodes)
+                info.stream(trieds)
 
         out.write(self.key.to_bytes(32, byteorder="big"))
         uint64(count_ids).stream(out)
@@ -364,34 +470,75 @@ class AddressManager:
     def make_private_subnets_valid(self) -> None:
         self.allow_private_subnets = True
 
+    def enable_change_log(self) -> None:
+        if self.change_log is None:
+            self.change_log = []
+
+    # This must be called under the lock. It's cheap, the changes are only
+    # swapped out here and can be processed after releasing the lock.
+    def take_change_log(self) -> list[PeerChange]:
+        changes = self.change_log
+        if changes is None:
+            return []
+        self.change_log = []
+        return changes
+
+    # Puts back changes taken with take_change_log() that couldn't be
+    # persisted, ahead of the ones logged since.
+    def restore_change_log(self, changes: list[PeerChange]) -> None:
+        if self.change_log is not None:
+            self.change_log[:0] = changes
+
+    def log_node_(self, info: ExtendedPeerInfo) -> None:
+        if self.change_log is not None:
+            self.change_log.append(
+                PeerChange(
+                    PeerChangeKind.NODE,
+                    info.peer_info.host,
+                    port=int(info.peer_info.port),
+                    timestamp=info.timestamp,
+                    src_host=info.src.host,
+                    src_port=int(info.src.port),
+                )
+            )
+
+    def log_cell_(self, kind: PeerChangeKind, row: int, col: int, value: int) -> None:
+        if self.change_log is not None:
+            host = None if value == -1 else self.map_info[value].peer_info.host
+            self.change_log.append(PeerChange(kind, host, bucket=row, pos=col))
+
     # Use only this method for modifying new matrix.
     def _set_new_matrix(self, row: int, col: int, value: int) -> None:
+        self.log_cell_(PeerChangeKind.NEW_CELL, row, col, value)
         self.new_matrix[row][col] = value
         if value == -1:
-            if (row, col) in self.used_new_matrix_positions:
-                self.used_new_matrix_positions.remove((row, col))
-        elif (row, col) not in self.used_new_matrix_positions:
+            self.used_new_matrix_positions.discard((row, col))
+        else:
             self.used_new_matrix_positions.add((row, col))
 
     # Use only this method for modifying tried matrix.
     def _set_tried_matrix(self, row: int, col: int, value: int) -> None:
+        self.log_cell_(PeerChangeKind.TRIED_CELL, row, col, value)
         self.tried_matrix[row][col] = value
         if value == -1:
-            if (row, col) in self.used_tried_matrix_positions:
-                self.used_tried_matrix_positions.remove((row, col))
-        elif (row, col) not in self.used_tried_matrix_positions:
+            self.used_tried_matrix_positions.discard((row, col))
+        else:
             self.used_tried_matrix_positions.add((row, col))
 
     def load_used_table_positions(self) -> None:
-        self.used_new_matrix_positions = set()
-        self.used_tried_matrix_positions = set()
-        for bucket in range(NEW_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.new_matrix[bucket][pos] != -1:
+        self.used_new_matrix_positions = create_new_table_positions()
+        self.used_tried_matrix_positions = create_tried_table_positions()
+        for bucket, row in enumerate(self.new_matrix):
+            if row.count(-1) == BUCKET_SIZE:
+                continue
+            for pos, node_id in enumerate(row):
+                if node_id != -1:
                     self.used_new_matrix_positions.add((bucket, pos))
-        for bucket in range(TRIED_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.tried_matrix[bucket][pos] != -1:
+        for bucket, row in enumerate(self.tried_matrix):
+            if row.count(-1) == BUCKET_SIZE:
+                continue
+            for pos, node_id in enumerate(row):
+                if node_id != -1:
                     self.used_tried_matrix_positions.add((bucket, pos))
 
     def prune_dead_peers(self) -> None:
@@ -406,6 +553,7 @@ class AddressManager:
         self.map_addr[addr.host] = node_id
         self.map_info[node_id].random_pos = len(self.random_pos)
         self.random_pos.append(node_id)
+        self.log_node_(self.map_info[node_id])
         return (self.map_info[node_id], node_id)
 
     def find_(self, addr: PeerInfo) -> tuple[ExtendedPeerInfo | None, int | None]:
@@ -523,10 +671,12 @@ class AddressManager:
         if info is None or info.random_pos is None:
             return None
         self.swap_random_(info.random_pos, len(self.random_pos) - 1)
-        self.random_pos = self.random_pos[:-1]
+        self.random_pos.pop()
         del self.map_addr[info.peer_info.host]
         del self.map_info[node_id]
         self.new_count -= 1
+        if self.change_log is not None:
+            self.change_log.append(PeerChange(PeerChangeKind.REMOVE, info.peer_info.host))
 
     def add_to_new_table_(self, addr: TimestampedPeerInfo, source: PeerInfo | None, penalty: int) -> bool:
         is_unique = False
@@ -548,6 +698,7 @@ class AddressManager:
                 info.timestamp > 0 or info.timestamp < addr.timestamp - update_interval - penalty
             ):
                 info.timestamp = max(0, addr.timestamp - penalty)
+                self.log_node_(info)
 
             # do not update if no new information is present
             if addr.timestamp == 0 or (info.timestamp > 0 and addr.timestamp <= info.timestamp):
@@ -567,7 +718,9 @@ class AddressManager:
                 return False
         else:
             (info, node_id) = self.create_(addr, source)
-            info.timestamp = max(0, info.timestamp - penalty)
+            if penalty > 0:
+                info.timestamp = max(0, info.timestamp - penalty)
+                self.log_node_(info)
             self.new_count += 1
             is_unique = True
 
@@ -609,64 +762,37 @@ class AddressManager:
         if new_only and self.new_count == 0:
             return None
 
+        now = math.floor(time.time())
         # Use a 50% chance for choosing between tried and new table entries.
         if not new_only and self.tried_count > 0 and (self.new_count == 0 or randrange(2) == 0):
-            chance = 1.0
-            start = time.time()
-            cached_tried_matrix_positions: list[tuple[int, int]] = []
-            if len(self.used_tried_matrix_positions) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
-                cached_tried_matrix_positions = list(self.used_tried_matrix_positions)
-            while True:
-                if len(self.used_tried_matrix_positions) < math.sqrt(TRIED_BUCKET_COUNT * BUCKET_SIZE):
-                    if len(self.used_tried_matrix_positions) == 0:
-                        log.error(f"Empty tried table, but tried_count shows {self.tried_count}.")
-                        return None
-                    # The table is sparse, randomly pick from positions list.
-                    index = randrange(len(cached_tried_matrix_positions))
-                    tried_bucket, tried_bucket_pos = cached_tried_matrix_positions[index]
-                else:
-                    # The table is dense, randomly trying positions is faster than loading positions list.
-                    tried_bucket = randrange(TRIED_BUCKET_COUNT)
-                    tried_bucket_pos = randrange(BUCKET_SIZE)
-                    while self.tried_matrix[tried_bucket][tried_bucket_pos] == -1:
-                        tried_bucket = (tried_bucket + randbits(LOG_TRIED_BUCKET_COUNT)) % TRIED_BUCKET_COUNT
-                        tried_bucket_pos = (tried_bucket_pos + randbits(LOG_BUCKET_SIZE)) % BUCKET_SIZE
-
-                node_id = self.tried_matrix[tried_bucket][tried_bucket_pos]
-                assert node_id != -1
-                info = self.map_info[node_id]
-                if randbits(30) < (chance * info.get_selection_chance() * (1 << 30)):
-                    end = time.time()
-                    log.debug(f"address_manager.select_peer took {(end - start):.2e} seconds in tried table.")
-                    return info
-                chance *= 1.2
+            table_name = "tried"
+            matrix = self.tried_matrix
+            positions = self.used_tried_matrix_positions
+            count = self.tried_count
         else:
-            chance = 1.0
-            start = time.time()
-            cached_new_matrix_positions: list[tuple[int, int]] = []
-            if len(self.used_new_matrix_positions) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
-                cached_new_matrix_positions = list(self.used_new_matrix_positions)
-            while True:
-                if len(self.used_new_matrix_positions) < math.sqrt(NEW_BUCKET_COUNT * BUCKET_SIZE):
-                    if len(self.used_new_matrix_positions) == 0:
-                        log.error(f"Empty new table, but new_count shows {self.new_count}.")
-                        return None
-                    index = randrange(len(cached_new_matrix_positions))
-                    new_bucket, new_bucket_pos = cached_new_matrix_positions[index]
-                else:
-                    new_bucket = randrange(NEW_BUCKET_COUNT)
-                    new_bucket_pos = randrange(BUCKET_SIZE)
-                    while self.new_matrix[new_bucket][new_bucket_pos] == -1:
-                        new_bucket = (new_bucket + randbits(LOG_NEW_BUCKET_COUNT)) % NEW_BUCKET_COUNT
-                        new_bucket_pos = (new_bucket_pos + randbits(LOG_BUCKET_SIZE)) % BUCKET_SIZE
-                node_id = self.new_matrix[new_bucket][new_bucket_pos]
-                assert node_id != -1
-                info = self.map_info[node_id]
-                if randbits(30) < chance * info.get_selection_chance() * (1 << 30):
-                    end = time.time()
-                    log.debug(f"address_manager.select_peer took {(end - start):.2e} seconds in new table.")
-                    return info
-                chance *= 1.2
+            table_name = "new"
+            matrix = self.new_matrix
+            positions = self.used_new_matrix_positions
+            count = self.new_count
+
+        if len(positions) == 0:
+            log.error(f"Empty {table_name} table, but {table_name}_count shows {count}.")
+            return None
+
+        chance = 1.0
+        start = time.time()
+        while True:
+            # picking from the used positions takes the same time however
+            # sparse the table is, unlike probing random positions
+            bucket, bucket_pos = positions.random_position()
+            node_id = matrix[bucket][bucket_pos]
+            assert node_id != -1
+            info = self.map_info[node_id]
+            if randbits(30) < chance * info.get_selection_chance(now) * (1 << 30):
+                end = time.time()
+                log.debug(f"address_manager.select_peer took {(end - start):.2e} seconds in {table_name} table.")
+                return info
+            chance *= 1.2
 
     def resolve_tried_collisions_(self) -> None:
         for node_id in self.tried_collisions[:]:
@@ -713,6 +839,7 @@ class AddressManager:
     def get_peers_(self) -> list[TimestampedPeerInfo]:
         addr: list[TimestampedPeerInfo] = []
         num_nodes = min(1000, math.ceil(23 * len(self.random_pos) / 100))
+        now = math.floor(time.time())
         for n in range(len(self.random_pos)):
             if len(addr) >= num_nodes:
                 return addr
@@ -722,7 +849,7 @@ class AddressManager:
             info = self.map_info[self.random_pos[n]]
             if info.peer_info.ip.is_private and not self.allow_private_subnets:
                 continue
-            if not info.is_terrible():
+            if not info.is_terrible(now):
                 cur_peer_info = TimestampedPeerInfo(
                     info.peer_info.host,
                     uint16(info.peer_info.port),
@@ -734,16 +861,16 @@ class AddressManager:
 
     def cleanup(self, max_timestamp_difference: int, max_consecutive_failures: int) -> None:
         now = math.floor(time.time())
-        for bucket in range(NEW_BUCKET_COUNT):
-            for pos in range(BUCKET_SIZE):
-                if self.new_matrix[bucket][pos] != -1:
-                    node_id = self.new_matrix[bucket][pos]
-                    cur_info = self.map_info[node_id]
-                    if (
-                        cur_info.timestamp < now - max_timestamp_difference
-                        and cur_info.num_attempts >= max_consecutive_failures
-                    ):
-                        self.clear_new_(bucket, pos)
+        # only the used positions are visited, rather than the whole table.
+        # Clearing positions changes the set, so it's copied first
+        for bucket, pos in list(self.used_new_matrix_positions):
+            node_id = self.new_matrix[bucket][pos]
+            cur_info = self.map_info[node_id]
+            if (
+                cur_info.timestamp < now - max_timestamp_difference
+                and cur_info.num_attempts >= max_consecutive_failures
+            ):
+                self.clear_new_(bucket, pos)
 
     def connect_(self, addr: PeerInfo, timestamp: int) -> None:
         info, _ = self.find_(addr)
@@ -757,6 +884,57 @@ class AddressManager:
         update_interval = 20 * 60
         if timestamp - info.timestamp > update_interval:
             info.timestamp = timestamp
+            self.log_node_(info)
+
+    def apply_change_(self, change: PeerChange) -> None:
+        """
+        Replays a change recorded in another address manager's change log. The
+        new and tried counts are not maintained, call recount_() once done.
+        """
+        if change.kind == PeerChangeKind.NODE:
+            assert change.host is not None
+            info, _ = self.find_(PeerInfo(change.host, uint16(change.port)))
+            if info is None:
+                self.create_(
+                    TimestampedPeerInfo(change.host, uint16(change.port), uint64(change.timestamp)),
+                    PeerInfo(change.src_host, uint16(change.src_port)),
+                )
+            else:
+                info.timestamp = change.timestamp
+        elif change.kind == PeerChangeKind.REMOVE:
+            assert change.host is not None
+            node_id = self.map_addr.get(change.host)
+            if node_id is None:
+                return
+            info = self.map_info[node_id]
+            # the positions of a removed node have already been cleared by
+            # preceding changes, unless the log isn't consistent with our state
+            if not info.is_tried and info.ref_count == 0:
+                self.delete_new_entry_(node_id)
+        elif change.kind == PeerChangeKind.NEW_CELL:
+            old_id = self.new_matrix[change.bucket][change.pos]
+            new_id = -1 if change.host is None else self.map_addr.get(change.host, -1)
+            if old_id == new_id:
+                return
+            if old_id != -1:
+                self.map_info[old_id].ref_count -= 1
+            if new_id != -1:
+                self.map_info[new_id].ref_count += 1
+            self._set_new_matrix(change.bucket, change.pos, new_id)
+        elif change.kind == PeerChangeKind.TRIED_CELL:
+            old_id = self.tried_matrix[change.bucket][change.pos]
+            new_id = -1 if change.host is None else self.map_addr.get(change.host, -1)
+            if old_id == new_id:
+                return
+            if old_id != -1:
+                self.map_info[old_id].is_tried = False
+            if new_id != -1:
+                self.map_info[new_id].is_tried = True
+            self._set_tried_matrix(change.bucket, change.pos, new_id)
+
+    def recount_(self) -> None:
+        self.tried_count = sum(1 for info in self.map_info.values() if info.is_tried)
+        self.new_count = len(self.map_info) - self.tried_count
 
     async def size(self) -> int:
         async with self.lock:
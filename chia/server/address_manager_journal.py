@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from chia_rs.sized_ints import uint8, uint16, uint64
+
+from chia.server.address_manager import AddressManager, ExtendedPeerInfo, PeerChange, PeerChangeKind
+from chia.util.ip_address import IPAddress
+
+log = logging.getLogger(__name__)
+
+# the journal is compacted into the snapshot once it's larger than this
+# fraction of the snapshot (or MIN_COMPACT_SIZE, whichever is larger)
+COMPACT_RATIO = 0.5
+MIN_COMPACT_SIZE = 1024 * 1024
+
+
+def _stream_host(host: str, out: io.BytesIO) -> None:
+    ip = IPAddress.create(host)
+    out.write(ExtendedPeerInfo.encode_ip_type(ip))
+    out.write(ip.packed)
+
+
+def encode_changes(changes: list[PeerChange]) -> bytes:
+    out = io.BytesIO()
+    for change in changes:
+        # clearing a table position is encoded as a separate kind, since
+        # there's no host to write
+        if change.host is None:
+            uint8(change.kind + 2).stream(out)
+        else:
+            uint8(change.kind).stream(out)
+        if change.kind == PeerChangeKind.NODE:
+            assert change.host is not None
+            _stream_host(change.host, out)
+            uint16(change.port).stream(out)
+            uint64(change.timestamp).stream(out)
+            _stream_host(change.src_host, out)
+            uint16(change.src_port).stream(out)
+        elif change.kind == PeerChangeKind.REMOVE:
+            assert change.host is not None
+            _stream_host(change.host, out)
+        else:
+            uint16(change.bucket).stream(out)
+            uint8(change.pos).stream(out)
+            if change.host is not None:
+                _stream_host(change.host, out)
+    return out.getvalue()
+
+
+def _parse_change(stream: io.BytesIO) -> PeerChange:
+    kind = int(uint8.parse(stream))
+    if kind == PeerChangeKind.NODE:
+        host = ExtendedPeerInfo.decode_ip(stream)
+        port = uint16.parse(stream)
+        timestamp = uint64.parse(stream)
+        src_host = ExtendedPeerInfo.decode_ip(stream)
+        src_port = uint16.parse(stream)
+        return PeerChange(PeerChangeKind.NODE, host, port, timestamp, src_host, src_port)
+    if kind == PeerChangeKind.REMOVE:
+        return PeerChange(PeerChangeKind.REMOVE, ExtendedPeerInfo.decode_ip(stream))
+    if kind in {PeerChangeKind.NEW_CELL, PeerChangeKind.TRIED_CELL}:
+        bucket = uint16.parse(stream)
+        pos = uint8.parse(stream)
+        return PeerChange(PeerChangeKind(kind), ExtendedPeerInfo.decode_ip(stream), bucket=bucket, pos=pos)
+    if kind in {PeerChangeKind.NEW_CELL + 2, PeerChangeKind.TRIED_CELL + 2}:
+        bucket = uint16.parse(stream)
+        pos = uint8.parse(stream)
+        return PeerChange(PeerChangeKind(kind - 2), None, bucket=bucket, pos=pos)
+    raise ValueError(f"unknown peer change kind {kind}")
+
+
+def decode_changes(data: bytes) -> list[PeerChange]:
+    """
+    Decodes the changes in a journal. A truncated or corrupt change at the end
+    (from an interrupted write) ends the journal.
+    """
+    changes: list[PeerChange] = []
+    stream = io.BytesIO(data)
+    while stream.tell() < len(data):
+        try:
+            changes.append(_parse_change(stream))
+        except Exception as e:
+            log.warning(f"Ignoring the end of the peers journal, after {len(changes)} changes: {e}")
+            break
+    return changes
+
+
+def apply_changes(address_manager: AddressManager, changes: list[PeerChange]) -> None:
+    for change in changes:
+        address_manager.apply_change_(change)
+    address_manager.recount_()
+
+
+@dataclass
+class PeerJournal:
+    """
+    Persists the address manager as a snapshot (the peers file) plus a journal
+    of the changes made since the snapshot was written. Changes are appended to
+    the journal, and the snapshot is rebuilt from the files on disk in a worker
+    thread, so the address manager lock is only held to take its change log.
+    load() must be called before anything else.
+
+    The file operations run in worker threads that keep going if the awaiting
+    task is cancelled, so they're serialized by a thread lock rather than an
+    asyncio one (reentrant, since compaction writes a snapshot).
+    """
+
+    peers_file_path: Path
+    journal_path: Path = field(init=False)
+    # the key of the address manager, which starts the journal
+    key: int = field(default=0, init=False)
+    _file_lock: threading.RLock = field(default_factory=threading.RLock, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.journal_path = self.peers_file_path.with_name(self.peers_file_path.name + ".journal")
+
+    async def load(self) -> AddressManager:
+        """
+        Loads the address manager from the snapshot and journal, and enables
+        its change log.
+        """
+        address_manager = await AddressManager.create_address_manager(self.peers_file_path)
+        self.key = address_manager.key
+        journal = await asyncio.to_thread(self._read_journal)
+        # the table positions in the journal depend on the key, it can only be
+        # replayed onto the snapshot it was started from
+        if journal[:32] == self._key_bytes():
+            try:
+                changes = decode_changes(journal[32:])
+                log.info(f"Replaying {len(changes)} changes from {self.journal_path}")
+                apply_changes(address_manager, changes)
+            except Exception:
+                log.exception(f"Unable to replay peers journal {self.journal_path}")
+        else:
+            if len(journal) > 0:
+                log.warning(f"Discarding peers journal {self.journal_path}, it doesn't match {self.peers_file_path}")
+            # start the journal from a snapshot in the current format
+            snapshot = address_manager.serialize_bytes()
+            await asyncio.to_thread(self._write_snapshot, snapshot)
+        address_manager.enable_change_log()
+        return address_manager
+
+    def _key_bytes(self) -> bytes:
+        return self.key.to_bytes(32, byteorder="big")
+
+    def _read_journal(self) -> bytes:
+        try:
+            return self.journal_path.read_bytes()
+        except FileNotFoundError:
+            return b""
+
+    def _append(self, data: bytes) -> None:
+        with self._file_lock:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            # unbuffered, so nothing is left to be written once the journal
+            # was truncated after a failure
+            with open(self.journal_path, "ab", buffering=0) as f:
+                start = f.tell()
+                if start == 0:
+                    data = self._key_bytes() + data
+                try:
+                    view = memoryview(data)
+                    while len(view) > 0:
+                        view = view[f.write(view) :]
+                    os.fsync(f.fileno())
+                except BaseException:
+                    # the changes are appended again by a later write, so none
+                    # of them are left behind
+                    f.truncate(start)
+                    raise
+
+    async def append(self, changes: list[PeerChange]) -> None:
+        if len(changes) == 0:
+            return
+        data = encode_changes(changes)
+        await asyncio.to_thread(self._append, data)
+
+    def should_compact(self) -> bool:
+        try:
+            journal_size = self.journal_path.stat().st_size
+        except FileNotFoundError:
+            return False
+        snapshot_size = self.peers_file_path.stat().st_size
+        return journal_size > max(MIN_COMPACT_SIZE, snapshot_size * COMPACT_RATIO)
+
+    def _write_snapshot(self, snapshot: bytes) -> None:
+        with self._file_lock:
+            self.peers_file_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.peers_file_path.with_name(self.peers_file_path.name + ".tmp")
+            with open(temp_path, "wb") as f:
+                f.write(snapshot)
+                f.flush()
+                os.fsync(f.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.peers_file_path)
+            self.journal_path.unlink(missing_ok=True)
+
+    def _compact(self) -> None:
+        with self._file_lock:
+            address_manager = AddressManager.deserialize_bytes(io.BytesIO(self.peers_file_path.read_bytes()))
+            journal = self._read_journal()
+            if journal[:32] == self._key_bytes():
+                apply_changes(address_manager, decode_changes(journal[32:]))
+            # appends are blocked until the new snapshot replaces the journal.
+            # If we're interrupted before removing the journal, replaying it
+            # onto the new snapshot reaches the same state
+            self._write_snapshot(address_manager.serialize_bytes())
+
+    async def compact(self) -> None:
+        """
+        Folds the journal into a new snapshot of the peers file.
+        """
+        await asyncio.to_thread(self._compact)
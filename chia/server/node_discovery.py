@@ -21,10 +21,10 @@ from chia.protocols.introducer_protocol import RequestPeersIntroducer
 from chia.protocols.outbound_message import Message, NodeType, make_msg
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.server.address_manager import AddressManager, ExtendedPeerInfo
+from chia.server.address_manager_journal import PeerJournal
 from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
 from chia.types.peer_info import PeerInfo, TimestampedPeerInfo, UnresolvedPeerInfo
-from chia.util.files import write_file_async
 from chia.util.hash import std_hash
 from chia.util.ip_address import IPAddress
 from chia.util.network import resolve
@@ -59,6 +59,7 @@ class FullNodeDiscovery:
     legacy_peer_db_migrated: bool = field(default=False)
     relay_queue: asyncio.Queue[tuple[TimestampedPeerInfo, int]] | None = field(default=None)
     address_manager: AddressManager | None = field(default=None)
+    peer_journal: PeerJournal | None = field(default=None)
     connection_time_pretest: dict[str, Any] = field(default_factory=dict)
     received_count_from_peers: dict[str, Any] = field(default_factory=dict)
     lock: asyncio.Lock = field(default_factory=asyncio.Lock)
@@ -87,7 +88,8 @@ class FullNodeDiscovery:
             self.default_port = NETWORK_ID_DEFAULT_PORTS[self.selected_network]
 
     async def initialize_address_manager(self) -> None:
-        self.address_manager = await AddressManager.create_address_manager(self.peers_file_path)
+        self.peer_journal = PeerJournal(self.peers_file_path)
+        self.address_manager = await self.peer_journal.load()
         if self.enable_private_networks:
             self.address_manager.make_private_subnets_valid()
         self.server.set_received_message_callback(self.update_peer_timestamp_on_message)
@@ -107,6 +109,10 @@ class FullNodeDiscovery:
             cancel_task_safe(t, self.log)
         if len(self.pending_tasks) > 0:
             await asyncio.wait(self.pending_tasks)
+        try:
+            await self._write_peer_changes()
+        except Exception:
+            self.log.exception("Unable to write peer changes on close")
 
     async def on_connect(self, peer: WSChiaConnection) -> None:
         if (
@@ -410,11 +416,28 @@ class FullNodeDiscovery:
             if self.address_manager is None:
                 await asyncio.sleep(10)
                 continue
-            serialize_interval = random.randint(15 * 60, 30 * 60)
+            serialize_interval = random.randint(60, 120)
             await asyncio.sleep(serialize_interval)
-            async with self.address_manager.lock:
-                serialised_bytes = self.address_manager.serialize_bytes()
-            await write_file_async(self.peers_file_path, serialised_bytes, file_mode=0o644)
+            try:
+                await self._write_peer_changes()
+                if self.peer_journal is not None and self.peer_journal.should_compact():
+                    await self.peer_journal.compact()
+            except Exception as e:
+                self.log.error(f"Exception writing peers journal: {e}")
+
+    async def _write_peer_changes(self) -> None:
+        if self.address_manager is None or self.peer_journal is None:
+            return
+        # only the change log is taken under the lock, encoding and writing
+        # the changes happens outside it
+        async with self.address_manager.lock:
+            changes = self.address_manager.take_change_log()
+        try:
+            await self.peer_journal.append(changes)
+        except BaseException:
+            # they're written along with the next changes instead
+            self.address_manager.restore_change_log(changes)
+            raise
 
     async def _periodically_cleanup(self) -> None:
         while not self.is_closed:
@@ -145,6 +145,7 @@ rate_limits: dict[int, dict[ProtocolMessageTypes, RLSettings | Unlimited]] = {
         ProtocolMessageTypes.plot_sync_invalid: RLSettings(True, 1000, 100 * 1024 * 1024),
         ProtocolMessageTypes.plot_sync_keys_missing: RLSettings(True, 1000, 100 * 1024 * 1024),
         ProtocolMessageTypes.plot_sync_duplicates: RLSettings(True, 1000, 100 * 1024 * 1024),
+        ProtocolMessageTypes.plot_sync_digest: RLSettings(True, 1000, 100 * 1024 * 1024),
         ProtocolMessageTypes.plot_sync_done: RLSettings(True, 1000, 100 * 1024 * 1024),
         ProtocolMessageTypes.plot_sync_response: RLSettings(True, 3000, 100 * 1024 * 1024),
         ProtocolMessageTypes.coin_state_update: RLSettings(True, 1000, 100 * 1024 * 1024),
@@ -3,27 +3,81 @@ from __future__ import annotations
 import dataclasses
 import logging
 import time
-from collections import Counter
 from collections.abc import Callable
+from enum import IntEnum
 
 from chia.protocols.outbound_message import Message
 from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.protocols.shared_protocol import Capability
-from chia.server.rate_limit_numbers import RLSettings, Unlimited, get_rate_limits_to_use
+from chia.server.rate_limit_numbers import Unlimited, get_rate_limits_to_use
 
 log = logging.getLogger(__name__)
 
+# message types are a uint8, so every per-type table has one slot for each
+# possible value
+MESSAGE_TYPE_SLOTS = 256
+
+# how a message type is limited, as stored in RateLimiter's per-type table
+_NO_LIMIT = 0  # not a valid message type, or missing from the limits table
+_UNLIMITED = 1  # only the per-message size is limited
+_LIMITED = 2  # rate limited by count and size
+_LIMITED_AGGREGATE = 3  # rate limited, and also counted against the aggregate limit
+
+
+class RateLimitCode(IntEnum):
+    NON_TX_COUNT = 1
+    NON_TX_SIZE = 2
+    MESSAGE_COUNT = 3
+    MESSAGE_SIZE = 4
+    CUMULATIVE_SIZE = 5
+    UNKNOWN_LIMIT = 6
+
+
+@dataclasses.dataclass(frozen=True)
+class RateLimitRejection:
+    """
+    Why a message was rejected by the rate limiter. value is the count or size
+    the message would have brought the limit to, which exceeds limit. The
+    string form is only built when it's logged.
+    """
+
+    code: RateLimitCode
+    message_type: int
+    value: int
+    limit: float
+    scale: float = 1.0
+
+    def __str__(self) -> str:
+        if self.code == RateLimitCode.MESSAGE_SIZE:
+            return f"message size: {self.value} > {int(self.limit)}"
+        if self.code == RateLimitCode.UNKNOWN_LIMIT:
+            return f"Internal Error, unknown rate limit for message: {ProtocolMessageTypes(self.message_type)}"
+        label = {
+            RateLimitCode.NON_TX_COUNT: "non-tx count",
+            RateLimitCode.NON_TX_SIZE: "non-tx size",
+            RateLimitCode.MESSAGE_COUNT: "message count",
+            RateLimitCode.CUMULATIVE_SIZE: "cumulative size",
+        }[self.code]
+        return f"{label}: {self.value} > {self.limit} (scale factor: {self.scale})"
+
 
 # TODO: only full node disconnects based on rate limits
 class RateLimiter:
+    """
+    A token bucket rate limiter. Every message type has a bucket for its count
+    and one for its cumulative size, and the non-tx messages share another
+    pair of buckets for the aggregate limit. A bucket holds up to the limit
+    for reset_seconds and refills continuously at that rate, so unlike counters
+    reset at fixed times, a peer can't send twice the limit around a reset.
+
+    The limits depend on the capabilities of both sides. They're looked up
+    once per set of capabilities, and kept in tables indexed by message type.
+    Buckets are refilled lazily, when a message of that type is checked.
+    """
+
     incoming: bool
     reset_seconds: int
-    current_slot: int
-    message_counts: Counter[ProtocolMessageTypes]
-    message_cumulative_sizes: Counter[ProtocolMessageTypes]
     percentage_of_limit: int
-    non_tx_message_counts: int = 0
-    non_tx_cumulative_size: int = 0
     get_time: Callable[[], float]
 
     def __init__(
@@ -35,122 +89,241 @@ class RateLimiter:
         get_time: Callable[[], float] = time.monotonic,
     ):
         """
-        The incoming parameter affects whether counters are incremented
-        unconditionally or not. For incoming messages, the counters are always
-        incremented. For outgoing messages, the counters are only incremented
-        if they are allowed to be sent by the rate limiter, since we won't send
-        the messages otherwise.
+        The incoming parameter affects whether buckets are drained
+        unconditionally or not. For incoming messages, the buckets are always
+        drained. For outgoing messages, the buckets are only drained if they
+        are allowed to be sent by the rate limiter, since we won't send the
+        messages otherwise.
         """
         self.get_time = get_time
         self.incoming = incoming
         self.reset_seconds = reset_seconds
-        self.current_slot = int(get_time() // reset_seconds)
-        self.message_counts = Counter()
-        self.message_cumulative_sizes = Counter()
         self.percentage_of_limit = percentage_of_limit
-        self.non_tx_message_counts = 0
-        self.non_tx_cumulative_size = 0
+        self.scale = percentage_of_limit / 100
 
-    def process_msg_and_check(
+        # the capability lists the limits were resolved for. Connections
+        # replace these lists rather than modify them, so they're compared by
+        # identity
+        self._resolved_for: tuple[list[Capability], list[Capability]] | None = None
+
+        self._kind = [_NO_LIMIT] * MESSAGE_TYPE_SLOTS
+        self._max_size = [0] * MESSAGE_TYPE_SLOTS
+        self._count_limit = [0.0] * MESSAGE_TYPE_SLOTS
+        self._size_limit = [0.0] * MESSAGE_TYPE_SLOTS
+        self._count_tokens = [0.0] * MESSAGE_TYPE_SLOTS
+        self._size_tokens = [0.0] * MESSAGE_TYPE_SLOTS
+        self._last_refill = [0.0] * MESSAGE_TYPE_SLOTS
+        self._non_tx_count_limit = 0.0
+        self._non_tx_size_limit = 0.0
+        self._non_tx_count_tokens = 0.0
+        self._non_tx_size_tokens = 0.0
+        self._non_tx_last_refill = get_time()
+
+    def _resolve_limits(self, our_capabilities: list[Capability], peer_capabilities: list[Capability]) -> None:
+        self._resolved_for = (our_capabilities, peer_capabilities)
+        rate_limits, agg_limit = get_rate_limits_to_use(our_capabilities, peer_capabilities)
+        now = self.get_time()
+
+        # when the limits change (typically once the handshake is done), what
+        # was already used still counts against the new limits
+        used_count = [0.0] * MESSAGE_TYPE_SLOTS
+        used_size = [0.0] * MESSAGE_TYPE_SLOTS
+        for message_type in range(MESSAGE_TYPE_SLOTS):
+            if self._kind[message_type] >= _LIMITED:
+                self._refill(message_type, now)
+                used_count[message_type] = self._count_limit[message_type] - self._count_tokens[message_type]
+                used_size[message_type] = self._size_limit[message_type] - self._size_tokens[message_type]
+            self._kind[message_type] = _NO_LIMIT
+
+        for protocol_message_type, limits in rate_limits.items():
+            message_type = protocol_message_type.value
+            if isinstance(limits, Unlimited):
+                self._kind[message_type] = _UNLIMITED
+                self._max_size[message_type] = limits.max_size
+                continue
+            max_total_size = limits.max_total_size
+            if max_total_size is None:
+                max_total_size = limits.frequency * limits.max_size
+            self._kind[message_type] = _LIMITED_AGGREGATE if limits.aggregate_limit else _LIMITED
+            self._max_size[message_type] = limits.max_size
+            self._count_limit[message_type] = limits.frequency * self.scale
+            self._size_limit[message_type] = max_total_size * self.scale
+            self._count_tokens[message_type] = max(self._count_limit[message_type] - used_count[message_type], 0.0)
+            self._size_tokens[message_type] = max(self._size_limit[message_type] - used_size[message_type], 0.0)
+            self._last_refill[message_type] = now
+
+        self._refill_non_tx(now)
+        used_non_tx_count = self._non_tx_count_limit - self._non_tx_count_tokens
+        used_non_tx_size = self._non_tx_size_limit - self._non_tx_size_tokens
+        assert agg_limit.max_total_size is not None
+        self._non_tx_count_limit = agg_limit.frequency * self.scale
+        self._non_tx_size_limit = agg_limit.max_total_size * self.scale
+        self._non_tx_count_tokens = max(self._non_tx_count_limit - used_non_tx_count, 0.0)
+        self._non_tx_size_tokens = max(self._non_tx_size_limit - used_non_tx_size, 0.0)
+
+    def _refill(self, message_type: int, now: float) -> None:
+        elapsed = now - self._last_refill[message_type]
+        self._last_refill[message_type] = now
+        count_limit = self._count_limit[message_type]
+        size_limit = self._size_limit[message_type]
+        if elapsed > 0:
+            self._count_tokens[message_type] += elapsed * count_limit / self.reset_seconds
+            self._size_tokens[message_type] += elapsed * size_limit / self.reset_seconds
+        self._count_tokens[message_type] = min(self._count_tokens[message_type], count_limit)
+        self._size_tokens[message_type] = min(self._size_tokens[message_type], size_limit)
+
+    def _refill_non_tx(self, now: float) -> None:
+        elapsed = now - self._non_tx_last_refill
+        self._non_tx_last_refill = now
+        if elapsed > 0:
+            self._non_tx_count_tokens += elapsed * self._non_tx_count_limit / self.reset_seconds
+            self._non_tx_size_tokens += elapsed * self._non_tx_size_limit / self.reset_seconds
+        self._non_tx_count_tokens = min(self._non_tx_count_tokens, self._non_tx_count_limit)
+        self._non_tx_size_tokens = min(self._non_tx_size_tokens, self._non_tx_size_limit)
+
+    def _rejection(
+        self, message_type: int, size: int, aggregate: bool, count_tokens: float, size_tokens: float
+    ) -> RateLimitRejection:
+        # the limits are checked in this order, and the first one exceeded is
+        # reported
+        if aggregate:
+            if self._non_tx_count_tokens < 1:
+                return RateLimitRejection(
+                    RateLimitCode.NON_TX_COUNT,
+                    message_type,
+                    round(self._non_tx_count_limit - self._non_tx_count_tokens) + 1,
+                    self._non_tx_count_limit,
+                    self.scale,
+                )
+            if self._non_tx_size_tokens < size:
+                return RateLimitRejection(
+                    RateLimitCode.NON_TX_SIZE,
+                    message_type,
+                    round(self._non_tx_size_limit - self._non_tx_size_tokens) + size,
+                    self._non_tx_size_limit,
+                    self.scale,
+                )
+        if count_tokens < 1:
+            return RateLimitRejection(
+                RateLimitCode.MESSAGE_COUNT,
+                message_type,
+                round(self._count_limit[message_type] - count_tokens) + 1,
+                self._count_limit[message_type],
+                self.scale,
+            )
+        if size > self._max_size[message_type]:
+            return RateLimitRejection(RateLimitCode.MESSAGE_SIZE, message_type, size, self._max_size[message_type])
+        return RateLimitRejection(
+            RateLimitCode.CUMULATIVE_SIZE,
+            message_type,
+            round(self._size_limit[message_type] - size_tokens) + size,
+            self._size_limit[message_type],
+            self.scale,
+        )
+
+    def check_message(
         self, message: Message, our_capabilities: list[Capability], peer_capabilities: list[Capability]
-    ) -> str | None:
+    ) -> RateLimitRejection | None:
         """
-        Returns a string indicating which limit was hit if a rate limit is
-        exceeded, and the message should be blocked. Returns None if the limit was not
-        hit and the message is good to be sent or received.
+        Returns the limit that was hit if a rate limit is exceeded, and the
+        message should be blocked. Returns None if the limit was not hit and the
+        message is good to be sent or received.
         """
 
-        current_slot = int(self.get_time() // self.reset_seconds)
-        if current_slot != self.current_slot:
-            self.current_slot = current_slot
-            self.message_counts = Counter()
-            self.message_cumulative_sizes = Counter()
-            self.non_tx_message_counts = 0
-            self.non_tx_cumulative_size = 0
-        try:
-            message_type = ProtocolMessageTypes(message.type)
-        except Exception as e:
-            log.warning(f"Invalid message: {message.type}, {e}")
+        resolved_for = self._resolved_for
+        if resolved_for is None or resolved_for[0] is not our_capabilities or resolved_for[1] is not peer_capabilities:
+            self._resolve_limits(our_capabilities, peer_capabilities)
+
+        message_type = message.type
+        size = len(message.data)
+        kind = self._kind[message_type]
+
+        if kind == _UNLIMITED:
+            # this message type is not rate limited. This is used for
+            # response messages and must be combined with banning peers
+            # sending unsolicited responses of this type
+            max_size = self._max_size[message_type]
+            if size > max_size:
+                return RateLimitRejection(RateLimitCode.MESSAGE_SIZE, message_type, size, max_size)
             return None
 
-        new_message_counts: int = self.message_counts[message_type] + 1
-        new_cumulative_size: int = self.message_cumulative_sizes[message_type] + len(message.data)
-        new_non_tx_count: int = self.non_tx_message_counts
-        new_non_tx_size: int = self.non_tx_cumulative_size
-        proportion_of_limit: float = self.percentage_of_limit / 100
+        if kind == _NO_LIMIT:
+            try:
+                ProtocolMessageTypes(message_type)
+            except Exception as e:
+                log.warning(f"Invalid message: {message_type}, {e}")
+                return None
+            return RateLimitRejection(RateLimitCode.UNKNOWN_LIMIT, message_type, size, 0)  # pragma: no cover
 
-        ret: bool = False
-        rate_limits: dict[ProtocolMessageTypes, RLSettings | Unlimited]
-        rate_limits, agg_limit = get_rate_limits_to_use(our_capabilities, peer_capabilities)
+        # refill the buckets for the time since they were last used. This is
+        # the path every message takes, so it's written out here rather than
+        # calling _refill()
+        now = self.get_time()
+        count_tokens = self._count_tokens[message_type]
+        size_tokens = self._size_tokens[message_type]
+        elapsed = now - self._last_refill[message_type]
+        if elapsed > 0:
+            self._last_refill[message_type] = now
+            count_limit = self._count_limit[message_type]
+            size_limit = self._size_limit[message_type]
+            count_tokens = min(count_tokens + elapsed * count_limit / self.reset_seconds, count_limit)
+            size_tokens = min(size_tokens + elapsed * size_limit / self.reset_seconds, size_limit)
 
-        try:
-            limits: RLSettings | Unlimited = rate_limits[message_type]
-            if isinstance(limits, RLSettings) and limits.aggregate_limit:
-                non_tx_freq = agg_limit.frequency
-                assert agg_limit.max_total_size is not None
-                non_tx_max_total_size = agg_limit.max_total_size
-                new_non_tx_count = self.non_tx_message_counts + 1
-                new_non_tx_size = self.non_tx_cumulative_size + len(message.data)
-                if new_non_tx_count > non_tx_freq * proportion_of_limit:
-                    return " ".join(
-                        [
-                            f"non-tx count: {new_non_tx_count}",
-                            f"> {non_tx_freq * proportion_of_limit}",
-                            f"(scale factor: {proportion_of_limit})",
-                        ]
-                    )
-                if new_non_tx_size > non_tx_max_total_size * proportion_of_limit:
-                    return " ".join(
-                        [
-                            f"non-tx size: {new_non_tx_size}",
-                            f"> {non_tx_max_total_size * proportion_of_limit}",
-                            f"(scale factor: {proportion_of_limit})",
-                        ]
-                    )
+        if kind == _LIMITED_AGGREGATE:
+            non_tx_count_tokens = self._non_tx_count_tokens
+            non_tx_size_tokens = self._non_tx_size_tokens
+            elapsed = now - self._non_tx_last_refill
+            if elapsed > 0:
+                self._non_tx_last_refill = now
+                non_tx_count_tokens = min(
+                    non_tx_count_tokens + elapsed * self._non_tx_count_limit / self.reset_seconds,
+                    self._non_tx_count_limit,
+                )
+                non_tx_size_tokens = min(
+                    non_tx_size_tokens + elapsed * self._non_tx_size_limit / self.reset_seconds,
+                    self._non_tx_size_limit,
+                )
+            self._non_tx_count_tokens = non_tx_count_tokens
+            self._non_tx_size_tokens = non_tx_size_tokens
+            ok = non_tx_count_tokens >= 1 and non_tx_size_tokens >= size
+        else:
+            ok = True
 
-            if isinstance(limits, Unlimited):
-                # this message type is not rate limited. This is used for
-                # response messages and must be combined with banning peers
-                # sending unsolicited responses of this type
-                if len(message.data) > limits.max_size:
-                    return f"message size: {len(message.data)} > {limits.max_size}"
-                ret = True
-                return None
-            elif isinstance(limits, RLSettings):
-                if limits.max_total_size is None:
-                    limits = dataclasses.replace(limits, max_total_size=limits.frequency * limits.max_size)
-                assert limits.max_total_size is not None
-
-                if new_message_counts > limits.frequency * proportion_of_limit:
-                    return " ".join(
-                        [
-                            f"message count: {new_message_counts}",
-                            f"> {limits.frequency * proportion_of_limit}",
-                            f"(scale factor: {proportion_of_limit})",
-                        ]
-                    )
-                if len(message.data) > limits.max_size:
-                    return f"message size: {len(message.data)} > {limits.max_size}"
-                if new_cumulative_size > limits.max_total_size * proportion_of_limit:
-                    return " ".join(
-                        [
-                            f"cumulative size: {new_cumulative_size}",
-                            f"> {limits.max_total_size * proportion_of_limit}",
-                            f"(scale factor: {proportion_of_limit})",
-                        ]
-                    )
-
-                ret = True
-                return None
-            else:  # pragma: no cover
-                return f"Internal Error, unknown rate limit for message: {message_type}, limit: {limits}"
-        finally:
-            if self.incoming or ret:
-                # now that we determined that it's OK to send the message, commit the
-                # updates to the counters. Alternatively, if this was an
-                # incoming message, we already received it and it should
-                # increment the counters unconditionally
-                self.message_counts[message_type] = new_message_counts
-                self.message_cumulative_sizes[message_type] = new_cumulative_size
-                self.non_tx_message_counts = new_non_tx_count
-                self.non_tx_cumulative_size = new_non_tx_size
+        if ok and count_tokens >= 1 and size_tokens >= size and size <= self._max_size[message_type]:
+            rejection = None
+        else:
+            rejection = self._rejection(message_type, size, kind == _LIMITED_AGGREGATE, count_tokens, size_tokens)
+
+        if self.incoming or rejection is None:
+            # now that we determined that it's OK to send the message, drain
+            # the buckets. Alternatively, if this was an incoming message, we
+            # already received it and it should drain the buckets
+            # unconditionally. They don't go below empty though, so a peer
+            # that's over the limit can send again once they've refilled
+            count_tokens -= 1
+            size_tokens -= size
+            self._count_tokens[message_type] = count_tokens if count_tokens > 0 else 0.0
+            self._size_tokens[message_type] = size_tokens if size_tokens > 0 else 0.0
+            if kind == _LIMITED_AGGREGATE:
+                non_tx_count_tokens -= 1
+                non_tx_size_tokens -= size
+                self._non_tx_count_tokens = non_tx_count_tokens if non_tx_count_tokens > 0 else 0.0
+                self._non_tx_size_tokens = non_tx_size_tokens if non_tx_size_tokens > 0 else 0.0
+        else:
+            self._count_tokens[message_type] = count_tokens
+            self._size_tokens[message_type] = size_tokens
+
+        return rejection
+
+    def process_msg_and_check(
+        self, message: Message, our_capabilities: list[Capability], peer_capabilities: list[Capability]
+    ) -> str | None:
+        """
+        Returns a string indicating which limit was hit if a rate limit is
+        exceeded, and the message should be blocked. Returns None if the limit was not
+        hit and the message is good to be sent or received.
+        """
+        rejection = self.check_message(message, our_capabilities, peer_capabilities)
+        if rejection is None:
+            return None
+        return str(rejection)
@@ -32,6 +32,7 @@ from chia.server.api_protocol import ApiMetadata, ApiProtocol
 from chia.server.capabilities import known_active_capabilities
 from chia.server.rate_limits import RateLimiter
 from chia.types.peer_info import PeerInfo
+from chia.util.db_wrapper import ReaderPriority, reader_priority
 from chia.util.errors import ApiError, ConsensusError, Err, ProtocolError, TimestampError
 from chia.util.log_exceptions import log_exceptions
 
@@ -461,7 +462,11 @@ class WSChiaConnection:
                     raise
                 return None
 
-            response: Message | None = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
+            # requests from wallets wait for database readers behind the
+            # node's own work
+            priority = ReaderPriority.PEER if self.connection_type == NodeType.WALLET else ReaderPriority.CONSENSUS
+            with reader_priority(priority):
+                response: Message | None = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
             self.log.debug(
                 f"Time taken to process {message_type} from {self.peer_node_id} is {time.time() - start_time} seconds"
             )
@@ -627,10 +632,8 @@ class WSChiaConnection:
         encoded: bytes = bytes(message)
         size = len(encoded)
         assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
-        limiter_msg = self.outbound_rate_limiter.process_msg_and_check(
-            message, self.local_capabilities, self.peer_capabilities
-        )
-        if limiter_msg is not None:
+        rejection = self.outbound_rate_limiter.check_message(message, self.local_capabilities, self.peer_capabilities)
+        if rejection is not None:
             if not is_localhost(self.peer_info.host):
                 message_type = ProtocolMessageTypes(message.type)
                 last_time = self.log_rate_limit_last_time[message_type]
@@ -642,7 +645,7 @@ class WSChiaConnection:
                             f"{message_type.name}",
                             f"sz: {len(message.data) / 1000:0.2f} kB",
                             f"peer: {self.peer_info.host}",
-                            f"{limiter_msg}",
+                            f"{rejection}",
                         ]
                     )
                     self.log.info(f"Rate limiting ourselves. Dropping outbound message: {details}")
@@ -701,12 +704,12 @@ class WSChiaConnection:
                 message_type = ProtocolMessageTypes(full_message_loaded.type).name
             except Exception:
                 message_type = "Unknown"
-            limiter_msg = self.inbound_rate_limiter.process_msg_and_check(
+            rejection = self.inbound_rate_limiter.check_message(
                 full_message_loaded, self.local_capabilities, self.peer_capabilities
             )
-            if limiter_msg is not None:
+            if rejection is not None:
                 if self.local_type == NodeType.FULL_NODE and not is_localhost(self.peer_info.host):
-                    details = ", ".join([f"{self.peer_info.host}", f"message: {message_type}", limiter_msg])
+                    details = ", ".join([f"{self.peer_info.host}", f"message: {message_type}", f"{rejection}"])
                     self.log.error(f"Peer has been rate limited and will be disconnected: {details}")
                     # Only full node disconnects peers, to prevent abuse and crashing timelords, farmers, etc
                     create_referenced_task(self.close(RATE_LIMITER_BAN_SECONDS), known_unreferenced=True)
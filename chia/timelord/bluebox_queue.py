@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from chia.protocols.timelord_protocol import RequestCompactProofOfTime
+
+# work that has been pending longer than this (in seconds) is from a previous
+# batch sent by the full nodes, and is dropped
+PENDING_WORK_EXPIRY = 5
+# requests identical to work assigned this recently (in seconds) are ignored,
+# the full nodes keep sending the same requests until they get the proofs
+ASSIGNED_RETAIN_TIME = 600
+# the window (in seconds) the throughput is measured over
+THROUGHPUT_WINDOW = 600
+
+
+@dataclass
+class BlueboxQueue:
+    """
+    The compact proof requests waiting for a bluebox worker. Identical requests
+    are queued once, and the workers wait on a condition for work to arrive.
+
+    There's a queue per field_vdf, ordered by height. The field_vdf to work on
+    is picked at random among the ones with work, since CC_SP and CC_IP are
+    requested more often than CC_EOS and ICC_EOS. This keeps the work spread
+    evenly across the fields.
+    """
+
+    _condition: asyncio.Condition = field(default_factory=asyncio.Condition)
+    # the time each pending request was added, oldest first
+    _pending: dict[RequestCompactProofOfTime, float] = field(default_factory=dict)
+    # (height, counter, request) heaps, by field_vdf. Entries whose request
+    # isn't pending anymore are skipped when they're popped
+    _heaps: dict[int, list[tuple[int, int, RequestCompactProofOfTime]]] = field(default_factory=dict)
+    _counter: itertools.count[int] = field(default_factory=itertools.count)
+    # the time each recently assigned request was assigned, oldest first
+    _assigned: dict[RequestCompactProofOfTime, float] = field(default_factory=dict)
+    _finished: deque[float] = field(default_factory=deque)
+    received: int = 0
+    duplicates: int = 0
+    expired: int = 0
+    assigned: int = 0
+    finished: int = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _expire(self, now: float) -> None:
+        while len(self._pending) > 0:
+            request, added = next(iter(self._pending.items()))
+            if now - added <= PENDING_WORK_EXPIRY:
+                break
+            del self._pending[request]
+            self.expired += 1
+        while len(self._assigned) > 0:
+            request, assigned = next(iter(self._assigned.items()))
+            if now - assigned <= ASSIGNED_RETAIN_TIME:
+                break
+            del self._assigned[request]
+        # rebuild the heaps once they're mostly entries that were dropped
+        if sum(len(heap) for heap in self._heaps.values()) > 2 * len(self._pending) + 100:
+            self._heaps = {}
+            for request in self._pending:
+                self._push(request)
+
+    def _push(self, request: RequestCompactProofOfTime) -> None:
+        heap = self._heaps.setdefault(request.field_vdf, [])
+        heapq.heappush(heap, (request.height, next(self._counter), request))
+
+    def _pop(self, now: float) -> RequestCompactProofOfTime | None:
+        field_vdfs = []
+        for field_vdf, heap in self._heaps.items():
+            while len(heap) > 0 and heap[0][2] not in self._pending:
+                heapq.heappop(heap)
+            if len(heap) > 0:
+                field_vdfs.append(field_vdf)
+        if len(field_vdfs) == 0:
+            return None
+        _, _, request = heapq.heappop(self._heaps[random.choice(field_vdfs)])
+        del self._pending[request]
+        self._assigned[request] = now
+        self.assigned += 1
+        return request
+
+    async def put(self, request: RequestCompactProofOfTime) -> bool:
+        """
+        Queues the request, unless it's already pending or was recently
+        assigned. Returns whether it was queued.
+        """
+        async with self._condition:
+            now = time.monotonic()
+            self._expire(now)
+            self.received += 1
+            if request in self._assigned:
+                self.duplicates += 1
+                return False
+            if request in self._pending:
+                # the request is part of the latest batch too
+                del self._pending[request]
+                self._pending[request] = now
+                self.duplicates += 1
+                return False
+            self._pending[request] = now
+            self._push(request)
+            self._condition.notify_all()
+            return True
+
+    async def get(self, ready: Callable[[], bool] | None = None) -> RequestCompactProofOfTime:
+        """
+        Waits for a request to work on, and for ready() to return True if it's
+        passed. notify() must be called when ready() may have changed.
+        """
+        async with self._condition:
+            while True:
+                if ready is None or ready():
+                    now = time.monotonic()
+                    self._expire(now)
+                    request = self._pop(now)
+                    if request is not None:
+                        return request
+                await self._condition.wait()
+
+    async def put_back(self, request: RequestCompactProofOfTime) -> None:
+        """
+        Queues a request returned by get() again, when no worker could take it.
+        """
+        async with self._condition:
+            if self._assigned.pop(request, None) is not None:
+                self.assigned -= 1
+            if request not in self._pending:
+                self._pending[request] = time.monotonic()
+                self._push(request)
+            self._condition.notify_all()
+
+    def release(self, request: RequestCompactProofOfTime) -> None:
+        """
+        Forgets that the request was assigned, when its worker failed or
+        disconnected, so it's queued again the next time it's requested.
+        """
+        self._assigned.pop(request, None)
+
+    async def notify(self) -> None:
+        async with self._condition:
+            self._condition.notify_all()
+
+    def record_finished(self) -> None:
+        now = time.monotonic()
+        self.finished += 1
+        self._finished.append(now)
+        while self._finished[0] < now - THROUGHPUT_WINDOW:
+            self._finished.popleft()
+
+    def get_stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        self._expire(now)
+        pending_by_field_vdf: dict[int, int] = {}
+        for request in self._pending:
+            pending_by_field_vdf[request.field_vdf] = pending_by_field_vdf.get(request.field_vdf, 0) + 1
+        finished_in_window = sum(1 for finished in self._finished if finished >= now - THROUGHPUT_WINDOW)
+        return {
+            "pending": len(self._pending),
+            "pending_by_field_vdf": pending_by_field_vdf,
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "expired": self.expired,
+            "assigned": self.assigned,
+            "finished": self.finished,
+            "proofs_per_minute": finished_in_window * 60 / THROUGHPUT_WINDOW,
+        }
@@ -6,7 +6,6 @@ import dataclasses
 import io
 import logging
 import os
-import random
 import tempfile
 import time
 import traceback
@@ -36,6 +35,7 @@ from chia.protocols.protocol_message_types import ProtocolMessageTypes
 from chia.rpc.rpc_server import StateChangedProtocol, default_get_connections
 from chia.server.server import ChiaServer
 from chia.server.ws_connection import WSChiaConnection
+from chia.timelord.bluebox_queue import BlueboxQueue
 from chia.timelord.iters_from_block import iters_from_block
 from chia.timelord.timelord_state import LastState
 from chia.timelord.types import Chain, IterationType, StateType
@@ -131,7 +131,7 @@ class Timelord:
         # Used to label proofs in `finished_proofs` and to only filter proofs corresponding to the most recent state.
         self.num_resets: int = 0
 
-        self.process_communication_tasks: list[asyncio.Task[None]] = []
+        self.process_communication_tasks: list[asyncio.Task[object]] = []
         self.main_loop: asyncio.Task[None] | None = None
         self.vdf_server: asyncio.base_events.Server | None = None
         self._shut_down = False
@@ -145,7 +145,7 @@ class Timelord:
         # Support backwards compatibility for the old `config.yaml` that has field `sanitizer_mode`.
         if not self.bluebox_mode:
             self.bluebox_mode = self.config.get("sanitizer_mode", False)
-        self.pending_bluebox_info: list[tuple[float, timelord_protocol.RequestCompactProofOfTime]] = []
+        self.bluebox_queue = BlueboxQueue()
         self.last_active_time = time.time()
         self.max_allowed_inactivity_time = 60
         self._executor_shutdown_tempfile: IO[bytes] | None = None
@@ -218,6 +218,8 @@ class Timelord:
             if client_ip in self.ip_whitelist:
                 self.free_clients.append((client_ip, reader, writer))
                 log.debug(f"Added new VDF client {client_ip}.")
+        if self.bluebox_mode:
+            await self.bluebox_queue.notify()
 
     async def _stop_chain(self, chain: Chain) -> None:
         try:
@@ -939,8 +941,10 @@ class Timelord:
         field_vdf: uint8 | None = None,
         # Labels a proof to the current state only
         proof_label: int | None = None,
-    ) -> None:
+    ) -> bool:
+        # returns whether the vdf_client finished a proof
         disc: int = create_discriminant(challenge, self.constants.DISCRIMINANT_SIZE_BITS)
+        finished = False
 
         try:
             # Depending on the flag 'bluebox_mode', the timelord tells the vdf_client what to execute.
@@ -972,10 +976,10 @@ class Timelord:
                 async with self.lock:
                     self.vdf_failures.append((chain, proof_label))
                     self.vdf_failures_count += 1
-                return
+                return False
 
             if ok.decode() != "OK":
-                return
+                return False
 
             log.debug("Got handshake with VDF client.")
             if not self.bluebox_mode:
@@ -1070,6 +1074,7 @@ class Timelord:
                     async with self.lock:
                         assert proof_label is not None
                         self.proofs_finished.append((chain, vdf_info, vdf_proof, proof_label))
+                    finished = True
                     self.state_changed(
                         "finished_pot",
                         {
@@ -1093,6 +1098,8 @@ class Timelord:
                     if self._server is not None:
                         message = make_msg(ProtocolMessageTypes.respond_compact_proof_of_time, response)
                         await self.server.send_to_all([message], NodeType.FULL_NODE)
+                    self.bluebox_queue.record_finished()
+                    finished = True
                     self.state_changed(
                         "new_compact_proof", {"header_hash": header_hash, "height": height, "field_vdf": field_vdf}
                     )
@@ -1101,45 +1108,50 @@ class Timelord:
             log.debug(f"Connection reset with VDF client {e}")
         except Exception:
             log.exception("VDF client communication terminated abruptly")
+        return finished
+
+    async def _do_bluebox_communication(
+        self,
+        request: timelord_protocol.RequestCompactProofOfTime,
+        ip: str,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        finished = await self._do_process_communication(
+            Chain.BLUEBOX,
+            request.new_proof_of_time.challenge,
+            ClassgroupElement.get_default_element(),
+            ip,
+            reader,
+            writer,
+            request.new_proof_of_time.number_of_iterations,
+            request.header_hash,
+            request.height,
+            request.field_vdf,
+        )
+        if not finished:
+            # the vdf_client failed or disconnected, so the request is queued
+            # again the next time a full node sends it
+            self.bluebox_queue.release(request)
 
     async def _manage_discriminant_queue_sanitizer(self) -> None:
         while not self._shut_down:
+            # only the bluebox takes free clients, one is still there once we get the work
+            info = await self.bluebox_queue.get(ready=lambda: len(self.free_clients) > 0)
             async with self.lock:
+                if len(self.free_clients) == 0:
+                    # the free client was taken in the meantime
+                    await self.bluebox_queue.put_back(info)
+                    continue
                 try:
-                    while len(self.pending_bluebox_info) > 0 and len(self.free_clients) > 0:
-                        # Select randomly the field_vdf we're creating a compact vdf for.
-                        # This is done because CC_SP and CC_IP are more frequent than
-                        # CC_EOS and ICC_EOS. This guarantees everything is picked uniformly.
-                        target_field_vdf = random.randint(1, 4)
-                        info = next(
-                            (info for info in self.pending_bluebox_info if info[1].field_vdf == target_field_vdf),
-                            None,
-                        )
-                        if info is None:
-                            # Nothing found with target_field_vdf, just pick the first VDFInfo.
-                            info = self.pending_bluebox_info[0]
-                        ip, reader, writer = self.free_clients[0]
-                        self.process_communication_tasks.append(
-                            create_referenced_task(
-                                self._do_process_communication(
-                                    Chain.BLUEBOX,
-                                    info[1].new_proof_of_time.challenge,
-                                    ClassgroupElement.get_default_element(),
-                                    ip,
-                                    reader,
-                                    writer,
-                                    info[1].new_proof_of_time.number_of_iterations,
-                                    info[1].header_hash,
-                                    info[1].height,
-                                    info[1].field_vdf,
-                                )
-                            )
-                        )
-                        self.pending_bluebox_info.remove(info)
-                        self.free_clients = self.free_clients[1:]
+                    ip, reader, writer = self.free_clients[0]
+                    self.process_communication_tasks.append(
+                        create_referenced_task(self._do_bluebox_communication(info, ip, reader, writer))
+                    )
+                    self.free_clients = self.free_clients[1:]
                 except Exception as e:
                     log.error(f"Exception manage discriminant queue: {e}")
-            await asyncio.sleep(0.1)
+                    await self.bluebox_queue.put_back(info)
 
     async def _start_manage_discriminant_queue_sanitizer_slow(self, pool: ThreadPoolExecutor, counter: int) -> None:
         tasks = []
@@ -1151,78 +1163,65 @@ class Timelord:
     async def _manage_discriminant_queue_sanitizer_slow(self, pool: ThreadPoolExecutor) -> None:
         log.info("Started task for managing bluebox queue.")
         while not self._shut_down:
-            picked_info = None
-            async with self.lock:
-                try:
-                    if len(self.pending_bluebox_info) > 0:
-                        # Select randomly the field_vdf we're creating a compact vdf for.
-                        # This is done because CC_SP and CC_IP are more frequent than
-                        # CC_EOS and ICC_EOS. This guarantees everything is picked uniformly.
-                        target_field_vdf = random.randint(1, 4)
-                        info = next(
-                            (info for info in self.pending_bluebox_info if info[1].field_vdf == target_field_vdf),
-                            None,
-                        )
-                        if info is None:
-                            # Nothing found with target_field_vdf, just pick the first VDFInfo.
-                            info = self.pending_bluebox_info[0]
-                        self.pending_bluebox_info.remove(info)
-                        picked_info = info[1]
-                except Exception as e:
-                    log.error(f"Exception manage discriminant queue: {e}")
-            if picked_info is not None:
-                try:
-                    t1 = time.time()
-                    log.info(
-                        f"Working on compact proof for height: {picked_info.height}. "
-                        f"VDF: {picked_info.field_vdf}. "
-                        f"Iters: {picked_info.new_proof_of_time.number_of_iterations}."
-                    )
-                    bluebox_process_data = BlueboxProcessData(
-                        picked_info.new_proof_of_time.challenge,
-                        uint16(self.constants.DISCRIMINANT_SIZE_BITS),
-                        picked_info.new_proof_of_time.number_of_iterations,
-                    )
-                    proof = await asyncio.get_running_loop().run_in_executor(
-                        pool,
-                        prove_bluebox_slow,
-                        bytes(bluebox_process_data),
-                        "" if self._executor_shutdown_tempfile is None else self._executor_shutdown_tempfile.name,
-                    )
-                    t2 = time.time()
-                    delta = t2 - t1
-                    if delta > 0:
-                        ips = picked_info.new_proof_of_time.number_of_iterations / delta
-                    else:
-                        ips = 0
-
-                    if len(proof) == 0:
-                        log.info(f"Empty VDF proof returned: {picked_info.height}. Time: {delta}s. IPS: {ips}.")
-                        return
-
-                    log.info(f"Finished compact proof: {picked_info.height}. Time: {delta}s. IPS: {ips}.")
-                    output = proof[:100]
-                    proof_part = proof[100:200]
-                    if ClassgroupElement.create(output) != picked_info.new_proof_of_time.output:
-                        log.error("Expected vdf output different than produced one. Stopping.")
-                        return
-                    vdf_proof = VDFProof(uint8(0), proof_part, True)
-                    initial_form = ClassgroupElement.get_default_element()
-                    if not validate_vdf(vdf_proof, self.constants, initial_form, picked_info.new_proof_of_time):
-                        log.error("Invalid compact proof of time!")
-                        return
-                    response = timelord_protocol.RespondCompactProofOfTime(
-                        picked_info.new_proof_of_time,
-                        vdf_proof,
-                        picked_info.header_hash,
-                        picked_info.height,
-                        picked_info.field_vdf,
-                    )
-                    if self._server is not None:
-                        message = make_msg(ProtocolMessageTypes.respond_compact_proof_of_time, response)
-                        await self.server.send_to_all([message], NodeType.FULL_NODE)
-                except Exception as e:
-                    log.error(f"Exception manage discriminant queue: {e}")
-                    tb = traceback.format_exc()
-                    log.error(f"Error while handling message: {tb}")
-            await asyncio.sleep(0.1)
+            picked_info = await self.bluebox_queue.get()
+            finished = False
+            try:
+                t1 = time.time()
+                log.info(
+                    f"Working on compact proof for height: {picked_info.height}. "
+                    f"VDF: {picked_info.field_vdf}. "
+                    f"Iters: {picked_info.new_proof_of_time.number_of_iterations}."
+                )
+                bluebox_process_data = BlueboxProcessData(
+                    picked_info.new_proof_of_time.challenge,
+                    uint16(self.constants.DISCRIMINANT_SIZE_BITS),
+                    picked_info.new_proof_of_time.number_of_iterations,
+                )
+                proof = await asyncio.get_running_loop().run_in_executor(
+                    pool,
+                    prove_bluebox_slow,
+                    bytes(bluebox_process_data),
+                    "" if self._executor_shutdown_tempfile is None else self._executor_shutdown_tempfile.name,
+                )
+                t2 = time.time()
+                delta = t2 - t1
+                if delta > 0:
+                    ips = picked_info.new_proof_of_time.number_of_iterations / delta
+                else:
+                    ips = 0
+
+                if len(proof) == 0:
+                    log.info(f"Empty VDF proof returned: {picked_info.height}. Time: {delta}s. IPS: {ips}.")
+                    return
+
+                log.info(f"Finished compact proof: {picked_info.height}. Time: {delta}s. IPS: {ips}.")
+                output = proof[:100]
+                proof_part = proof[100:200]
+                if ClassgroupElement.create(output) != picked_info.new_proof_of_time.output:
+                    log.error("Expected vdf output different than produced one. Stopping.")
+                    return
+                vdf_proof = VDFProof(uint8(0), proof_part, True)
+                initial_form = ClassgroupElement.get_default_element()
+                if not validate_vdf(vdf_proof, self.constants, initial_form, picked_info.new_proof_of_time):
+                    log.error("Invalid compact proof of time!")
+                    return
+                response = timelord_protocol.RespondCompactProofOfTime(
+                    picked_info.new_proof_of_time,
+                    vdf_proof,
+                    picked_info.header_hash,
+                    picked_info.height,
+                    picked_info.field_vdf,
+                )
+                if self._server is not None:
+                    message = make_msg(ProtocolMessageTypes.respond_compact_proof_of_time, response)
+                    await self.server.send_to_all([message], NodeType.FULL_NODE)
+                self.bluebox_queue.record_finished()
+                finished = True
+            except Exception as e:
+                log.error(f"Exception manage discriminant queue: {e}")
+                tb = traceback.format_exc()
+                log.error(f"Error while handling message: {tb}")
+            finally:
+                if not finished:
+                    # queue the request again the next time a full node sends it
+                    self.bluebox_queue.release(picked_info)
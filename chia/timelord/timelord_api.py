@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-import time
 from typing import TYPE_CHECKING, ClassVar
 
 from chia_rs.sized_ints import uint64
@@ -158,11 +157,6 @@ class TimelordAPI:
 
     @metadata.request()
     async def request_compact_proof_of_time(self, vdf_info: timelord_protocol.RequestCompactProofOfTime):
-        async with self.timelord.lock:
-            if not self.timelord.bluebox_mode:
-                return None
-            now = time.time()
-            # work older than 5s can safely be assumed to be from the previous batch, and needs to be cleared
-            while self.timelord.pending_bluebox_info and (now - self.timelord.pending_bluebox_info[0][0] > 5):
-                del self.timelord.pending_bluebox_info[0]
-            self.timelord.pending_bluebox_info.append((now, vdf_info))
+        if not self.timelord.bluebox_mode:
+            return None
+        await self.timelord.bluebox_queue.put(vdf_info)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, ClassVar, cast
 
-from chia.rpc.rpc_server import Endpoint
+from chia.rpc.rpc_server import Endpoint, EndpointResult
 from chia.timelord.timelord import Timelord
 from chia.util.ws_message import WsRpcMessage, create_payload_dict
 
@@ -18,7 +18,12 @@ class TimelordRpcApi:
         self.service_name = "chia_timelord"
 
     def get_routes(self) -> dict[str, Endpoint]:
-        return {}
+        return {
+            "/get_bluebox_queue_stats": self.get_bluebox_queue_stats,
+        }
+
+    async def get_bluebox_queue_stats(self, _: dict[str, Any]) -> EndpointResult:
+        return self.service.bluebox_queue.get_stats()
 
     async def _state_changed(self, change: str, change_data: dict[str, Any] | None = None) -> list[WsRpcMessage]:
         payloads = []
@@ -3,11 +3,13 @@ from __future__ import annotations
 import argparse
 import contextlib
 import copy
+import dataclasses
 import logging
 import os
 import shutil
 import sys
 import tempfile
+import threading
 import time
 import traceback
 from collections.abc import Callable, Iterator
@@ -21,6 +23,102 @@ from chia.util.lock import Lockfile
 
 log = logging.getLogger(__name__)
 
+# a config file modified less than this many seconds before it was parsed may
+# be modified again without changing its stat() signature (file system
+# timestamps are coarse). Those are always verified by their contents
+_CONFIG_CACHE_RACY_SECONDS = 2.0
+
+_StatKey = tuple[int, int, int, int]
+
+
+@dataclasses.dataclass(frozen=True)
+class _CachedConfig:
+    stat_key: _StatKey
+    modified_at: float
+    parsed_at: float
+    contents: bytes
+    config: dict[str, Any]
+
+
+# the parsed config files of this process, by path. Callers always get a copy of
+# the cached config, since they're free to modify what's returned
+_config_cache: dict[Path, _CachedConfig] = {}
+_config_cache_lock = threading.Lock()
+
+
+def _stat_key(stat: os.stat_result) -> _StatKey:
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns
+
+
+def _copy_config(value: Any) -> Any:
+    # this is a lot cheaper than copy.deepcopy() for the plain dicts, lists and
+    # scalars that a YAML document is made of
+    value_type = type(value)
+    if value_type is dict:
+        return {k: _copy_config(v) for k, v in value.items()}
+    if value_type is list:
+        return [_copy_config(v) for v in value]
+    if value_type in {str, int, float, bool, type(None)}:
+        return value
+    return copy.deepcopy(value)
+
+
+def _yaml_safe_load(contents: bytes) -> Any:
+    # use the libyaml based loader when PyYAML was built with it, it's a lot
+    # faster than the pure python one
+    if yaml.__with_libyaml__:
+        return yaml.load(contents, Loader=yaml.CSafeLoader)
+    return yaml.safe_load(contents)
+
+
+def _get_cached_config(path: Path) -> dict[str, Any] | None:
+    """
+    Returns a copy of the cached config if the file hasn't changed since it was
+    parsed, judging by its stat() signature alone.
+    """
+    with _config_cache_lock:
+        cached = _config_cache.get(path)
+    if cached is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if _stat_key(stat) != cached.stat_key or cached.parsed_at - cached.modified_at < _CONFIG_CACHE_RACY_SECONDS:
+        return None
+    return cast(dict[str, Any], _copy_config(cached.config))
+
+
+def _parse_config(path: Path, contents: bytes, stat: os.stat_result) -> dict[str, Any] | None:
+    """
+    Returns a copy of the config parsed from contents, reusing the cached one if
+    the contents are unchanged.
+    """
+    now = time.time()
+    with _config_cache_lock:
+        cached = _config_cache.get(path)
+    if cached is not None and cached.contents == contents:
+        config = cached.config
+    else:
+        config = _yaml_safe_load(contents)
+        if config is None:
+            return None
+    entry = _CachedConfig(
+        stat_key=_stat_key(stat),
+        modified_at=max(stat.st_mtime, stat.st_ctime),
+        parsed_at=now,
+        contents=contents,
+        config=config,
+    )
+    with _config_cache_lock:
+        _config_cache[path] = entry
+    return cast(dict[str, Any], _copy_config(config))
+
+
+def clear_config_cache() -> None:
+    with _config_cache_lock:
+        _config_cache.clear()
+
 
 def initial_config_file(filename: str | Path) -> str:
     initial_config_path = importlib_resources.files(__name__.rpartition(".")[0]).joinpath(f"initial-{filename}")
@@ -128,12 +226,15 @@ def _load_config_maybe_locked(
     for i in range(10):
         try:
             # at least we intend it to be this type
-            r: dict[str, Any]
-            with contextlib.ExitStack() as exit_stack:
-                if acquire_lock:
-                    exit_stack.enter_context(lock_config(root_path, filename))
-                with open(path) as opened_config_file:
-                    r = yaml.safe_load(opened_config_file)
+            r: dict[str, Any] | None = _get_cached_config(path)
+            if r is None:
+                with contextlib.ExitStack() as exit_stack:
+                    if acquire_lock:
+                        exit_stack.enter_context(lock_config(root_path, filename))
+                    with open(path, "rb") as opened_config_file:
+                        contents = opened_config_file.read()
+                        stat = os.fstat(opened_config_file.fileno())
+                r = _parse_config(path, contents, stat)
             if r is None:
                 log.error(f"yaml.safe_load returned None: {path}")
                 time.sleep(i * 0.1)
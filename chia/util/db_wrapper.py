@@ -3,29 +3,81 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import contextlib
+import contextvars
 import functools
+import math
+import re
 import secrets
 import sqlite3
 import sys
-from collections.abc import AsyncIterator, Iterable
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable, Iterator
 from dataclasses import dataclass, field
 from datetime import datetime
+from enum import IntEnum
 from pathlib import Path
-from typing import Any, TextIO
+from typing import Any, TextIO, TypeVar
 
 import aiosqlite
 import anyio
+from aiosqlite.context import contextmanager
 from typing_extensions import final
 
+from chia.util.task_referencer import create_referenced_task
+
 if aiosqlite.sqlite_version_info < (3, 32, 0):
     SQLITE_MAX_VARIABLE_NUMBER = 900
 else:
     SQLITE_MAX_VARIABLE_NUMBER = 32700
 
+T = TypeVar("T")
+
 # integers in sqlite are limited by int64
 SQLITE_INT_MAX = 2**63 - 1
 
+# the number of prepared statements each connection keeps for reuse
+DEFAULT_CACHED_STATEMENTS = 128
+# the number of recent latencies kept per statement, for percentiles
+QUERY_LATENCY_SAMPLES = 1000
+
+# a list of two or more placeholders, e.g. in "WHERE name IN (?, ?, ?)"
+_PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+# the statements DBWrapper2 manages its transactions with, which aren't queries
+_SAVEPOINT_STATEMENT = re.compile(r"\s*(?:SAVEPOINT|RELEASE|ROLLBACK)\b", re.IGNORECASE)
+
+
+class ReaderPriority(IntEnum):
+    """
+    The kinds of work reading the database. When all the reader connections
+    are busy, they're handed to the waiting readers of the lowest value first.
+    """
+
+    CONSENSUS = 0
+    MEMPOOL = 1
+    PEER = 2
+    RPC = 3
+
+
+_reader_priority: contextvars.ContextVar[ReaderPriority] = contextvars.ContextVar(
+    "reader_priority", default=ReaderPriority.CONSENSUS
+)
+
+
+@contextlib.contextmanager
+def reader_priority(priority: ReaderPriority) -> Iterator[None]:
+    """
+    Sets the priority of the reader connections acquired within the context,
+    including by the tasks created in it.
+    """
+    token = _reader_priority.set(priority)
+    try:
+        yield
+    finally:
+        _reader_priority.reset(token)
+
 
 class DBWrapperError(Exception):
     pass
@@ -75,14 +127,250 @@ async def execute_fetchone(
     return None
 
 
+@functools.lru_cache(maxsize=4096)
+def statement_template(sql: str) -> str:
+    """
+    Returns the statement sql with its whitespace normalized, and lists of
+    placeholders collapsed. Queries built for a varying number of parameters
+    share a template.
+    """
+    return _PLACEHOLDER_LIST.sub("?, ...", " ".join(sql.split()))
+
+
+@dataclass
+class StatementStats:
+    count: int = 0
+    total_time: float = 0.0
+    rows: int = 0
+    latencies: deque[float] = field(default_factory=functools.partial(deque, maxlen=QUERY_LATENCY_SAMPLES))
+
+    def p99_time(self) -> float:
+        if len(self.latencies) == 0:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[math.ceil(len(latencies) * 0.99) - 1]
+
+    def to_json_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_time": self.total_time,
+            "mean_time": self.total_time / self.count if self.count > 0 else 0.0,
+            "p99_time": self.p99_time(),
+            "rows": self.rows,
+        }
+
+
+@dataclass
+class QueryStats:
+    """
+    Per statement template counts, latencies (in seconds) and rows returned
+    for the queries run through the connections created here. The latency of
+    a query run through a cursor includes fetching its rows.
+    """
+
+    enabled: bool = True
+    statements: dict[tuple[str, str], StatementStats] = field(default_factory=dict)
+
+    def record(self, database: str, sql: str, duration: float, rows: int) -> None:
+        if not self.enabled or _SAVEPOINT_STATEMENT.match(sql) is not None:
+            return
+        key = (database, statement_template(sql))
+        stats = self.statements.get(key)
+        if stats is None:
+            stats = StatementStats()
+            self.statements[key] = stats
+        stats.count += 1
+        stats.total_time += duration
+        stats.rows += rows
+        stats.latencies.append(duration)
+
+    def reset(self) -> None:
+        self.statements.clear()
+
+    def to_json_dict(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """
+        Returns the stats of the statements that took the most total time
+        first.
+        """
+        items = sorted(self.statements.items(), key=lambda item: item[1].total_time, reverse=True)
+        return [
+            {"database": database, "statement": template, **stats.to_json_dict()}
+            for (database, template), stats in items[:limit]
+        ]
+
+
+# the stats of all the databases opened by this process
+query_stats = QueryStats()
+
+
+class _Cursor(aiosqlite.Cursor):
+    """
+    Records the stats of its statement once it's closed or deleted, and
+    releases the sqlite3 cursor on the connection's thread.
+    """
+
+    def __init__(self, conn: _Connection, cursor: sqlite3.Cursor, sql: str | None, duration: float) -> None:
+        super().__init__(conn, cursor)
+        self._connection = conn
+        self._sqlite_cursor = cursor
+        self._sql = sql
+        self._duration = duration
+        self._rows = 0
+        self._closed = False
+
+    def _record(self) -> None:
+        if self._sql is not None:
+            self._connection.record(self._sql, self._duration, self._rows)
+            self._sql = None
+
+    async def _fetch(self, fn: Any, *args: Any) -> Any:
+        start = time.perf_counter()
+        rows = await self._connection.run_on_thread(fn, *args)
+        self._duration += time.perf_counter() - start
+        return rows
+
+    async def execute(self, sql: str, parameters: Iterable[Any] | None = None) -> aiosqlite.Cursor:
+        self._record()
+        start = time.perf_counter()
+        await super().execute(sql, parameters)
+        self._sql = sql
+        self._duration = time.perf_counter() - start
+        self._rows = 0
+        return self
+
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> aiosqlite.Cursor:
+        self._record()
+        start = time.perf_counter()
+        await super().executemany(sql, parameters)
+        self._sql = sql
+        self._duration = time.perf_counter() - start
+        self._rows = 0
+        return self
+
+    async def fetchone(self) -> sqlite3.Row | None:
+        row: sqlite3.Row | None = await self._fetch(self._sqlite_cursor.fetchone)
+        if row is not None:
+            self._rows += 1
+        return row
+
+    async def fetchmany(self, size: int | None = None) -> Iterable[sqlite3.Row]:
+        args = () if size is None else (size,)
+        rows: list[sqlite3.Row] = await self._fetch(self._sqlite_cursor.fetchmany, *args)
+        self._rows += len(rows)
+        return rows
+
+    async def fetchall(self) -> Iterable[sqlite3.Row]:
+        rows: list[sqlite3.Row] = await self._fetch(self._sqlite_cursor.fetchall)
+        self._rows += len(rows)
+        return rows
+
+    async def close(self) -> None:
+        self._record()
+        self._closed = True
+        await super().close()
+
+    def __del__(self) -> None:
+        self._record()
+        # the cursor's statement may be cached and reused by the connection's
+        # thread. It's reset when the cursor is released, which must not
+        # happen on another thread while the statement is in use
+        if not self._closed:
+            self._connection.release_cursor(self._sqlite_cursor)
+
+
+class _Connection(aiosqlite.Connection):
+    """
+    An aiosqlite connection that records the stats of the queries it runs, and
+    can use the sqlite3 statement cache safely. Cursors are only ever released
+    on the connection's thread, where the cached statements are used.
+
+    This relies on the internals of aiosqlite, to run functions on the
+    connection's thread and to reach the sqlite3 connection. They're only used
+    in this class, and the aiosqlite versions it's known to work with are
+    pinned in pyproject.toml.
+    """
+
+    def __init__(self, connector: Any, database_name: str) -> None:
+        super().__init__(connector, iter_chunk_size=64)
+        self.database_name = database_name
+        self._event_loop = asyncio.get_running_loop()
+
+    def record(self, sql: str, duration: float, rows: int) -> None:
+        query_stats.record(self.database_name, sql, duration, rows)
+
+    async def run_on_thread(self, fn: Callable[..., T], *args: Any) -> T:
+        result: T = await self._execute(fn, *args)  # type: ignore[no-untyped-call]
+        return result
+
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        return self._conn
+
+    def release_cursor(self, cursor: sqlite3.Cursor) -> None:
+        """
+        Closes a cursor that was dropped without being closed. This may be
+        called on any thread, the cursor is closed from a task on the
+        connection's event loop.
+        """
+        with contextlib.suppress(RuntimeError):
+            # the event loop is closed already
+            self._event_loop.call_soon_threadsafe(self._close_dropped_cursor, cursor)
+
+    def _close_dropped_cursor(self, cursor: sqlite3.Cursor) -> None:
+        create_referenced_task(self._close_cursor(cursor))
+
+    async def _close_cursor(self, cursor: sqlite3.Cursor) -> None:
+        # the connection may have been closed in the meantime, which releases
+        # its cursors anyway
+        with contextlib.suppress(ValueError, sqlite3.Error):
+            await self.run_on_thread(cursor.close)
+
+    @contextmanager
+    async def cursor(self) -> aiosqlite.Cursor:
+        return _Cursor(self, await self.run_on_thread(self._sqlite_connection().cursor), None, 0.0)
+
+    @contextmanager
+    async def execute(self, sql: str, parameters: Iterable[Any] | None = None) -> aiosqlite.Cursor:
+        start = time.perf_counter()
+        cursor = await self.run_on_thread(
+            self._sqlite_connection().execute, sql, [] if parameters is None else parameters
+        )
+        return _Cursor(self, cursor, sql, time.perf_counter() - start)
+
+    @contextmanager
+    async def executemany(self, sql: str, parameters: Iterable[Iterable[Any]]) -> aiosqlite.Cursor:
+        start = time.perf_counter()
+        cursor = await self.run_on_thread(self._sqlite_connection().executemany, sql, parameters)
+        return _Cursor(self, cursor, sql, time.perf_counter() - start)
+
+    @contextmanager
+    async def execute_fetchall(self, sql: str, parameters: Iterable[Any] | None = None) -> Iterable[sqlite3.Row]:
+        start = time.perf_counter()
+        rows = list(await super().execute_fetchall(sql, parameters))
+        self.record(sql, time.perf_counter() - start, len(rows))
+        return rows
+
+    @contextmanager
+    async def execute_insert(self, sql: str, parameters: Iterable[Any] | None = None) -> sqlite3.Row | None:
+        start = time.perf_counter()
+        row: sqlite3.Row | None = await super().execute_insert(sql, parameters)
+        self.record(sql, time.perf_counter() - start, 0)
+        return row
+
+
+def _database_name(database: str | Path) -> str:
+    # strip the parameters of a uri, like in "file:db_1234?mode=memory"
+    return Path(str(database).split("?")[0]).name
+
+
 async def _create_connection(
     database: str | Path,
     uri: bool = False,
     log_file: TextIO | None = None,
     name: str | None = None,
+    cached_statements: int = DEFAULT_CACHED_STATEMENTS,
 ) -> aiosqlite.Connection:
-    # To avoid https://github.com/python/cpython/issues/118172
-    connection = await aiosqlite.connect(database=database, uri=uri, cached_statements=0)
+    connector = functools.partial(sqlite3.connect, str(database), uri=uri, cached_statements=cached_statements)
+    connection = await _Connection(connector, database_name=_database_name(database))
 
     if log_file is not None:
         await connection.set_trace_callback(functools.partial(sql_trace_callback, file=log_file, name=name))
@@ -96,9 +384,12 @@ async def manage_connection(
     uri: bool = False,
     log_file: TextIO | None = None,
     name: str | None = None,
+    cached_statements: int = DEFAULT_CACHED_STATEMENTS,
 ) -> AsyncIterator[aiosqlite.Connection]:
     connection: aiosqlite.Connection
-    connection = await _create_connection(database=database, uri=uri, log_file=log_file, name=name)
+    connection = await _create_connection(
+        database=database, uri=uri, log_file=log_file, name=name, cached_statements=cached_statements
+    )
 
     try:
         yield connection
@@ -143,18 +434,111 @@ class DBWrapper2:
     _log_file: TextIO | None = None
     host_parameter_limit: int = get_host_parameter_limit()
     _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
-    _read_connections: asyncio.Queue[aiosqlite.Connection] = field(default_factory=asyncio.Queue)
+    _idle_readers: list[aiosqlite.Connection] = field(default_factory=list)
     _num_read_connections: int = 0
+    # the number of reader connections held by each priority
+    _readers_in_use: dict[ReaderPriority, int] = field(default_factory=lambda: dict.fromkeys(ReaderPriority, 0))
+    # the tasks waiting for a reader connection, by priority and then in order
+    # of arrival
+    _reader_waiters: list[tuple[ReaderPriority, int, asyncio.Future[aiosqlite.Connection]]] = field(
+        default_factory=list
+    )
+    _reader_waiter_count: int = 0
+    # the maximum number of reader connections held by each priority at a time
+    reader_limits: dict[ReaderPriority, int] = field(default_factory=dict)
+    # while readers are waiting, more reader connections are opened with
+    # _open_reader, up to this many in total. They're closed once they're no
+    # longer needed
+    max_reader_count: int = 0
+    _open_reader: Callable[[], Awaitable[aiosqlite.Connection]] | None = None
+    _extra_readers: set[aiosqlite.Connection] = field(default_factory=set)
     _in_use: dict[asyncio.Task[object], aiosqlite.Connection] = field(default_factory=dict)
     _current_writer: asyncio.Task[object] | None = None
-    _savepoint_name: int = 0
+    _savepoint_depth: int = 0
+    # the number of savepoints rolled back. In-memory state kept in sync with
+    # writes may be stale once this changes
+    rollback_count: int = 0
 
     async def add_connection(self, c: aiosqlite.Connection) -> None:
         # this guarantees that reader connections can only be used for reading
         assert c != self._write_connection
         await c.execute("pragma query_only")
-        self._read_connections.put_nowait(c)
+        self._idle_readers.append(c)
         self._num_read_connections += 1
+        self._dispatch_readers()
+
+    def _under_reader_limit(self, priority: ReaderPriority) -> bool:
+        limit = self.reader_limits.get(priority)
+        return limit is None or self._readers_in_use[priority] < limit
+
+    async def _acquire_reader(self, priority: ReaderPriority, *, limited: bool = True) -> aiosqlite.Connection:
+        # there are only idle readers if none of the waiters can take them
+        if not limited or self._under_reader_limit(priority):
+            if len(self._idle_readers) > 0:
+                self._readers_in_use[priority] += 1
+                return self._idle_readers.pop()
+            if limited and self._open_reader is not None and self._num_read_connections < self.max_reader_count:
+                self._num_read_connections += 1
+                self._readers_in_use[priority] += 1
+                try:
+                    c = await self._open_reader()
+                except BaseException:
+                    self._num_read_connections -= 1
+                    self._readers_in_use[priority] -= 1
+                    raise
+                self._extra_readers.add(c)
+                return c
+
+        future: asyncio.Future[aiosqlite.Connection] = asyncio.get_running_loop().create_future()
+        waiter = (priority, self._reader_waiter_count, future)
+        self._reader_waiter_count += 1
+        bisect.insort(self._reader_waiters, waiter)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # we were handed a connection as we were cancelled
+                self._release_reader(future.result(), priority)
+            elif waiter in self._reader_waiters:
+                # a reader may have been released after we were cancelled,
+                # which drops our waiter already
+                self._reader_waiters.remove(waiter)
+            raise
+
+    def _release_reader(self, c: aiosqlite.Connection, priority: ReaderPriority) -> None:
+        self._readers_in_use[priority] -= 1
+        self._idle_readers.append(c)
+        self._dispatch_readers()
+        if len(self._reader_waiters) == 0 and c in self._extra_readers and c in self._idle_readers:
+            # nobody is waiting for a reader, close the one opened on demand
+            self._idle_readers.remove(c)
+            self._extra_readers.remove(c)
+            self._num_read_connections -= 1
+            create_referenced_task(c.close())
+
+    def _dispatch_readers(self) -> None:
+        index = 0
+        while len(self._idle_readers) > 0 and index < len(self._reader_waiters):
+            priority, _, future = self._reader_waiters[index]
+            if future.done():
+                del self._reader_waiters[index]
+            elif not self._under_reader_limit(priority):
+                index += 1
+            else:
+                del self._reader_waiters[index]
+                self._readers_in_use[priority] += 1
+                future.set_result(self._idle_readers.pop())
+
+    async def _remove_readers(self) -> list[aiosqlite.Connection]:
+        """
+        Waits for all the reader connections to be released, and removes them
+        from the pool.
+        """
+        removed: list[aiosqlite.Connection] = []
+        while self._num_read_connections > 0:
+            removed.append(await self._acquire_reader(ReaderPriority.CONSENSUS, limited=False))
+            self._num_read_connections -= 1
+        return removed
 
     @classmethod
     @contextlib.asynccontextmanager
@@ -170,6 +554,9 @@ class DBWrapper2:
         synchronous: str | None = None,
         foreign_keys: bool | None = None,
         row_factory: type[aiosqlite.Row] | None = None,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
+        max_reader_count: int | None = None,
+        reader_limits: dict[ReaderPriority, int] | None = None,
     ) -> AsyncIterator[DBWrapper2]:
         if foreign_keys is None:
             foreign_keys = False
@@ -182,7 +569,13 @@ class DBWrapper2:
                 log_file = async_exit_stack.enter_context(log_path.open("a", encoding="utf-8"))
 
             write_connection = await async_exit_stack.enter_async_context(
-                manage_connection(database=database, uri=uri, log_file=log_file, name="writer"),
+                manage_connection(
+                    database=database,
+                    uri=uri,
+                    log_file=log_file,
+                    name="writer",
+                    cached_statements=cached_statements,
+                ),
             )
             await (await write_connection.execute(f"pragma journal_mode={journal_mode}")).close()
             if synchronous is not None:
@@ -201,18 +594,41 @@ class DBWrapper2:
                         uri=uri,
                         log_file=log_file,
                         name=f"reader-{index}",
+                        cached_statements=cached_statements,
                     ),
                 )
                 read_connection.row_factory = row_factory
                 await self.add_connection(c=read_connection)
 
+            async def open_reader() -> aiosqlite.Connection:
+                read_connection = await _create_connection(
+                    database=database,
+                    uri=uri,
+                    log_file=log_file,
+                    name="reader-extra",
+                    cached_statements=cached_statements,
+                )
+                try:
+                    read_connection.row_factory = row_factory
+                    await read_connection.execute("pragma query_only")
+                except BaseException:
+                    with anyio.CancelScope(shield=True):
+                        await read_connection.close()
+                    raise
+                return read_connection
+
+            self.max_reader_count = reader_count if max_reader_count is None else max_reader_count
+            self.reader_limits = {} if reader_limits is None else reader_limits
+            self._open_reader = open_reader
+
             try:
                 yield self
             finally:
                 with anyio.CancelScope(shield=True):
-                    while self._num_read_connections > 0:
-                        await self._read_connections.get()
-                        self._num_read_connections -= 1
+                    for read_connection in await self._remove_readers():
+                        # the exit stack closes the others
+                        if read_connection in self._extra_readers:
+                            await read_connection.close()
 
     @classmethod
     async def create(
@@ -227,6 +643,7 @@ class DBWrapper2:
         synchronous: str | None = None,
         foreign_keys: bool = False,
         row_factory: type[aiosqlite.Row] | None = None,
+        cached_statements: int = DEFAULT_CACHED_STATEMENTS,
     ) -> DBWrapper2:
         # WARNING: please use .managed() instead
         if log_path is None:
@@ -234,7 +651,9 @@ class DBWrapper2:
         else:
             log_path.parent.mkdir(parents=True, exist_ok=True)
             log_file = log_path.open("a", encoding="utf-8")
-        write_connection = await _create_connection(database=database, uri=uri, log_file=log_file, name="writer")
+        write_connection = await _create_connection(
+            database=database, uri=uri, log_file=log_file, name="writer", cached_statements=cached_statements
+        )
         await (await write_connection.execute(f"pragma journal_mode={journal_mode}")).close()
         if synchronous is not None:
             await (await write_connection.execute(f"pragma synchronous={synchronous}")).close()
@@ -251,6 +670,7 @@ class DBWrapper2:
                 uri=uri,
                 log_file=log_file,
                 name=f"reader-{index}",
+                cached_statements=cached_statements,
             )
             read_connection.row_factory = row_factory
             await self.add_connection(c=read_connection)
@@ -260,29 +680,29 @@ class DBWrapper2:
     async def close(self) -> None:
         # WARNING: please use .managed() instead
         try:
-            while self._num_read_connections > 0:
-                await (await self._read_connections.get()).close()
-                self._num_read_connections -= 1
+            for read_connection in await self._remove_readers():
+                await read_connection.close()
             await self._write_connection.close()
         finally:
             if self._log_file is not None:
                 self._log_file.close()
 
-    def _next_savepoint(self) -> str:
-        name = f"s{self._savepoint_name}"
-        self._savepoint_name += 1
-        return name
-
     @contextlib.asynccontextmanager
     async def _savepoint_ctx(self) -> AsyncIterator[None]:
-        name = self._next_savepoint()
+        # savepoints are only nested by the task holding the writer, so their
+        # names just need to differ by depth. Reusing them keeps the number of
+        # distinct statements, in the statement cache, small
+        name = f"s{self._savepoint_depth}"
         await self._write_connection.execute(f"SAVEPOINT {name}")
+        self._savepoint_depth += 1
         try:
             yield
         except:
+            self.rollback_count += 1
             await self._write_connection.execute(f"ROLLBACK TO {name}")
             raise
         finally:
+            self._savepoint_depth -= 1
             # rollback to a savepoint doesn't cancel the transaction, it
             # just rolls back the state. We need to cancel it regardless
             await self._write_connection.execute(f"RELEASE {name}")
@@ -409,7 +829,7 @@ class DBWrapper2:
 
         # we can have multiple concurrent readers, just pick a connection from
         # the pool of readers. If they're all busy, we'll wait for one to free
-        # up.
+        # up (or for a new one to be opened).
         task = asyncio.current_task()
         assert task is not None
 
@@ -425,7 +845,10 @@ class DBWrapper2:
         if task in self._in_use:
             yield self._in_use[task]
         else:
-            c = await self._read_connections.get()
+            # the connections are handed out by the priority set with
+            # reader_priority()
+            priority = _reader_priority.get()
+            c = await self._acquire_reader(priority)
             try:
                 # record our connection in this dict to allow nested calls in
                 # the same task to use the same connection
@@ -433,4 +856,4 @@ class DBWrapper2:
                 yield c
             finally:
                 del self._in_use[task]
-                self._read_connections.put_nowait(c)
+                self._release_reader(c, priority)
@@ -1,10 +1,33 @@
 from __future__ import annotations
 
+import dataclasses
 import json
-from typing import Any
+import logging
+from collections.abc import Callable, Iterator
+from json.encoder import encode_basestring_ascii
+from typing import Any, get_args
 
 from aiohttp import web
 
+from chia.util.streamable import (
+    Streamable,
+    is_type_Enum,
+    is_type_List,
+    is_type_SpecificOptional,
+    is_type_Tuple,
+    recurse_jsonify,
+)
+
+log = logging.getLogger(__name__)
+
+# The approximate size of the chunks large json responses are written in
+JSON_CHUNK_SIZE = 64 * 1024
+
+# The number of items of the lists and dicts in a response that are converted at a time
+JSON_CHUNK_ITEMS = 100
+
+WriteJsonFunctionType = Callable[[Any, list[str]], None]
+
 
 class EnhancedJSONEncoder(json.JSONEncoder):
     """
@@ -21,6 +44,12 @@ class EnhancedJSONEncoder(json.JSONEncoder):
         return super().default(o)
 
 
+# The same encoder dict_to_json_str() creates for each call
+enhanced_encoder = EnhancedJSONEncoder(sort_keys=True)
+# Encodes the objects json supports natively, and raises TypeError for all others
+plain_encoder = json.JSONEncoder(sort_keys=True)
+
+
 def dict_to_json_str(o: Any) -> str:
     """
     Converts a python object into json.
@@ -29,9 +58,278 @@ def dict_to_json_str(o: Any) -> str:
     return json_str
 
 
+def write_json_bool(item: Any, out: list[str]) -> None:
+    out.append("true" if item else "false")
+
+
+def write_json_int(item: Any, out: list[str]) -> None:
+    out.append(int.__repr__(item))
+
+
+def write_json_str(item: Any, out: list[str]) -> None:
+    out.append(encode_basestring_ascii(item))
+
+
+def write_json_bytes(item: Any, out: list[str]) -> None:
+    out.append(f'"0x{item.hex()}"')
+
+
+def write_json_jsonified(item: Any, out: list[str]) -> None:
+    out.append(enhanced_encoder.encode(recurse_jsonify(item)))
+
+
+def converted_json_value(item: Any) -> Any:
+    override = getattr(item, "json_serialization_override", None)
+    if override is not None:
+        return override(item)
+    return item.to_json_dict()
+
+
+def write_json_converted(item: Any, out: list[str]) -> None:
+    out.append(enhanced_encoder.encode(converted_json_value(item)))
+
+
+def write_json_converted_list(items: Any, out: list[str]) -> None:
+    out.append(enhanced_encoder.encode([converted_json_value(item) for item in items]))
+
+
+def write_json_optional(write_inner: WriteJsonFunctionType, item: Any, out: list[str]) -> None:
+    if item is None:
+        out.append("null")
+    else:
+        write_inner(item, out)
+
+
+def write_json_list(write_item: WriteJsonFunctionType, items: Any, out: list[str]) -> None:
+    out.append("[")
+    for i, item in enumerate(items):
+        if i > 0:
+            out.append(", ")
+        write_item(item, out)
+    out.append("]")
+
+
+def write_json_tuple(write_items: list[WriteJsonFunctionType], items: Any, out: list[str]) -> None:
+    out.append("[")
+    for i, (write_item, item) in enumerate(zip(write_items, items)):
+        if i > 0:
+            out.append(", ")
+        write_item(item, out)
+    out.append("]")
+
+
+def function_to_write_json_one_item(f_type: Any) -> WriteJsonFunctionType:
+    """
+    Returns a function writing the json of a value of a streamable field of the given type, the same as its part of
+    the json of recurse_jsonify() would be.
+    """
+    if is_type_SpecificOptional(f_type):
+        write_inner = function_to_write_json_one_item(get_args(f_type)[0])
+        return lambda item, out: write_json_optional(write_inner, item, out)
+    if is_type_List(f_type):
+        write_item = function_to_write_json_one_item(get_args(f_type)[0])
+        if write_item is write_json_converted:
+            return write_json_converted_list
+        return lambda items, out: write_json_list(write_item, items, out)
+    if is_type_Tuple(f_type):
+        write_items = [function_to_write_json_one_item(item_type) for item_type in get_args(f_type)]
+        return lambda items, out: write_json_tuple(write_items, items, out)
+    if f_type is bool:
+        return write_json_bool
+    if f_type is str:
+        return write_json_str
+    if isinstance(f_type, type) and not is_type_Enum(f_type):
+        if issubclass(f_type, Streamable):
+            return write_json_streamable_fields
+        if issubclass(f_type, bytes):
+            return write_json_bytes
+        if issubclass(f_type, int):
+            return write_json_int
+        if hasattr(f_type, "to_json_dict") and not dataclasses.is_dataclass(f_type):
+            # like the types implemented in chia_rs, recurse_jsonify() returns their to_json_dict() as is
+            return write_json_converted
+    return write_json_jsonified
+
+
+StreamableJsonFields = tuple[tuple[str, str, WriteJsonFunctionType], ...]
+
+streamable_json_fields: dict[type[Streamable], StreamableJsonFields] = {}
+
+
+def get_streamable_json_fields(cls: type[Streamable]) -> StreamableJsonFields:
+    """
+    Returns the json key, name and write function of each field of cls, in the order json.dumps() writes them with
+    sort_keys.
+    """
+    json_fields = streamable_json_fields.get(cls)
+    if json_fields is None:
+        fields = sorted(cls.streamable_fields(), key=lambda field: field.name)
+        json_fields = tuple(
+            (
+                f"{', ' if i > 0 else ''}{encode_basestring_ascii(field.name)}: ",
+                field.name,
+                function_to_write_json_one_item(field.type),
+            )
+            for i, field in enumerate(fields)
+        )
+        streamable_json_fields[cls] = json_fields
+    return json_fields
+
+
+def write_json_streamable_fields(item: Any, out: list[str]) -> None:
+    """
+    Writes the json of recurse_jsonify(item) for a streamable object, field by field without creating its dict.
+    """
+    override = getattr(item, "json_serialization_override", None)
+    if override is not None:
+        out.append(enhanced_encoder.encode(override(item)))
+        return
+    out.append("{")
+    for key, name, write_value in get_streamable_json_fields(type(item)):
+        out.append(key)
+        write_value(getattr(item, name), out)
+    out.append("}")
+
+
+def write_json(o: Any, out: list[str]) -> None:
+    """
+    Writes the same json dict_to_json_str() returns for o. Streamable objects are written field by field instead of
+    converting them into dicts first, the values json supports natively are written directly.
+    """
+    if type(o) is str:
+        out.append(encode_basestring_ascii(o))
+    elif o is None:
+        out.append("null")
+    elif o is True:
+        out.append("true")
+    elif o is False:
+        out.append("false")
+    elif isinstance(o, int):
+        out.append(int.__repr__(o))
+    elif isinstance(o, (list, tuple)):
+        out.append("[")
+        for i, item in enumerate(o):
+            if i > 0:
+                out.append(", ")
+            write_json(item, out)
+        out.append("]")
+    elif isinstance(o, dict) and all(type(key) is str for key in o):
+        out.append("{")
+        for i, key in enumerate(sorted(o)):
+            out.append(f"{', ' if i > 0 else ''}{encode_basestring_ascii(key)}: ")
+            write_json(o[key], out)
+        out.append("}")
+    elif isinstance(o, Streamable) and type(o).to_json_dict is Streamable.to_json_dict:
+        write_json_streamable_fields(o, out)
+    else:
+        # str subclasses, floats, dicts with keys other than str and objects converted by EnhancedJSONEncoder
+        out.append(enhanced_encoder.encode(o))
+
+
+def encode_json(o: Any) -> str:
+    """
+    Converts a python object into json, like dict_to_json_str(). Trying the encoder of the json module first, which
+    is faster as long as it doesn't need to convert objects.
+    """
+    try:
+        return plain_encoder.encode(o)
+    except TypeError:
+        out: list[str] = []
+        write_json(o, out)
+        return "".join(out)
+
+
+def json_parts(o: Any, split_levels: int) -> Iterator[str]:
+    """
+    Yields the json of o in parts. Lists and dicts down to split_levels levels deep are converted JSON_CHUNK_ITEMS
+    items at a time, the outermost dict is converted value by value.
+    """
+    if split_levels > 0 and isinstance(o, dict) and all(type(key) is str for key in o):
+        keys = sorted(o)
+        yield "{"
+        if split_levels > 1:
+            for i, key in enumerate(keys):
+                yield f"{', ' if i > 0 else ''}{encode_basestring_ascii(key)}: "
+                yield from json_parts(o[key], split_levels - 1)
+        else:
+            for start in range(0, len(keys), JSON_CHUNK_ITEMS):
+                if start > 0:
+                    yield ", "
+                # the json of the dict without its braces
+                yield encode_json({key: o[key] for key in keys[start : start + JSON_CHUNK_ITEMS]})[1:-1]
+        yield "}"
+    elif split_levels > 0 and isinstance(o, (list, tuple)):
+        yield "["
+        for start in range(0, len(o), JSON_CHUNK_ITEMS):
+            if start > 0:
+                yield ", "
+            # the json of the list without its brackets
+            yield encode_json(o[start : start + JSON_CHUNK_ITEMS])[1:-1]
+        yield "]"
+    else:
+        yield encode_json(o)
+
+
+def json_chunks(o: Any, chunk_size: int = JSON_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Converts a python object into json like dict_to_json_str(), yielding it in chunks of about chunk_size characters.
+    The lists and dicts in the response or in one of its values are converted a few items at a time, so a large
+    response doesn't need to be converted all at once.
+    """
+    buffer: list[str] = []
+    size = 0
+    for part in json_parts(o, split_levels=2):
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+    if len(buffer) > 0:
+        yield "".join(buffer)
+
+
 def obj_to_response(o: Any) -> web.Response:
     """
     Converts a python object into json. Used for RPC server which returns JSON.
     """
     json_str = dict_to_json_str(o)
     return web.Response(body=json_str, content_type="application/json")
+
+
+async def obj_to_streamed_response(request: web.Request, o: Any) -> web.StreamResponse:
+    """
+    Converts a python object into json, like obj_to_response(). A response larger than a chunk is streamed to the
+    client while it's converted, letting other tasks run between the chunks. If the conversion fails once the response
+    was started, the connection is closed so the client can't take the partial json for a complete response.
+    """
+    chunks = json_chunks(o)
+    first = next(chunks, "")
+    second = next(chunks, None)
+    if second is None:
+        return web.Response(body=first, content_type="application/json")
+
+    response = web.StreamResponse()
+    response.content_type = "application/json"
+    await response.prepare(request)
+    try:
+        await response.write(first.encode())
+        await response.write(second.encode())
+        while True:
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            except Exception:
+                # the status was sent already, closing the connection before the end of the response tells the
+                # client it failed
+                log.exception(f"Failed to convert the response to {request.path} to json, closing the connection")
+                if request.transport is not None:
+                    request.transport.close()
+                return response
+            await response.write(chunk.encode())
+        await response.write_eof()
+    except ConnectionError as e:
+        # the client went away before the end of the response, which isn't an error of the server
+        log.debug(f"Client disconnected while streaming the response to {request.path}: {e}")
+    return response
@@ -7,6 +7,7 @@ import functools
 import io
 import os
 import pprint
+import struct
 import traceback
 from collections.abc import Callable, Collection
 from enum import Enum, EnumMeta
@@ -24,8 +25,8 @@ from typing import (
     get_type_hints,
 )
 
-from chia_rs.sized_bytes import bytes32
-from chia_rs.sized_ints import uint16, uint32, uint64
+from chia_rs.sized_bytes import bytes4, bytes8, bytes32, bytes48, bytes96, bytes100, bytes480
+from chia_rs.sized_ints import int8, int16, int32, int64, uint8, uint16, uint32, uint64, uint128
 from typing_extensions import Self
 
 from chia.util.byte_types import hexstr_to_bytes
@@ -36,6 +37,10 @@ if TYPE_CHECKING:
 
 pp = pprint.PrettyPrinter(indent=1, width=120, compact=True)
 
+# Set CHIA_STREAMABLE_GENERATED to have the streamable decorator replace the parse and stream methods of each class
+# with functions generated for its fields, see generate_streamable_functions()
+USE_GENERATED_FUNCTIONS = os.environ.get("CHIA_STREAMABLE_GENERATED") is not None
+
 
 class StreamableError(Exception):
     pass
@@ -567,6 +572,179 @@ def function_to_stream_one_item(f_type: type[Any]) -> StreamFunctionType:
         raise UnsupportedType(f"can't stream {f_type}")
 
 
+# The struct formats of the fixed size types the generated functions unpack and pack directly. There are no formats
+# for 128 bit ints, these are unpacked and packed as bytes.
+STRUCT_FORMATS: dict[type[Any], str] = {
+    bool: "B",
+    int8: "b",
+    uint8: "B",
+    int16: "h",
+    uint16: "H",
+    int32: "i",
+    uint32: "I",
+    int64: "q",
+    uint64: "Q",
+    uint128: "16s",
+    bytes4: "4s",
+    bytes8: "8s",
+    bytes32: "32s",
+    bytes48: "48s",
+    bytes96: "96s",
+    bytes100: "100s",
+    bytes480: "480s",
+}
+
+
+def from_struct_value(f_type: Any, value: str) -> str:
+    """
+    Returns the source of an expression converting a value unpacked with the struct format of f_type into f_type. The
+    values unpacked are always in range, so the types are created without their checks.
+    """
+    if f_type is bool:
+        return f"{value} == 1"
+    if f_type is uint128:
+        return f"new_int({f_type.__name__}, int_from_bytes({value}, 'big', signed={f_type.SIGNED}))"
+    if issubclass(f_type, bytes):
+        return f"new_bytes({f_type.__name__}, {value})"
+    return f"new_int({f_type.__name__}, {value})"
+
+
+def to_struct_value(f_type: Any, value: str) -> str:
+    """
+    Returns the source of an expression converting a value of f_type into one to pack with its struct format.
+    """
+    if f_type is uint128:
+        return f"int_to_bytes({value}, 16, 'big', signed={f_type.SIGNED})"
+    return value
+
+
+def generate_fixed_size_run(
+    run: list[tuple[int, Field]], namespace: dict[str, Any], parse_lines: list[str], stream_lines: list[str]
+) -> None:
+    """
+    Generates the code to unpack and pack consecutive fixed size fields with a single struct. If there are too few
+    bytes left, the fields are parsed one by one again, to raise the same error the generic parse would.
+    """
+    if len(run) == 0:
+        return
+    first = run[0][0]
+    layout = struct.Struct(">" + "".join(STRUCT_FORMATS[field.type] for _, field in run))
+    namespace[f"unpack_{first}"] = layout.unpack
+    namespace[f"pack_{first}"] = layout.pack
+    values = ", ".join(f"v{i}" for i, _ in run)
+    parse_lines.append(f"    data = read({layout.size})")
+    parse_lines.append(f"    if len(data) == {layout.size}:")
+    parse_lines.append(f"        {values}, = unpack_{first}(data)")
+    for i, field in run:
+        if field.type is bool:
+            parse_lines.append(f"        if v{i} > 1:")
+            parse_lines.append("            raise ValueError('Bool byte must be 0 or 1')")
+        parse_lines.append(f"        v{i} = {from_struct_value(field.type, f'v{i}')}")
+    parse_lines.append("    else:")
+    parse_lines.append("        f.seek(-len(data), SEEK_CUR)")
+    parse_lines.extend(f"        v{i} = parse_{i}(f)" for i, _ in run)
+    packed = ", ".join(to_struct_value(field.type, f"self.{field.name}") for _, field in run)
+    stream_lines.append(f"    write(pack_{first}({packed}))")
+    run.clear()
+
+
+def generate_fixed_size_list(
+    i: int, field: Field, item_type: Any, namespace: dict[str, Any], parse_lines: list[str], stream_lines: list[str]
+) -> None:
+    """
+    Generates the code to unpack and pack a list of fixed size items all at once, after its size prefix.
+    """
+    item = struct.Struct(">" + STRUCT_FORMATS[item_type])
+    namespace[f"unpack_items_{i}"] = item.iter_unpack
+    namespace[f"pack_item_{i}"] = item.pack
+    parse_lines.append("    count = parse_uint32(f)")
+    parse_lines.append(f"    data = read(count * {item.size})")
+    parse_lines.append(f"    if len(data) == count * {item.size}:")
+    parse_lines.append(f"        v{i} = [{from_struct_value(item_type, 'v')} for v, in unpack_items_{i}(data)]")
+    parse_lines.append("    else:")
+    parse_lines.append("        f.seek(-len(data) - 4, SEEK_CUR)")
+    parse_lines.append(f"        v{i} = parse_{i}(f)")
+    stream_lines.append(f"    v = self.{field.name}")
+    stream_lines.append("    write(pack_uint32(len(v)))")
+    if issubclass(item_type, bytes):
+        stream_lines.append("    write(b''.join(v))")
+    elif item_type is uint128:
+        stream_lines.append(f"    write(b''.join([{to_struct_value(item_type, 'item')} for item in v]))")
+    else:
+        stream_lines.append(f"    write(b''.join(map(pack_item_{i}, v)))")
+
+
+def generate_streamable_functions(cls: type[Streamable]) -> tuple[Callable[[Any, BinaryIO], Any], StreamFunctionType]:
+    """
+    Generates parse and stream functions specialized for the fields of cls, equivalent to the generic Streamable.parse
+    and Streamable.stream. Consecutive sized ints, sized bytes and bools are unpacked and packed with a single struct
+    and lists of sized ints and sized bytes all at once. The other fields are handled by their parse and stream
+    functions, called directly rather than from a loop over the fields.
+
+    Returns the parse function, taking the class and the stream like a classmethod, and the stream function.
+    """
+    if any("__slots__" in vars(base) for base in cls.__mro__):
+        # the fields are set through the object's __dict__, like Streamable.__post_init__ does
+        raise DefinitionError("__slots__ aren't supported.", cls)
+
+    namespace: dict[str, Any] = {
+        "new_object": object.__new__,
+        "new_int": int.__new__,
+        "new_bytes": bytes.__new__,
+        "int_from_bytes": int.from_bytes,
+        "int_to_bytes": int.to_bytes,
+        "parse_uint32": parse_uint32,
+        "pack_uint32": struct.Struct(">I").pack,
+        "SEEK_CUR": os.SEEK_CUR,
+        **{f_type.__name__: f_type for f_type in STRUCT_FORMATS if f_type is not bool},
+    }
+    parse_lines = ["def parse(cls, f):", "    read = f.read"]
+    stream_lines = ["def stream(self, f):", "    write = f.write"]
+    run: list[tuple[int, Field]] = []
+    for i, field in enumerate(cls._streamable_fields):
+        namespace[f"parse_{i}"] = field.parse_function
+        namespace[f"stream_{i}"] = field.stream_function
+        if field.type in STRUCT_FORMATS:
+            run.append((i, field))
+            continue
+        generate_fixed_size_run(run, namespace, parse_lines, stream_lines)
+        item_type = get_args(field.type)[0] if is_type_List(field.type) else None
+        if item_type is not bool and item_type in STRUCT_FORMATS:
+            generate_fixed_size_list(i, field, item_type, namespace, parse_lines, stream_lines)
+        else:
+            parse_lines.append(f"    v{i} = parse_{i}(f)")
+            stream_lines.append(f"    stream_{i}(self.{field.name}, f)")
+    generate_fixed_size_run(run, namespace, parse_lines, stream_lines)
+
+    # Create the object without calling __init__() to avoid unnecessary post-init checks, like Streamable.parse
+    values = ", ".join(f"{field.name!r}: v{i}" for i, field in enumerate(cls._streamable_fields))
+    parse_lines.append("    obj = new_object(cls)")
+    parse_lines.append(f"    obj.__dict__.update({{{values}}})")
+    parse_lines.append("    return obj")
+
+    source = "\n".join([*parse_lines, "", *stream_lines]) + "\n"
+    # the source is built only from the field names and types of the class itself
+    exec(compile(source, f"<streamable {cls.__module__}.{cls.__qualname__}>", "exec"), namespace)  # noqa: S102
+    parse: Callable[[Any, BinaryIO], Any] = namespace["parse"]
+    stream: StreamFunctionType = namespace["stream"]
+    for function in (parse, stream):
+        function.__qualname__ = f"{cls.__qualname__}.{function.__name__}"
+        setattr(function, "_streamable_generated", True)
+    return parse, stream
+
+
+def uses_generic_functions(cls: type[Streamable]) -> bool:
+    """
+    Returns true if cls parses and streams with Streamable's methods or ones generated for a base class, rather than
+    its own.
+    """
+    parse = getattr(cls.parse, "__func__", None)
+    stream = cls.stream
+    return (parse is Streamable.__dict__["parse"].__func__ or hasattr(parse, "_streamable_generated")) and (
+        stream is Streamable.stream or hasattr(stream, "_streamable_generated")
+    )
+
+
 def streamable(cls: type[_T_Streamable]) -> type[_T_Streamable]:
     """
     This decorator forces correct streamable protocol syntax/usage and populates the caches for types hints and
@@ -600,6 +778,11 @@ def streamable(cls: type[_T_Streamable]) -> type[_T_Streamable]:
 
     cls._streamable_fields = create_fields(cls)
 
+    if USE_GENERATED_FUNCTIONS and uses_generic_functions(cls):
+        parse, stream = generate_streamable_functions(cls)
+        setattr(cls, "parse", classmethod(parse))
+        setattr(cls, "stream", stream)
+
     return cls
 
 
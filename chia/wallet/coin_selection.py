@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import bisect
+import itertools
 import logging
 import random
 
@@ -10,6 +12,10 @@ from chia.types.blockchain_format.coin import Coin
 from chia.wallet.util.tx_config import CoinSelectionConfig
 from chia.wallet.wallet_coin_record import WalletCoinRecord
 
+# the number of steps the branch and bound search for an exact match takes
+# before giving up
+BNB_MAX_TRIES = 100000
+
 
 async def select_coins(
     spendable_amount: uint128,
@@ -33,23 +39,29 @@ async def select_coins(
 
     max_num_coins = 500
     sum_spendable_coins = 0
-    valid_spendable_coins: list[Coin] = []
+    # (amount, coin), since getting the amount of a coin is relatively slow
+    valid_spendable_coins_with_amounts: list[tuple[int, Coin]] = []
+    min_coin_amount = int(coin_selection_config.min_coin_amount)
+    max_coin_amount = int(coin_selection_config.max_coin_amount)
+    excluded_coin_amounts = {int(a) for a in coin_selection_config.excluded_coin_amounts}
+    excluded_coin_ids = set(coin_selection_config.excluded_coin_ids)
+    # computing the coin IDs is only needed when there are coins to exclude
+    check_coin_ids = len(unconfirmed_removals) > 0 or len(excluded_coin_ids) > 0
 
     for coin_record in spendable_coins:  # remove all the unconfirmed coins, excluded coins and dust.
-        coin_name: bytes32 = coin_record.coin.name()
-        if coin_name in unconfirmed_removals:
-            continue
-        if coin_name in coin_selection_config.excluded_coin_ids:
+        if check_coin_ids:
+            coin_name: bytes32 = coin_record.coin.name()
+            if coin_name in unconfirmed_removals:
+                continue
+            if coin_name in excluded_coin_ids:
+                continue
+        coin_amount = int(coin_record.coin.amount)
+        if coin_amount < min_coin_amount or coin_amount > max_coin_amount:
             continue
-        if (
-            coin_record.coin.amount < coin_selection_config.min_coin_amount
-            or coin_record.coin.amount > coin_selection_config.max_coin_amount
-        ):
+        if coin_amount in excluded_coin_amounts:
             continue
-        if coin_record.coin.amount in coin_selection_config.excluded_coin_amounts:
-            continue
-        valid_spendable_coins.append(coin_record.coin)
-        sum_spendable_coins += coin_record.coin.amount
+        valid_spendable_coins_with_amounts.append((coin_amount, coin_record.coin))
+        sum_spendable_coins += coin_amount
 
     # This happens when we couldn't use one of the coins because it's already used
     # but unconfirmed, and we are waiting for the change. (unconfirmed_additions)
@@ -64,39 +76,46 @@ async def select_coins(
         )
 
     # Sort the coins by amount
-    valid_spendable_coins.sort(reverse=True, key=lambda r: r.amount)
+    valid_spendable_coins_with_amounts.sort(reverse=True, key=lambda r: r[0])
+    valid_spendable_coins: list[Coin] = [coin for _, coin in valid_spendable_coins_with_amounts]
+    amounts = [coin_amount for coin_amount, _ in valid_spendable_coins_with_amounts]
+    # the coins smaller than the amount come after this index, and the coin before it
+    # is the smallest coin over the amount
+    first_smaller = bisect.bisect_right(amounts, -amount, key=lambda a: -a)
+    smallest_coin_over_target = valid_spendable_coins[first_smaller - 1] if first_smaller > 0 else None
 
     # check for exact 1 to 1 coin match.
-    exact_match_coin: Coin | None = check_for_exact_match(valid_spendable_coins, uint64(amount))
-    if exact_match_coin:
+    if first_smaller > 0 and amounts[first_smaller - 1] == amount:
+        exact_match_coin = valid_spendable_coins[bisect.bisect_left(amounts, -amount, key=lambda a: -a)]
         log.debug(f"selected coin with an exact match: {exact_match_coin}")
         return {exact_match_coin}
 
     # Check for an exact match with all of the coins smaller than the amount.
     # If we have more, smaller coins than the amount we run the next algorithm.
-    smaller_coin_sum = 0  # coins smaller than target.
-    smaller_coins: list[Coin] = []
-    for coin in valid_spendable_coins:
-        if coin.amount < amount:
-            smaller_coin_sum += coin.amount
-            smaller_coins.append(coin)
+    smaller_coin_sum = sum(amounts[first_smaller:])  # coins smaller than target.
+    smaller_coins: list[Coin] = valid_spendable_coins[first_smaller:]
     if smaller_coin_sum == amount and len(smaller_coins) < max_num_coins and amount != 0:
         log.debug(f"Selected all smaller coins because they equate to an exact match of the target.: {smaller_coins}")
         return set(smaller_coins)
     elif smaller_coin_sum < amount:
-        smallest_coin: Coin | None = select_smallest_coin_over_target(amount, valid_spendable_coins)
-        assert smallest_coin is not None  # Since we know we have enough, there must be a larger coin
-        log.debug(f"Selected closest greater coin: {smallest_coin.name()}")
-        return {smallest_coin}
+        # Since we know we have enough, there must be a larger coin
+        assert smallest_coin_over_target is not None
+        log.debug(f"Selected closest greater coin: {smallest_coin_over_target.name()}")
+        return {smallest_coin_over_target}
     elif smaller_coin_sum > amount:
-        coin_set: set[Coin] | None = knapsack_coin_algorithm(
-            smaller_coins, amount, coin_selection_config.max_coin_amount, max_num_coins
+        # a set of coins adding up to the amount exactly doesn't need a change coin
+        coin_set: set[Coin] | None = branch_and_bound_exact_match(
+            smaller_coins, amount, max_num_coins, amounts=amounts[first_smaller:]
         )
+        if coin_set is not None:
+            log.debug(f"Selected coins from branch and bound exact match: {coin_set}")
+            return coin_set
+        coin_set = knapsack_coin_algorithm(smaller_coins, amount, coin_selection_config.max_coin_amount, max_num_coins)
         log.debug(f"Selected coins from knapsack algorithm: {coin_set}")
         if coin_set is None:
             coin_set = sum_largest_coins(amount, smaller_coins)
             if coin_set is None or len(coin_set) > max_num_coins:
-                greater_coin = select_smallest_coin_over_target(amount, valid_spendable_coins)
+                greater_coin = smallest_coin_over_target
                 if greater_coin is None:
                     raise ValueError(
                         f"Transaction of {amount} mojo would use more than "
@@ -106,7 +125,7 @@ async def select_coins(
         return coin_set
     else:
         # if smaller_coin_sum == amount and (len(smaller_coins) >= max_num_coins or amount == 0)
-        potential_large_coin: Coin | None = select_smallest_coin_over_target(amount, valid_spendable_coins)
+        potential_large_coin: Coin | None = smallest_coin_over_target
         if potential_large_coin is None:
             raise ValueError("Too many coins are required to make this transaction")
         log.debug(f"Resorted to selecting smallest coin over target due to dust.: {potential_large_coin}")
@@ -136,6 +155,49 @@ def select_smallest_coin_over_target(target: uint128, sorted_coin_list: list[Coi
     assert False  # Should never reach here
 
 
+# we use this to find a set of coins which adds up to the target exactly, by a depth first search which includes
+# the largest coins that fit first, and prunes the branches that can't reach the target anymore. The search
+# gives up after max_tries steps. Coins must be sorted in descending amount order, amounts are the amounts of the
+# coins if they're known already.
+def branch_and_bound_exact_match(
+    sorted_coins: list[Coin],
+    target: uint128,
+    max_num_coins: int,
+    max_tries: int = BNB_MAX_TRIES,
+    amounts: list[int] | None = None,
+) -> set[Coin] | None:
+    if amounts is None:
+        amounts = [int(coin.amount) for coin in sorted_coins]
+    # in ascending order, for bisect
+    negated_amounts = [-amount for amount in amounts]
+    # remaining[i] is the sum of the amounts of the coins from index i on
+    remaining = list(itertools.accumulate(reversed(amounts), initial=0))[::-1]
+    selected: list[int] = []
+    selected_sum = 0
+    index = 0
+    for _ in range(max_tries):
+        if selected_sum == target:
+            coin_set = {sorted_coins[i] for i in selected}
+            # the same coin can't be spent twice
+            return coin_set if len(coin_set) == len(selected) else None
+        missing = target - selected_sum
+        # skip the coins that would overshoot the target
+        index = bisect.bisect_left(negated_amounts, -missing, lo=index)
+        if remaining[index] < missing or len(selected) == max_num_coins:
+            if len(selected) == 0:
+                return None
+            # exclude the last coin we included instead, and the coins of the same amount after it, since
+            # including those leads to the sets we already tried
+            last = selected.pop()
+            selected_sum -= amounts[last]
+            index = bisect.bisect_right(negated_amounts, -amounts[last], lo=last + 1)
+        else:
+            selected.append(index)
+            selected_sum += amounts[index]
+            index += 1
+    return None
+
+
 # we use this to find the set of coins which have total value closest to the target, but at least the target.
 # IMPORTANT: The coins have to be sorted in descending order or else this function will not work.
 def knapsack_coin_algorithm(
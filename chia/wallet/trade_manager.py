@@ -16,6 +16,7 @@ from chia.types.blockchain_format.coin import Coin, coin_as_list
 from chia.types.blockchain_format.program import Program, run
 from chia.util.db_wrapper import DBWrapper2
 from chia.util.hash import std_hash
+from chia.util.lru_cache import LRUCache
 from chia.wallet.cat_wallet.cat_wallet import CATWallet
 from chia.wallet.conditions import (
     AssertCoinAnnouncement,
@@ -52,6 +53,10 @@ if TYPE_CHECKING:
     from chia.wallet.wallet_state_manager import WalletStateManager
 from chia.wallet.wallet_spend_bundle import WalletSpendBundle
 
+# the number of parsed offers kept, so the trades that coin states touch can be
+# settled without parsing the offers again
+PARSED_OFFER_CACHE_SIZE = 1000
+
 
 class TradeManager:
     """
@@ -93,7 +98,7 @@ class TradeManager:
     wallet_state_manager: WalletStateManager
     log: logging.Logger
     trade_store: TradeStore
-    most_recently_deserialized_trade: tuple[bytes32, Offer] | None
+    parsed_offers: LRUCache[bytes32, Offer]
 
     @staticmethod
     async def create(
@@ -109,9 +114,16 @@ class TradeManager:
 
         self.wallet_state_manager = wallet_state_manager
         self.trade_store = await TradeStore.create(db_wrapper)
-        self.most_recently_deserialized_trade = None
+        self.parsed_offers = LRUCache(PARSED_OFFER_CACHE_SIZE)
         return self
 
+    def get_parsed_offer(self, trade: TradeRecord) -> Offer:
+        offer = self.parsed_offers.get(trade.trade_id)
+        if offer is None:
+            offer = Offer.from_bytes(trade.offer)
+            self.parsed_offers.put(trade.trade_id, offer)
+        return offer
+
     async def get_offers_with_status(self, status: TradeStatus) -> list[TradeRecord]:
         records = await self.trade_store.get_trade_record_with_status(status)
         return records
@@ -138,14 +150,64 @@ class TradeManager:
                 trades_by_coin.append(trade)
         return trades_by_coin
 
+    async def get_our_addition_ids(self, offers: list[Offer]) -> list[list[bytes32]]:
+        """
+        Returns the IDs of the additions of each offer that come from coins WE offered.
+        """
+        primary_coin_ids = {c.name() for offer in offers for c in offer.removals()}
+        # TODO: Add `WalletCoinStore.get_coins`.
+        result = await self.wallet_state_manager.coin_store.get_coin_records(
+            coin_id_filter=HashFilter.include(list(primary_coin_ids))
+        )
+        our_primary_coins: set[Coin] = {cr.coin for cr in result.records}
+        return [
+            [addition.name() for addition, root in offer.get_root_removals().items() if root in our_primary_coins]
+            for offer in offers
+        ]
+
+    async def get_settlement_coin_states(
+        self, coin_states: list[CoinState], fork_height: uint32 | None, peer: WSChiaConnection
+    ) -> dict[bytes32, CoinState | None]:
+        """
+        Looks up the coin states of our additions in all the trades that the spent coin states settle, with a single
+        peer query. Returns the state of each addition looked up, or None if the peer doesn't know the coin.
+        """
+        spent_coins = {cs.coin for cs in coin_states if cs.spent_height is not None}
+        if len(spent_coins) == 0:
+            return {}
+        offers = [
+            self.get_parsed_offer(trade)
+            for trade in await self.get_all_trades()
+            if trade.status != TradeStatus.CANCELLED.value and not spent_coins.isdisjoint(trade.coins_of_interest)
+        ]
+        addition_ids = list({coin_id for ids in await self.get_our_addition_ids(offers) for coin_id in ids})
+        if len(addition_ids) == 0:
+            return {}
+        settlement_states: dict[bytes32, CoinState | None] = dict.fromkeys(addition_ids)
+        found_states = await self.wallet_state_manager.wallet_node.get_coin_state(
+            addition_ids,
+            peer=peer,
+            fork_height=fork_height,
+        )
+        for found_state in found_states:
+            settlement_states[found_state.coin.name()] = found_state
+        return settlement_states
+
     async def coins_of_interest_farmed(
-        self, coin_state: CoinState, fork_height: uint32 | None, peer: WSChiaConnection
+        self,
+        coin_state: CoinState,
+        fork_height: uint32 | None,
+        peer: WSChiaConnection,
+        settlement_states: dict[bytes32, CoinState | None] | None = None,
     ) -> None:
         """
         If both our coins and other coins in trade got removed that means that trade was successfully executed
         If coins from other side of trade got farmed without ours, that means that trade failed because either someone
         else completed trade or other side of trade canceled the trade by doing a spend.
         If our coins got farmed but coins from other side didn't, we successfully canceled trade by spending inputs.
+
+        settlement_states are the coin states of our additions if they've already been looked up (see
+        get_settlement_coin_states()), the peer is only asked about the ones that haven't.
         """
         self.log.info(f"coins_of_interest_farmed: {coin_state}")
         trades = await self.get_trades_by_coin(coin_state.coin)
@@ -156,31 +218,20 @@ class TradeManager:
             if coin_state.spent_height is None:
                 self.log.error(f"Coin: {coin_state.coin}, has not been spent so trade can remain valid")
             # Then let's filter the offer into coins that WE offered
-            if (
-                self.most_recently_deserialized_trade is not None
-                and trade.trade_id == self.most_recently_deserialized_trade[0]
-            ):
-                offer = self.most_recently_deserialized_trade[1]
-            else:
-                offer = Offer.from_bytes(trade.offer)
-                self.most_recently_deserialized_trade = (trade.trade_id, offer)
-            primary_coin_ids = [c.name() for c in offer.removals()]
-            # TODO: Add `WalletCoinStore.get_coins`.
-            result = await self.wallet_state_manager.coin_store.get_coin_records(
-                coin_id_filter=HashFilter.include(primary_coin_ids)
-            )
-            our_primary_coins: list[Coin] = [cr.coin for cr in result.records]
-            our_additions: list[Coin] = list(
-                filter(lambda c: offer.get_root_removal(c) in our_primary_coins, offer.additions())
-            )
-            our_addition_ids: list[bytes32] = [c.name() for c in our_additions]
+            offer = self.get_parsed_offer(trade)
+            [our_addition_ids] = await self.get_our_addition_ids([offer])
 
             # And get all relevant coin states
-            coin_states = await self.wallet_state_manager.wallet_node.get_coin_state(
-                our_addition_ids,
-                peer=peer,
-                fork_height=fork_height,
-            )
+            if settlement_states is not None and all(coin_id in settlement_states for coin_id in our_addition_ids):
+                coin_states = [
+                    state for state in (settlement_states[coin_id] for coin_id in our_addition_ids) if state is not None
+                ]
+            else:
+                coin_states = await self.wallet_state_manager.wallet_node.get_coin_state(
+                    our_addition_ids,
+                    peer=peer,
+                    fork_height=fork_height,
+                )
             assert coin_states is not None
             coin_state_names: list[bytes32] = [cs.coin.name() for cs in coin_states]
             # If any of our settlement_payments were spent, this offer was a success!
@@ -268,7 +319,7 @@ class TradeManager:
                 else:
                     trade = potential_trade
 
-            cancellation_coins = Offer.from_bytes(trade.offer).get_cancellation_coins()
+            cancellation_coins = self.get_parsed_offer(trade).get_cancellation_coins()
             for coin in cancellation_coins:
                 creation = CreateCoinAnnouncement(msg=announcement_nonce, coin_id=coin.name())
                 announcement_creations.append(creation)
@@ -104,6 +104,8 @@ class Offer:
     _offered_coins: dict[bytes32 | None, list[Coin]] = field(init=False, repr=False)
     _final_spend_bundle: WalletSpendBundle | None = field(init=False, repr=False)
     _conditions: dict[Coin, list[Condition]] | None = field(init=False)
+    # this is a cache of the root removal of each addition
+    _root_removals: dict[Coin, Coin] | None = field(init=False, repr=False, compare=False)
 
     @staticmethod
     def ph() -> bytes32:
@@ -178,6 +180,7 @@ class Offer:
         object.__setattr__(self, "_additions", adds)
         object.__setattr__(self, "_hints", hints)
         object.__setattr__(self, "_conditions", None)
+        object.__setattr__(self, "_root_removals", None)
 
     def conditions(self) -> dict[Coin, list[Condition]]:
         if self._conditions is None:
@@ -404,6 +407,20 @@ class Offer:
 
         return coin
 
+    # This returns the root removal (see above) of every addition
+    def get_root_removals(self) -> dict[Coin, Coin]:
+        if self._root_removals is None:
+            removals: dict[bytes32, Coin] = {c.name(): c for c in self.removals()}
+            root_removals: dict[Coin, Coin] = {}
+            for addition in self.additions():
+                coin = addition
+                while coin.parent_coin_info in removals:
+                    coin = removals[coin.parent_coin_info]
+                root_removals[addition] = coin
+            object.__setattr__(self, "_root_removals", root_removals)
+        assert self._root_removals is not None
+        return self._root_removals
+
     # This will only return coins that are ancestors of settlement payments
     def get_primary_coins(self) -> list[Coin]:
         primary_coins: set[Coin] = set()
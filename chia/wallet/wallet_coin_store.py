@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import bisect
 import sqlite3
 from dataclasses import dataclass
 from enum import IntEnum
@@ -52,6 +53,35 @@ class GetCoinRecordsResult:
     total_count: uint32 | None
 
 
+@dataclass
+class UnspentCoinIndex:
+    """
+    The unspent coins of a wallet of one coin type, ordered by amount.
+    """
+
+    records: dict[bytes32, WalletCoinRecord]
+    # (amount, coin name), in ascending order
+    amounts: list[tuple[int, bytes32]]
+
+    def add(self, name: bytes32, record: WalletCoinRecord) -> None:
+        self.remove(name)
+        self.records[name] = record
+        bisect.insort(self.amounts, (int(record.coin.amount), name))
+
+    def remove(self, name: bytes32) -> None:
+        record = self.records.pop(name, None)
+        if record is None:
+            return
+        key = (int(record.coin.amount), name)
+        i = bisect.bisect_left(self.amounts, key)
+        assert self.amounts[i] == key
+        del self.amounts[i]
+
+    def by_amount(self, reverse: bool = False) -> list[WalletCoinRecord]:
+        amounts = reversed(self.amounts) if reverse else self.amounts
+        return [self.records[name] for _, name in amounts]
+
+
 class WalletCoinStore:
     """
     This object handles CoinRecords in DB used by wallet.
@@ -59,6 +89,12 @@ class WalletCoinStore:
 
     db_wrapper: DBWrapper2
     total_count_cache: LRUCache[bytes32, uint32]
+    # the unspent coins by (wallet_id, coin_type), loaded on first use and
+    # updated as the coins are added and spent
+    unspent_coin_indexes: dict[tuple[int, int], UnspentCoinIndex]
+    # the rollback count of the DB wrapper when the indexes were last known to
+    # be in sync with the DB
+    unspent_coin_indexes_rollback_count: int
 
     @classmethod
     async def create(cls, wrapper: DBWrapper2):
@@ -66,6 +102,8 @@ class WalletCoinStore:
 
         self.db_wrapper = wrapper
         self.total_count_cache = LRUCache(100)
+        self.unspent_coin_indexes = {}
+        self.unspent_coin_indexes_rollback_count = wrapper.rollback_count
 
         async with self.db_wrapper.writer_maybe_transaction() as conn:
             await conn.execute(
@@ -138,12 +176,18 @@ class WalletCoinStore:
                     None if record.metadata is None else bytes(record.metadata),
                 ),
             )
+            self._remove_from_unspent_coin_indexes(name)
+            if not record.spent:
+                index = self.unspent_coin_indexes.get((record.wallet_id, record.coin_type))
+                if index is not None:
+                    index.add(name, record)
         self.total_count_cache.cache.clear()
 
     # Sometimes we realize that a coin is actually not interesting to us so we need to delete it
     async def delete_coin_record(self, coin_name: bytes32) -> None:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
             await (await conn.execute("DELETE FROM coin_record WHERE coin_name=?", (coin_name.hex(),))).close()
+            self._remove_from_unspent_coin_indexes(coin_name)
         self.total_count_cache.cache.clear()
 
     # Update coin_record to be spent in DB
@@ -157,8 +201,39 @@ class WalletCoinStore:
                     coin_name.hex(),
                 ),
             )
+            self._remove_from_unspent_coin_indexes(coin_name)
         self.total_count_cache.cache.clear()
 
+    def _remove_from_unspent_coin_indexes(self, coin_name: bytes32) -> None:
+        for index in self.unspent_coin_indexes.values():
+            index.remove(coin_name)
+
+    async def _get_unspent_coin_index(self, wallet_id: int, coin_type: CoinType) -> UnspentCoinIndex:
+        if self.db_wrapper.rollback_count != self.unspent_coin_indexes_rollback_count:
+            # the indexes may have been updated by writes that were rolled back
+            self.unspent_coin_indexes.clear()
+            self.unspent_coin_indexes_rollback_count = self.db_wrapper.rollback_count
+        index = self.unspent_coin_indexes.get((wallet_id, coin_type))
+        if index is not None:
+            return index
+
+        # the index is loaded under the write lock, so it doesn't miss any
+        # write that is in progress
+        async with self.db_wrapper.writer_maybe_transaction() as conn:
+            rows = await conn.execute_fetchall(
+                "SELECT * FROM coin_record WHERE coin_type=? AND wallet_id=? AND spent_height=0",
+                (coin_type, wallet_id),
+            )
+            index = UnspentCoinIndex({}, [])
+            for row in rows:
+                name = bytes32.fromhex(row[0])
+                index.records[name] = self.coin_record_from_row(row)
+                index.amounts.append((int.from_bytes(row[7], "big"), name))
+            index.amounts.sort()
+            if self.db_wrapper.rollback_count == self.unspent_coin_indexes_rollback_count:
+                self.unspent_coin_indexes[wallet_id, coin_type] = index
+        return index
+
     def coin_record_from_row(self, row: sqlite3.Row) -> WalletCoinRecord:
         coin = Coin(bytes32.fromhex(row[6]), bytes32.fromhex(row[5]), uint64.from_bytes(row[7]))
         return WalletCoinRecord(
@@ -295,12 +370,13 @@ class WalletCoinStore:
         self, wallet_id: int, coin_type: CoinType = CoinType.NORMAL
     ) -> set[WalletCoinRecord]:
         """Returns set of CoinRecords that have not been spent yet for a wallet."""
-        async with self.db_wrapper.reader_no_transaction() as conn:
-            rows = await conn.execute_fetchall(
-                "SELECT * FROM coin_record WHERE coin_type=? AND wallet_id=? AND spent_height=0",
-                (coin_type, wallet_id),
-            )
-        return {self.coin_record_from_row(row) for row in rows}
+        return set((await self._get_unspent_coin_index(wallet_id, coin_type)).records.values())
+
+    async def get_unspent_coins_by_amount(
+        self, wallet_id: int, coin_type: CoinType = CoinType.NORMAL
+    ) -> list[WalletCoinRecord]:
+        """Returns the CoinRecords that have not been spent yet for a wallet, largest amount first."""
+        return (await self._get_unspent_coin_index(wallet_id, coin_type)).by_amount(reverse=True)
 
     async def get_all_unspent_coins(self, coin_type: CoinType = CoinType.NORMAL) -> set[WalletCoinRecord]:
         """Returns set of CoinRecords that have not been spent yet for a wallet."""
@@ -342,10 +418,13 @@ class WalletCoinStore:
                     (height,),
                 )
             ).close()
+            self.unspent_coin_indexes.clear()
         self.total_count_cache.cache.clear()
 
     async def delete_wallet(self, wallet_id: uint32) -> None:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
             cursor = await conn.execute("DELETE FROM coin_record WHERE wallet_id=?", (wallet_id,))
             await cursor.close()
+            for key in [key for key in self.unspent_coin_indexes if key[0] == wallet_id]:
+                del self.unspent_coin_indexes[key]
         self.total_count_cache.cache.clear()
@@ -1668,6 +1668,22 @@ class WalletStateManager:
         coin_names = [bytes32(coin_state.coin.name()) for coin_state in coin_states]
         local_records = await self.coin_store.get_coin_records(coin_id_filter=HashFilter.include(coin_names))
 
+        # look up how all the trades these coin states settle turned out at once, if that fails they're looked up
+        # trade by trade
+        trade_settlement_states: dict[bytes32, CoinState | None] | None = None
+        try:
+            trade_settlement_states = await self.trade_manager.get_settlement_coin_states(
+                [
+                    coin_state
+                    for coin_name, coin_state in zip(coin_names, coin_states)
+                    if coin_state.spent_height is not None and coin_name in trade_removals
+                ],
+                fork_height,
+                peer,
+            )
+        except Exception as e:
+            self.log.warning(f"Failed to look up the trade settlement coin states: {e}")
+
         for coin_name, coin_state in zip(coin_names, coin_states):
             if peer.closed:
                 raise ConnectionError("Connection closed")
@@ -1694,7 +1710,9 @@ class WalletStateManager:
                             continue
 
                     if coin_state.spent_height is not None and coin_name in trade_removals:
-                        await self.trade_manager.coins_of_interest_farmed(coin_state, fork_height, peer)
+                        await self.trade_manager.coins_of_interest_farmed(
+                            coin_state, fork_height, peer, trade_settlement_states
+                        )
                     if wallet_identifier is not None:
                         self.log.debug(f"Found existing wallet_identifier: {wallet_identifier}, coin: {coin_name}")
                     elif local_record is not None:
@@ -2523,11 +2541,15 @@ class WalletStateManager:
     ) -> set[WalletCoinRecord]:
         wallet = self.wallets[uint32(wallet_id)]
         wallet_type = wallet.type()
+        # the candidate records, largest amount first
+        records_by_amount: list[WalletCoinRecord]
         if records is None:
             if wallet_type == WalletType.CRCAT:
-                records = await self.coin_store.get_unspent_coins_for_wallet(wallet_id, CoinType.CRCAT)
+                records_by_amount = await self.coin_store.get_unspent_coins_by_amount(wallet_id, CoinType.CRCAT)
             else:
-                records = await self.coin_store.get_unspent_coins_for_wallet(wallet_id)
+                records_by_amount = await self.coin_store.get_unspent_coins_by_amount(wallet_id)
+        else:
+            records_by_amount = sorted(records, reverse=True, key=lambda rec: rec.coin.amount)
 
         # Coins that are currently part of a transaction
         if pending_removals is None:
@@ -2541,20 +2563,19 @@ class WalletStateManager:
         # Coins that are part of the trade
         offer_locked_coins: dict[bytes32, WalletCoinRecord] = await self.trade_manager.get_locked_coins()
 
-        filtered = set()
-        for record in records:
-            if record.coin.name() in {*offer_locked_coins.keys(), *pending_removals}:
+        excluded_coin_ids = {*offer_locked_coins.keys(), *pending_removals}
+        filtered: list[WalletCoinRecord] = []
+        for record in records_by_amount:
+            if record.coin.name() in excluded_coin_ids:
                 continue
             if hasattr(wallet, "is_coin_spendable") and not await wallet.is_coin_spendable(record):
                 continue
-            filtered.add(record)
+            filtered.append(record)
 
         if hasattr(wallet, "max_send_quantity") and in_one_block:
-            filtered_as_list = list(filtered)
-            filtered_as_list.sort(reverse=True, key=lambda rec: rec.coin.amount)
-            return set(filtered_as_list[0 : min(len(filtered_as_list), wallet.max_send_quantity)])
+            return set(filtered[0 : min(len(filtered), wallet.max_send_quantity)])
 
-        return filtered
+        return set(filtered)
 
     async def new_peak(self, height: uint32) -> None:
         for wallet_id, wallet in self.wallets.items():